@@ -25,6 +25,10 @@ def create_app(config_name=None):
     from config import config
     app.config.from_object(config[config_name])
     
+    # Opciones del engine según el perfil del pool de conexiones
+    from app.db_pool import configure_engine_options
+    configure_engine_options(app)
+    
     # Inicializar extensiones
     db.init_app(app)
     login_manager.init_app(app)
@@ -61,6 +65,26 @@ def create_app(config_name=None):
     from app.api import bp as api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # Registrar comandos de línea de comandos (flask <comando>)
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # Métricas y perfilado de peticiones
+    from app.metrics import init_metrics
+    from app.profiling import init_profiling
+    from app.db_pool import init_pool_monitor
+    init_metrics(app)
+    init_profiling(app)
+    init_pool_monitor(app)
+    
+    # Cola de webhooks (solo en modo de ingesta 'queue')
+    from app.webhook_queue import init_webhook_queue
+    init_webhook_queue(app)
+    
+    # Buffer de escritura del progreso (solo en modo 'buffer')
+    from app.progress_buffer import init_progress_buffer
+    init_progress_buffer(app)
+    
     # Crear directorios necesarios
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(app.config['AI_MODEL_PATH'], exist_ok=True)
@@ -7,11 +7,13 @@ from .vark_analyzer import VARKAnalyzer
 from .learning_path_generator import LearningPathGenerator
 from .recommendation_engine import RecommendationEngine
 from .analytics_engine import AnalyticsEngine
+from .analytics_snapshot import AnalyticsSnapshotRefresher
 
 __all__ = [
     'GoogleFormsIntegration',
     'VARKAnalyzer', 
     'LearningPathGenerator',
     'RecommendationEngine',
-    'AnalyticsEngine'
+    'AnalyticsEngine',
+    'AnalyticsSnapshotRefresher'
 ]
@@ -2,11 +2,196 @@
 Motor de analíticas para el STI
 """
 
-from app.models import Student, Course, Progress, LearningPath, DiagnosticExam
+from app.models import (
+    User, Student, Course, CourseEnrollment, Progress, LearningPath, DiagnosticExam, LearningAnalytics
+)
 from app import db
-from sqlalchemy import func, desc
-from datetime import datetime, timedelta
+from app.ai.performance_trends import get_performance_trends
+from flask import current_app
+from sqlalchemy import func, desc, case, and_
 import json
+import numpy as np
+
+# Códigos de estilo VARK almacenados en Student.dominant_learning_style
+LEARNING_STYLE_CODES = ('V', 'A', 'R', 'K')
+
+# Tramos de los histogramas de engagement (puntaje de 0.0 a 1.0) y de
+# duración promedio de sesión (minutos; el último tramo es abierto)
+ENGAGEMENT_HISTOGRAM_BINS = 10
+SESSION_MINUTES_EDGES = (0, 5, 15, 30, 60)
+
+def build_enrollment_stats(total, active, completed):
+    """Construir el diccionario de estadísticas de matrícula a partir de conteos"""
+    return {
+        'total': total,
+        'active': active,
+        'completed': completed,
+        'completion_rate': (completed / total * 100) if total > 0 else 0
+    }
+
+def build_diagnostic_stats(total, completed, avg_score, min_score, max_score):
+    """Construir el diccionario de estadísticas de diagnóstico a partir de agregados"""
+    # Estadísticas de puntajes
+    if completed > 0:
+        avg_score = float(avg_score or 0)
+        min_score = float(min_score or 0)
+        max_score = float(max_score or 0)
+    else:
+        avg_score = min_score = max_score = 0
+    
+    return {
+        'total': total,
+        'completed': completed,
+        'completion_rate': (completed / total * 100) if total > 0 else 0,
+        'avg_score': round(avg_score, 2),
+        'min_score': round(min_score, 2),
+        'max_score': round(max_score, 2)
+    }
+
+def build_learning_path_stats(total, active, completed, avg_progress):
+    """Construir el diccionario de estadísticas de rutas a partir de agregados"""
+    # Progreso promedio
+    avg_progress = float(avg_progress or 0) if active > 0 else 0
+    
+    return {
+        'total': total,
+        'active': active,
+        'completed': completed,
+        'completion_rate': (completed / total * 100) if total > 0 else 0,
+        'avg_progress': round(avg_progress, 2)
+    }
+
+def build_progress_analytics(distribution):
+    """
+    Construir las analíticas de progreso
+    
+    Args:
+        distribution (dict): {activity_type: {'count', 'scored', 'percentage_sum'}}
+    """
+    if not distribution:
+        return {}
+    
+    total_activities = sum(d['count'] for d in distribution.values())
+    total_scored = sum(d['scored'] for d in distribution.values())
+    total_percentage = sum(d['percentage_sum'] for d in distribution.values())
+    avg_percentage = total_percentage / total_scored if total_scored > 0 else 0
+    
+    # Distribución por tipo de actividad
+    activity_types = {}
+    for activity_type, data in distribution.items():
+        activity_types[activity_type] = {
+            'count': data['count'],
+            'avg_score': round(data['percentage_sum'] / data['scored'], 2) if data['scored'] > 0 else 0
+        }
+    
+    return {
+        'total_activities': total_activities,
+        'avg_percentage': round(avg_percentage, 2),
+        'activity_distribution': activity_types
+    }
+
+def build_learning_style_distribution(total_students, style_counts):
+    """
+    Construir la distribución porcentual de estilos de aprendizaje
+    
+    Args:
+        total_students (int): Estudiantes con matrícula activa
+        style_counts (dict): Conteo por código de estilo (V, A, R, K)
+    """
+    style_distribution = {code: style_counts.get(code, 0) for code in LEARNING_STYLE_CODES}
+    style_distribution['Unknown'] = total_students - sum(style_distribution.values())
+    
+    if total_students > 0:
+        for style in style_distribution:
+            style_distribution[style] = round(
+                (style_distribution[style] / total_students) * 100, 2
+            )
+    
+    return style_distribution
+
+def _column(rows, attribute):
+    """Columna de las filas como arreglo float, con NaN en lugar de NULL"""
+    return np.array([np.nan if getattr(row, attribute) is None else float(getattr(row, attribute))
+                     for row in rows], dtype=float)
+
+def _summarize(values):
+    """Promedio y percentiles 50 y 90 ignorando valores nulos (NaN)"""
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return 0, {'p50': 0, 'p90': 0}
+    p50, p90 = np.percentile(values, [50, 90])
+    return round(float(values.mean()), 2), {'p50': round(float(p50), 2), 'p90': round(float(p90), 2)}
+
+def _round_or_none(value):
+    return None if value is None else round(float(value), 2)
+
+def build_engagement_metrics(rows):
+    """
+    Construir las métricas de engagement de un curso
+    
+    Los promedios, percentiles e histogramas del curso se calculan sobre el
+    promedio de cada estudiante (todos pesan igual) y solo con los
+    estudiantes que tienen un valor para la métrica.
+    
+    Args:
+        rows (list): Una fila por matrícula activa con student_id, first_name,
+            last_name, sessions y los promedios engagement_score,
+            session_duration, questions_attempted y accuracy_rate
+    
+    Returns:
+        dict: Métricas del curso y lista 'student_engagement' por estudiante
+    """
+    if not rows:
+        return {}
+    
+    rows = [row for row in rows if row.sessions]
+    engagement = _column(rows, 'engagement_score')
+    session_duration = _column(rows, 'session_duration')
+    accuracy = _column(rows, 'accuracy_rate')
+    
+    avg_engagement, engagement_percentiles = _summarize(engagement)
+    avg_session_duration, session_duration_percentiles = _summarize(session_duration)
+    avg_accuracy, accuracy_percentiles = _summarize(accuracy)
+    
+    engagement_counts, edges = np.histogram(
+        np.clip(engagement[~np.isnan(engagement)], 0.0, 1.0), bins=ENGAGEMENT_HISTOGRAM_BINS, range=(0.0, 1.0)
+    )
+    minutes = session_duration[~np.isnan(session_duration)] / 60
+    minute_counts = np.bincount(
+        np.searchsorted(SESSION_MINUTES_EDGES, minutes, side='right') - 1, minlength=len(SESSION_MINUTES_EDGES)
+    )
+    minute_labels = [f'{low}-{high} min' for low, high in zip(SESSION_MINUTES_EDGES, SESSION_MINUTES_EDGES[1:])]
+    minute_labels.append(f'{SESSION_MINUTES_EDGES[-1]}+ min')
+    
+    return {
+        'avg_engagement_score': avg_engagement,
+        'avg_session_duration': avg_session_duration,
+        'avg_accuracy_rate': avg_accuracy,
+        'students_with_sessions': len(rows),
+        'total_sessions': int(sum(row.sessions for row in rows)),
+        'engagement_percentiles': engagement_percentiles,
+        'session_duration_percentiles': session_duration_percentiles,
+        'accuracy_rate_percentiles': accuracy_percentiles,
+        'engagement_histogram': [
+            {'range': f'{low:.1f}-{high:.1f}', 'count': int(count)}
+            for low, high, count in zip(edges, edges[1:], engagement_counts)
+        ],
+        'session_duration_histogram': [
+            {'range': label, 'count': int(count)} for label, count in zip(minute_labels, minute_counts)
+        ],
+        'student_engagement': [
+            {
+                'student_id': row.student_id,
+                'student_name': f"{row.first_name} {row.last_name}",
+                'sessions': row.sessions,
+                'engagement_score': _round_or_none(row.engagement_score),
+                'session_duration': _round_or_none(row.session_duration),
+                'questions_attempted': _round_or_none(row.questions_attempted),
+                'accuracy_rate': _round_or_none(row.accuracy_rate)
+            }
+            for row in rows
+        ]
+    }
 
 class AnalyticsEngine:
     """Motor de analíticas y reportes para el STI"""
@@ -18,6 +203,10 @@ class AnalyticsEngine:
         """
         Obtener analíticas completas de un curso
         
+        Las estadísticas de matrícula, diagnóstico, rutas, progreso y estilos
+        se calculan con un número fijo de consultas agregadas (una por tabla),
+        sin cargar filas individuales en memoria.
+        
         Args:
             course_id (int): ID del curso
             
@@ -29,6 +218,9 @@ class AnalyticsEngine:
             if not course:
                 return {}
             
+            # Una sola consulta alimenta matrícula y distribución de estilos
+            enrollment_row = self._aggregate_enrollments(course_id)
+            
             analytics = {
                 'course_info': {
                     'id': course.id,
@@ -36,11 +228,11 @@ class AnalyticsEngine:
                     'code': course.code,
                     'subject': course.subject
                 },
-                'enrollment_stats': self._get_enrollment_stats(course_id),
+                'enrollment_stats': self._get_enrollment_stats(course_id, enrollment_row),
                 'diagnostic_stats': self._get_diagnostic_stats(course_id),
                 'learning_path_stats': self._get_learning_path_stats(course_id),
                 'progress_analytics': self._get_progress_analytics(course_id),
-                'learning_style_distribution': self._get_learning_style_distribution(course_id),
+                'learning_style_distribution': self._get_learning_style_distribution(course_id, enrollment_row),
                 'performance_trends': self._get_performance_trends(course_id),
                 'engagement_metrics': self._get_engagement_metrics(course_id)
             }
@@ -51,27 +243,99 @@ class AnalyticsEngine:
             print(f"Error obteniendo analíticas del curso: {e}")
             return {}
     
-    def _get_enrollment_stats(self, course_id):
+    def _aggregate_enrollments(self, course_id):
+        """
+        Agregar matrículas y estilos de aprendizaje en una sola consulta
+        
+        Returns:
+            Row: total, active, completed, suma de progreso y conteos de
+            estilo (V, A, R, K) de los estudiantes con matrícula activa
+        """
+        is_active = CourseEnrollment.is_active == True
+        style = Student.dominant_learning_style
+        
+        columns = [
+            func.count(CourseEnrollment.id).label('total'),
+            func.sum(case((is_active, 1), else_=0)).label('active'),
+            func.sum(case((CourseEnrollment.completion_date.isnot(None), 1), else_=0)).label('completed'),
+            func.sum(case((is_active, CourseEnrollment.overall_progress), else_=0)).label('progress_sum')
+        ]
+        for code in LEARNING_STYLE_CODES:
+            columns.append(
+                func.sum(case((and_(is_active, style == code), 1), else_=0)).label(f'style_{code}')
+            )
+        
+        return db.session.query(*columns).select_from(CourseEnrollment).join(
+            Student, Student.id == CourseEnrollment.student_id
+        ).filter(
+            CourseEnrollment.course_id == course_id
+        ).one()
+    
+    def _aggregate_diagnostics(self, course_id):
+        """
+        Agregar exámenes diagnósticos en una sola consulta
+        
+        Returns:
+            Row: total, completed y suma, promedio, mínimo y máximo del
+            porcentaje de los exámenes completados
+        """
+        is_completed = DiagnosticExam.is_completed == True
+        completed_percentage = case((is_completed, DiagnosticExam.percentage), else_=None)
+        
+        return db.session.query(
+            func.count(DiagnosticExam.id).label('total'),
+            func.sum(case((is_completed, 1), else_=0)).label('completed'),
+            func.sum(completed_percentage).label('score_sum'),
+            func.avg(completed_percentage).label('avg_score'),
+            func.min(completed_percentage).label('min_score'),
+            func.max(completed_percentage).label('max_score')
+        ).filter(
+            DiagnosticExam.course_id == course_id
+        ).one()
+    
+    def _aggregate_learning_paths(self, course_id):
+        """
+        Agregar rutas de aprendizaje en una sola consulta
+        
+        Returns:
+            Row: total, active, completed y suma y promedio del porcentaje de
+            avance de las rutas activas
+        """
+        is_active = LearningPath.is_active == True
+        active_progress = case((is_active, LearningPath.completion_percentage), else_=None)
+        
+        return db.session.query(
+            func.count(LearningPath.id).label('total'),
+            func.sum(case((is_active, 1), else_=0)).label('active'),
+            func.sum(case((LearningPath.is_completed == True, 1), else_=0)).label('completed'),
+            func.sum(active_progress).label('progress_sum'),
+            func.avg(active_progress).label('avg_progress')
+        ).filter(
+            LearningPath.course_id == course_id
+        ).one()
+    
+    def _aggregate_progress(self, course_id):
+        """
+        Agregar registros de progreso por tipo de actividad
+        
+        Returns:
+            list: Una fila por tipo de actividad con count, scored (registros
+            con porcentaje) y percentage_sum
+        """
+        return db.session.query(
+            Progress.activity_type,
+            func.count(Progress.id).label('count'),
+            func.count(Progress.percentage).label('scored'),
+            func.sum(Progress.percentage).label('percentage_sum')
+        ).filter(
+            Progress.course_id == course_id
+        ).group_by(Progress.activity_type).all()
+    
+    def _get_enrollment_stats(self, course_id, enrollment_row=None):
         """Obtener estadísticas de matrícula"""
         try:
-            from app.models import CourseEnrollment
-            
-            total_enrollments = CourseEnrollment.query.filter_by(course_id=course_id).count()
-            active_enrollments = CourseEnrollment.query.filter_by(
-                course_id=course_id, 
-                is_active=True
-            ).count()
-            completed_enrollments = CourseEnrollment.query.filter(
-                CourseEnrollment.course_id == course_id,
-                CourseEnrollment.completion_date.isnot(None)
-            ).count()
-            
-            return {
-                'total': total_enrollments,
-                'active': active_enrollments,
-                'completed': completed_enrollments,
-                'completion_rate': (completed_enrollments / total_enrollments * 100) if total_enrollments > 0 else 0
-            }
+            row = enrollment_row if enrollment_row is not None else self._aggregate_enrollments(course_id)
+            return build_enrollment_stats(row.total or 0, row.active or 0, row.completed or 0)
             
         except Exception as e:
             print(f"Error obteniendo estadísticas de matrícula: {e}")
@@ -80,39 +344,14 @@ class AnalyticsEngine:
     def _get_diagnostic_stats(self, course_id):
         """Obtener estadísticas del examen diagnóstico"""
         try:
-            total_diagnostics = DiagnosticExam.query.filter_by(course_id=course_id).count()
-            completed_diagnostics = DiagnosticExam.query.filter_by(
-                course_id=course_id,
-                is_completed=True
-            ).count()
-            
-            # Estadísticas de puntajes
-            if completed_diagnostics > 0:
-                avg_score = db.session.query(func.avg(DiagnosticExam.percentage)).filter(
-                    DiagnosticExam.course_id == course_id,
-                    DiagnosticExam.is_completed == True
-                ).scalar() or 0
-                
-                min_score = db.session.query(func.min(DiagnosticExam.percentage)).filter(
-                    DiagnosticExam.course_id == course_id,
-                    DiagnosticExam.is_completed == True
-                ).scalar() or 0
-                
-                max_score = db.session.query(func.max(DiagnosticExam.percentage)).filter(
-                    DiagnosticExam.course_id == course_id,
-                    DiagnosticExam.is_completed == True
-                ).scalar() or 0
-            else:
-                avg_score = min_score = max_score = 0
-            
-            return {
-                'total': total_diagnostics,
-                'completed': completed_diagnostics,
-                'completion_rate': (completed_diagnostics / total_diagnostics * 100) if total_diagnostics > 0 else 0,
-                'avg_score': round(avg_score, 2),
-                'min_score': round(min_score, 2),
-                'max_score': round(max_score, 2)
-            }
+            row = self._aggregate_diagnostics(course_id)
+            return build_diagnostic_stats(
+                row.total or 0,
+                row.completed or 0,
+                row.avg_score,
+                row.min_score,
+                row.max_score
+            )
             
         except Exception as e:
             print(f"Error obteniendo estadísticas de diagnóstico: {e}")
@@ -121,32 +360,13 @@ class AnalyticsEngine:
     def _get_learning_path_stats(self, course_id):
         """Obtener estadísticas de rutas de aprendizaje"""
         try:
-            total_paths = LearningPath.query.filter_by(course_id=course_id).count()
-            active_paths = LearningPath.query.filter_by(
-                course_id=course_id,
-                is_active=True
-            ).count()
-            completed_paths = LearningPath.query.filter_by(
-                course_id=course_id,
-                is_completed=True
-            ).count()
-            
-            # Progreso promedio
-            if active_paths > 0:
-                avg_progress = db.session.query(func.avg(LearningPath.completion_percentage)).filter(
-                    LearningPath.course_id == course_id,
-                    LearningPath.is_active == True
-                ).scalar() or 0
-            else:
-                avg_progress = 0
-            
-            return {
-                'total': total_paths,
-                'active': active_paths,
-                'completed': completed_paths,
-                'completion_rate': (completed_paths / total_paths * 100) if total_paths > 0 else 0,
-                'avg_progress': round(avg_progress, 2)
-            }
+            row = self._aggregate_learning_paths(course_id)
+            return build_learning_path_stats(
+                row.total or 0,
+                row.active or 0,
+                row.completed or 0,
+                row.avg_progress
+            )
             
         except Exception as e:
             print(f"Error obteniendo estadísticas de rutas de aprendizaje: {e}")
@@ -155,164 +375,114 @@ class AnalyticsEngine:
     def _get_progress_analytics(self, course_id):
         """Obtener analíticas de progreso"""
         try:
-            # Obtener registros de progreso del curso
-            progress_records = Progress.query.join(Progress.enrollment).filter(
-                CourseEnrollment.course_id == course_id
-            ).all()
-            
-            if not progress_records:
-                return {}
-            
-            # Calcular estadísticas
-            total_activities = len(progress_records)
-            avg_percentage = sum(p.percentage for p in progress_records) / total_activities
-            
-            # Distribución por tipo de actividad
-            activity_types = {}
-            for record in progress_records:
-                activity_type = record.activity_type
-                if activity_type not in activity_types:
-                    activity_types[activity_type] = {'count': 0, 'avg_score': 0}
-                activity_types[activity_type]['count'] += 1
-                activity_types[activity_type]['avg_score'] += record.percentage
-            
-            # Calcular promedios
-            for activity_type in activity_types:
-                count = activity_types[activity_type]['count']
-                activity_types[activity_type]['avg_score'] = round(
-                    activity_types[activity_type]['avg_score'] / count, 2
-                )
-            
-            return {
-                'total_activities': total_activities,
-                'avg_percentage': round(avg_percentage, 2),
-                'activity_distribution': activity_types
+            distribution = {
+                row.activity_type: {
+                    'count': row.count,
+                    'scored': row.scored,
+                    'percentage_sum': float(row.percentage_sum or 0)
+                }
+                for row in self._aggregate_progress(course_id)
             }
+            return build_progress_analytics(distribution)
             
         except Exception as e:
             print(f"Error obteniendo analíticas de progreso: {e}")
             return {}
     
-    def _get_learning_style_distribution(self, course_id):
+    def _get_learning_style_distribution(self, course_id, enrollment_row=None):
         """Obtener distribución de estilos de aprendizaje"""
         try:
-            from app.models import CourseEnrollment
-            
-            # Obtener estudiantes del curso
-            enrollments = CourseEnrollment.query.filter_by(
-                course_id=course_id,
-                is_active=True
-            ).all()
-            
-            style_distribution = {'V': 0, 'A': 0, 'R': 0, 'K': 0, 'Unknown': 0}
-            
-            for enrollment in enrollments:
-                student = enrollment.student
-                if student.dominant_learning_style:
-                    style_distribution[student.dominant_learning_style] += 1
-                else:
-                    style_distribution['Unknown'] += 1
-            
-            total_students = len(enrollments)
-            if total_students > 0:
-                for style in style_distribution:
-                    style_distribution[style] = round(
-                        (style_distribution[style] / total_students) * 100, 2
-                    )
-            
-            return style_distribution
+            row = enrollment_row if enrollment_row is not None else self._aggregate_enrollments(course_id)
+            style_counts = {code: getattr(row, f'style_{code}') or 0 for code in LEARNING_STYLE_CODES}
+            return build_learning_style_distribution(row.active or 0, style_counts)
             
         except Exception as e:
             print(f"Error obteniendo distribución de estilos: {e}")
             return {}
     
-    def _get_performance_trends(self, course_id):
-        """Obtener tendencias de rendimiento"""
+    def _get_performance_trends(self, course_id, days=None, bucket=None, rolling_window=None):
+        """
+        Obtener tendencias de rendimiento del curso agrupadas por periodo en SQL
+
+        Args:
+            course_id (int): ID del curso
+            days (int): Días de la ventana (por defecto PERFORMANCE_TRENDS_DAYS)
+            bucket (str): 'day', 'week' o 'month' (por defecto PERFORMANCE_TRENDS_BUCKET)
+            rolling_window (int): Periodos del promedio móvil (por defecto PERFORMANCE_TRENDS_ROLLING_WINDOW)
+
+        Returns:
+            list: Periodos con 'date', 'avg_percentage', 'activity_count' y 'rolling_avg'
+        """
         try:
-            # Obtener progreso de los últimos 30 días
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            
-            progress_records = Progress.query.join(Progress.enrollment).filter(
-                CourseEnrollment.course_id == course_id,
-                Progress.created_at >= thirty_days_ago
-            ).order_by(Progress.created_at).all()
-            
-            # Agrupar por día
-            daily_performance = {}
-            for record in progress_records:
-                date_key = record.created_at.date().isoformat()
-                if date_key not in daily_performance:
-                    daily_performance[date_key] = []
-                daily_performance[date_key].append(record.percentage)
-            
-            # Calcular promedio diario
-            trends = []
-            for date, percentages in daily_performance.items():
-                avg_percentage = sum(percentages) / len(percentages)
-                trends.append({
-                    'date': date,
-                    'avg_percentage': round(avg_percentage, 2),
-                    'activity_count': len(percentages)
-                })
-            
-            return trends
+            return get_performance_trends().course_trends(
+                course_id, *self._trend_options(days, bucket, rolling_window)
+            )
             
         except Exception as e:
             print(f"Error obteniendo tendencias de rendimiento: {e}")
             return []
     
+    def _trend_options(self, days, bucket, rolling_window):
+        """Completar las opciones de tendencias con la configuración"""
+        config = current_app.config
+        return (
+            days if days is not None else config.get('PERFORMANCE_TRENDS_DAYS', 30),
+            bucket or config.get('PERFORMANCE_TRENDS_BUCKET', 'day'),
+            rolling_window or config.get('PERFORMANCE_TRENDS_ROLLING_WINDOW', 7)
+        )
+    
     def _get_engagement_metrics(self, course_id):
-        """Obtener métricas de engagement"""
-        try:
-            from app.models import CourseEnrollment
-            
-            # Obtener estudiantes activos
-            active_enrollments = CourseEnrollment.query.filter_by(
-                course_id=course_id,
-                is_active=True
-            ).all()
-            
-            if not active_enrollments:
-                return {}
-            
-            engagement_data = []
-            for enrollment in active_enrollments:
-                student = enrollment.student
-                
-                # Obtener analíticas del estudiante
-                analytics = LearningAnalytics.query.filter_by(
-                    student_id=student.id
-                ).order_by(desc(LearningAnalytics.created_at)).first()
-                
-                if analytics:
-                    engagement_data.append({
-                        'student_id': student.id,
-                        'student_name': student.user.get_full_name(),
-                        'engagement_score': analytics.engagement_score,
-                        'session_duration': analytics.session_duration,
-                        'questions_attempted': analytics.questions_attempted,
-                        'accuracy_rate': analytics.accuracy_rate
-                    })
-            
-            # Calcular métricas agregadas
-            if engagement_data:
-                avg_engagement = sum(d['engagement_score'] for d in engagement_data) / len(engagement_data)
-                avg_session_duration = sum(d['session_duration'] for d in engagement_data if d['session_duration']) / len(engagement_data)
-                avg_accuracy = sum(d['accuracy_rate'] for d in engagement_data if d['accuracy_rate']) / len(engagement_data)
-            else:
-                avg_engagement = avg_session_duration = avg_accuracy = 0
+        """
+        Obtener métricas de engagement del curso con una sola consulta agrupada
+        
+        Args:
+            course_id (int): ID del curso
             
-            return {
-                'avg_engagement_score': round(avg_engagement, 2),
-                'avg_session_duration': round(avg_session_duration, 2),
-                'avg_accuracy_rate': round(avg_accuracy, 2),
-                'student_engagement': engagement_data
-            }
+        Returns:
+            dict: Promedios, percentiles (p50/p90) e histogramas del curso y
+            promedios por estudiante (ver build_engagement_metrics)
+        """
+        try:
+            return build_engagement_metrics(self._aggregate_engagement(course_id))
             
         except Exception as e:
             print(f"Error obteniendo métricas de engagement: {e}")
             return {}
     
+    def _aggregate_engagement(self, course_id):
+        """
+        Agregar las sesiones de learning_analytics por estudiante matriculado
+        
+        Returns:
+            list: Una fila por matrícula activa (con o sin sesiones en el
+            curso) con el nombre del estudiante, el número de sesiones y el
+            promedio de cada métrica; AVG ignora los valores nulos
+        """
+        return db.session.query(
+            CourseEnrollment.student_id,
+            User.first_name,
+            User.last_name,
+            func.count(LearningAnalytics.id).label('sessions'),
+            func.avg(LearningAnalytics.engagement_score).label('engagement_score'),
+            func.avg(LearningAnalytics.session_duration).label('session_duration'),
+            func.avg(LearningAnalytics.questions_attempted).label('questions_attempted'),
+            func.avg(LearningAnalytics.accuracy_rate).label('accuracy_rate')
+        ).select_from(CourseEnrollment).join(
+            Student, Student.id == CourseEnrollment.student_id
+        ).join(
+            User, User.id == Student.user_id
+        ).outerjoin(
+            LearningAnalytics, and_(
+                LearningAnalytics.student_id == CourseEnrollment.student_id,
+                LearningAnalytics.course_id == CourseEnrollment.course_id
+            )
+        ).filter(
+            CourseEnrollment.course_id == course_id,
+            CourseEnrollment.is_active == True
+        ).group_by(
+            CourseEnrollment.student_id, User.first_name, User.last_name
+        ).order_by(CourseEnrollment.student_id).all()
+    
     def get_student_analytics(self, student_id):
         """
         Obtener analíticas de un estudiante específico
@@ -408,35 +578,12 @@ class AnalyticsEngine:
             print(f"Error obteniendo resumen de progreso: {e}")
             return {}
     
-    def _get_student_performance_trends(self, student_id):
-        """Obtener tendencias de rendimiento del estudiante"""
+    def _get_student_performance_trends(self, student_id, days=None, bucket=None, rolling_window=None):
+        """Obtener tendencias de rendimiento del estudiante (ver _get_performance_trends)"""
         try:
-            # Similar a _get_performance_trends pero para un estudiante específico
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            
-            progress_records = Progress.query.filter(
-                Progress.student_id == student_id,
-                Progress.created_at >= thirty_days_ago
-            ).order_by(Progress.created_at).all()
-            
-            # Implementación similar a _get_performance_trends
-            daily_performance = {}
-            for record in progress_records:
-                date_key = record.created_at.date().isoformat()
-                if date_key not in daily_performance:
-                    daily_performance[date_key] = []
-                daily_performance[date_key].append(record.percentage)
-            
-            trends = []
-            for date, percentages in daily_performance.items():
-                avg_percentage = sum(percentages) / len(percentages)
-                trends.append({
-                    'date': date,
-                    'avg_percentage': round(avg_percentage, 2),
-                    'activity_count': len(percentages)
-                })
-            
-            return trends
+            return get_performance_trends().student_trends(
+                student_id, *self._trend_options(days, bucket, rolling_window)
+            )
             
         except Exception as e:
             print(f"Error obteniendo tendencias de rendimiento: {e}")
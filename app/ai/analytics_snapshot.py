@@ -0,0 +1,409 @@
+"""
+Instantáneas materializadas de analíticas por curso
+
+Las lecturas de analíticas consultan una sola fila de
+``course_analytics_snapshots`` (y de ``course_activity_counters`` para la
+distribución del progreso). Los contadores de diagnósticos, rutas y
+progreso se actualizan de forma incremental cuando ocurren los eventos
+correspondientes, con UPDATE atómicos que no bloquean la fila de la
+instantánea; el resto de secciones (matrículas, estilos, tendencias y
+engagement) se recalculan al reconstruir la instantánea, lo que ocurre
+cuando supera ``ANALYTICS_SNAPSHOT_MAX_AGE`` segundos o manualmente con
+``flask rebuild-analytics``.
+"""
+
+from flask import current_app
+from sqlalchemy import case, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import Course, CourseAnalyticsSnapshot, CourseActivityCounter
+from app import db
+from app.response_cache import course_scope, invalidate_responses
+from app.unit_of_work import in_unit_of_work
+from app.ai.analytics_engine import (
+    AnalyticsEngine, LEARNING_STYLE_CODES, build_enrollment_stats, build_diagnostic_stats,
+    build_learning_path_stats, build_progress_analytics, build_learning_style_distribution
+)
+from datetime import datetime
+
+DEFAULT_MAX_AGE_SECONDS = 300
+
+class AnalyticsSnapshotRefresher:
+    """Mantiene y sirve las instantáneas de analíticas por curso"""
+
+    def __init__(self, max_age_seconds=None):
+        self.analytics_engine = AnalyticsEngine()
+        if max_age_seconds is None:
+            max_age_seconds = current_app.config.get('ANALYTICS_SNAPSHOT_MAX_AGE', DEFAULT_MAX_AGE_SECONDS)
+        self.max_age_seconds = max_age_seconds
+
+    def get_course_analytics(self, course_id, force_rebuild=False):
+        """
+        Obtener analíticas de un curso desde su instantánea
+
+        Args:
+            course_id (int): ID del curso
+            force_rebuild (bool): Reconstruir aunque la instantánea esté vigente
+
+        Returns:
+            dict: Analíticas con la misma forma que AnalyticsEngine.get_course_analytics
+        """
+        try:
+            snapshot = self.get_snapshot(course_id, force_rebuild=force_rebuild)
+            if not snapshot:
+                return {}
+
+            return self.to_analytics(snapshot)
+
+        except Exception as e:
+            print(f"Error obteniendo instantánea de analíticas: {e}")
+            return {}
+
+    def get_snapshot(self, course_id, force_rebuild=False):
+        """
+        Obtener la instantánea de un curso, reconstruyéndola si falta o está vencida
+
+        La reconstrucción se guarda en una transacción propia: las lecturas no
+        confirman la transacción de la petición. Dentro de una unidad de
+        trabajo (que puede tener escrituras pendientes) la instantánea se
+        calcula sin guardarla.
+
+        Returns:
+            CourseAnalyticsSnapshot: Instantánea vigente o None si el curso no existe
+        """
+        snapshot = CourseAnalyticsSnapshot.query.filter_by(course_id=course_id).first()
+
+        if force_rebuild or snapshot is None or snapshot.is_stale(self.max_age_seconds):
+            snapshot = self._rebuild_detached(course_id)
+
+        return snapshot
+
+    def rebuild(self, course_id):
+        """
+        Reconstruir por completo la instantánea de un curso y confirmar la transacción
+
+        Lo usan los comandos de mantenimiento (``flask rebuild-analytics``);
+        las lecturas usan get_snapshot.
+
+        Args:
+            course_id (int): ID del curso
+
+        Returns:
+            CourseAnalyticsSnapshot: Instantánea reconstruida o None si el curso no existe
+        """
+        values = self._build_values(course_id)
+        if values is None:
+            return None
+
+        try:
+            snapshot = self._store(db.session, course_id, values)
+            db.session.commit()
+        except IntegrityError:
+            # Otra petición creó la instantánea en paralelo; usar la suya
+            db.session.rollback()
+            snapshot = CourseAnalyticsSnapshot.query.filter_by(course_id=course_id).first()
+
+        return snapshot
+
+    def _rebuild_detached(self, course_id):
+        """Reconstruir la instantánea y guardarla en una sesión aparte, sin tocar la transacción de la petición"""
+        values = self._build_values(course_id)
+        if values is None:
+            return None
+
+        if in_unit_of_work():
+            # Otra conexión esperaría los bloqueos de escritura de esta transacción
+            values = dict(values)
+            counters = self._new_counters(course_id, values.pop('activity_distribution'))
+            snapshot = CourseAnalyticsSnapshot(course_id=course_id, **values)
+            snapshot.activity_counters = counters
+            return snapshot
+
+        with Session(db.engine, expire_on_commit=False) as session:
+            try:
+                snapshot = self._store(session, course_id, values)
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                snapshot = session.query(CourseAnalyticsSnapshot).filter_by(course_id=course_id).first()
+
+        return snapshot
+
+    def _store(self, session, course_id, values):
+        """Crear o actualizar la fila de la instantánea y sus contadores en una sesión, sin confirmar"""
+        values = dict(values)
+        distribution = values.pop('activity_distribution')
+
+        snapshot = session.query(CourseAnalyticsSnapshot).filter_by(course_id=course_id).first()
+        if snapshot is None:
+            snapshot = CourseAnalyticsSnapshot(course_id=course_id)
+            session.add(snapshot)
+
+        for key, value in values.items():
+            setattr(snapshot, key, value)
+
+        # Reemplazar los contadores de progreso por los recalculados
+        session.query(CourseActivityCounter).filter_by(course_id=course_id).delete(synchronize_session=False)
+        counters = self._new_counters(course_id, distribution)
+        session.add_all(counters)
+
+        session.flush()
+        snapshot.activity_counters = counters
+        return snapshot
+
+    def _new_counters(self, course_id, distribution):
+        """Filas de course_activity_counters a partir de una distribución {tipo: {...}}"""
+        return [
+            CourseActivityCounter(
+                course_id=course_id,
+                activity_type=activity_type,
+                count=entry['count'],
+                scored=entry['scored'],
+                percentage_sum=entry['percentage_sum']
+            )
+            for activity_type, entry in sorted(distribution.items())
+        ]
+
+    def _build_values(self, course_id):
+        """
+        Calcular todas las columnas de la instantánea de un curso
+
+        Returns:
+            dict: Valores de la instantánea o None si el curso no existe
+        """
+        course = Course.query.get(course_id)
+        if not course:
+            return None
+
+        # Escribir antes el progreso pendiente del buffer para no omitirlo
+        from app.progress_buffer import flush_pending_progress
+        flush_pending_progress(course_id=course_id)
+
+        engine = self.analytics_engine
+        enrollments = engine._aggregate_enrollments(course_id)
+        diagnostics = engine._aggregate_diagnostics(course_id)
+        paths = engine._aggregate_learning_paths(course_id)
+
+        values = {
+            'course_info': {
+                'id': course.id,
+                'name': course.name,
+                'code': course.code,
+                'subject': course.subject
+            },
+            'enrollments_total': enrollments.total or 0,
+            'enrollments_active': enrollments.active or 0,
+            'enrollments_completed': enrollments.completed or 0,
+            'enrollment_progress_sum': float(enrollments.progress_sum or 0),
+            'style_counts': {code: getattr(enrollments, f'style_{code}') or 0 for code in LEARNING_STYLE_CODES},
+            'diagnostics_total': diagnostics.total or 0,
+            'diagnostics_completed': diagnostics.completed or 0,
+            'diagnostic_score_sum': float(diagnostics.score_sum or 0),
+            'diagnostic_score_min': diagnostics.min_score,
+            'diagnostic_score_max': diagnostics.max_score,
+            'paths_total': paths.total or 0,
+            'paths_active': paths.active or 0,
+            'paths_completed': paths.completed or 0,
+            'active_path_progress_sum': float(paths.progress_sum or 0),
+            'activity_distribution': {
+                row.activity_type: {
+                    'count': row.count,
+                    'scored': row.scored,
+                    'percentage_sum': float(row.percentage_sum or 0)
+                }
+                for row in engine._aggregate_progress(course_id)
+            },
+            'performance_trends': engine._get_performance_trends(course_id),
+            'engagement_metrics': engine._get_engagement_metrics(course_id),
+            'rebuilt_at': datetime.utcnow()
+        }
+
+        return values
+
+    def rebuild_all(self):
+        """
+        Reconstruir las instantáneas de todos los cursos
+
+        Returns:
+            int: Número de instantáneas reconstruidas
+        """
+        rebuilt = 0
+        for (course_id,) in db.session.query(Course.id).order_by(Course.id).all():
+            if self.rebuild(course_id):
+                rebuilt += 1
+        return rebuilt
+
+    def to_analytics(self, snapshot):
+        """Convertir una instantánea al diccionario de analíticas del curso"""
+        style_counts = snapshot.style_counts or {}
+        completed = snapshot.diagnostics_completed or 0
+        active_paths = snapshot.paths_active or 0
+
+        return {
+            'course_info': snapshot.course_info or {},
+            'enrollment_stats': build_enrollment_stats(
+                snapshot.enrollments_total or 0,
+                snapshot.enrollments_active or 0,
+                snapshot.enrollments_completed or 0
+            ),
+            'diagnostic_stats': build_diagnostic_stats(
+                snapshot.diagnostics_total or 0,
+                completed,
+                (snapshot.diagnostic_score_sum or 0) / completed if completed > 0 else 0,
+                snapshot.diagnostic_score_min,
+                snapshot.diagnostic_score_max
+            ),
+            'learning_path_stats': build_learning_path_stats(
+                snapshot.paths_total or 0,
+                active_paths,
+                snapshot.paths_completed or 0,
+                (snapshot.active_path_progress_sum or 0) / active_paths if active_paths > 0 else 0
+            ),
+            'progress_analytics': build_progress_analytics(snapshot.activity_distribution or {}),
+            'learning_style_distribution': build_learning_style_distribution(
+                snapshot.enrollments_active or 0,
+                style_counts
+            ),
+            'performance_trends': snapshot.performance_trends or [],
+            'engagement_metrics': snapshot.engagement_metrics or {}
+        }
+
+    # Actualizaciones incrementales. No confirman la transacción: se aplican
+    # dentro de la transacción de quien registra el evento.
+
+    def record_progress(self, progress):
+        """Registrar un nuevo registro de progreso en la instantánea de su curso"""
+        self.record_progress_batch(progress.course_id, [(progress.activity_type, progress.percentage)])
+
+    def record_progress_batch(self, course_id, entries):
+        """
+        Registrar varios registros de progreso nuevos de un curso
+
+        Cada tipo de actividad se suma con un UPDATE atómico sobre su fila de
+        course_activity_counters, sin bloquear la instantánea del curso. Si el
+        tipo aún no tiene fila se inserta, solo si el curso tiene instantánea.
+
+        Args:
+            course_id (int): ID del curso
+            entries (list): Tuplas (activity_type, percentage)
+        """
+        totals = {}
+        for activity_type, percentage in entries:
+            count, scored, percentage_sum = totals.get(activity_type, (0, 0, 0.0))
+            if percentage is not None:
+                scored += 1
+                percentage_sum += percentage
+            totals[activity_type] = (count + 1, scored, percentage_sum)
+
+        if not totals:
+            return
+
+        # Orden fijo de los tipos para que dos transacciones no se bloqueen en cruce
+        for activity_type in sorted(totals):
+            self._add_activity(course_id, activity_type, *totals[activity_type])
+
+        # El UPDATE masivo no dispara los eventos del ORM de la caché de respuestas
+        invalidate_responses({course_scope(course_id)}, db.session)
+
+    def record_diagnostic_created(self, diagnostic):
+        """Registrar la creación de un examen diagnóstico"""
+        self._increment(diagnostic.course_id, diagnostics_total=1)
+
+    def record_diagnostic_completed(self, diagnostic, was_completed):
+        """
+        Registrar un examen diagnóstico completado
+
+        Args:
+            diagnostic (DiagnosticExam): Examen ya actualizado
+            was_completed (bool): Si el examen ya estaba completado antes del cambio;
+                en ese caso ya se contó y no se registra de nuevo
+        """
+        if was_completed or not diagnostic.is_completed:
+            return
+
+        score = diagnostic.percentage
+        values = {
+            CourseAnalyticsSnapshot.diagnostics_completed: CourseAnalyticsSnapshot.diagnostics_completed + 1
+        }
+
+        if score is not None:
+            score_min = CourseAnalyticsSnapshot.diagnostic_score_min
+            score_max = CourseAnalyticsSnapshot.diagnostic_score_max
+            values[CourseAnalyticsSnapshot.diagnostic_score_sum] = CourseAnalyticsSnapshot.diagnostic_score_sum + score
+            values[score_min] = case((score_min.is_(None), score), (score_min > score, score), else_=score_min)
+            values[score_max] = case((score_max.is_(None), score), (score_max < score, score), else_=score_max)
+
+        self._update(diagnostic.course_id, values)
+
+    def record_paths_created(self, course_id, count=1):
+        """Registrar rutas de aprendizaje nuevas (activas y sin avance)"""
+        if count:
+            self._increment(course_id, paths_total=count, paths_active=count)
+
+    def record_path_progress(self, learning_path, previous_percentage, was_completed):
+        """
+        Registrar el cambio de avance de una ruta de aprendizaje
+
+        Args:
+            learning_path (LearningPath): Ruta ya actualizada
+            previous_percentage (float): Porcentaje antes del cambio
+            was_completed (bool): Si la ruta ya estaba completada antes del cambio
+        """
+        values = {}
+
+        if learning_path.is_active:
+            delta = (learning_path.completion_percentage or 0) - (previous_percentage or 0)
+            if delta:
+                values[CourseAnalyticsSnapshot.active_path_progress_sum] = \
+                    CourseAnalyticsSnapshot.active_path_progress_sum + delta
+
+        if learning_path.is_completed and not was_completed:
+            values[CourseAnalyticsSnapshot.paths_completed] = CourseAnalyticsSnapshot.paths_completed + 1
+
+        if values:
+            self._update(learning_path.course_id, values)
+
+    def _increment(self, course_id, **counters):
+        """Incrementar contadores enteros de la instantánea de un curso"""
+        self._update(course_id, {
+            getattr(CourseAnalyticsSnapshot, name): getattr(CourseAnalyticsSnapshot, name) + amount
+            for name, amount in counters.items()
+        })
+
+    def _update(self, course_id, values):
+        """
+        Aplicar un UPDATE atómico sobre la instantánea de un curso, si existe
+
+        Los errores de la base de datos se propagan: la transacción de quien
+        registra el evento queda inválida y debe revertirse.
+        """
+        CourseAnalyticsSnapshot.query.filter_by(course_id=course_id).update(
+            values,
+            synchronize_session=False
+        )
+        # El UPDATE masivo no dispara los eventos del ORM de la caché de respuestas
+        invalidate_responses({course_scope(course_id)}, db.session)
+
+    def _add_activity(self, course_id, activity_type, count, scored, percentage_sum):
+        """Sumar registros de progreso al contador de un tipo de actividad, creándolo si falta"""
+        values = {
+            CourseActivityCounter.count: CourseActivityCounter.count + count,
+            CourseActivityCounter.scored: CourseActivityCounter.scored + scored,
+            CourseActivityCounter.percentage_sum: CourseActivityCounter.percentage_sum + percentage_sum
+        }
+        query = CourseActivityCounter.query.filter_by(course_id=course_id, activity_type=activity_type)
+        if query.update(values, synchronize_session=False):
+            return
+
+        # Primer registro del tipo: INSERT ... SELECT que no inserta nada si el curso no tiene instantánea
+        row = select(
+            literal(course_id), literal(activity_type), literal(count), literal(scored), literal(percentage_sum)
+        ).where(CourseAnalyticsSnapshot.course_id == course_id)
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(CourseActivityCounter).from_select(
+                    ['course_id', 'activity_type', 'count', 'scored', 'percentage_sum'], row
+                ))
+        except IntegrityError:
+            # Otra transacción creó la fila en paralelo: sumar sobre la suya
+            query.update(values, synchronize_session=False)
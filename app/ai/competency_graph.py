@@ -0,0 +1,278 @@
+"""
+Grafo de prerequisitos de competencias
+
+El grafo (DAG) de cada curso se construye una sola vez a partir de
+``Competency.prerequisites`` y se guarda en caché hasta que una competencia
+del curso se inserta, actualiza o elimina. El orden de estudio se obtiene con
+un ordenamiento topológico de Kahn sobre una cola de prioridad (heapq) cuya
+clave es el puntaje diagnóstico. Los ciclos se detectan y se informan en
+lugar de romperse en silencio.
+"""
+
+from collections import namedtuple
+import heapq
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from app import db
+from app.cache import TTLCache, defer_invalidation, history_values
+from app.models import Competency
+
+DEFAULT_MAX_ENTRIES = 256
+
+CompetencyNode = namedtuple('CompetencyNode', ['id', 'course_id', 'name', 'code', 'prerequisites'])
+
+class CompetencyGraph:
+    """Grafo inmutable de prerequisitos de las competencias de un curso"""
+
+    def __init__(self, course_id, nodes):
+        """
+        Args:
+            course_id (int): ID del curso
+            nodes (list): CompetencyNode ordenados por ID
+        """
+        self.course_id = course_id
+        self.nodes = tuple(nodes)
+        self.by_id = {node.id: node for node in self.nodes}
+        self.position = {node.id: index for index, node in enumerate(self.nodes)}
+
+        # Aristas prerequisito -> dependiente; los prerequisitos ajenos al curso se ignoran
+        self.dependents = {node.id: [] for node in self.nodes}
+        self.in_degree = {}
+        self.missing_prerequisites = {}
+        for node in self.nodes:
+            known = [prereq for prereq in node.prerequisites if prereq in self.by_id]
+            missing = [prereq for prereq in node.prerequisites if prereq not in self.by_id]
+            for prereq in known:
+                self.dependents[prereq].append(node.id)
+            self.in_degree[node.id] = len(known)
+            if missing:
+                self.missing_prerequisites[node.id] = tuple(missing)
+
+        self.cycles = self._find_cycles()
+
+    @classmethod
+    def from_competencies(cls, course_id, competencies):
+        """Construir el grafo a partir de competencias (ORM o equivalentes)"""
+        nodes = []
+        for comp in sorted(competencies, key=lambda c: c.id):
+            prerequisites = []
+            for prereq in comp.prerequisites or []:
+                try:
+                    prereq = int(prereq)
+                except (TypeError, ValueError):
+                    continue
+                if prereq not in prerequisites:
+                    prerequisites.append(prereq)
+            nodes.append(CompetencyNode(
+                comp.id, comp.course_id, comp.name, getattr(comp, 'code', None), tuple(prerequisites)
+            ))
+        return cls(course_id, nodes)
+
+    @property
+    def has_cycles(self):
+        return bool(self.cycles)
+
+    def order(self, scores):
+        """
+        Ordenar las competencias respetando prerequisitos
+
+        Entre las competencias disponibles se elige siempre la de menor
+        puntaje (la que necesita más trabajo) y, a igual puntaje, la de menor ID.
+        Si un ciclo impide avanzar, se libera la competencia de mayor prioridad
+        de un ciclo que solo espera a sus propios miembros y se anota en
+        ``forced``; las competencias que dependen del ciclo siguen esperando.
+
+        Args:
+            scores (dict): Puntaje por ID de competencia (0.0 si falta)
+
+        Returns:
+            tuple: (lista de (CompetencyNode, puntaje), IDs liberados por ciclos)
+        """
+        in_degree = dict(self.in_degree)
+        placed = set()
+        sequence = []
+        forced = []
+
+        def entry(node_id):
+            return (scores.get(node_id, 0.0), self.position[node_id], node_id)
+
+        heap = [entry(node_id) for node_id, degree in in_degree.items() if degree == 0]
+        heapq.heapify(heap)
+
+        while len(sequence) < len(self.nodes):
+            if not heap:
+                # Ciclo: liberar la competencia de mayor prioridad entre las que lo forman
+                blocked = min(entry(node_id) for node_id in self._releasable(placed))
+                forced.append(blocked[2])
+                heap.append(blocked)
+
+            score, _, node_id = heapq.heappop(heap)
+            if node_id in placed:
+                continue
+
+            placed.add(node_id)
+            sequence.append((self.by_id[node_id], score))
+
+            for dependent in self.dependents[node_id]:
+                if dependent in placed:
+                    continue
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    heapq.heappush(heap, entry(dependent))
+
+        return sequence, forced
+
+    def _releasable(self, placed):
+        """
+        Competencias pendientes de los ciclos cuyos prerequisitos pendientes
+        están todos dentro del mismo ciclo
+
+        Args:
+            placed (set): IDs ya ordenados
+
+        Returns:
+            list: IDs candidatos a liberar (los de todos los ciclos pendientes
+            si ninguno cumple la condición)
+        """
+        candidates = []
+        pending = []
+        for cycle in self.cycles:
+            members = [node_id for node_id in cycle if node_id not in placed]
+            if not members:
+                continue
+            pending.extend(members)
+
+            inside = set(cycle)
+            waits_outside = any(
+                prereq in self.by_id and prereq not in placed and prereq not in inside
+                for node_id in members for prereq in self.by_id[node_id].prerequisites
+            )
+            if not waits_outside:
+                candidates.extend(members)
+
+        return candidates or pending
+
+    def _find_cycles(self):
+        """
+        Encontrar los ciclos del grafo (componentes fuertemente conexas de Tarjan)
+
+        Returns:
+            list: Listas ordenadas de IDs de competencias que forman cada ciclo
+        """
+        index_of = {}
+        lowlink = {}
+        on_stack = set()
+        stack = []
+        cycles = []
+        counter = 0
+
+        for root in self.by_id:
+            if root in index_of:
+                continue
+
+            # Recorrido en profundidad iterativo para no depender del límite de recursión
+            work = [(root, iter(self.dependents[root]))]
+            index_of[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+
+            while work:
+                node_id, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in index_of:
+                        index_of[child] = lowlink[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.dependents[child])))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        lowlink[node_id] = min(lowlink[node_id], index_of[child])
+                if advanced:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node_id])
+
+                if lowlink[node_id] == index_of[node_id]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node_id:
+                            break
+                    if len(component) > 1 or node_id in self.dependents[node_id]:
+                        cycles.append(sorted(component))
+
+        return sorted(cycles)
+
+class CompetencyGraphCache:
+    """Caché de grafos de prerequisitos por curso"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        # Sin expiración: los grafos se invalidan al cambiar una competencia
+        self.cache = TTLCache(max_entries=max_entries, ttl_seconds=0)
+
+    def get_graph(self, course_id):
+        """Obtener el grafo de un curso, construyéndolo si no está en caché"""
+        return self.cache.get_or_load(course_id, lambda: self._load(course_id))
+
+    def invalidate_course(self, course_id):
+        """Invalidar el grafo de un curso"""
+        self.cache.invalidate(course_id)
+
+    def stats(self):
+        """Estadísticas de la caché"""
+        return self.cache.stats()
+
+    def _load(self, course_id):
+        competencies = db.session.query(
+            Competency.id, Competency.course_id, Competency.name,
+            Competency.code, Competency.prerequisites
+        ).filter(Competency.course_id == course_id).all()
+        return CompetencyGraph.from_competencies(course_id, competencies)
+
+def get_competency_graph_cache(app=None):
+    """Obtener la caché de grafos de la aplicación, creándola si no existe"""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('competency_graphs')
+    if cache is None:
+        cache = app.extensions.setdefault('competency_graphs', CompetencyGraphCache(
+            max_entries=app.config.get('COMPETENCY_GRAPH_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        ))
+    return cache
+
+def get_competency_graph(course_id):
+    """
+    Obtener el grafo de prerequisitos de un curso
+
+    Args:
+        course_id (int): ID del curso
+
+    Returns:
+        CompetencyGraph: Grafo del curso (vacío si no tiene competencias)
+    """
+    return get_competency_graph_cache().get_graph(course_id)
+
+def _invalidate_courses(course_ids):
+    """Invalidar los grafos de los cursos indicados en la aplicación actual"""
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get('competency_graphs')
+    if cache is None:
+        return
+    for course_id in course_ids:
+        cache.invalidate_course(course_id)
+
+@event.listens_for(Competency, 'after_insert')
+@event.listens_for(Competency, 'after_update')
+@event.listens_for(Competency, 'after_delete')
+def _on_competency_change(mapper, connection, target):
+    """Invalidar el grafo del curso de la competencia modificada"""
+    defer_invalidation(inspect(target).session, _invalidate_courses, history_values(target, 'course_id'))
@@ -0,0 +1,350 @@
+"""
+Descarga incremental de respuestas de Google Forms
+
+FormsResponsePuller reutiliza una sesión HTTP con pool de conexiones,
+tiempos de espera y reintentos, sigue ``nextPageToken`` hasta agotar las
+páginas y descarga varios formularios en paralelo con un pool de hilos
+acotado. Por cada formulario guarda una marca de agua (el último
+``lastSubmittedTime`` visto) para que las sincronizaciones posteriores solo
+pidan las respuestas nuevas. La marca solo avanza después de que la función
+``ingest`` guardó (o encoló) las respuestas descargadas, de modo que un fallo
+al ingerirlas no las da por procesadas.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import json
+import os
+import re
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+
+DEFAULT_BASE_URL = 'https://forms.googleapis.com/v1/forms'
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+
+# Códigos HTTP que se reintentan con espera exponencial
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# ID del formulario dentro de una URL de Google Forms (/forms/d/<id>/ o /forms/d/e/<id>/)
+_FORM_URL_ID = re.compile(r'/forms/d/(?:e/)?([A-Za-z0-9_-]+)')
+
+# Fracción de segundo de un timestamp RFC 3339 (la API usa 0, 3, 6 o 9 dígitos)
+_FRACTION = re.compile(r'\.(\d+)')
+
+# ID de pregunta en los formularios generados por GoogleFormsIntegration (itemId 'question_<id>')
+_QUESTION_ITEM_ID = re.compile(r'^question_(\d+)$')
+
+def form_id_from_url(form):
+    """Extraer el ID de un formulario a partir de su URL (o devolver el ID si ya lo es)"""
+    match = _FORM_URL_ID.search(form or '')
+    return match.group(1) if match else form
+
+def parse_timestamp(value):
+    """
+    Convertir un timestamp RFC 3339 de la API a datetime con zona horaria
+
+    Returns:
+        datetime: Instante en UTC (None si falta o no es válido)
+    """
+    if not value:
+        return None
+    # fromisoformat no acepta 'Z' ni más de 6 dígitos de fracción en todas las versiones
+    text = value.strip().replace('Z', '+00:00')
+    text = _FRACTION.sub(lambda m: '.' + m.group(1)[:6].ljust(6, '0'), text, count=1)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+def diagnostic_payload(item):
+    """
+    Convertir una respuesta de la API al formato del webhook de diagnóstico
+
+    Returns:
+        dict: ``student_email`` y ``responses`` (lista de ``question_id`` y ``answer``)
+    """
+    responses = []
+    for question_id, answer in (item.get('answers') or {}).items():
+        values = [value.get('value') for value in (answer.get('textAnswers') or {}).get('answers', [])]
+        values = [value for value in values if value is not None]
+        if not values:
+            continue
+        match = _QUESTION_ITEM_ID.match(question_id)
+        responses.append({'question_id': match.group(1) if match else question_id, 'answer': values[0]})
+
+    return {'student_email': item.get('respondentEmail'), 'responses': responses}
+
+class FormsSyncState:
+    """Marcas de agua por formulario guardadas en un archivo JSON"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): Archivo JSON; si es None el estado solo vive en memoria
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._marks = {}
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._marks = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error leyendo el estado de sincronización de formularios: {e}")
+
+    def get(self, form_id):
+        """
+        Marca de agua de un formulario
+
+        Returns:
+            dict: ``last_submitted_time`` y ``response_ids`` (respuestas con ese
+                mismo instante ya procesadas), o None si nunca se sincronizó
+        """
+        with self._lock:
+            mark = self._marks.get(form_id)
+            return dict(mark) if mark else None
+
+    def update(self, form_id, mark):
+        """Guardar la nueva marca de agua de un formulario"""
+        with self._lock:
+            self._marks[form_id] = mark
+            self._save()
+
+    def reset(self, form_id=None):
+        """Olvidar la marca de un formulario (o de todos) para forzar una descarga completa"""
+        with self._lock:
+            if form_id is None:
+                self._marks = {}
+            else:
+                self._marks.pop(form_id, None)
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Escritura atómica: un proceso interrumpido no deja el archivo a medias
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._marks, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+class FormsResponsePuller:
+    """Descarga paginada, concurrente e incremental de respuestas de Google Forms"""
+
+    def __init__(self, api_key=None, base_url=None, state=None, session=None,
+                 max_workers=DEFAULT_MAX_WORKERS, page_size=DEFAULT_PAGE_SIZE,
+                 timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+        """
+        Args:
+            api_key (str): Token de la API (por defecto Config.GOOGLE_FORMS_API_KEY)
+            base_url (str): URL base de la API; permite apuntar a un servidor local de prueba
+            state (FormsSyncState): Marcas de agua; por defecto solo en memoria
+            session (requests.Session): Sesión a reutilizar; por defecto se crea una con reintentos
+            max_workers (int): Formularios descargados en paralelo
+            page_size (int): Respuestas por página
+            timeout (float): Tiempo de espera por petición en segundos
+            retries (int): Reintentos ante errores de conexión y códigos 429/5xx
+        """
+        self.api_key = api_key if api_key is not None else Config.GOOGLE_FORMS_API_KEY
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip('/')
+        self.state = state or FormsSyncState()
+        self.max_workers = max(1, max_workers)
+        self.page_size = page_size
+        self.timeout = timeout
+        self.session = session or self._create_session(retries)
+
+    @classmethod
+    def from_config(cls, app):
+        """Crear el puller con la configuración de la aplicación"""
+        return cls(
+            api_key=app.config.get('GOOGLE_FORMS_API_KEY'),
+            base_url=app.config.get('GOOGLE_FORMS_API_URL'),
+            state=FormsSyncState(
+                app.config.get('FORMS_SYNC_STATE_PATH') or os.path.join(app.instance_path, 'forms_sync_state.json')
+            ),
+            max_workers=app.config.get('FORMS_PULL_MAX_WORKERS', DEFAULT_MAX_WORKERS),
+            page_size=app.config.get('FORMS_PULL_PAGE_SIZE', DEFAULT_PAGE_SIZE),
+            timeout=app.config.get('FORMS_PULL_TIMEOUT', DEFAULT_TIMEOUT),
+            retries=app.config.get('FORMS_PULL_RETRIES', DEFAULT_RETRIES)
+        )
+
+    def fetch_responses(self, form_id, since=None):
+        """
+        Descargar todas las páginas de respuestas de un formulario
+
+        Args:
+            form_id (str): ID del formulario
+            since (str): Si se indica, solo respuestas con ``lastSubmittedTime``
+                mayor o igual (RFC 3339)
+
+        Returns:
+            list: Respuestas en el formato de la API
+
+        Raises:
+            requests.exceptions.RequestException: Si una página falla tras los reintentos
+        """
+        url = f'{self.base_url}/{form_id}/responses'
+        params = {'pageSize': self.page_size}
+        if since:
+            params['filter'] = f'timestamp >= {since}'
+
+        responses = []
+        while True:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+
+            responses.extend(data.get('responses', []))
+
+            page_token = data.get('nextPageToken')
+            if not page_token:
+                return responses
+            params['pageToken'] = page_token
+
+    def pull_form(self, form_id, full=False, ingest=None):
+        """
+        Sincronizar un formulario desde su marca de agua
+
+        Args:
+            form_id (str): ID del formulario
+            full (bool): Ignorar la marca y descargar todas las respuestas
+            ingest (callable): ``ingest(form_id, responses)`` guarda o encola las
+                respuestas nuevas; la marca solo avanza si termina sin errores.
+                Sin ella la marca no se modifica
+
+        Returns:
+            dict: ``success``, respuestas nuevas, resultado de ``ingest`` y marca de
+                agua resultante, o ``error``
+        """
+        try:
+            mark = None if full else self.state.get(form_id)
+            since = mark['last_submitted_time'] if mark else None
+            since_time = parse_timestamp(since)
+            seen_at_mark = set(mark.get('response_ids', [])) if mark else set()
+
+            # Mismo instante aunque el texto tenga otra cantidad de decimales
+            responses = [
+                item for item in self.fetch_responses(form_id, since=since)
+                if not (item.get('responseId') in seen_at_mark
+                        and parse_timestamp(item.get('lastSubmittedTime')) == since_time)
+            ]
+
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error descargando respuestas del formulario {form_id}: {e}")
+            return {'success': False, 'form_id': form_id, 'error': str(e)}
+
+        if ingest is None:
+            return {
+                'success': True,
+                'form_id': form_id,
+                'responses': responses,
+                'ingested': None,
+                'high_water_mark': since
+            }
+
+        try:
+            ingested = ingest(form_id, responses) if responses else None
+        except Exception as e:
+            print(f"Error guardando respuestas del formulario {form_id}: {e}")
+            return {'success': False, 'form_id': form_id, 'error': str(e)}
+
+        # Las respuestas ya están guardadas: recién ahora se avanza la marca
+        new_mark = self._advance_mark(mark, responses)
+        if new_mark != mark:
+            self.state.update(form_id, new_mark)
+
+        return {
+            'success': True,
+            'form_id': form_id,
+            'responses': responses,
+            'ingested': ingested,
+            'high_water_mark': new_mark['last_submitted_time'] if new_mark else None
+        }
+
+    def pull(self, forms=None, full=False, ingest=None):
+        """
+        Sincronizar varios formularios en paralelo
+
+        Args:
+            forms (dict): Nombre -> ID o URL del formulario (por defecto Config.DIAGNOSTIC_FORMS)
+            full (bool): Ignorar las marcas de agua
+            ingest (callable): Ver pull_form; se llama desde los hilos del pool
+
+        Returns:
+            dict: Resultado de pull_form por nombre de formulario
+        """
+        forms = forms if forms is not None else Config.DIAGNOSTIC_FORMS
+        form_ids = {name: form_id_from_url(form) for name, form in forms.items()}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(form_ids) or 1)) as executor:
+            futures = {name: executor.submit(self.pull_form, form_id, full, ingest)
+                       for name, form_id in form_ids.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def close(self):
+        """Cerrar las conexiones de la sesión"""
+        self.session.close()
+
+    def _advance_mark(self, mark, responses):
+        """
+        Calcular la marca de agua tras recibir ``responses``
+
+        Los timestamps se comparan como instantes: como texto, '10:00:00Z' queda
+        después de '10:00:00.5Z'. La marca guarda el texto original de la
+        respuesta más reciente, que es el que se envía luego en el filtro.
+        """
+        timed = [(parse_timestamp(item.get('lastSubmittedTime')), item) for item in responses]
+        timed = [(instant, item) for instant, item in timed if instant is not None]
+        if not timed:
+            return mark
+
+        latest = max(instant for instant, _ in timed)
+        at_latest = [item for instant, item in timed if instant == latest]
+        response_ids = {item.get('responseId') for item in at_latest}
+
+        mark_time = parse_timestamp(mark['last_submitted_time']) if mark else None
+        if mark_time is not None and mark_time > latest:
+            return mark
+        if mark_time == latest:
+            response_ids.update(mark.get('response_ids', []))
+
+        return {
+            'last_submitted_time': at_latest[0]['lastSubmittedTime'],
+            'response_ids': sorted(response_ids - {None})
+        }
+
+    def _create_session(self, retries):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.max_workers,
+            pool_maxsize=self.max_workers,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=RETRY_STATUS_CODES,
+                allowed_methods=frozenset(['GET']),
+                raise_on_status=False
+            )
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        })
+        return session
@@ -7,6 +7,10 @@ import json
 from datetime import datetime
 from app.models import Student, DiagnosticExam, ExamResponse, Question, Competency
 from app import db
+from app.unit_of_work import commit_or_flush
+from sqlalchemy import insert
+from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+from app.ai.forms_response_puller import FormsResponsePuller
 from config import Config
 
 class GoogleFormsIntegration:
@@ -15,30 +19,29 @@ class GoogleFormsIntegration:
     def __init__(self):
         self.api_key = Config.GOOGLE_FORMS_API_KEY
         self.form_id = Config.GOOGLE_FORMS_FORM_ID
-        self.base_url = "https://forms.googleapis.com/v1/forms"
+        self.base_url = Config.GOOGLE_FORMS_API_URL
     
     def get_form_responses(self, form_id=None):
-        """Obtener respuestas de un formulario de Google Forms"""
+        """Obtener todas las respuestas de un formulario de Google Forms (todas las páginas)"""
+        puller = FormsResponsePuller(api_key=self.api_key, base_url=self.base_url, max_workers=1)
         try:
-            form_id = form_id or self.form_id
-            url = f"{self.base_url}/{form_id}/responses"
-            
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            
-            return response.json()
+            return {'responses': puller.fetch_responses(form_id or self.form_id)}
             
         except requests.exceptions.RequestException as e:
             print(f"Error obteniendo respuestas de Google Forms: {e}")
             return None
+        finally:
+            puller.close()
     
     def process_diagnostic_responses(self, student_id, responses_data):
-        """Procesar respuestas del examen diagnóstico"""
+        """
+        Procesar respuestas del examen diagnóstico
+        
+        Las preguntas referenciadas se cargan con una sola consulta IN, las
+        respuestas se califican en memoria acumulando a la vez los puntajes por
+        competencia, y todas las ExamResponse se escriben con una inserción
+        masiva dentro de una única transacción.
+        """
         try:
             student = Student.query.get(student_id)
             if not student:
@@ -53,57 +56,61 @@ class GoogleFormsIntegration:
             if not diagnostic:
                 return {'success': False, 'error': 'Examen diagnóstico no encontrado'}
             
-            # Procesar cada respuesta
+            questions = self._prefetch_questions(responses_data)
+            
+            # Calificar cada respuesta en memoria
+            response_rows = []
+            competency_scores = {}
             total_score = 0
             total_questions = 0
             
             for response_data in responses_data:
-                question_id = response_data.get('question_id')
-                student_answer = response_data.get('answer')
-                time_spent = response_data.get('time_spent', 0)
-                
-                # Buscar la pregunta
-                question = Question.query.get(question_id)
+                question = questions.get(self._question_key(response_data.get('question_id')))
                 if not question:
                     continue
                 
+                student_answer = response_data.get('answer')
+                
                 # Verificar si la respuesta es correcta
                 is_correct = self._check_answer(question, student_answer)
                 points_earned = question.points if is_correct else 0
                 
-                # Crear registro de respuesta
-                exam_response = ExamResponse(
-                    exam_id=diagnostic.id,
-                    question_id=question_id,
-                    student_id=student_id,
-                    student_answer=student_answer,
-                    is_correct=is_correct,
-                    points_earned=points_earned,
-                    time_spent=time_spent
-                )
-                
-                db.session.add(exam_response)
+                response_rows.append({
+                    'exam_id': diagnostic.id,
+                    'question_id': question.id,
+                    'student_id': student_id,
+                    'student_answer': student_answer,
+                    'is_correct': is_correct,
+                    'points_earned': points_earned,
+                    'time_spent': response_data.get('time_spent', 0)
+                })
+                self._accumulate_competency_score(competency_scores, question, is_correct, points_earned)
                 
                 total_score += points_earned
                 total_questions += 1
             
+            if response_rows:
+                db.session.execute(insert(ExamResponse.__table__), response_rows)
+            
             # Calcular puntaje final
+            was_completed = diagnostic.is_completed
             diagnostic.total_score = total_score
             diagnostic.percentage = (total_score / total_questions) * 100 if total_questions > 0 else 0
             diagnostic.is_completed = True
             diagnostic.completed_at = datetime.utcnow()
             
+            # Análisis de competencias calculado durante la calificación
+            competency_scores = self._finalize_competency_scores(competency_scores)
+            diagnostic.competency_scores = competency_scores
+            
             # Actualizar perfil del estudiante
             student.diagnostic_completed = True
             student.diagnostic_score = diagnostic.percentage
             student.diagnostic_date = datetime.utcnow()
             
-            db.session.commit()
+            AnalyticsSnapshotRefresher().record_diagnostic_completed(diagnostic, was_completed)
             
-            # Generar análisis de competencias
-            competency_scores = self._analyze_competency_scores(diagnostic.id)
-            diagnostic.competency_scores = competency_scores
-            db.session.commit()
+            commit_or_flush()
             
             return {
                 'success': True,
@@ -116,6 +123,32 @@ class GoogleFormsIntegration:
             db.session.rollback()
             return {'success': False, 'error': str(e)}
     
+    def _prefetch_questions(self, responses_data):
+        """
+        Cargar en una sola consulta las preguntas referenciadas por las respuestas
+        
+        Returns:
+            dict: Filas (id, competency_id, question_type, correct_answer, points) por ID de pregunta
+        """
+        question_ids = {self._question_key(response_data.get('question_id')) for response_data in responses_data}
+        question_ids.discard(None)
+        if not question_ids:
+            return {}
+        
+        rows = db.session.query(
+            Question.id, Question.competency_id, Question.question_type,
+            Question.correct_answer, Question.points
+        ).filter(Question.id.in_(question_ids)).all()
+        
+        return {row.id: row for row in rows}
+    
+    def _question_key(self, question_id):
+        """Normalizar el ID de pregunta recibido (entero o texto) a entero"""
+        try:
+            return int(question_id)
+        except (TypeError, ValueError):
+            return None
+    
     def _check_answer(self, question, student_answer):
         """Verificar si la respuesta del estudiante es correcta"""
         correct_answer = question.correct_answer.lower().strip()
@@ -143,34 +176,27 @@ class GoogleFormsIntegration:
         
         return similarity >= 0.7  # 70% de similitud
     
-    def _analyze_competency_scores(self, diagnostic_id):
-        """Analizar puntajes por competencia"""
-        diagnostic = DiagnosticExam.query.get(diagnostic_id)
-        if not diagnostic:
-            return {}
+    def _accumulate_competency_score(self, competency_scores, question, is_correct, points_earned):
+        """Sumar una respuesta calificada a los puntajes de su competencia"""
+        if not question.competency_id:
+            return
         
-        competency_scores = {}
+        scores = competency_scores.setdefault(question.competency_id, {
+            'total_questions': 0,
+            'correct_answers': 0,
+            'total_points': 0,
+            'earned_points': 0
+        })
         
-        # Agrupar respuestas por competencia
-        for response in diagnostic.responses:
-            if response.question.competency_id:
-                competency_id = response.question.competency_id
-                if competency_id not in competency_scores:
-                    competency_scores[competency_id] = {
-                        'total_questions': 0,
-                        'correct_answers': 0,
-                        'total_points': 0,
-                        'earned_points': 0
-                    }
-                
-                competency_scores[competency_id]['total_questions'] += 1
-                competency_scores[competency_id]['total_points'] += response.question.points
-                
-                if response.is_correct:
-                    competency_scores[competency_id]['correct_answers'] += 1
-                    competency_scores[competency_id]['earned_points'] += response.points_earned
+        scores['total_questions'] += 1
+        scores['total_points'] += question.points
         
-        # Calcular porcentajes
+        if is_correct:
+            scores['correct_answers'] += 1
+            scores['earned_points'] += points_earned
+    
+    def _finalize_competency_scores(self, competency_scores):
+        """Calcular porcentajes por competencia"""
         for competency_id, scores in competency_scores.items():
             if scores['total_questions'] > 0:
                 scores['percentage'] = (scores['earned_points'] / scores['total_points']) * 100
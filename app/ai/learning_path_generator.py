@@ -3,11 +3,30 @@ Generador de rutas de aprendizaje personalizadas
 """
 
 from app.models import Student, Course, LearningPath, LearningPathStep, Resource, Competency, CompetencyMastery
+from app.models import User, CourseEnrollment, DiagnosticExam
+from app.models.learning import LearningStyle
 from app import db
-from app.ai.vark_analyzer import VARKAnalyzer
+from app.unit_of_work import commit_or_flush
+from sqlalchemy import insert
+from app.ai.vark_analyzer import VARKAnalyzer, STYLE_ORDER
+from app.ai.resource_catalog import get_resource_catalog
+from app.ai.competency_graph import get_competency_graph
+from app.ai.recommendation_engine import top_k_indices
 from datetime import datetime
+import numpy as np
 import random
 
+# Estilo dominante del estudiante (código VARK) a estilo de la ruta
+LEARNING_STYLE_BY_CODE = {
+    'V': LearningStyle.VISUAL,
+    'A': LearningStyle.AUDITORY,
+    'R': LearningStyle.READING,
+    'K': LearningStyle.KINESTHETIC
+}
+
+# Estudiantes procesados por transacción en la generación masiva
+DEFAULT_BULK_CHUNK_SIZE = 100
+
 class LearningPathGenerator:
     """Generador de rutas de aprendizaje personalizadas basado en IA"""
     
@@ -42,6 +61,14 @@ class LearningPathGenerator:
             if existing_path:
                 return existing_path
             
+            enrollment = CourseEnrollment.query.filter_by(
+                student_id=student_id,
+                course_id=course_id
+            ).order_by(CourseEnrollment.is_active.desc(), CourseEnrollment.id).first()
+            
+            if not enrollment:
+                return None
+            
             # Obtener perfil del estudiante
             vark_profile = student.get_vark_profile()
             diagnostic_scores = self._get_diagnostic_scores(student_id, course_id)
@@ -53,9 +80,10 @@ class LearningPathGenerator:
             learning_path = LearningPath(
                 student_id=student_id,
                 course_id=course_id,
+                enrollment_id=enrollment.id,
                 title=f"Ruta Personalizada - {course.name}",
                 description=f"Ruta de aprendizaje adaptada para {student.user.get_full_name()}",
-                learning_style=student.dominant_learning_style,
+                learning_style=LEARNING_STYLE_BY_CODE.get(student.dominant_learning_style),
                 total_steps=0,
                 current_step=0
             )
@@ -73,7 +101,16 @@ class LearningPathGenerator:
             learning_path.total_steps = len(steps)
             learning_path.started_at = datetime.utcnow()
             
-            db.session.commit()
+            # Puntero al primer paso (los pasos se generan en orden)
+            if steps:
+                db.session.flush()
+                learning_path.next_step_id = steps[0].id
+            
+            # Mantener al día la instantánea de analíticas del curso
+            from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+            AnalyticsSnapshotRefresher().record_paths_created(course_id)
+            
+            commit_or_flush()
             
             return learning_path
             
@@ -82,11 +119,191 @@ class LearningPathGenerator:
             db.session.rollback()
             return None
     
+    def generate_paths_for_course(self, course_id, student_ids=None, chunk_size=DEFAULT_BULK_CHUNK_SIZE,
+                                  progress_callback=None):
+        """
+        Generar rutas de aprendizaje para todos los estudiantes de un curso
+        
+        Lee competencias, diagnósticos, matrículas y recursos una sola vez,
+        calcula todas las secuencias en memoria y escribe rutas y pasos con
+        inserciones masivas, confirmando cada ``chunk_size`` estudiantes.
+        Los estudiantes que ya tienen una ruta activa se omiten.
+        
+        Args:
+            course_id (int): ID del curso
+            student_ids (list): IDs de estudiantes; por defecto todas las matrículas activas
+            chunk_size (int): Estudiantes por transacción
+            progress_callback (callable): Función ``(procesados, total)`` llamada tras cada bloque
+            
+        Returns:
+            dict: Resultado con rutas creadas, omitidas y fallidas
+        """
+        try:
+            course = Course.query.get(course_id)
+            if not course:
+                return {'success': False, 'error': 'Curso no encontrado'}
+            
+            # Matrículas activas con los datos del estudiante necesarios para la ruta
+            enrollment_query = db.session.query(
+                CourseEnrollment.id.label('enrollment_id'),
+                Student.id.label('student_id'),
+                Student.vark_visual, Student.vark_auditory,
+                Student.vark_reading, Student.vark_kinesthetic,
+                Student.dominant_learning_style,
+                User.first_name, User.last_name
+            ).join(
+                Student, Student.id == CourseEnrollment.student_id
+            ).join(
+                User, User.id == Student.user_id
+            ).filter(
+                CourseEnrollment.course_id == course_id,
+                CourseEnrollment.is_active == True
+            )
+            if student_ids is not None:
+                enrollment_query = enrollment_query.filter(CourseEnrollment.student_id.in_(student_ids))
+            
+            # Una sola ruta por estudiante aunque tenga varias matrículas activas
+            enrollments = {}
+            for row in enrollment_query.order_by(CourseEnrollment.id).all():
+                enrollments.setdefault(row.student_id, row)
+            
+            existing = {
+                student_id for (student_id,) in db.session.query(LearningPath.student_id).filter(
+                    LearningPath.course_id == course_id,
+                    LearningPath.is_active == True
+                ).distinct().all()
+            }
+            
+            diagnostic_scores = {}
+            for student_id, scores in db.session.query(
+                DiagnosticExam.student_id, DiagnosticExam.competency_scores
+            ).filter(
+                DiagnosticExam.course_id == course_id,
+                DiagnosticExam.is_completed == True
+            ).order_by(DiagnosticExam.id).all():
+                diagnostic_scores.setdefault(student_id, scores)
+            
+            graph = get_competency_graph(course_id)
+            default_scores = {node.id: {'percentage': 20.0} for node in graph.nodes}
+            course_info = {'id': course.id, 'name': course.name}
+            
+            pending = [row for student_id, row in enrollments.items() if student_id not in existing]
+            result = {
+                'success': True,
+                'course_id': course_id,
+                'total': len(enrollments),
+                'created': 0,
+                'skipped': len(enrollments) - len(pending),
+                'failed': 0,
+                'steps_created': 0,
+                'errors': []
+            }
+            
+            processed = result['skipped']
+            if progress_callback:
+                progress_callback(processed, result['total'])
+            
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                try:
+                    created, steps_created = self._write_paths_chunk(
+                        course_info, chunk, graph, diagnostic_scores, default_scores
+                    )
+                    result['created'] += created
+                    result['steps_created'] += steps_created
+                except Exception as e:
+                    db.session.rollback()
+                    result['failed'] += len(chunk)
+                    result['errors'].append(f"Estudiantes {chunk[0].student_id}-{chunk[-1].student_id}: {e}")
+                
+                processed += len(chunk)
+                if progress_callback:
+                    progress_callback(processed, result['total'])
+            
+            return result
+            
+        except Exception as e:
+            print(f"Error generando rutas del curso: {e}")
+            db.session.rollback()
+            return {'success': False, 'error': str(e)}
+    
+    def _write_paths_chunk(self, course_info, chunk, graph, diagnostic_scores, default_scores):
+        """
+        Calcular y escribir las rutas de un bloque de estudiantes en una transacción
+        
+        Returns:
+            tuple: (rutas creadas, pasos creados)
+        """
+        course_id = course_info['id']
+        now = datetime.utcnow()
+        path_rows = []
+        path_steps = {}
+        
+        for row in chunk:
+            vark_profile = {
+                'visual': row.vark_visual,
+                'auditory': row.vark_auditory,
+                'reading': row.vark_reading,
+                'kinesthetic': row.vark_kinesthetic,
+                'dominant': row.dominant_learning_style
+            }
+            sequence = self._order_competencies(
+                graph,
+                diagnostic_scores.get(row.student_id) or default_scores
+            )
+            steps = self._plan_learning_steps(sequence, vark_profile, course_id)
+            
+            path_rows.append({
+                'student_id': row.student_id,
+                'course_id': course_id,
+                'enrollment_id': row.enrollment_id,
+                'title': f"Ruta Personalizada - {course_info['name']}",
+                'description': f"Ruta de aprendizaje adaptada para {row.first_name} {row.last_name}",
+                'learning_style': LEARNING_STYLE_BY_CODE.get(row.dominant_learning_style),
+                'total_steps': len(steps),
+                'current_step': 0,
+                'started_at': now
+            })
+            path_steps[row.student_id] = steps
+        
+        # Inserción Core sobre la tabla: el modo masivo del ORM separa las filas en
+        # varias sentencias cuando learning_style es None solo en algunas
+        db.session.execute(insert(LearningPath.__table__), path_rows)
+        
+        # Recuperar los IDs de las rutas recién insertadas (los estudiantes no tenían ruta activa)
+        path_ids = {}
+        for path_id, student_id in db.session.query(LearningPath.id, LearningPath.student_id).filter(
+            LearningPath.course_id == course_id,
+            LearningPath.student_id.in_(list(path_steps)),
+            LearningPath.is_active == True
+        ).order_by(LearningPath.id).all():
+            path_ids[student_id] = path_id
+        
+        step_rows = [
+            dict(step, learning_path_id=path_ids[student_id])
+            for student_id, steps in path_steps.items()
+            for step in steps
+        ]
+        if step_rows:
+            db.session.execute(insert(LearningPathStep.__table__), step_rows)
+            # Puntero al primer paso de cada ruta, en un solo UPDATE
+            LearningPath.refresh_counters(list(path_ids.values()))
+        
+        # Mantener al día la instantánea de analíticas del curso
+        from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+        AnalyticsSnapshotRefresher().record_paths_created(course_id, len(path_rows))
+        
+        # La inserción masiva no dispara los eventos del ORM que invalidan los dashboards
+        from app.ai.student_dashboard import invalidate_student_dashboards
+        invalidate_student_dashboards(path_steps, db.session)
+        
+        db.session.commit()
+        
+        return len(path_rows), len(step_rows)
+    
     def _get_diagnostic_scores(self, student_id, course_id):
         """Obtener puntajes del examen diagnóstico por competencia"""
         try:
-            from app.models import DiagnosticExam
-            
             diagnostic = DiagnosticExam.query.filter_by(
                 student_id=student_id,
                 course_id=course_id,
@@ -97,8 +314,8 @@ class LearningPathGenerator:
                 return diagnostic.competency_scores
             else:
                 # Si no hay diagnóstico, asumir puntajes bajos
-                competencies = Competency.query.filter_by(course_id=course_id).all()
-                return {comp.id: {'percentage': 20.0} for comp in competencies}
+                graph = get_competency_graph(course_id)
+                return {node.id: {'percentage': 20.0} for node in graph.nodes}
                 
         except Exception as e:
             print(f"Error obteniendo puntajes diagnósticos: {e}")
@@ -107,95 +324,57 @@ class LearningPathGenerator:
     def _generate_competency_sequence(self, course_id, diagnostic_scores):
         """Generar secuencia de competencias basada en puntajes diagnósticos"""
         try:
-            competencies = Competency.query.filter_by(course_id=course_id).all()
-            
-            if not competencies:
-                return []
+            graph = get_competency_graph(course_id)
             
-            # Ordenar competencias por puntaje diagnóstico (menor a mayor)
-            competency_scores = []
-            for comp in competencies:
-                score = diagnostic_scores.get(comp.id, {}).get('percentage', 0.0)
-                competency_scores.append((comp, score))
-            
-            # Ordenar por puntaje (las que necesitan más trabajo primero)
-            competency_scores.sort(key=lambda x: x[1])
-            
-            # Aplicar lógica de prerequisitos
-            ordered_competencies = self._apply_prerequisites(competency_scores)
-            
-            return ordered_competencies
+            return self._order_competencies(graph, diagnostic_scores)
             
         except Exception as e:
             print(f"Error generando secuencia de competencias: {e}")
             return []
     
-    def _apply_prerequisites(self, competency_scores):
-        """Aplicar lógica de prerequisitos a la secuencia de competencias"""
-        try:
-            ordered = []
-            remaining = competency_scores.copy()
-            
-            while remaining:
-                # Buscar competencias sin prerequisitos o con prerequisitos ya incluidos
-                for comp, score in remaining[:]:
-                    if self._can_add_competency(comp, ordered):
-                        ordered.append((comp, score))
-                        remaining.remove((comp, score))
-                        break
-                else:
-                    # Si no se puede agregar ninguna, agregar la primera restante
-                    if remaining:
-                        comp, score = remaining.pop(0)
-                        ordered.append((comp, score))
-            
-            return ordered
-            
-        except Exception as e:
-            print(f"Error aplicando prerequisitos: {e}")
-            return competency_scores
+    def _order_competencies(self, graph, diagnostic_scores):
+        """
+        Ordenar las competencias del grafo según puntajes diagnósticos y prerequisitos
+        
+        Las que necesitan más trabajo (menor puntaje) van primero, siempre
+        después de sus prerequisitos.
+        
+        Returns:
+            list: Tuplas (CompetencyNode, puntaje) en orden de estudio
+        """
+        scores = {
+            node.id: self._get_competency_score(diagnostic_scores, node.id)
+            for node in graph.nodes
+        }
+        
+        sequence, forced = graph.order(scores)
+        if forced:
+            print(f"Advertencia: ciclo de prerequisitos en el curso {graph.course_id} "
+                  f"{graph.cycles}; se liberaron las competencias {forced}")
+        
+        return sequence
     
-    def _can_add_competency(self, competency, ordered_list):
-        """Verificar si una competencia puede ser agregada a la secuencia"""
-        if not competency.prerequisites:
-            return True
+    def _get_competency_score(self, diagnostic_scores, competency_id):
+        """
+        Obtener el porcentaje diagnóstico de una competencia
         
-        ordered_ids = [comp.id for comp, _ in ordered_list]
-        return all(prereq_id in ordered_ids for prereq_id in competency.prerequisites)
+        Las claves de ``competency_scores`` se guardan como texto en la
+        columna JSON, por lo que se busca tanto por entero como por texto.
+        """
+        entry = diagnostic_scores.get(competency_id)
+        if entry is None:
+            entry = diagnostic_scores.get(str(competency_id), {})
+        return entry.get('percentage', 0.0) or 0.0
     
     def _generate_learning_steps(self, learning_path_id, competency_sequence, vark_profile):
         """Generar pasos de aprendizaje para cada competencia"""
         try:
             steps = []
-            step_order = 1
             
-            for competency, diagnostic_score in competency_sequence:
-                # Determinar número de pasos basado en el puntaje diagnóstico
-                num_steps = self._calculate_steps_needed(diagnostic_score)
-                
-                # Obtener recursos apropiados para la competencia
-                resources = self._get_appropriate_resources(
-                    competency.id, 
-                    vark_profile,
-                    num_steps
-                )
-                
-                # Crear pasos para cada recurso
-                for i, resource in enumerate(resources):
-                    step = LearningPathStep(
-                        learning_path_id=learning_path_id,
-                        resource_id=resource.id,
-                        competency_id=competency.id,
-                        step_order=step_order,
-                        title=f"{competency.name} - Paso {i+1}",
-                        description=f"Aprende {competency.name} usando {resource.title}",
-                        estimated_time=resource.duration or 30,
-                        points=resource.points or 1
-                    )
-                    
-                    db.session.add(step)
-                    steps.append(step)
-                    step_order += 1
+            for values in self._plan_learning_steps(competency_sequence, vark_profile):
+                step = LearningPathStep(learning_path_id=learning_path_id, **values)
+                db.session.add(step)
+                steps.append(step)
             
             return steps
             
@@ -203,6 +382,43 @@ class LearningPathGenerator:
             print(f"Error generando pasos de aprendizaje: {e}")
             return []
     
+    def _plan_learning_steps(self, competency_sequence, vark_profile, course_id=None):
+        """
+        Calcular en memoria los pasos de una ruta, sin crear objetos del ORM
+        
+        Returns:
+            list: Diccionarios con los valores de cada LearningPathStep (sin learning_path_id)
+        """
+        steps = []
+        step_order = 1
+        
+        for competency, diagnostic_score in competency_sequence:
+            # Determinar número de pasos basado en el puntaje diagnóstico
+            num_steps = self._calculate_steps_needed(diagnostic_score)
+            
+            # Obtener recursos apropiados para la competencia
+            resources = self._get_appropriate_resources(
+                competency.id, 
+                vark_profile,
+                num_steps,
+                course_id=course_id if course_id is not None else competency.course_id
+            )
+            
+            # Crear pasos para cada recurso
+            for i, resource in enumerate(resources):
+                steps.append({
+                    'resource_id': resource.id,
+                    'competency_id': competency.id,
+                    'step_order': step_order,
+                    'title': f"{competency.name} - Paso {i+1}",
+                    'description': f"Aprende {competency.name} usando {resource.title}",
+                    'estimated_time': resource.duration or 30,
+                    'points': resource.points or 1
+                })
+                step_order += 1
+        
+        return steps
+    
     def _calculate_steps_needed(self, diagnostic_score):
         """Calcular número de pasos necesarios basado en el puntaje diagnóstico"""
         if diagnostic_score >= 80:
@@ -214,41 +430,30 @@ class LearningPathGenerator:
         else:
             return 4  # Aprendizaje completo
     
-    def _get_appropriate_resources(self, competency_id, vark_profile, num_steps):
-        """Obtener recursos apropiados para una competencia y estilo de aprendizaje"""
+    def _get_appropriate_resources(self, competency_id, vark_profile, num_steps, course_id=None):
+        """
+        Obtener recursos apropiados para una competencia y estilo de aprendizaje
+        
+        Los recursos y sus puntajes de estilo salen del catálogo en caché
+        del curso (global si no se indica ``course_id``).
+        """
         try:
-            # Obtener todos los recursos de la competencia
-            all_resources = Resource.query.filter_by(
-                competency_id=competency_id,
-                is_active=True
-            ).all()
+            catalog = get_resource_catalog().get_course_catalog(course_id)
+            indices = catalog.competency_indices(competency_id)
             
-            if not all_resources:
+            if not len(indices):
                 return []
             
             # Calcular compatibilidad con el estilo de aprendizaje
-            resource_scores = []
-            for resource in all_resources:
-                compatibility = self._calculate_resource_compatibility(
-                    resource, 
-                    vark_profile
-                )
-                resource_scores.append((resource, compatibility))
-            
-            # Ordenar por compatibilidad
-            resource_scores.sort(key=lambda x: x[1], reverse=True)
-            
-            # Seleccionar los mejores recursos
-            selected_resources = []
-            for resource, score in resource_scores[:num_steps]:
-                selected_resources.append(resource)
-            
-            # Si no hay suficientes recursos, agregar recursos adicionales
-            if len(selected_resources) < num_steps:
-                remaining_resources = [r for r, _ in resource_scores[len(selected_resources):]]
-                selected_resources.extend(remaining_resources[:num_steps - len(selected_resources)])
+            style_values = [vark_profile.get(style, 25.0) for style in STYLE_ORDER] if vark_profile else []
+            if style_values and None not in style_values:
+                student_vector = np.array(style_values, dtype=float) / 100.0
+                scores = self.vark_analyzer.score_compatibility(student_vector, catalog.score_matrix[indices])
+            else:
+                scores = np.full(len(indices), 0.5)
             
-            return selected_resources
+            # Seleccionar los recursos más compatibles
+            return [catalog.active[indices[i]] for i in top_k_indices(scores, num_steps)]
             
         except Exception as e:
             print(f"Error obteniendo recursos apropiados: {e}")
@@ -308,11 +513,13 @@ class LearningPathGenerator:
             
             # Actualizar progreso
             learning_path.update_progress()
+            commit_or_flush()
             
             return True
             
         except Exception as e:
             print(f"Error adaptando ruta de aprendizaje: {e}")
+            db.session.rollback()
             return False
     
     def _add_reinforcement_steps(self, learning_path):
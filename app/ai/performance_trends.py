@@ -0,0 +1,315 @@
+"""
+Tendencias de rendimiento agrupadas por periodo en SQL
+
+Las tendencias de un curso o de un estudiante se calculan con una sola
+consulta ``GROUP BY`` sobre la fecha de ``progress.created_at`` truncada al
+periodo (día, semana o mes), con la expresión propia de cada motor (SQLite,
+MySQL/MariaDB y PostgreSQL). Cada periodo trae el promedio de porcentaje, el
+número de actividades y un promedio móvil de los últimos periodos.
+
+Las ventanas más largas que ``PERFORMANCE_TRENDS_STREAM_DAYS`` (o sin límite,
+o en motores sin expresión conocida) se recorren en orden de fecha con
+``yield_per`` y se agrupan al vuelo, guardando en memoria solo el periodo en
+curso. Los resultados se guardan en caché por (curso o estudiante, ventana,
+periodo, promedio móvil) y se invalidan cuando cambia el progreso.
+"""
+
+from collections import deque
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import Date, cast, event, func, inspect
+from app import db
+from app.cache import TTLCache, defer_invalidation, history_values
+from app.models import Progress
+import threading
+
+BUCKETS = ('day', 'week', 'month')
+
+DEFAULT_DAYS = 30
+DEFAULT_BUCKET = 'day'
+DEFAULT_ROLLING_WINDOW = 7
+DEFAULT_STREAM_DAYS = 366
+DEFAULT_YIELD_PER = 1000
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 512
+
+def course_trends_scope(course_id):
+    """Ámbito de las tendencias de un curso"""
+    return ('course', course_id)
+
+def student_trends_scope(student_id):
+    """Ámbito de las tendencias de un estudiante"""
+    return ('student', student_id)
+
+def bucket_expression(column, bucket, dialect_name):
+    """
+    Expresión SQL con la fecha de inicio del periodo de una columna de fecha
+
+    Las semanas empiezan en lunes en todos los motores.
+
+    Args:
+        column: Columna DateTime
+        bucket (str): 'day', 'week' o 'month'
+        dialect_name (str): Nombre del dialecto (sqlite, mysql, mariadb, postgresql)
+
+    Returns:
+        Expresión SQL, o None si el dialecto no tiene una expresión conocida
+    """
+    if dialect_name == 'sqlite':
+        if bucket == 'day':
+            return func.date(column)
+        if bucket == 'week':
+            return func.date(column, '-6 days', 'weekday 1')
+        return func.strftime('%Y-%m-01', column)
+
+    if dialect_name in ('mysql', 'mariadb'):
+        if bucket == 'day':
+            return func.date(column)
+        if bucket == 'week':
+            return func.subdate(func.date(column), func.weekday(column))
+        return func.date_format(column, '%Y-%m-01')
+
+    if dialect_name == 'postgresql':
+        return cast(func.date_trunc(bucket, column), Date)
+
+    return None
+
+def bucket_start(value, bucket):
+    """Fecha de inicio del periodo de un datetime (equivalente en Python de bucket_expression)"""
+    day = value.date()
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def _bucket_key(value):
+    """Fecha de un periodo en formato ISO, venga como date o como texto"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()[:10]
+    return str(value)[:10]
+
+def _period_index(date_key, bucket):
+    """Número consecutivo del periodo, para saber cuántos periodos separan dos fechas"""
+    day = datetime.strptime(date_key, '%Y-%m-%d').date()
+    if bucket == 'month':
+        return day.year * 12 + day.month
+    if bucket == 'week':
+        return (day.toordinal() - 1) // 7
+    return day.toordinal()
+
+class _TrendBuilder:
+    """Arma la lista de tendencias periodo a periodo con su promedio móvil"""
+
+    def __init__(self, bucket, rolling_window):
+        self.bucket = bucket
+        self.rolling_window = max(1, rolling_window)
+        self.trends = []
+        self._window = deque()
+        self._window_sum = 0.0
+        self._window_count = 0
+
+    def add(self, date_key, activity_count, percentage_sum, scored_count):
+        """
+        Agregar un periodo (en orden cronológico)
+
+        Args:
+            date_key (str): Fecha de inicio del periodo (ISO)
+            activity_count (int): Actividades del periodo
+            percentage_sum (float): Suma de porcentajes de las actividades con nota
+            scored_count (int): Actividades con porcentaje
+        """
+        percentage_sum = float(percentage_sum or 0)
+        scored_count = scored_count or 0
+
+        # Promedio móvil ponderado de los últimos ``rolling_window`` periodos de calendario
+        index = _period_index(date_key, self.bucket)
+        self._window.append((index, percentage_sum, scored_count))
+        self._window_sum += percentage_sum
+        self._window_count += scored_count
+        while self._window[0][0] <= index - self.rolling_window:
+            _, old_sum, old_count = self._window.popleft()
+            self._window_sum -= old_sum
+            self._window_count -= old_count
+
+        self.trends.append({
+            'date': date_key,
+            'avg_percentage': round(percentage_sum / scored_count, 2) if scored_count else None,
+            'activity_count': activity_count,
+            'rolling_avg': round(self._window_sum / self._window_count, 2) if self._window_count else None
+        })
+
+class PerformanceTrends:
+    """Cálculo y caché de tendencias de rendimiento por curso y por estudiante"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 stream_days=DEFAULT_STREAM_DAYS, yield_per=DEFAULT_YIELD_PER):
+        self.cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.stream_days = stream_days
+        self.yield_per = yield_per
+        # Las versiones no se desalojan: perder una reactivaría entradas antiguas
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def course_trends(self, course_id, days=DEFAULT_DAYS, bucket=DEFAULT_BUCKET,
+                      rolling_window=DEFAULT_ROLLING_WINDOW):
+        """
+        Obtener las tendencias de rendimiento de un curso
+
+        Args:
+            course_id (int): ID del curso
+            days (int): Días hacia atrás de la ventana; None para todo el historial
+            bucket (str): Periodo de agrupación ('day', 'week' o 'month')
+            rolling_window (int): Periodos del promedio móvil
+
+        Returns:
+            list: Periodos con 'date', 'avg_percentage', 'activity_count' y 'rolling_avg'
+        """
+        return self._cached(course_trends_scope(course_id), Progress.course_id == course_id,
+                            days, bucket, rolling_window)
+
+    def student_trends(self, student_id, days=DEFAULT_DAYS, bucket=DEFAULT_BUCKET,
+                       rolling_window=DEFAULT_ROLLING_WINDOW):
+        """Obtener las tendencias de rendimiento de un estudiante (ver course_trends)"""
+        return self._cached(student_trends_scope(student_id), Progress.student_id == student_id,
+                            days, bucket, rolling_window)
+
+    def invalidate(self, scopes):
+        """Invalidar las tendencias de los ámbitos indicados"""
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def clear(self):
+        """Vaciar la caché"""
+        self.cache.clear()
+
+    def stats(self):
+        """Estadísticas de la caché"""
+        return self.cache.stats()
+
+    def _cached(self, scope, condition, days, bucket, rolling_window):
+        if bucket not in BUCKETS:
+            raise ValueError(f"Periodo no válido: {bucket}")
+
+        with self._lock:
+            version = self._versions.get(scope, 0)
+        # La ventana se mueve con el tiempo: la fecha de hoy forma parte de la clave
+        key = scope + (version, days, bucket, rolling_window, datetime.utcnow().date())
+        trends = self.cache.get(key)
+        if trends is None:
+            trends = tuple(self.compute(condition, days, bucket, rolling_window))
+            self.cache.set(key, trends)
+        return [dict(trend) for trend in trends]
+
+    def compute(self, condition, days=DEFAULT_DAYS, bucket=DEFAULT_BUCKET,
+                rolling_window=DEFAULT_ROLLING_WINDOW):
+        """
+        Calcular las tendencias sin caché
+
+        Args:
+            condition: Filtro sobre Progress (curso o estudiante)
+            days (int): Días hacia atrás de la ventana; None para todo el historial
+            bucket (str): Periodo de agrupación
+            rolling_window (int): Periodos del promedio móvil
+
+        Returns:
+            list: Periodos en orden cronológico
+        """
+        filters = [condition]
+        if days is not None:
+            filters.append(Progress.created_at >= datetime.utcnow() - timedelta(days=days))
+
+        builder = _TrendBuilder(bucket, rolling_window)
+        expression = bucket_expression(Progress.created_at, bucket, db.engine.dialect.name)
+        if expression is None or days is None or days > self.stream_days:
+            self._stream(builder, filters, bucket)
+        else:
+            self._group(builder, filters, expression)
+        return builder.trends
+
+    def _group(self, builder, filters, expression):
+        """Agrupar en SQL: una fila por periodo"""
+        period = expression.label('period')
+        rows = db.session.query(
+            period,
+            func.count(Progress.id).label('activity_count'),
+            func.sum(Progress.percentage).label('percentage_sum'),
+            func.count(Progress.percentage).label('scored_count')
+        ).filter(*filters).group_by(period).order_by(period)
+
+        for row in rows:
+            builder.add(_bucket_key(row.period), row.activity_count, row.percentage_sum, row.scored_count)
+
+    def _stream(self, builder, filters, bucket):
+        """Recorrer las filas en orden de fecha con yield_per, guardando solo el periodo en curso"""
+        rows = db.session.query(Progress.created_at, Progress.percentage).filter(
+            *filters, Progress.created_at.isnot(None)
+        ).order_by(Progress.created_at).execution_options(yield_per=self.yield_per)
+
+        current = None
+        activity_count = scored_count = 0
+        percentage_sum = 0.0
+        for created_at, percentage in rows:
+            start = bucket_start(created_at, bucket)
+            if start != current:
+                if current is not None:
+                    builder.add(current.isoformat(), activity_count, percentage_sum, scored_count)
+                current = start
+                activity_count = scored_count = 0
+                percentage_sum = 0.0
+
+            activity_count += 1
+            if percentage is not None:
+                scored_count += 1
+                percentage_sum += percentage
+
+        if current is not None:
+            builder.add(current.isoformat(), activity_count, percentage_sum, scored_count)
+
+def get_performance_trends(app=None):
+    """Obtener las tendencias de rendimiento de la aplicación, creándolas si no existen"""
+    app = app or current_app._get_current_object()
+    trends = app.extensions.get('performance_trends')
+    if trends is None:
+        trends = app.extensions.setdefault('performance_trends', PerformanceTrends(
+            max_entries=app.config.get('PERFORMANCE_TRENDS_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+            ttl_seconds=app.config.get('PERFORMANCE_TRENDS_CACHE_TTL', DEFAULT_TTL_SECONDS),
+            stream_days=app.config.get('PERFORMANCE_TRENDS_STREAM_DAYS', DEFAULT_STREAM_DAYS),
+            yield_per=app.config.get('PERFORMANCE_TRENDS_YIELD_PER', DEFAULT_YIELD_PER)
+        ))
+    return trends
+
+def invalidate_performance_trends(course_ids=(), student_ids=(), session=None):
+    """
+    Invalidar las tendencias de varios cursos y estudiantes
+
+    Las escrituras masivas (``insert``/``update`` sobre la tabla) no disparan
+    los eventos del ORM y deben llamar a esta función explícitamente.
+
+    Args:
+        course_ids (iterable): IDs de los cursos
+        student_ids (iterable): IDs de los estudiantes
+        session (Session): Si se indica, se vuelve a invalidar al confirmar su transacción
+    """
+    scopes = {course_trends_scope(course_id) for course_id in course_ids if course_id is not None}
+    scopes.update(student_trends_scope(student_id) for student_id in student_ids if student_id is not None)
+    defer_invalidation(session, _invalidate_scopes, scopes)
+
+def _invalidate_scopes(scopes):
+    """Invalidar los ámbitos indicados en la aplicación actual"""
+    if not has_app_context():
+        return
+    trends = current_app.extensions.get('performance_trends')
+    if trends is None:
+        return
+    trends.invalidate(scopes)
+
+@event.listens_for(Progress, 'after_insert')
+@event.listens_for(Progress, 'after_update')
+@event.listens_for(Progress, 'after_delete')
+def _on_progress_change(mapper, connection, target):
+    """Invalidar las tendencias del curso y del estudiante del progreso modificado"""
+    invalidate_performance_trends(
+        history_values(target, 'course_id'), history_values(target, 'student_id'), inspect(target).session
+    )
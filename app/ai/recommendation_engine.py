@@ -2,12 +2,49 @@
 Motor de recomendaciones para el STI
 """
 
-from app.models import Student, LearningPath, Resource, Progress, LearningRecommendation
+from app.models import Student, LearningPath, Resource, Progress, LearningRecommendation, Competency
 from app import db
+from app.unit_of_work import commit_or_flush
+from sqlalchemy import func
 from app.ai.vark_analyzer import VARKAnalyzer
+from app.ai.resource_catalog import get_resource_catalog
 from datetime import datetime, timedelta
+import numpy as np
 import random
 
+# Compatibilidad mínima para recomendar un recurso por estilo VARK
+VARK_COMPATIBILITY_THRESHOLD = 0.7
+
+# Celdas máximas de la matriz estudiantes x recursos calculada de una vez
+BATCH_SCORE_MAX_CELLS = 2000000
+
+def top_k_indices(scores, k):
+    """
+    Obtener los índices de los k puntajes más altos en orden descendente
+    
+    Usa argpartition (O(n)) y resuelve los empates en el corte a favor del
+    índice menor, de modo que el resultado coincide con un ordenamiento estable.
+    
+    Args:
+        scores (numpy.ndarray): Puntajes unidimensionales
+        k (int): Número de índices a devolver
+        
+    Returns:
+        numpy.ndarray: Índices seleccionados
+    """
+    n = len(scores)
+    if k is None or k >= n:
+        return np.lexsort((np.arange(n), -scores))
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+    
+    kth_score = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > kth_score)
+    ties = np.flatnonzero(scores == kth_score)[:k - len(above)]
+    selected = np.concatenate([above, ties])
+    
+    return selected[np.lexsort((selected, -scores[selected]))]
+
 class RecommendationEngine:
     """Motor de recomendaciones basado en IA"""
     
@@ -33,7 +70,7 @@ class RecommendationEngine:
             recommendations = []
             
             # 1. Recomendaciones basadas en estilo de aprendizaje
-            vark_recommendations = self._get_vark_based_recommendations(student_id)
+            vark_recommendations = self._get_vark_based_recommendations(student_id, limit, student=student)
             recommendations.extend(vark_recommendations)
             
             # 2. Recomendaciones basadas en progreso
@@ -58,39 +95,200 @@ class RecommendationEngine:
             print(f"Error obteniendo recomendaciones: {e}")
             return []
     
-    def _get_vark_based_recommendations(self, student_id):
-        """Obtener recomendaciones basadas en el estilo de aprendizaje VARK"""
+    def get_recommendations_batch(self, student_ids, limit=5):
+        """
+        Obtener recomendaciones para varios estudiantes a la vez
+        
+        Carga estudiantes, rutas, progreso y catálogo de recursos una sola vez
+        y calcula la compatibilidad VARK de todos los estudiantes como una
+        matriz estudiantes x recursos. El número de consultas es constante.
+        
+        Args:
+            student_ids (list): IDs de los estudiantes
+            limit (int): Número máximo de recomendaciones por estudiante
+            
+        Returns:
+            dict: Recomendaciones por ID de estudiante, con la misma forma que
+            get_recommendations (lista vacía si el estudiante no existe)
+        """
         try:
-            student = Student.query.get(student_id)
+            student_ids = list(dict.fromkeys(student_ids))
+            results = {student_id: [] for student_id in student_ids}
+            if not student_ids:
+                return results
+            
+            students = Student.query.filter(Student.id.in_(student_ids)).order_by(Student.id).all()
+            if not students:
+                return results
+            found_ids = [student.id for student in students]
+            
+            catalog = get_resource_catalog().get_course_catalog()
+            
+            per_student = {student_id: [] for student_id in found_ids}
+            
+            # 1. Recomendaciones basadas en estilo de aprendizaje
+            for student_id, recommendations in self._get_vark_based_recommendations_batch(
+                students, catalog, limit
+            ).items():
+                per_student[student_id].extend(recommendations)
+            
+            # 2. Recomendaciones basadas en progreso
+            active_paths = db.session.query(
+                LearningPath.id, LearningPath.student_id, LearningPath.title,
+                LearningPath.completion_percentage
+            ).filter(
+                LearningPath.student_id.in_(found_ids),
+                LearningPath.is_active == True
+            ).order_by(LearningPath.id).all()
+            
+            for path in active_paths:
+                recommendation = self._build_path_recommendation(path)
+                if recommendation:
+                    per_student[path.student_id].append(recommendation)
+            
+            # 3. Recomendaciones basadas en dificultades
+            for progress in self._get_latest_progress_batch(found_ids, 5, Progress.percentage < 50):
+                if progress.competency_id:
+                    per_student[progress.student_id].append(self._build_difficulty_recommendation(
+                        progress.competency_id, progress.competency_name, progress.percentage
+                    ))
+            
+            # 4. Recomendaciones de recursos similares
+            for progress in self._get_latest_progress_batch(
+                found_ids, 3,
+                Progress.percentage >= 80,
+                Progress.activity_type == 'learning'
+            ):
+                similar = self._find_similar_resources(progress.activity_id, catalog)
+                per_student[progress.student_id].extend(
+                    self._build_similar_recommendation(resource) for resource in similar
+                )
+            
+            # Ordenar por relevancia y limitar por estudiante
+            for student_id, recommendations in per_student.items():
+                recommendations.sort(key=lambda x: x['relevance_score'], reverse=True)
+                results[student_id] = recommendations[:limit]
+            
+            return results
+            
+        except Exception as e:
+            print(f"Error obteniendo recomendaciones en lote: {e}")
+            return {student_id: [] for student_id in student_ids}
+    
+    def _get_vark_based_recommendations_batch(self, students, catalog, limit=None):
+        """
+        Recomendaciones VARK de varios estudiantes sobre un catálogo ya cargado
+        
+        Args:
+            students (list): Estudiantes
+            catalog (CourseCatalog): Catálogo de recursos
+            limit (int): Máximo de recomendaciones por estudiante (None = todas)
+            
+        Returns:
+            dict: Recomendaciones VARK por ID de estudiante
+        """
+        results = {}
+        styled = [student for student in students if student.dominant_learning_style]
+        resources = catalog.active
+        resource_matrix = catalog.type_matrix
+        if not styled or not resources:
+            return results
+        
+        style_matrix = np.vstack([self.vark_analyzer.get_student_style_vector(student) for student in styled])
+        
+        # Calcular por bloques para acotar la memoria con catálogos grandes
+        chunk_size = max(1, BATCH_SCORE_MAX_CELLS // len(resources))
+        for start in range(0, len(styled), chunk_size):
+            chunk = styled[start:start + chunk_size]
+            scores = self.vark_analyzer.score_compatibility(style_matrix[start:start + chunk_size], resource_matrix)
+            
+            for student, row in zip(chunk, scores):
+                candidates = np.flatnonzero(row >= VARK_COMPATIBILITY_THRESHOLD)
+                selected = candidates[top_k_indices(row[candidates], limit)]
+                results[student.id] = [
+                    self._build_vark_recommendation(resources[index], float(row[index]), student.dominant_learning_style)
+                    for index in selected
+                ]
+        
+        return results
+    
+    def _get_latest_progress_batch(self, student_ids, per_student, *criteria):
+        """
+        Obtener los registros de progreso más recientes de cada estudiante
+        
+        Args:
+            student_ids (list): IDs de los estudiantes
+            per_student (int): Registros máximos por estudiante
+            *criteria: Filtros adicionales sobre Progress
+            
+        Returns:
+            list: Filas (student_id, activity_id, competency_id, competency_name, percentage)
+        """
+        row_number = func.row_number().over(
+            partition_by=Progress.student_id,
+            order_by=(Progress.created_at.desc(), Progress.id.desc())
+        ).label('row_number')
+        
+        ranked = db.session.query(
+            Progress.student_id,
+            Progress.activity_id,
+            Progress.competency_id,
+            Competency.name.label('competency_name'),
+            Progress.percentage,
+            row_number
+        ).outerjoin(
+            Competency, Competency.id == Progress.competency_id
+        ).filter(
+            Progress.student_id.in_(student_ids),
+            *criteria
+        ).subquery()
+        
+        return db.session.query(ranked).filter(
+            ranked.c.row_number <= per_student
+        ).order_by(ranked.c.student_id, ranked.c.row_number).all()
+    
+    def _get_vark_based_recommendations(self, student_id, limit=None, student=None):
+        """
+        Obtener recomendaciones basadas en el estilo de aprendizaje VARK
+        
+        La compatibilidad de todo el catálogo se calcula con un único producto
+        matriz-vector sobre el catálogo en caché, por lo que el número de
+        consultas no depende del número de recursos.
+        
+        Args:
+            student_id (int): ID del estudiante
+            limit (int): Máximo de recomendaciones a devolver (None = todas)
+            student (Student): Estudiante ya cargado, para evitar otra consulta
+        """
+        try:
+            if student is None:
+                student = Student.query.get(student_id)
             if not student or not student.dominant_learning_style:
                 return []
             
-            vark_profile = student.get_vark_profile()
             dominant_style = student.dominant_learning_style
             
-            recommendations = []
+            catalog = get_resource_catalog().get_course_catalog()
+            resources = catalog.active
+            if not resources:
+                return []
             
-            # Buscar recursos que coincidan con el estilo dominante
-            resources = Resource.query.filter_by(is_active=True).all()
+            scores = self.vark_analyzer.score_compatibility(
+                self.vark_analyzer.get_student_style_vector(student),
+                catalog.type_matrix
+            )
+            
+            # Solo recursos con alta compatibilidad
+            candidates = np.flatnonzero(scores >= VARK_COMPATIBILITY_THRESHOLD)
+            selected = candidates[top_k_indices(scores[candidates], limit)]
             
-            for resource in resources:
-                compatibility = self.vark_analyzer.get_learning_style_compatibility(
-                    student_id, 
-                    resource.resource_type.value
+            recommendations = []
+            
+            for index in selected:
+                resource = resources[index]
+                recommendations.append(
+                    self._build_vark_recommendation(resource, float(scores[index]), dominant_style)
                 )
-                
-                if compatibility >= 0.7:  # Alta compatibilidad
-                    recommendation = {
-                        'type': 'resource',
-                        'target_id': resource.id,
-                        'title': f"Recurso recomendado: {resource.title}",
-                        'description': f"Este recurso es ideal para tu estilo de aprendizaje {dominant_style}",
-                        'reasoning': f"Compatibilidad del {compatibility*100:.0f}% con tu estilo de aprendizaje",
-                        'confidence_score': compatibility,
-                        'relevance_score': compatibility * 0.8,
-                        'priority': 3
-                    }
-                    recommendations.append(recommendation)
             
             return recommendations
             
@@ -98,6 +296,75 @@ class RecommendationEngine:
             print(f"Error obteniendo recomendaciones VARK: {e}")
             return []
     
+    def _build_vark_recommendation(self, resource, compatibility, dominant_style):
+        """Construir una recomendación de recurso compatible con el estilo VARK"""
+        return {
+            'type': 'resource',
+            'target_id': resource.id,
+            'title': f"Recurso recomendado: {resource.title}",
+            'description': f"Este recurso es ideal para tu estilo de aprendizaje {dominant_style}",
+            'reasoning': f"Compatibilidad del {compatibility*100:.0f}% con tu estilo de aprendizaje",
+            'confidence_score': compatibility,
+            'relevance_score': compatibility * 0.8,
+            'priority': 3
+        }
+    
+    def _build_path_recommendation(self, path):
+        """Construir la recomendación de una ruta activa según su avance (o None)"""
+        # Si el progreso es bajo, recomendar recursos de refuerzo
+        if path.completion_percentage < 30:
+            return {
+                'type': 'learning_path',
+                'target_id': path.id,
+                'title': "Refuerza tu aprendizaje",
+                'description': f"Tu progreso en {path.title} es del {path.completion_percentage:.0f}%. Te recomendamos recursos adicionales.",
+                'reasoning': "Progreso bajo detectado",
+                'confidence_score': 0.8,
+                'relevance_score': 0.9,
+                'priority': 4
+            }
+        
+        # Si el progreso es alto, recomendar desafíos adicionales
+        if path.completion_percentage > 80:
+            return {
+                'type': 'challenge',
+                'target_id': path.id,
+                'title': "Desafío adicional",
+                'description': f"¡Excelente progreso en {path.title}! Te recomendamos desafíos adicionales.",
+                'reasoning': "Alto rendimiento detectado",
+                'confidence_score': 0.7,
+                'relevance_score': 0.6,
+                'priority': 2
+            }
+        
+        return None
+    
+    def _build_difficulty_recommendation(self, competency_id, competency_name, percentage):
+        """Construir una recomendación de refuerzo para una competencia con bajo puntaje"""
+        return {
+            'type': 'competency_support',
+            'target_id': competency_id,
+            'title': f"Refuerza {competency_name}",
+            'description': f"Detectamos dificultades en {competency_name}. Te recomendamos recursos adicionales.",
+            'reasoning': f"Puntaje bajo ({percentage:.0f}%) en evaluación reciente",
+            'confidence_score': 0.9,
+            'relevance_score': 0.95,
+            'priority': 5
+        }
+    
+    def _build_similar_recommendation(self, resource):
+        """Construir una recomendación de recurso similar"""
+        return {
+            'type': 'similar_resource',
+            'target_id': resource.id,
+            'title': f"Recurso similar: {resource.title}",
+            'description': f"Basado en tu éxito con recursos similares, te recomendamos este contenido.",
+            'reasoning': "Basado en recursos exitosos previos",
+            'confidence_score': 0.6,
+            'relevance_score': 0.7,
+            'priority': 2
+        }
+    
     def _get_progress_based_recommendations(self, student_id):
         """Obtener recomendaciones basadas en el progreso del estudiante"""
         try:
@@ -114,32 +381,8 @@ class RecommendationEngine:
             ).all()
             
             for path in active_paths:
-                # Si el progreso es bajo, recomendar recursos de refuerzo
-                if path.completion_percentage < 30:
-                    recommendation = {
-                        'type': 'learning_path',
-                        'target_id': path.id,
-                        'title': "Refuerza tu aprendizaje",
-                        'description': f"Tu progreso en {path.title} es del {path.completion_percentage:.0f}%. Te recomendamos recursos adicionales.",
-                        'reasoning': "Progreso bajo detectado",
-                        'confidence_score': 0.8,
-                        'relevance_score': 0.9,
-                        'priority': 4
-                    }
-                    recommendations.append(recommendation)
-                
-                # Si el progreso es alto, recomendar desafíos adicionales
-                elif path.completion_percentage > 80:
-                    recommendation = {
-                        'type': 'challenge',
-                        'target_id': path.id,
-                        'title': "Desafío adicional",
-                        'description': f"¡Excelente progreso en {path.title}! Te recomendamos desafíos adicionales.",
-                        'reasoning': "Alto rendimiento detectado",
-                        'confidence_score': 0.7,
-                        'relevance_score': 0.6,
-                        'priority': 2
-                    }
+                recommendation = self._build_path_recommendation(path)
+                if recommendation:
                     recommendations.append(recommendation)
             
             return recommendations
@@ -166,17 +409,9 @@ class RecommendationEngine:
             for progress in low_performance:
                 if progress.competency_id:
                     competency = progress.competency
-                    recommendation = {
-                        'type': 'competency_support',
-                        'target_id': competency.id,
-                        'title': f"Refuerza {competency.name}",
-                        'description': f"Detectamos dificultades en {competency.name}. Te recomendamos recursos adicionales.",
-                        'reasoning': f"Puntaje bajo ({progress.percentage:.0f}%) en evaluación reciente",
-                        'confidence_score': 0.9,
-                        'relevance_score': 0.95,
-                        'priority': 5
-                    }
-                    recommendations.append(recommendation)
+                    recommendations.append(self._build_difficulty_recommendation(
+                        competency.id, competency.name, progress.percentage
+                    ))
             
             return recommendations
             
@@ -205,17 +440,7 @@ class RecommendationEngine:
                 similar_resources = self._find_similar_resources(progress.activity_id)
                 
                 for resource in similar_resources:
-                    recommendation = {
-                        'type': 'similar_resource',
-                        'target_id': resource.id,
-                        'title': f"Recurso similar: {resource.title}",
-                        'description': f"Basado en tu éxito con recursos similares, te recomendamos este contenido.",
-                        'reasoning': "Basado en recursos exitosos previos",
-                        'confidence_score': 0.6,
-                        'relevance_score': 0.7,
-                        'priority': 2
-                    }
-                    recommendations.append(recommendation)
+                    recommendations.append(self._build_similar_recommendation(resource))
             
             return recommendations
             
@@ -223,19 +448,21 @@ class RecommendationEngine:
             print(f"Error obteniendo recomendaciones similares: {e}")
             return []
     
-    def _find_similar_resources(self, resource_id):
+    def _find_similar_resources(self, resource_id, catalog=None):
         """Encontrar recursos similares a uno dado"""
         try:
+            if catalog is None:
+                catalog = get_resource_catalog().get_course_catalog()
+            
             # Implementación simple: buscar recursos de la misma competencia
-            resource = Resource.query.get(resource_id)
+            resource = catalog.get(resource_id)
             if not resource or not resource.competency_id:
                 return []
             
-            similar_resources = Resource.query.filter(
-                Resource.competency_id == resource.competency_id,
-                Resource.id != resource_id,
-                Resource.is_active == True
-            ).limit(3).all()
+            similar_resources = [
+                similar for similar in catalog.competency_resources(resource.competency_id)
+                if similar.id != resource_id
+            ][:3]
             
             return similar_resources
             
@@ -269,7 +496,7 @@ class RecommendationEngine:
             )
             
             db.session.add(recommendation)
-            db.session.commit()
+            commit_or_flush()
             
             return recommendation
             
@@ -295,8 +522,10 @@ class RecommendationEngine:
                 return False
             
             recommendation.provide_feedback(feedback_score)
+            commit_or_flush()
             return True
             
         except Exception as e:
             print(f"Error actualizando retroalimentación: {e}")
+            db.session.rollback()
             return False
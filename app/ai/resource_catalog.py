@@ -0,0 +1,168 @@
+"""
+Catálogo de recursos en caché
+
+Los recursos se leen en casi todas las rutas de IA pero cambian poco. El
+catálogo guarda, por curso (o global con ``course_id=None``), registros
+ligeros de los recursos, un índice por competencia y las matrices de estilo
+ya calculadas. Las entradas expiran tras ``RESOURCE_CACHE_TTL`` segundos y se
+invalidan al insertar, actualizar o eliminar un ``Resource`` con el ORM.
+"""
+
+from collections import namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from app import db
+from app.cache import TTLCache, defer_invalidation, history_values
+from app.models import Resource
+from app.ai.vark_analyzer import VARKAnalyzer
+import numpy as np
+
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_MAX_ENTRIES = 256
+
+CatalogResource = namedtuple('CatalogResource', [
+    'id', 'course_id', 'competency_id', 'title', 'resource_type',
+    'difficulty_level', 'duration', 'points', 'is_active', 'is_required'
+])
+
+class CourseCatalog:
+    """Instantánea inmutable de los recursos de un curso (o de todos)"""
+
+    __slots__ = ('course_id', 'resources', 'by_id', 'active', 'type_matrix', 'score_matrix', '_by_competency')
+
+    def __init__(self, course_id, resources, style_scores, type_matrix):
+        self.course_id = course_id
+        self.resources = tuple(resources)
+        self.by_id = {resource.id: resource for resource in self.resources}
+
+        active_mask = np.array([resource.is_active for resource in self.resources], dtype=bool)
+        self.active = tuple(resource for resource in self.resources if resource.is_active)
+
+        # Matrices (n_activos x 4) alineadas con self.active, en el orden de STYLE_ORDER
+        self.type_matrix = _read_only(type_matrix[active_mask] if len(self.resources) else np.zeros((0, 4)))
+        self.score_matrix = _read_only(style_scores[active_mask] if len(self.resources) else np.zeros((0, 4)))
+
+        by_competency = {}
+        for index, resource in enumerate(self.active):
+            if resource.competency_id:
+                by_competency.setdefault(resource.competency_id, []).append(index)
+        self._by_competency = {
+            competency_id: _read_only(np.array(indices, dtype=np.intp))
+            for competency_id, indices in by_competency.items()
+        }
+
+    def get(self, resource_id):
+        """Obtener un recurso (activo o no) por su ID"""
+        return self.by_id.get(resource_id)
+
+    def competency_indices(self, competency_id):
+        """Índices en ``active`` de los recursos activos de una competencia"""
+        return self._by_competency.get(competency_id, np.array([], dtype=np.intp))
+
+    def competency_resources(self, competency_id):
+        """Recursos activos de una competencia, ordenados por ID"""
+        return [self.active[index] for index in self.competency_indices(competency_id)]
+
+class ResourceCatalog:
+    """Caché de catálogos de recursos por curso"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.vark_analyzer = VARKAnalyzer()
+
+    def get_course_catalog(self, course_id=None):
+        """
+        Obtener el catálogo de un curso
+
+        Args:
+            course_id (int): ID del curso; None para el catálogo global
+
+        Returns:
+            CourseCatalog: Catálogo con los recursos del curso
+        """
+        return self.cache.get_or_load(course_id, lambda: self._load(course_id))
+
+    def invalidate_course(self, course_id):
+        """Invalidar el catálogo de un curso y el catálogo global"""
+        self.cache.invalidate(course_id)
+        self.cache.invalidate(None)
+
+    def clear(self):
+        """Vaciar todos los catálogos"""
+        self.cache.clear()
+
+    def stats(self):
+        """Estadísticas de la caché (aciertos, fallos, entradas...)"""
+        return self.cache.stats()
+
+    def _load(self, course_id):
+        """Leer los recursos de la base de datos y construir el catálogo"""
+        query = db.session.query(
+            Resource.id, Resource.course_id, Resource.competency_id, Resource.title,
+            Resource.resource_type, Resource.difficulty_level, Resource.duration,
+            Resource.points, Resource.is_active, Resource.is_required,
+            Resource.visual_score, Resource.auditory_score,
+            Resource.reading_score, Resource.kinesthetic_score
+        )
+        if course_id is not None:
+            query = query.filter(Resource.course_id == course_id)
+        rows = query.order_by(Resource.id).all()
+
+        resources = [
+            CatalogResource(
+                row.id, row.course_id, row.competency_id, row.title, row.resource_type,
+                row.difficulty_level, row.duration, row.points, bool(row.is_active), bool(row.is_required)
+            )
+            for row in rows
+        ]
+        style_scores = np.array([
+            [row.visual_score or 0.0, row.auditory_score or 0.0,
+             row.reading_score or 0.0, row.kinesthetic_score or 0.0]
+            for row in rows
+        ], dtype=float).reshape(len(rows), 4)
+        type_matrix = self.vark_analyzer.get_resource_type_matrix(
+            [row.resource_type.value for row in rows]
+        ).reshape(len(rows), 4)
+
+        return CourseCatalog(course_id, resources, style_scores, type_matrix)
+
+def get_resource_catalog(app=None):
+    """
+    Obtener el catálogo de recursos de la aplicación, creándolo si no existe
+
+    Args:
+        app (Flask): Aplicación; por defecto la aplicación actual
+
+    Returns:
+        ResourceCatalog: Catálogo compartido por el proceso
+    """
+    app = app or current_app._get_current_object()
+    catalog = app.extensions.get('resource_catalog')
+    if catalog is None:
+        catalog = app.extensions.setdefault('resource_catalog', ResourceCatalog(
+            max_entries=app.config.get('RESOURCE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+            ttl_seconds=app.config.get('RESOURCE_CACHE_TTL', DEFAULT_TTL_SECONDS)
+        ))
+    return catalog
+
+def _read_only(array):
+    """Marcar un arreglo como de solo lectura, ya que se comparte entre peticiones"""
+    array.flags.writeable = False
+    return array
+
+def _invalidate_courses(course_ids):
+    """Invalidar los catálogos de los cursos indicados en la aplicación actual"""
+    if not has_app_context():
+        return
+    catalog = current_app.extensions.get('resource_catalog')
+    if catalog is None:
+        return
+    for course_id in course_ids:
+        catalog.invalidate_course(course_id)
+
+@event.listens_for(Resource, 'after_insert')
+@event.listens_for(Resource, 'after_update')
+@event.listens_for(Resource, 'after_delete')
+def _on_resource_change(mapper, connection, target):
+    """Invalidar el catálogo del curso del recurso modificado"""
+    defer_invalidation(inspect(target).session, _invalidate_courses, history_values(target, 'course_id'))
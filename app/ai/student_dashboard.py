@@ -0,0 +1,304 @@
+"""
+Modelo de lectura del dashboard del estudiante
+
+StudentDashboardView reúne en tres consultas todo lo que muestran
+``student/dashboard.html`` y ``student/dashboard_mejorado.html``: datos y
+perfil VARK del estudiante con los conteos de diagnósticos y rutas activas,
+los cursos activos con su progreso y docente, y las rutas activas con su
+siguiente paso. La vista solo contiene valores simples, por lo que se guarda
+por estudiante en una caché en memoria que se invalida cuando cambian sus
+matrículas, progreso, diagnósticos o rutas.
+"""
+
+from collections import namedtuple
+from types import MappingProxyType
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import aliased
+from app import db
+from app.cache import TTLCache, defer_invalidation, history_values
+from app.models import (
+    User, Student, Teacher, Course, CourseEnrollment, DiagnosticExam,
+    LearningPath, LearningPathStep, Progress
+)
+
+DEFAULT_TTL_SECONDS = 120
+DEFAULT_MAX_ENTRIES = 1024
+
+DashboardStudent = namedtuple('DashboardStudent', [
+    'id', 'student_id', 'first_name', 'last_name', 'full_name',
+    'dominant_learning_style', 'diagnostic_completed'
+])
+
+DashboardStep = namedtuple('DashboardStep', [
+    'id', 'step_order', 'title', 'resource_id', 'estimated_time'
+])
+
+DashboardPath = namedtuple('DashboardPath', [
+    'id', 'course_id', 'title', 'current_step', 'total_steps',
+    'completion_percentage', 'next_step'
+])
+
+DashboardCourse = namedtuple('DashboardCourse', [
+    'id', 'name', 'code', 'description', 'teacher_name', 'enrollment_id',
+    'progress', 'progress_percentage', 'diagnostic_percentage', 'active_path'
+])
+
+class StudentDashboardView:
+    """Instantánea inmutable de los datos del dashboard de un estudiante"""
+
+    __slots__ = (
+        'student', 'courses', 'active_paths', 'avg_progress',
+        'completed_diagnostics', 'active_learning_paths', 'vark_profile'
+    )
+
+    def __init__(self, student, courses, active_paths, completed_diagnostics, active_learning_paths, vark_profile):
+        self.student = student
+        self.courses = tuple(courses)
+        self.active_paths = tuple(active_paths)
+        self.completed_diagnostics = completed_diagnostics
+        self.active_learning_paths = active_learning_paths
+        self.vark_profile = vark_profile
+
+        # Progreso promedio (0-1) de los cursos activos
+        self.avg_progress = (
+            sum(course.progress for course in self.courses) / len(self.courses) if self.courses else 0
+        )
+
+    @classmethod
+    def load(cls, student_id):
+        """
+        Construir la vista de un estudiante con tres consultas
+
+        Args:
+            student_id (int): ID del estudiante
+
+        Returns:
+            StudentDashboardView: Vista del dashboard, o None si el estudiante no existe
+        """
+        student_row = _query_student(student_id)
+        if student_row is None:
+            return None
+
+        active_paths = [
+            DashboardPath(
+                row.id, row.course_id, row.title, row.current_step or 0, row.total_steps or 0,
+                row.completion_percentage or 0.0,
+                DashboardStep(row.step_id, row.step_order, row.step_title, row.resource_id, row.estimated_time)
+                if row.step_id is not None else None
+            )
+            for row in _query_active_paths(student_id)
+        ]
+        path_by_course = {}
+        for path in active_paths:
+            path_by_course.setdefault(path.course_id, path)
+
+        courses = []
+        for row in _query_active_courses(student_id):
+            progress = row.overall_progress or 0.0
+            courses.append(DashboardCourse(
+                row.course_id, row.name, row.code, row.description or '',
+                f"{row.teacher_first_name} {row.teacher_last_name}", row.enrollment_id,
+                progress, progress * 100, row.diagnostic_percentage, path_by_course.get(row.course_id)
+            ))
+
+        student = DashboardStudent(
+            student_row.id, student_row.student_id, student_row.first_name, student_row.last_name,
+            f"{student_row.first_name} {student_row.last_name}",
+            student_row.dominant_learning_style, bool(student_row.diagnostic_completed)
+        )
+        vark_profile = None
+        if student.diagnostic_completed:
+            vark_profile = MappingProxyType({
+                'visual': student_row.vark_visual,
+                'auditory': student_row.vark_auditory,
+                'reading': student_row.vark_reading,
+                'kinesthetic': student_row.vark_kinesthetic,
+                'dominant': student_row.dominant_learning_style
+            })
+
+        return cls(
+            student, courses, active_paths,
+            student_row.completed_diagnostics or 0, student_row.active_learning_paths or 0,
+            vark_profile
+        )
+
+    def template_context(self):
+        """Variables que esperan las plantillas del dashboard"""
+        return {
+            'student': self.student,
+            'courses': self.courses,
+            'active_paths': self.active_paths,
+            'avg_progress': self.avg_progress,
+            'completed_diagnostics': self.completed_diagnostics,
+            'active_learning_paths': self.active_learning_paths,
+            'vark_profile': self.vark_profile
+        }
+
+def _query_student(student_id):
+    """Consulta 1: estudiante, usuario, perfil VARK y conteos"""
+    completed_diagnostics = select(func.count(DiagnosticExam.id)).where(
+        DiagnosticExam.student_id == Student.id,
+        DiagnosticExam.is_completed == True
+    ).correlate(Student).scalar_subquery()
+
+    active_learning_paths = select(func.count(LearningPath.id)).where(
+        LearningPath.student_id == Student.id,
+        LearningPath.is_active == True
+    ).correlate(Student).scalar_subquery()
+
+    return db.session.query(
+        Student.id, Student.student_id, Student.dominant_learning_style, Student.diagnostic_completed,
+        Student.vark_visual, Student.vark_auditory, Student.vark_reading, Student.vark_kinesthetic,
+        User.first_name, User.last_name,
+        completed_diagnostics.label('completed_diagnostics'),
+        active_learning_paths.label('active_learning_paths')
+    ).join(User, User.id == Student.user_id).filter(Student.id == student_id).first()
+
+def _query_active_courses(student_id):
+    """Consulta 2: matrículas activas con su curso, docente y mejor diagnóstico"""
+    teacher_user = aliased(User)
+    diagnostic_percentage = select(func.max(DiagnosticExam.percentage)).where(
+        DiagnosticExam.student_id == CourseEnrollment.student_id,
+        DiagnosticExam.course_id == CourseEnrollment.course_id,
+        DiagnosticExam.is_completed == True
+    ).correlate(CourseEnrollment).scalar_subquery()
+
+    return db.session.query(
+        CourseEnrollment.id.label('enrollment_id'), CourseEnrollment.course_id, CourseEnrollment.overall_progress,
+        Course.name, Course.code, Course.description,
+        teacher_user.first_name.label('teacher_first_name'),
+        teacher_user.last_name.label('teacher_last_name'),
+        diagnostic_percentage.label('diagnostic_percentage')
+    ).join(Course, Course.id == CourseEnrollment.course_id).join(
+        Teacher, Teacher.id == Course.teacher_id
+    ).join(
+        teacher_user, teacher_user.id == Teacher.user_id
+    ).filter(
+        CourseEnrollment.student_id == student_id,
+        CourseEnrollment.is_active == True
+    ).order_by(CourseEnrollment.id).all()
+
+def _query_active_paths(student_id):
+    """Consulta 3: rutas activas con su siguiente paso pendiente (next_step_id)"""
+    return db.session.query(
+        LearningPath.id, LearningPath.course_id, LearningPath.title, LearningPath.current_step,
+        LearningPath.total_steps, LearningPath.completion_percentage,
+        LearningPathStep.id.label('step_id'), LearningPathStep.step_order,
+        LearningPathStep.title.label('step_title'), LearningPathStep.resource_id,
+        LearningPathStep.estimated_time
+    ).outerjoin(LearningPathStep, LearningPathStep.id == LearningPath.next_step_id).filter(
+        LearningPath.student_id == student_id,
+        LearningPath.is_active == True
+    ).order_by(LearningPath.id).all()
+
+class StudentDashboardCache:
+    """Caché de vistas del dashboard por estudiante"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get_view(self, student_id):
+        """
+        Obtener la vista de un estudiante, construyéndola si no está en caché
+
+        Returns:
+            StudentDashboardView: Vista del dashboard, o None si el estudiante no existe
+        """
+        view = self.cache.get(student_id)
+        if view is None:
+            view = StudentDashboardView.load(student_id)
+            if view is not None:
+                self.cache.set(student_id, view)
+        return view
+
+    def invalidate_student(self, student_id):
+        """Invalidar la vista de un estudiante"""
+        self.cache.invalidate(student_id)
+
+    def clear(self):
+        """Vaciar todas las vistas"""
+        self.cache.clear()
+
+    def stats(self):
+        """Estadísticas de la caché"""
+        return self.cache.stats()
+
+def get_student_dashboard_cache(app=None):
+    """Obtener la caché de dashboards de la aplicación, creándola si no existe"""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('student_dashboards')
+    if cache is None:
+        cache = app.extensions.setdefault('student_dashboards', StudentDashboardCache(
+            max_entries=app.config.get('STUDENT_DASHBOARD_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+            ttl_seconds=app.config.get('STUDENT_DASHBOARD_CACHE_TTL', DEFAULT_TTL_SECONDS)
+        ))
+    return cache
+
+def get_student_dashboard(student_id):
+    """
+    Obtener la vista del dashboard de un estudiante
+
+    Args:
+        student_id (int): ID del estudiante
+
+    Returns:
+        StudentDashboardView: Vista del dashboard, o None si el estudiante no existe
+    """
+    return get_student_dashboard_cache().get_view(student_id)
+
+def invalidate_student_dashboards(student_ids, session=None):
+    """
+    Invalidar las vistas de varios estudiantes
+
+    Las escrituras masivas (``insert``/``update`` sobre la tabla) no disparan
+    los eventos del ORM y deben llamar a esta función explícitamente.
+
+    Args:
+        student_ids (iterable): IDs de los estudiantes
+        session (Session): Si se indica, se vuelve a invalidar al confirmar su transacción
+    """
+    defer_invalidation(session, _invalidate_students, student_ids)
+
+def _invalidate_students(student_ids):
+    """Invalidar las vistas de los estudiantes indicados en la aplicación actual"""
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get('student_dashboards')
+    if cache is None:
+        return
+    for student_id in student_ids:
+        cache.invalidate_student(student_id)
+
+@event.listens_for(CourseEnrollment, 'after_insert')
+@event.listens_for(CourseEnrollment, 'after_update')
+@event.listens_for(CourseEnrollment, 'after_delete')
+@event.listens_for(DiagnosticExam, 'after_insert')
+@event.listens_for(DiagnosticExam, 'after_update')
+@event.listens_for(DiagnosticExam, 'after_delete')
+@event.listens_for(LearningPath, 'after_insert')
+@event.listens_for(LearningPath, 'after_update')
+@event.listens_for(LearningPath, 'after_delete')
+@event.listens_for(Progress, 'after_insert')
+@event.listens_for(Progress, 'after_update')
+@event.listens_for(Progress, 'after_delete')
+def _on_student_record_change(mapper, connection, target):
+    """Invalidar el dashboard del estudiante dueño del registro modificado"""
+    invalidate_student_dashboards(history_values(target, 'student_id'), inspect(target).session)
+
+@event.listens_for(Student, 'after_update')
+@event.listens_for(Student, 'after_delete')
+def _on_student_change(mapper, connection, target):
+    """Invalidar el dashboard al cambiar el perfil del estudiante (p. ej. VARK)"""
+    invalidate_student_dashboards({target.id}, inspect(target).session)
+
+@event.listens_for(LearningPathStep, 'after_insert')
+@event.listens_for(LearningPathStep, 'after_update')
+@event.listens_for(LearningPathStep, 'after_delete')
+def _on_step_change(mapper, connection, target):
+    """Invalidar el dashboard del dueño de la ruta del paso modificado"""
+    # Se consulta con la conexión del flush para no cargar la relación a mitad del flush
+    student_id = connection.execute(
+        select(LearningPath.student_id).where(LearningPath.id == target.learning_path_id)
+    ).scalar()
+    invalidate_student_dashboards({student_id}, inspect(target).session)
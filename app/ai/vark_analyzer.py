@@ -4,8 +4,42 @@ Analizador de estilos de aprendizaje VARK
 
 from app.models import VARKQuestion, VARKResponse, Student
 from app import db
+from app.unit_of_work import commit_or_flush
+from sqlalchemy import update
 import numpy as np
 
+# Orden de las columnas en los vectores de estilo VARK
+STYLE_ORDER = ('visual', 'auditory', 'reading', 'kinesthetic')
+
+# Códigos de respuesta VARK en el mismo orden que STYLE_ORDER
+VARK_CODES = ('V', 'A', 'R', 'K')
+
+# Códigos enteros adicionales para el análisis en lote: respuesta no VARK y
+# casilla sin respuesta (ambas cuentan como pregunta, sin peso, igual que en
+# el cálculo por diccionario) y relleno de las filas más cortas (no cuenta)
+INVALID_CODE = len(VARK_CODES)
+UNANSWERED_CODE = len(VARK_CODES) + 1
+PADDING_CODE = len(VARK_CODES) + 2
+
+# Umbrales de fortalezas y debilidades (porcentaje)
+STRENGTH_THRESHOLD = 30
+WEAKNESS_THRESHOLD = 20
+
+# Estudiantes por bloque al recalcular todos los perfiles
+DEFAULT_RECOMPUTE_CHUNK_SIZE = 1000
+
+# Mapeo de tipos de recursos a estilos de aprendizaje
+RESOURCE_STYLE_MAPPING = {
+    'video': {'visual': 0.8, 'auditory': 0.7, 'reading': 0.3, 'kinesthetic': 0.4},
+    'reading': {'visual': 0.4, 'auditory': 0.2, 'reading': 0.9, 'kinesthetic': 0.3},
+    'exercise': {'visual': 0.5, 'auditory': 0.3, 'reading': 0.6, 'kinesthetic': 0.8},
+    'simulation': {'visual': 0.7, 'auditory': 0.4, 'reading': 0.4, 'kinesthetic': 0.9},
+    'game': {'visual': 0.6, 'auditory': 0.5, 'reading': 0.3, 'kinesthetic': 0.8}
+}
+
+# Compatibilidad neutral para tipos de recurso sin mapeo
+NEUTRAL_STYLE_SCORES = {'visual': 0.5, 'auditory': 0.5, 'reading': 0.5, 'kinesthetic': 0.5}
+
 class VARKAnalyzer:
     """Analizador para el cuestionario VARK (Visual, Auditory, Reading/Writing, Kinesthetic)"""
     
@@ -28,30 +62,88 @@ class VARKAnalyzer:
             dict: Puntajes VARK normalizados
         """
         try:
-            # Inicializar contadores
-            vark_scores = {'visual': 0.0, 'auditory': 0.0, 'reading': 0.0, 'kinesthetic': 0.0}
-            total_questions = len(responses)
-            
-            if total_questions == 0:
-                return vark_scores
-            
-            # Procesar cada respuesta
-            for question_id, response in responses.items():
-                if response in self.vark_weights:
-                    weights = self.vark_weights[response]
-                    for style, weight in weights.items():
-                        vark_scores[style] += weight
-            
-            # Normalizar puntajes (convertir a porcentajes)
-            for style in vark_scores:
-                vark_scores[style] = (vark_scores[style] / total_questions) * 100
-            
-            return vark_scores
+            scores = self.analyze_responses_batch([responses])['scores'][0]
+            return {style: float(score) for style, score in zip(STYLE_ORDER, scores)}
             
         except Exception as e:
             print(f"Error analizando respuestas VARK: {e}")
             return {'visual': 25.0, 'auditory': 25.0, 'reading': 25.0, 'kinesthetic': 25.0}
     
+    def analyze_responses_batch(self, responses):
+        """
+        Analizar en lote los cuestionarios VARK de muchos estudiantes
+        
+        Args:
+            responses: Matriz (n_estudiantes x n_preguntas) de opciones 'V', 'A',
+                'R', 'K' (None o '' si la pregunta quedó sin responder), o lista
+                de diccionarios question_id -> opción como en analyze_responses
+            
+        Returns:
+            dict: Arreglos NumPy alineados con la entrada:
+                ``scores`` (n x 4, porcentajes en el orden de STYLE_ORDER),
+                ``dominant_styles`` (códigos V/A/R/K), ``strengths`` y
+                ``weaknesses`` (máscaras n x 4), ``questions`` (preguntas de
+                cada fila, el divisor de los porcentajes) y ``answered``
+                (preguntas contestadas)
+        """
+        codes = self.encode_responses(responses)
+        weight_table = self._get_weight_table()
+        
+        # Acumular pregunta por pregunta en orden fijo, igual que la suma por diccionario
+        scores = np.zeros((codes.shape[0], len(STYLE_ORDER)))
+        for column in range(codes.shape[1]):
+            scores += weight_table[codes[:, column]]
+        
+        # El divisor es el total de preguntas de la fila, contestadas o no
+        questions = np.count_nonzero(codes != PADDING_CODE, axis=1)
+        answered = np.count_nonzero(codes < UNANSWERED_CODE, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(questions[:, None] > 0, (scores / questions[:, None]) * 100, 0.0)
+        
+        return {
+            'scores': scores,
+            'dominant_styles': np.array(VARK_CODES)[np.argmax(scores, axis=1)] if len(scores) else np.array([], dtype='<U1'),
+            'strengths': scores >= STRENGTH_THRESHOLD,
+            'weaknesses': scores <= WEAKNESS_THRESHOLD,
+            'questions': questions,
+            'answered': answered
+        }
+    
+    def encode_responses(self, responses):
+        """
+        Codificar respuestas VARK como enteros (0-3 para V/A/R/K)
+        
+        Args:
+            responses: Matriz de opciones o lista de diccionarios (ver analyze_responses_batch)
+            
+        Returns:
+            numpy.ndarray: Matriz int8 (n_estudiantes x n_preguntas); las filas
+            más cortas se completan con PADDING_CODE
+        """
+        if isinstance(responses, np.ndarray) and responses.ndim == 2:
+            # Matriz de opciones: comparación vectorizada por código
+            codes = np.full(responses.shape, INVALID_CODE, dtype=np.int8)
+            for index, code in enumerate(VARK_CODES):
+                codes[responses == code] = index
+            unanswered = responses == ''
+            if responses.dtype == object:
+                unanswered |= np.equal(responses, None)
+            codes[unanswered] = UNANSWERED_CODE
+            return codes
+        
+        rows = [row.values() if isinstance(row, dict) else row for row in responses]
+        lengths = np.fromiter((len(row) for row in rows), dtype=np.intp, count=len(rows))
+        width = int(lengths.max()) if len(rows) else 0
+        
+        code_of = {code: index for index, code in enumerate(VARK_CODES)}
+        code_of.update({None: UNANSWERED_CODE, '': UNANSWERED_CODE})
+        flat = [code_of.get(option, INVALID_CODE) for row in rows for option in row]
+        
+        # Rellenar fila por fila en orden (el resto de las filas cortas queda como relleno)
+        codes = np.full((len(rows), width), PADDING_CODE, dtype=np.int8)
+        codes[np.arange(width) < lengths[:, None]] = flat
+        return codes
+    
     def get_dominant_style(self, vark_scores):
         """
         Determinar el estilo de aprendizaje dominante
@@ -127,7 +219,7 @@ class VARKAnalyzer:
         """Identificar fortalezas del estudiante"""
         strengths = []
         for style, score in vark_scores.items():
-            if score >= 30:  # Umbral para considerar fortaleza
+            if score >= STRENGTH_THRESHOLD:  # Umbral para considerar fortaleza
                 strengths.append(style)
         return strengths
     
@@ -135,10 +227,18 @@ class VARKAnalyzer:
         """Identificar debilidades del estudiante"""
         weaknesses = []
         for style, score in vark_scores.items():
-            if score <= 20:  # Umbral para considerar debilidad
+            if score <= WEAKNESS_THRESHOLD:  # Umbral para considerar debilidad
                 weaknesses.append(style)
         return weaknesses
     
+    def _get_weight_table(self):
+        """Matriz de pesos por código de respuesta (filas extra en cero para inválidas, sin responder y relleno)"""
+        return np.array(
+            [[self.vark_weights.get(code, {}).get(style, 0.0) for style in STYLE_ORDER] for code in VARK_CODES]
+            + [[0.0] * len(STYLE_ORDER)] * 3,
+            dtype=float
+        )
+    
     def _get_learning_preferences(self, dominant_style):
         """Obtener preferencias de aprendizaje basadas en el estilo dominante"""
         preferences = {
@@ -243,7 +343,7 @@ class VARKAnalyzer:
             # Determinar estilo dominante
             student.dominant_learning_style = self.get_dominant_style(vark_scores)
             
-            db.session.commit()
+            commit_or_flush()
             return True
             
         except Exception as e:
@@ -251,6 +351,72 @@ class VARKAnalyzer:
             db.session.rollback()
             return False
     
+    def recompute_all_profiles(self, chunk_size=DEFAULT_RECOMPUTE_CHUNK_SIZE):
+        """
+        Recalcular los perfiles VARK de todos los estudiantes con respuestas guardadas
+        
+        Pensado para volver a puntuar toda la institución tras cambiar los
+        pesos (``vark_weights``). Los estudiantes se recorren por bloques de
+        IDs; cada bloque se puntúa con analyze_responses_batch y se guarda con
+        una actualización masiva de las columnas ``Student.vark_*``.
+        
+        Args:
+            chunk_size (int): Estudiantes por bloque (y por transacción)
+            
+        Returns:
+            dict: ``success`` y número de estudiantes actualizados, o ``error``
+        """
+        try:
+            updated = 0
+            last_student_id = 0
+            
+            while True:
+                student_ids = [student_id for (student_id,) in db.session.query(VARKResponse.student_id).filter(
+                    VARKResponse.student_id > last_student_id
+                ).distinct().order_by(VARKResponse.student_id).limit(chunk_size).all()]
+                
+                if not student_ids:
+                    break
+                
+                # Agrupar respuestas por estudiante (la última respuesta a una pregunta prevalece)
+                responses = {student_id: {} for student_id in student_ids}
+                for student_id, question_id, option in db.session.query(
+                    VARKResponse.student_id, VARKResponse.question_id, VARKResponse.selected_option
+                ).filter(VARKResponse.student_id.in_(student_ids)).order_by(
+                    VARKResponse.student_id, VARKResponse.id
+                ):
+                    responses[student_id][question_id] = option
+                
+                result = self.analyze_responses_batch([responses[student_id] for student_id in student_ids])
+                
+                db.session.execute(update(Student), [
+                    {
+                        'id': student_id,
+                        'vark_visual': float(scores[0]),
+                        'vark_auditory': float(scores[1]),
+                        'vark_reading': float(scores[2]),
+                        'vark_kinesthetic': float(scores[3]),
+                        'dominant_learning_style': str(dominant)
+                    }
+                    for student_id, scores, dominant in zip(student_ids, result['scores'], result['dominant_styles'])
+                ])
+                
+                # La actualización masiva no dispara los eventos del ORM que invalidan los dashboards
+                from app.ai.student_dashboard import invalidate_student_dashboards
+                invalidate_student_dashboards(student_ids, db.session)
+                
+                db.session.commit()
+                
+                updated += len(student_ids)
+                last_student_id = student_ids[-1]
+            
+            return {'success': True, 'updated': updated}
+            
+        except Exception as e:
+            print(f"Error recalculando perfiles VARK: {e}")
+            db.session.rollback()
+            return {'success': False, 'error': str(e)}
+    
     def get_learning_style_compatibility(self, student_id, resource_type):
         """
         Calcular compatibilidad entre el estilo de aprendizaje del estudiante y un tipo de recurso
@@ -267,35 +433,74 @@ class VARKAnalyzer:
             if not student:
                 return 0.5  # Compatibilidad neutral
             
-            # Mapeo de tipos de recursos a estilos de aprendizaje
-            resource_style_mapping = {
-                'video': {'visual': 0.8, 'auditory': 0.7, 'reading': 0.3, 'kinesthetic': 0.4},
-                'reading': {'visual': 0.4, 'auditory': 0.2, 'reading': 0.9, 'kinesthetic': 0.3},
-                'exercise': {'visual': 0.5, 'auditory': 0.3, 'reading': 0.6, 'kinesthetic': 0.8},
-                'simulation': {'visual': 0.7, 'auditory': 0.4, 'reading': 0.4, 'kinesthetic': 0.9},
-                'game': {'visual': 0.6, 'auditory': 0.5, 'reading': 0.3, 'kinesthetic': 0.8}
-            }
+            scores = self.score_compatibility(
+                self.get_student_style_vector(student),
+                self.get_resource_type_matrix([resource_type])
+            )
             
-            # Obtener puntajes VARK del estudiante
-            student_vark = {
-                'visual': student.vark_visual / 100.0,
-                'auditory': student.vark_auditory / 100.0,
-                'reading': student.vark_reading / 100.0,
-                'kinesthetic': student.vark_kinesthetic / 100.0
-            }
-            
-            # Obtener compatibilidad del tipo de recurso
-            resource_compatibility = resource_style_mapping.get(resource_type, {
-                'visual': 0.5, 'auditory': 0.5, 'reading': 0.5, 'kinesthetic': 0.5
-            })
-            
-            # Calcular compatibilidad ponderada
-            compatibility = 0.0
-            for style in ['visual', 'auditory', 'reading', 'kinesthetic']:
-                compatibility += student_vark[style] * resource_compatibility[style]
-            
-            return min(1.0, max(0.0, compatibility))
+            return float(scores[0])
             
         except Exception as e:
             print(f"Error calculando compatibilidad: {e}")
             return 0.5
+    
+    def get_student_style_vector(self, student):
+        """
+        Obtener el vector VARK de un estudiante normalizado a 0.0-1.0
+        
+        Args:
+            student (Student): Estudiante
+            
+        Returns:
+            numpy.ndarray: Vector de 4 elementos en el orden de STYLE_ORDER
+        """
+        return np.array([
+            student.vark_visual or 0.0,
+            student.vark_auditory or 0.0,
+            student.vark_reading or 0.0,
+            student.vark_kinesthetic or 0.0
+        ], dtype=float) / 100.0
+    
+    def get_resource_type_matrix(self, resource_types):
+        """
+        Construir la matriz de compatibilidad estilo-recurso por tipo de recurso
+        
+        Args:
+            resource_types (list): Tipos de recurso (str) en el orden deseado
+            
+        Returns:
+            numpy.ndarray: Matriz (n_recursos x 4) en el orden de STYLE_ORDER
+        """
+        type_names = sorted(RESOURCE_STYLE_MAPPING)
+        type_table = np.array(
+            [[RESOURCE_STYLE_MAPPING[name][style] for style in STYLE_ORDER] for name in type_names]
+            + [[NEUTRAL_STYLE_SCORES[style] for style in STYLE_ORDER]],
+            dtype=float
+        )
+        
+        # Los tipos sin mapeo apuntan a la última fila (compatibilidad neutral)
+        type_index = {name: i for i, name in enumerate(type_names)}
+        codes = np.array([type_index.get(t, len(type_names)) for t in resource_types], dtype=np.intp)
+        
+        return type_table[codes]
+    
+    def score_compatibility(self, style_vectors, resource_matrix):
+        """
+        Calcular la compatibilidad de uno o varios estudiantes con un conjunto de recursos
+        
+        Args:
+            style_vectors (numpy.ndarray): Vector (4,) o matriz (n_estudiantes x 4)
+            resource_matrix (numpy.ndarray): Matriz (n_recursos x 4)
+            
+        Returns:
+            numpy.ndarray: Compatibilidades recortadas a 0.0-1.0, con forma
+            (n_recursos,) o (n_estudiantes x n_recursos)
+        """
+        # Acumular estilo por estilo en orden fijo: el resultado es idéntico
+        # para un estudiante o para un lote, a diferencia de un producto BLAS
+        style_vectors = np.asarray(style_vectors, dtype=float)
+        scores = np.zeros(style_vectors.shape[:-1] + (resource_matrix.shape[0],))
+        for column in range(len(STYLE_ORDER)):
+            scores += style_vectors[..., column, None] * resource_matrix[:, column]
+        
+        return np.clip(scores, 0.0, 1.0)
@@ -0,0 +1,296 @@
+"""
+Mapeo de respuestas del formulario VARK de Google Forms a códigos V/A/R/K
+
+Las preguntas del formulario se definen una sola vez (VARK_FORM_QUESTIONS) y
+se compilan al importar el módulo en una tabla de búsqueda por pregunta,
+indexada por el texto de la opción normalizado (sin mayúsculas, tildes ni
+espacios o puntuación sobrantes). Si el texto de una opción se editó en el
+formulario y ya no coincide, se recurre a una comparación difusa.
+"""
+
+from difflib import SequenceMatcher
+from functools import lru_cache
+import re
+import sys
+import unicodedata
+
+# Similitud mínima (0-1) para aceptar una opción por comparación difusa
+FUZZY_MATCH_THRESHOLD = 0.85
+
+# Prefijo de los campos del formulario (entry.<número de pregunta>)
+ENTRY_PREFIX = 'entry.'
+
+_WHITESPACE = re.compile(r'\s+')
+_EDGE_PUNCTUATION = ' .,;:¡!¿?"\'()'
+
+# Preguntas del formulario VARK (basadas en el formulario publicado)
+VARK_FORM_QUESTIONS = [
+    {
+        'question_number': 1,
+        'question_text': 'Cuando me explican un tema de matemáticas, prefiero:',
+        'options': {
+            'V': 'Ver diagramas o ejemplos gráficos.',
+            'A': 'Escuchar la explicación del profesor.',
+            'R': 'Leer la teoría en el libro o apuntes.',
+            'K': 'Resolver ejercicios prácticos.'
+        }
+    },
+    {
+        'question_number': 2,
+        'question_text': 'Si me piden aprender a simplificar fracciones, prefiero:',
+        'options': {
+            'V': 'Ver un esquema paso a paso en imágenes.',
+            'A': 'Escuchar a alguien explicarlo en voz alta.',
+            'R': 'Leer la explicación en el cuaderno o guía.',
+            'K': 'Intentar resolver ejemplos por mi cuenta.'
+        }
+    },
+    {
+        'question_number': 3,
+        'question_text': 'Para aprender fórmulas, me ayuda más:',
+        'options': {
+            'V': 'Ver la fórmula en un gráfico o esquema.',
+            'A': 'Escuchar cómo se explica con ejemplos orales.',
+            'R': 'Leer y escribir varias veces la fórmula.',
+            'K': 'Usar la fórmula en muchos ejercicios prácticos.'
+        }
+    },
+    {
+        'question_number': 4,
+        'question_text': 'Cuando estudio operaciones básicas, prefiero:',
+        'options': {
+            'V': 'Usar colores o subrayar para diferenciar pasos.',
+            'A': 'Escuchar grabaciones de clases.',
+            'R': 'Hacer resúmenes y escribir las reglas.',
+            'K': 'Resolver problemas de aplicación.'
+        }
+    },
+    {
+        'question_number': 5,
+        'question_text': 'Para recordar definiciones, prefiero:',
+        'options': {
+            'V': 'Asociarlas con una imagen o gráfico.',
+            'A': 'Repetirlas en voz alta.',
+            'R': 'Leer y escribirlas varias veces.',
+            'K': 'Usarlas al resolver ejercicios.'
+        }
+    },
+    {
+        'question_number': 6,
+        'question_text': 'Si no entiendo un problema, busco:',
+        'options': {
+            'V': 'Ver la solución resuelta con dibujos.',
+            'A': 'Que alguien me lo explique verbalmente.',
+            'R': 'Leer el procedimiento en un texto.',
+            'K': 'Resolverlo manipulando números y probando.'
+        }
+    },
+    {
+        'question_number': 7,
+        'question_text': 'Para aprender geometría, prefiero:',
+        'options': {
+            'V': 'Ver figuras y esquemas.',
+            'A': 'Escuchar la explicación del maestro.',
+            'R': 'Leer las propiedades en el libro.',
+            'K': 'Usar instrumentos (regla, compás) para practicar.'
+        }
+    },
+    {
+        'question_number': 8,
+        'question_text': 'Cuando reviso álgebra, me sirve más:',
+        'options': {
+            'V': 'Mirar ejemplos con gráficos o diagramas.',
+            'A': 'Escuchar un audio con la explicación.',
+            'R': 'Leer paso a paso el procedimiento.',
+            'K': 'Resolver ejercicios prácticos en hojas.'
+        }
+    },
+    {
+        'question_number': 9,
+        'question_text': 'En un examen me siento más seguro si:',
+        'options': {
+            'V': 'Recuerdo los gráficos o colores usados al estudiar.',
+            'A': 'Recuerdo lo que el profesor explicó en clase.',
+            'R': 'Recuerdo lo que escribí en mis apuntes.',
+            'K': 'Recuerdo los ejercicios que practiqué.'
+        }
+    },
+    {
+        'question_number': 10,
+        'question_text': 'Para aprender porcentajes, prefiero:',
+        'options': {
+            'V': 'Ver diagramas circulares o barras.',
+            'A': 'Escuchar ejemplos prácticos explicados.',
+            'R': 'Leer la fórmula y ejemplos en el cuaderno.',
+            'K': 'Aplicar porcentajes en compras o descuentos.'
+        }
+    },
+    {
+        'question_number': 11,
+        'question_text': 'Cuando tengo que repasar, prefiero:',
+        'options': {
+            'V': 'Hacer mapas conceptuales o esquemas.',
+            'A': 'Explicarle en voz alta a un compañero.',
+            'R': 'Reescribir mis notas y resúmenes.',
+            'K': 'Hacer ejercicios prácticos.'
+        }
+    },
+    {
+        'question_number': 12,
+        'question_text': 'Para aprender a resolver ecuaciones, prefiero:',
+        'options': {
+            'V': 'Ver un procedimiento visual paso a paso.',
+            'A': 'Escuchar cómo alguien lo resuelve en voz alta.',
+            'R': 'Leer ejemplos resueltos en el libro.',
+            'K': 'Resolver varias ecuaciones yo mismo.'
+        }
+    },
+    {
+        'question_number': 13,
+        'question_text': 'Cuando me enseñan un tema nuevo, lo entiendo mejor si:',
+        'options': {
+            'V': 'Veo imágenes o gráficos del tema.',
+            'A': 'Escucho la explicación oralmente.',
+            'R': 'Leo el procedimiento escrito.',
+            'K': 'Lo practico con ejemplos.'
+        }
+    },
+    {
+        'question_number': 14,
+        'question_text': 'Para aprender probabilidad, prefiero:',
+        'options': {
+            'V': 'Ver tablas y gráficos de resultados.',
+            'A': 'Escuchar la explicación de ejemplos cotidianos.',
+            'R': 'Leer la definición y fórmulas.',
+            'K': 'Realizar experimentos como lanzar dados o monedas.'
+        }
+    },
+    {
+        'question_number': 15,
+        'question_text': 'Cuando estudio, me resulta más fácil:',
+        'options': {
+            'V': 'Recordar imágenes, colores o diagramas.',
+            'A': 'Recordar lo que escuché en clase.',
+            'R': 'Recordar lo que escribí o leí.',
+            'K': 'Recordar lo que hice en ejercicios prácticos.'
+        }
+    }
+]
+
+@lru_cache(maxsize=8192)
+def _normalize_cached(text):
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = _WHITESPACE.sub(' ', text.casefold()).strip(_EDGE_PUNCTUATION)
+    return sys.intern(text)
+
+def normalize_answer_text(text):
+    """
+    Normalizar el texto de una opción para compararlo
+
+    Ignora mayúsculas, tildes, espacios repetidos y la puntuación de los extremos.
+
+    Returns:
+        str: Texto normalizado e internado ('' si no es texto)
+    """
+    if not isinstance(text, str):
+        return ''
+    # Las respuestas se repiten mucho entre envíos: se memoriza la normalización
+    return _normalize_cached(text)
+
+class VARKAnswerMatcher:
+    """Tabla de búsqueda precompilada de opciones VARK por pregunta"""
+
+    def __init__(self, questions, fuzzy_threshold=FUZZY_MATCH_THRESHOLD):
+        """
+        Args:
+            questions (list): Diccionarios con ``question_number`` y ``options``
+                (código VARK -> texto de la opción)
+            fuzzy_threshold (float): Similitud mínima de la comparación difusa
+        """
+        self.fuzzy_threshold = fuzzy_threshold
+        self.exact = {}
+        self.lookup = {}
+        for question in questions:
+            exact = {}
+            options = {}
+            for code, text in question['options'].items():
+                key = normalize_answer_text(text)
+                if key:
+                    exact[text] = options[key] = sys.intern(code)
+            question_number = int(question['question_number'])
+            self.exact[question_number] = exact
+            self.lookup[question_number] = options
+
+        # Campo del formulario -> número de pregunta
+        self.entries = {sys.intern(f'{ENTRY_PREFIX}{number}'): number for number in self.lookup}
+
+        # Caché acotada de la comparación difusa por instancia
+        self._fuzzy_match = lru_cache(maxsize=4096)(self._compute_fuzzy_match)
+
+    @classmethod
+    def from_vark_questions(cls, vark_questions, **kwargs):
+        """Construir la tabla a partir de filas VARKQuestion"""
+        return cls([
+            {'question_number': question.question_number, 'options': question.get_options()}
+            for question in vark_questions
+        ], **kwargs)
+
+    def match(self, question_number, answer_text):
+        """
+        Obtener el código VARK de una respuesta
+
+        Args:
+            question_number (int): Número de pregunta
+            answer_text (str): Texto de la opción elegida
+
+        Returns:
+            str: 'V', 'A', 'R' o 'K', o None si no corresponde a ninguna opción
+        """
+        options = self.lookup.get(question_number)
+        if not options:
+            return None
+
+        # Camino rápido: texto idéntico al de la opción
+        code = self.exact[question_number].get(answer_text) if isinstance(answer_text, str) else None
+        if code is not None:
+            return code
+
+        key = normalize_answer_text(answer_text)
+        code = options.get(key)
+        if code is None and key:
+            code = self._fuzzy_match(question_number, key)
+        return code
+
+    def map_form_data(self, forms_data):
+        """
+        Mapear los campos ``entry.<n>`` del formulario a {número de pregunta: código}
+
+        Returns:
+            dict: Respuestas VARK reconocidas
+        """
+        vark_responses = {}
+        entries = self.entries
+        for entry_key, response_text in forms_data.items():
+            question_number = entries.get(entry_key)
+            if question_number is None:
+                continue
+
+            vark_option = self.match(question_number, response_text)
+            if vark_option:
+                vark_responses[question_number] = vark_option
+
+        return vark_responses
+
+    def _compute_fuzzy_match(self, question_number, key):
+        """Opción más parecida de la pregunta si supera el umbral de similitud"""
+        best_code = None
+        best_ratio = self.fuzzy_threshold
+        for option_key, code in self.lookup[question_number].items():
+            ratio = SequenceMatcher(None, key, option_key).ratio()
+            if ratio >= best_ratio:
+                best_code, best_ratio = code, ratio
+        return best_code
+
+# Tabla compilada una sola vez al importar el módulo
+DEFAULT_ANSWER_MATCHER = VARKAnswerMatcher(VARK_FORM_QUESTIONS)
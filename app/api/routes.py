@@ -5,17 +5,27 @@ Rutas de API REST para el STI
 from flask import request, jsonify, current_app
 from flask_login import login_required, current_user
 from app.api import bp
-from app.models import Student, Course, DiagnosticExam, LearningPath, Progress
+from app.models import User, Student, Course, CourseEnrollment, DiagnosticExam, LearningPath, Progress
 from app import db
+from app.unit_of_work import commit_or_flush, transactional
 from app.ai.google_forms_integration import GoogleFormsIntegration
 from app.ai.learning_path_generator import LearningPathGenerator
 from app.ai.vark_forms_integration import VARKFormsIntegration
+from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+from app.webhook_queue import (KIND_DIAGNOSTIC, KIND_VARK, enqueue_response, get_webhook_queue, queue_intake_enabled,
+                               webhook_intake_authorized, webhook_job_visible)
+from app.progress_buffer import build_progress_event, buffer_enabled, get_progress_buffer
+import hmac
 import json
 from sqlalchemy import text
 
 @bp.route('/google-forms/responses', methods=['POST'])
+@transactional
 def receive_google_forms_responses():
     """Recibir respuestas del examen diagnóstico desde Google Forms"""
+    if not webhook_intake_authorized():
+        return jsonify({'error': 'No autorizado'}), 401
+    
     try:
         data = request.get_json()
         
@@ -23,6 +33,14 @@ def receive_google_forms_responses():
         if not data or 'student_email' not in data or 'responses' not in data:
             return jsonify({'error': 'Datos inválidos'}), 400
         
+        # En modo cola se encola y el trabajador procesa las respuestas
+        if queue_intake_enabled():
+            body, status = enqueue_response(KIND_DIAGNOSTIC, {
+                'student_email': data['student_email'],
+                'responses': data['responses']
+            }, _idempotency_key(data))
+            return jsonify(body), status
+        
         # Buscar estudiante por email
         student = Student.query.join(Student.user).filter(
             User.email == data['student_email']
@@ -48,6 +66,31 @@ def receive_google_forms_responses():
         current_app.logger.error(f"Error procesando respuestas de Google Forms: {str(e)}")
         return jsonify({'error': 'Error interno del servidor'}), 500
 
+@bp.route('/webhooks/jobs/<job_id>')
+def get_webhook_job(job_id):
+    """Consultar el estado de un webhook encolado (con el secreto de webhooks o como docente/administrador)"""
+    if not webhook_job_visible():
+        return jsonify({'error': 'Acceso denegado'}), 403
+    
+    job = get_webhook_queue().get(job_id)
+    if not job:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    
+    return jsonify({
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'result': job['result'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at']
+    })
+
+def _idempotency_key(data):
+    """Clave de idempotencia del webhook (cabecera Idempotency-Key o campo idempotency_key)"""
+    return request.headers.get('Idempotency-Key') or (data or {}).get('idempotency_key')
+
 @bp.route('/health/db')
 def db_health_check():
     """Verificar conectividad y estado de la base de datos"""
@@ -65,6 +108,7 @@ def db_health_check():
 
 @bp.route('/learning-path/generate', methods=['POST'])
 @login_required
+@transactional
 def generate_learning_path():
     """Generar ruta de aprendizaje personalizada"""
     if current_user.user_type.value != 'student':
@@ -103,6 +147,43 @@ def generate_learning_path():
         current_app.logger.error(f"Error generando ruta de aprendizaje: {str(e)}")
         return jsonify({'error': 'Error interno del servidor'}), 500
 
+@bp.route('/learning-path/generate/course/<int:course_id>', methods=['POST'])
+@login_required
+def generate_course_learning_paths(course_id):
+    """Generar rutas de aprendizaje para todos los estudiantes de un curso"""
+    if current_user.user_type.value != 'teacher':
+        return jsonify({'error': 'Acceso denegado'}), 403
+    
+    try:
+        teacher = current_user.teacher_profile
+        course = Course.query.get_or_404(course_id)
+        
+        # Verificar que el curso pertenece al docente
+        if course.teacher_id != teacher.id:
+            return jsonify({'error': 'Acceso denegado'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        student_ids = data.get('student_ids')
+        
+        def log_progress(processed, total):
+            current_app.logger.info(f"Rutas del curso {course_id}: {processed}/{total} estudiantes procesados")
+        
+        generator = LearningPathGenerator()
+        result = generator.generate_paths_for_course(
+            course_id,
+            student_ids=student_ids,
+            progress_callback=log_progress
+        )
+        
+        if result['success']:
+            return jsonify(result)
+        else:
+            return jsonify({'error': result['error']}), 500
+            
+    except Exception as e:
+        current_app.logger.error(f"Error generando rutas del curso: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
 @bp.route('/progress/update', methods=['POST'])
 @login_required
 def update_progress():
@@ -110,36 +191,52 @@ def update_progress():
     if current_user.user_type.value != 'student':
         return jsonify({'error': 'Acceso denegado'}), 403
     
+    # En modo buffer el evento se escribe por lotes en segundo plano (sin unidad de trabajo)
+    if buffer_enabled():
+        return _buffer_progress()
+    return _store_progress()
+
+def _buffer_progress():
+    """Validar el evento con la caché del buffer y encolarlo; solo confirma el hilo que escribe"""
     try:
-        data = request.get_json()
-        activity_type = data.get('activity_type')
-        activity_id = data.get('activity_id')
-        score = data.get('score')
-        max_score = data.get('max_score')
-        time_spent = data.get('time_spent')
+        buffer = get_progress_buffer()
+        student_id = buffer.student_id_for(current_user.id)
+        if student_id is None:
+            return jsonify({'error': 'Perfil de estudiante no encontrado'}), 404
         
-        if not all([activity_type, activity_id, score is not None]):
-            return jsonify({'error': 'Datos requeridos faltantes'}), 400
+        try:
+            event = build_progress_event(student_id, request.get_json(), buffer.resolve_enrollment)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
+        buffer.append(event)
+        return jsonify({
+            'message': 'Progreso recibido; se guardará en segundo plano',
+            'percentage': event['percentage']
+        }), 202
+        
+    except Exception as e:
+        current_app.logger.error(f"Error actualizando progreso: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+@transactional
+def _store_progress():
+    """Guardar el evento en la petición con una sola confirmación"""
+    try:
         student = current_user.student_profile
         if not student:
             return jsonify({'error': 'Perfil de estudiante no encontrado'}), 404
         
-        # Crear registro de progreso
-        progress = Progress(
-            student_id=student.id,
-            course_id=data.get('course_id'),
-            enrollment_id=data.get('enrollment_id'),
-            activity_type=activity_type,
-            activity_id=activity_id,
-            score=score,
-            max_score=max_score,
-            time_spent=time_spent
-        )
+        try:
+            event = build_progress_event(student.id, request.get_json())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        progress.calculate_percentage()
+        # Crear registro de progreso
+        progress = Progress(**event)
         db.session.add(progress)
-        db.session.commit()
+        AnalyticsSnapshotRefresher().record_progress(progress)
+        commit_or_flush()
         
         return jsonify({
             'message': 'Progreso actualizado exitosamente',
@@ -203,6 +300,45 @@ def get_recommendations(student_id):
         current_app.logger.error(f"Error obteniendo recomendaciones: {str(e)}")
         return jsonify({'error': 'Error interno del servidor'}), 500
 
+@bp.route('/recommendations/course/<int:course_id>')
+@login_required
+def get_course_recommendations(course_id):
+    """Obtener recomendaciones para todos los estudiantes activos de un curso"""
+    if current_user.user_type.value != 'teacher':
+        return jsonify({'error': 'Acceso denegado'}), 403
+    
+    try:
+        teacher = current_user.teacher_profile
+        course = Course.query.get_or_404(course_id)
+        
+        # Verificar que el curso pertenece al docente
+        if course.teacher_id != teacher.id:
+            return jsonify({'error': 'Acceso denegado'}), 403
+        
+        limit = request.args.get('limit', 5, type=int)
+        student_ids = [
+            student_id for (student_id,) in db.session.query(CourseEnrollment.student_id).filter_by(
+                course_id=course_id,
+                is_active=True
+            ).order_by(CourseEnrollment.student_id).all()
+        ]
+        
+        from app.ai.recommendation_engine import RecommendationEngine
+        engine = RecommendationEngine()
+        recommendations = engine.get_recommendations_batch(student_ids, limit)
+        
+        return jsonify({
+            'course_id': course_id,
+            'recommendations': [
+                {'student_id': student_id, 'recommendations': recommendations.get(student_id, [])}
+                for student_id in student_ids
+            ]
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"Error obteniendo recomendaciones del curso: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
 @bp.route('/analytics/course/<int:course_id>')
 @login_required
 def get_course_analytics(course_id):
@@ -218,10 +354,12 @@ def get_course_analytics(course_id):
         if course.teacher_id != teacher.id:
             return jsonify({'error': 'Acceso denegado'}), 403
         
-        # Obtener analíticas
-        from app.ai.analytics_engine import AnalyticsEngine
-        analytics_engine = AnalyticsEngine()
-        analytics = analytics_engine.get_course_analytics(course_id)
+        # Obtener analíticas desde la instantánea materializada
+        refresher = AnalyticsSnapshotRefresher()
+        analytics = refresher.get_course_analytics(
+            course_id,
+            force_rebuild=request.args.get('refresh', type=int) == 1
+        )
         
         return jsonify(analytics)
         
@@ -229,6 +367,72 @@ def get_course_analytics(course_id):
         current_app.logger.error(f"Error obteniendo analíticas: {str(e)}")
         return jsonify({'error': 'Error interno del servidor'}), 500
 
+@bp.route('/analytics/course/<int:course_id>/trends')
+@login_required
+def get_course_performance_trends(course_id):
+    """Obtener las tendencias de rendimiento de un curso por día, semana o mes"""
+    if current_user.user_type.value != 'teacher':
+        return jsonify({'error': 'Acceso denegado'}), 403
+
+    from app.ai.performance_trends import BUCKETS, get_performance_trends
+    from app.progress_buffer import flush_pending_progress
+
+    try:
+        teacher = current_user.teacher_profile
+        course = Course.query.get_or_404(course_id)
+
+        # Verificar que el curso pertenece al docente
+        if course.teacher_id != teacher.id:
+            return jsonify({'error': 'Acceso denegado'}), 403
+
+        config = current_app.config
+        days = request.args.get('days', config.get('PERFORMANCE_TRENDS_DAYS', 30), type=int)
+        bucket = request.args.get('bucket', config.get('PERFORMANCE_TRENDS_BUCKET', 'day'))
+        rolling_window = request.args.get('rolling', config.get('PERFORMANCE_TRENDS_ROLLING_WINDOW', 7), type=int)
+        if bucket not in BUCKETS or days is None or days < 1 or rolling_window is None or rolling_window < 1:
+            return jsonify({'error': 'Parámetros no válidos'}), 400
+
+        flush_pending_progress(course_id=course_id)
+        trends = get_performance_trends().course_trends(course_id, days, bucket, rolling_window)
+
+        return jsonify({
+            'course_id': course_id,
+            'days': days,
+            'bucket': bucket,
+            'rolling_window': rolling_window,
+            'trends': trends
+        })
+
+    except Exception as e:
+        current_app.logger.error(f"Error obteniendo tendencias de rendimiento: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+@bp.route('/cache/resources/stats')
+@login_required
+def get_resource_cache_stats():
+    """Obtener estadísticas de la caché del catálogo de recursos"""
+    if current_user.user_type.value != 'teacher':
+        return jsonify({'error': 'Acceso denegado'}), 403
+    
+    from app.ai.resource_catalog import get_resource_catalog
+    return jsonify(get_resource_catalog().stats())
+
+@bp.route('/metrics')
+def get_metrics():
+    """Exponer las métricas de la aplicación en formato de texto de Prometheus"""
+    token = current_app.config.get('METRICS_TOKEN')
+    authorized = bool(token) and hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    )
+    if not authorized and not (current_user.is_authenticated and current_user.user_type.value == 'admin'):
+        return jsonify({'error': 'Acceso denegado'}), 403
+    
+    from app.metrics import get_metrics_registry
+    return current_app.response_class(
+        get_metrics_registry().render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
 @bp.route('/vark/sync-questions', methods=['POST'])
 def sync_vark_questions():
     """Sincronizar preguntas VARK con la base de datos"""
@@ -249,8 +453,12 @@ def sync_vark_questions():
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 @bp.route('/vark/process-external', methods=['POST'])
+@transactional
 def process_vark_external():
     """Procesar respuestas del formulario VARK externo"""
+    if not webhook_intake_authorized():
+        return jsonify({'error': 'No autorizado'}), 401
+    
     try:
         data = request.get_json()
         student_id = data.get('student_id')
@@ -259,6 +467,13 @@ def process_vark_external():
         if not student_id or not responses:
             return jsonify({'error': 'ID de estudiante y respuestas requeridos'}), 400
         
+        if queue_intake_enabled():
+            body, status = enqueue_response(KIND_VARK, {
+                'student_id': student_id,
+                'responses': responses
+            }, _idempotency_key(data))
+            return jsonify(body), status
+        
         vark_integration = VARKFormsIntegration()
         result = vark_integration.process_vark_responses_from_forms(student_id, responses)
         
@@ -9,9 +9,11 @@ from app.auth import bp
 from app.models import User, Student, Teacher
 from app.models.user import UserType
 from app import db
+from app.unit_of_work import commit_or_flush, transactional
 from app.auth.forms import LoginForm, RegistrationForm
 
 @bp.route('/login', methods=['GET', 'POST'])
+@transactional
 def login():
     """Iniciar sesión"""
     if current_user.is_authenticated:
@@ -42,6 +44,7 @@ def login():
     return render_template('auth/login.html', title='Iniciar Sesión', form=form)
 
 @bp.route('/register', methods=['GET', 'POST'])
+@transactional
 def register():
     """Registrar nuevo usuario"""
     if current_user.is_authenticated:
@@ -85,7 +88,7 @@ def register():
                 )
                 db.session.add(teacher)
 
-            db.session.commit()
+            commit_or_flush()
 
             flash('¡Registro exitoso! Ya puedes iniciar sesión.', 'success')
             return redirect(url_for('auth.login'))
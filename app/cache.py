@@ -0,0 +1,163 @@
+"""
+Cachés en memoria del proceso
+
+Además de ``TTLCache``, el módulo coordina la invalidación diferida de las
+cachés que dependen de filas del ORM: ``defer_invalidation`` invalida de
+inmediato y vuelve a invalidar cuando la transacción se confirma, con un
+único par de oyentes de sesión para todas las cachés.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+_MISSING = object()
+
+# Clave de session.info con las invalidaciones pendientes (función -> claves)
+_PENDING_KEY = 'cache_invalidations_pending'
+
+class TTLCache:
+    """
+    Caché LRU con expiración por tiempo y contadores de uso
+
+    Es segura entre hilos. Los valores deben ser inmutables o no modificarse
+    después de guardarse, ya que se comparten entre peticiones.
+    """
+
+    def __init__(self, max_entries=128, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        """
+        Obtener un valor vigente de la caché
+
+        Args:
+            key: Clave del valor
+            default: Valor a devolver si no existe o expiró
+
+        Returns:
+            Valor guardado o ``default``
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Guardar un valor, desalojando el menos usado si se supera el límite"""
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """
+        Obtener un valor o calcularlo con ``loader`` si no está en caché
+
+        El cálculo se hace fuera del candado; si dos hilos fallan a la vez,
+        ambos calculan y el último en terminar queda guardado.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        """Eliminar una clave de la caché"""
+        with self._lock:
+            if self._entries.pop(key, _MISSING) is not _MISSING:
+                self.invalidations += 1
+
+    def clear(self):
+        """Vaciar la caché"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Obtener estadísticas de uso
+
+        Returns:
+            dict: Entradas, límites y contadores de aciertos, fallos y desalojos
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+def defer_invalidation(session, callback, keys):
+    """
+    Invalidar ahora y otra vez al confirmar la transacción de ``session``
+
+    La segunda invalidación cubre a una lectura concurrente que recargó el
+    valor antes de que el cambio fuera visible. Si la transacción se revierte,
+    las invalidaciones pendientes se descartan.
+
+    Args:
+        session (Session): Sesión de la transacción (None: solo invalidar ahora)
+        callback (callable): ``callback(keys)`` invalida un conjunto de claves;
+            debe ser una función de módulo para acumular sus claves
+        keys (iterable): Claves a invalidar (se ignoran los None)
+    """
+    keys = {key for key in keys if key is not None}
+    if not keys:
+        return
+
+    callback(keys)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, {}).setdefault(callback, set()).update(keys)
+
+def history_values(target, attribute):
+    """Valor actual y anterior (si cambió) de un atributo de una fila del ORM, sin None"""
+    values = {getattr(target, attribute)}
+    values.update(getattr(inspect(target).attrs, attribute).history.deleted or ())
+    values.discard(None)
+    return values
+
+@event.listens_for(Session, 'after_commit')
+def _on_commit(session):
+    """Repetir las invalidaciones pendientes de la transacción confirmada"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    for callback, keys in (pending or {}).items():
+        callback(keys)
+
+@event.listens_for(Session, 'after_rollback')
+def _on_rollback(session):
+    """Descartar invalidaciones pendientes de una transacción revertida"""
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,220 @@
+"""
+Comandos de línea de comandos del STI (flask <comando>)
+"""
+
+import time
+
+import click
+
+
+def register_commands(app):
+    """Registrar los comandos personalizados en la aplicación"""
+
+    @app.cli.command('rebuild-analytics')
+    @click.option('--course-id', type=int, default=None,
+                  help='Reconstruir solo la instantánea de este curso')
+    def rebuild_analytics(course_id):
+        """Reconstruir las instantáneas de analíticas por curso"""
+        from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+
+        refresher = AnalyticsSnapshotRefresher()
+        if course_id is not None:
+            if not refresher.rebuild(course_id):
+                raise click.ClickException(f'Curso {course_id} no encontrado')
+            click.echo(f'[OK] Instantánea del curso {course_id} reconstruida')
+        else:
+            rebuilt = refresher.rebuild_all()
+            click.echo(f'[OK] {rebuilt} instantáneas reconstruidas')
+
+    @app.cli.command('generate-paths')
+    @click.option('--course-id', type=int, required=True, help='Curso para el que se generan las rutas')
+    @click.option('--student-id', 'student_ids', type=int, multiple=True,
+                  help='Limitar a estos estudiantes (se puede repetir)')
+    @click.option('--chunk-size', type=int, default=100, show_default=True,
+                  help='Estudiantes por transacción')
+    def generate_paths(course_id, student_ids, chunk_size):
+        """Generar rutas de aprendizaje para todos los estudiantes de un curso"""
+        from app.ai.learning_path_generator import LearningPathGenerator
+
+        def report(processed, total):
+            click.echo(f'  {processed}/{total} estudiantes procesados')
+
+        result = LearningPathGenerator().generate_paths_for_course(
+            course_id,
+            student_ids=list(student_ids) or None,
+            chunk_size=chunk_size,
+            progress_callback=report
+        )
+        if not result['success']:
+            raise click.ClickException(result['error'])
+
+        for error in result['errors']:
+            click.echo(f'[ERROR] {error}', err=True)
+        click.echo(f"[OK] {result['created']} rutas creadas ({result['steps_created']} pasos), "
+                   f"{result['skipped']} omitidas, {result['failed']} fallidas")
+
+    @app.cli.command('repair-path-counters')
+    @click.option('--course-id', type=int, default=None, help='Revisar solo las rutas de este curso')
+    def repair_path_counters(course_id):
+        """Recalcular desde learning_path_steps los contadores y el siguiente paso de las rutas"""
+        from app import db
+        from app.models import LearningPath
+        from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+
+        repaired = LearningPath.refresh_counters(course_id=course_id)
+        db.session.commit()
+
+        # El porcentaje de las rutas corregidas entra en las analíticas del curso
+        refresher = AnalyticsSnapshotRefresher()
+        for repaired_course_id in sorted({row.course_id for row in repaired}):
+            refresher.rebuild(repaired_course_id)
+        click.echo(f'[OK] {len(repaired)} rutas corregidas')
+
+    @app.cli.command('check-prerequisites')
+    @click.option('--course-id', type=int, default=None, help='Revisar solo este curso')
+    def check_prerequisites(course_id):
+        """Informar ciclos y prerequisitos inexistentes entre competencias"""
+        from app import db
+        from app.models import Course
+        from app.ai.competency_graph import get_competency_graph
+
+        if course_id is not None:
+            course_ids = [course_id]
+        else:
+            course_ids = [cid for (cid,) in db.session.query(Course.id).order_by(Course.id).all()]
+
+        problems = 0
+        for cid in course_ids:
+            graph = get_competency_graph(cid)
+            for cycle in graph.cycles:
+                problems += 1
+                click.echo(f'[CICLO] Curso {cid}: competencias {cycle}')
+            for competency_id, missing in sorted(graph.missing_prerequisites.items()):
+                problems += 1
+                click.echo(f'[FALTA] Curso {cid}: la competencia {competency_id} '
+                           f'requiere competencias fuera del curso {list(missing)}')
+
+        if problems:
+            raise click.ClickException(f'{problems} problemas de prerequisitos encontrados')
+        click.echo(f'[OK] {len(course_ids)} cursos sin problemas de prerequisitos')
+
+    @app.cli.command('process-webhooks')
+    @click.option('--once', is_flag=True, help='Vaciar la cola y terminar')
+    @click.option('--workers', type=int, default=None, help='Hilos trabajadores (por defecto WEBHOOK_WORKERS)')
+    def process_webhooks(once, workers):
+        """Procesar los webhooks encolados de Google Forms"""
+        from app.webhook_queue import create_worker_pool, get_webhook_queue
+
+        pool = create_worker_pool(app, workers=workers)
+        if once:
+            processed = pool.drain()
+            click.echo(f'[OK] {processed} webhooks procesados; cola: {get_webhook_queue(app).stats()}')
+            return
+
+        if pool.workers < 1:
+            raise click.ClickException('Se necesita al menos un trabajador')
+
+        pool.start()
+        click.echo(f'Procesando webhooks con {pool.workers} trabajadores (Ctrl+C para detener)')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pool.stop()
+
+    @app.cli.command('pull-form-responses')
+    @click.option('--form', 'form_names', multiple=True,
+                  help='Nombre del formulario en DIAGNOSTIC_FORMS (se puede repetir)')
+    @click.option('--full', is_flag=True, help='Ignorar la marca de agua y descargar todo')
+    def pull_form_responses(form_names, full):
+        """Descargar las respuestas nuevas de los formularios de diagnóstico y procesarlas"""
+        from app.ai.forms_response_puller import FormsResponsePuller
+        from app.webhook_queue import (create_worker_pool, enqueue_form_responses, get_webhook_queue,
+                                       queue_intake_enabled)
+
+        forms = app.config['DIAGNOSTIC_FORMS']
+        unknown = [name for name in form_names if name not in forms]
+        if unknown:
+            raise click.ClickException(f'Formularios desconocidos: {", ".join(unknown)}')
+        if form_names:
+            forms = {name: forms[name] for name in form_names}
+
+        # Las respuestas se guardan en la cola duradera antes de avanzar la marca de agua
+        queue = get_webhook_queue(app)
+        puller = FormsResponsePuller.from_config(app)
+        try:
+            results = puller.pull(forms, full=full,
+                                  ingest=lambda form_id, responses: enqueue_form_responses(queue, form_id, responses))
+        finally:
+            puller.close()
+
+        failed = 0
+        for name, result in results.items():
+            if result['success']:
+                ingested = result['ingested'] or {'queued': 0, 'duplicates': 0}
+                click.echo(f"[OK] {name}: {len(result['responses'])} respuestas nuevas, "
+                           f"{ingested['queued']} encoladas, {ingested['duplicates']} ya encoladas "
+                           f"(hasta {result['high_water_mark'] or '-'})")
+            else:
+                failed += 1
+                click.echo(f"[ERROR] {name}: {result['error']}", err=True)
+
+        # Sin trabajadores en segundo plano se procesan aquí mismo
+        if not (queue_intake_enabled(app) and app.config.get('WEBHOOK_WORKERS', 2)):
+            processed = create_worker_pool(app, workers=0).drain()
+            click.echo(f'[OK] {processed} diagnósticos procesados; cola: {queue.stats()}')
+
+        if failed:
+            raise click.ClickException(f'{failed} formularios no se pudieron descargar')
+
+    @app.cli.command('recompute-vark-profiles')
+    @click.option('--chunk-size', type=int, default=1000, show_default=True,
+                  help='Estudiantes por transacción')
+    def recompute_vark_profiles(chunk_size):
+        """Recalcular los perfiles VARK de todos los estudiantes desde sus respuestas"""
+        from app.ai.vark_analyzer import VARKAnalyzer
+
+        result = VARKAnalyzer().recompute_all_profiles(chunk_size=chunk_size)
+        if not result['success']:
+            raise click.ClickException(result['error'])
+        click.echo(f"[OK] {result['updated']} perfiles VARK recalculados")
+
+    @app.cli.command('export-course')
+    @click.option('--course-id', type=int, required=True, help='Curso a exportar')
+    @click.option('--format', 'export_format', type=click.Choice(['csv', 'jsonl', 'parquet']), default='csv',
+                  show_default=True, help='Formato de los archivos')
+    @click.option('--dataset', 'datasets', multiple=True,
+                  type=click.Choice(['progress', 'exam_responses', 'competency_mastery', 'learning_paths']),
+                  help='Conjunto de datos (se puede repetir; por defecto todos)')
+    @click.option('--output-dir', type=click.Path(file_okay=False), default='.', show_default=True,
+                  help='Carpeta donde se escriben los archivos')
+    @click.option('--chunk-size', type=int, default=None, help='Filas por bloque (por defecto EXPORT_CHUNK_SIZE)')
+    def export_course(course_id, export_format, datasets, output_dir, chunk_size):
+        """Exportar en streaming el progreso y los diagnósticos de un curso"""
+        import os
+        from app import db
+        from app.models import Course
+        from app.course_export import CourseExporter, ExportError, EXPORT_DATASETS, EXPORT_FORMATS
+
+        course = db.session.get(Course, course_id)
+        if course is None:
+            raise click.ClickException(f'Curso {course_id} no encontrado')
+
+        exporter = CourseExporter(course_id, chunk_size=chunk_size or app.config.get('EXPORT_CHUNK_SIZE', 1000))
+        os.makedirs(output_dir, exist_ok=True)
+        extension = EXPORT_FORMATS[export_format][1]
+        for dataset in datasets or EXPORT_DATASETS:
+            path = os.path.join(output_dir, f'{course.code or course_id}_{dataset}.{extension}')
+            try:
+                chunks = exporter.stream(dataset, export_format)
+            except ExportError as e:
+                raise click.ClickException(str(e))
+
+            if export_format == 'parquet':
+                f = open(path, 'wb')
+            else:
+                f = open(path, 'w', encoding='utf-8', newline='')
+            with f:
+                for chunk in chunks:
+                    f.write(chunk)
+            click.echo(f'[OK] {dataset}: {path} ({os.path.getsize(path)} bytes)')
@@ -0,0 +1,223 @@
+"""
+Exportación en streaming de los datos de un curso
+
+Recorre ``Progress``, ``ExamResponse``, ``CompetencyMastery`` y
+``LearningPath`` de un curso con un cursor del servidor (``yield_per``) y
+escribe cada bloque de filas en CSV, JSONL o Parquet a medida que llega, de
+modo que la memoria usada no depende del tamaño del curso. Lo usan la ruta
+``/teacher/course/<id>/export`` y el comando ``flask export-course``.
+"""
+
+from datetime import date, datetime
+from enum import Enum
+import csv
+import io
+import json
+from app import db
+from app.models import CompetencyMastery, DiagnosticExam, ExamResponse, LearningPath, Progress
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Conjuntos de datos exportables: nombre -> modelo
+EXPORT_DATASETS = {
+    'progress': Progress,
+    'exam_responses': ExamResponse,
+    'competency_mastery': CompetencyMastery,
+    'learning_paths': LearningPath
+}
+
+# Formatos: nombre -> (tipo MIME, extensión)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+# Valor de ``dataset`` para exportar todos los conjuntos en un solo JSONL
+ALL_DATASETS = 'all'
+
+class ExportError(ValueError):
+    """Formato o conjunto de datos no disponible"""
+
+def _plain(value):
+    """Valor serializable en texto (enumeraciones por su valor, fechas en ISO 8601)"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+class _ChunkSink:
+    """Archivo en memoria que entrega y descarta lo escrito en cada bloque"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class CourseExporter:
+    """Exportador en streaming de los datos de un curso"""
+
+    def __init__(self, course_id, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            course_id (int): ID del curso
+            chunk_size (int): Filas leídas del cursor y escritas por bloque
+        """
+        self.course_id = course_id
+        self.chunk_size = max(1, int(chunk_size))
+
+    @staticmethod
+    def columns(dataset):
+        """Columnas exportadas de un conjunto de datos (todas las de su tabla)"""
+        return list(EXPORT_DATASETS[dataset].__table__.columns)
+
+    def _statement(self, dataset):
+        model = EXPORT_DATASETS[dataset]
+        stmt = db.select(*self.columns(dataset))
+        if model is ExamResponse:
+            # Las respuestas pertenecen al curso a través de su examen
+            stmt = stmt.join(DiagnosticExam, DiagnosticExam.id == ExamResponse.exam_id) \
+                .where(DiagnosticExam.course_id == self.course_id)
+        else:
+            stmt = stmt.where(model.course_id == self.course_id)
+        return stmt.order_by(model.id).execution_options(yield_per=self.chunk_size)
+
+    def iter_chunks(self, dataset):
+        """
+        Recorrer las filas de un conjunto de datos por bloques
+
+        Args:
+            dataset (str): Nombre en EXPORT_DATASETS
+
+        Yields:
+            list: Tuplas de valores en el orden de ``columns(dataset)``
+        """
+        result = db.session.execute(self._statement(dataset))
+        try:
+            for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+        finally:
+            result.close()
+
+    def stream(self, dataset, format):
+        """
+        Generador con el archivo exportado, bloque a bloque
+
+        Valida los argumentos antes de devolver el generador, para que los
+        errores puedan responderse antes de empezar a enviar el archivo.
+
+        Args:
+            dataset (str): Nombre en EXPORT_DATASETS ('all' solo en JSONL)
+            format (str): 'csv', 'jsonl' o 'parquet'
+
+        Returns:
+            generator: Bloques de texto (CSV y JSONL) o bytes (Parquet)
+
+        Raises:
+            ExportError: Si el formato o el conjunto de datos no existen, o si
+                falta pyarrow para exportar en Parquet
+        """
+        if format not in EXPORT_FORMATS:
+            raise ExportError(f"Formato no soportado: {format} (disponibles: {', '.join(EXPORT_FORMATS)})")
+
+        if format == 'jsonl' and dataset == ALL_DATASETS:
+            return self._stream_jsonl(list(EXPORT_DATASETS), tagged=True)
+        if dataset not in EXPORT_DATASETS:
+            raise ExportError(f"Conjunto de datos desconocido: {dataset} (disponibles: {', '.join(EXPORT_DATASETS)})")
+
+        if format == 'csv':
+            return self._stream_csv(dataset)
+        if format == 'jsonl':
+            return self._stream_jsonl([dataset])
+        return self._stream_parquet(dataset, self._parquet_schema(dataset))
+
+    def _stream_csv(self, dataset):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([column.name for column in self.columns(dataset)])
+        for rows in self.iter_chunks(dataset):
+            writer.writerows([_plain(value) for value in row] for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            # Curso sin filas: solo la cabecera
+            yield buffer.getvalue()
+
+    def _stream_jsonl(self, datasets, tagged=False):
+        for dataset in datasets:
+            names = [column.name for column in self.columns(dataset)]
+            if tagged:
+                names.insert(0, 'dataset')
+            for rows in self.iter_chunks(dataset):
+                lines = []
+                for row in rows:
+                    values = [_plain(value) for value in row]
+                    if tagged:
+                        values.insert(0, dataset)
+                    lines.append(json.dumps(dict(zip(names, values)), ensure_ascii=False))
+                yield '\n'.join(lines) + '\n'
+
+    def _parquet_schema(self, dataset):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ExportError('La exportación a Parquet requiere pyarrow (pip install pyarrow)')
+
+        fields = []
+        for column in self.columns(dataset):
+            if isinstance(column.type, db.Boolean):
+                arrow_type = pa.bool_()
+            elif isinstance(column.type, db.Integer):
+                arrow_type = pa.int64()
+            elif isinstance(column.type, db.Float):
+                arrow_type = pa.float64()
+            elif isinstance(column.type, db.DateTime):
+                arrow_type = pa.timestamp('us')
+            else:
+                # Textos y enumeraciones
+                arrow_type = pa.string()
+            fields.append(pa.field(column.name, arrow_type))
+        return pa.schema(fields)
+
+    def _stream_parquet(self, dataset, schema):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        text_columns = {index for index, field in enumerate(schema) if pa.types.is_string(field.type)}
+        sink = _ChunkSink()
+        with pq.ParquetWriter(sink, schema) as writer:
+            for rows in self.iter_chunks(dataset):
+                # Un grupo de filas por bloque leído
+                arrays = [
+                    pa.array([_plain(value) for value in values] if index in text_columns else values,
+                             type=field.type)
+                    for index, (field, values) in enumerate(zip(schema, zip(*rows)))
+                ]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                data = sink.drain()
+                if data:
+                    yield data
+        data = sink.drain()
+        if data:
+            yield data
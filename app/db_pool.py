@@ -0,0 +1,215 @@
+"""
+Perfiles del pool de conexiones y telemetría del pool
+
+``DB_POOL_PROFILE`` elige en ``DB_POOL_PROFILES`` (config.py) el tamaño del
+pool, el desbordamiento, el tiempo máximo de espera, el reciclaje y el
+pre-ping de cada despliegue; las variables ``DB_POOL_SIZE``,
+``DB_MAX_OVERFLOW``, ``DB_POOL_TIMEOUT``, ``DB_POOL_RECYCLE`` y
+``DB_POOL_PRE_PING`` sobrescriben valores sueltos. El pool registra las
+conexiones entregadas, la espera para obtenerlas, el desbordamiento, los
+tiempos agotados y las invalidaciones (conexiones caídas detectadas por el
+pre-ping), y los publica en /api/metrics como ``sti_db_pool_*``.
+"""
+
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Variable de configuración -> (argumento de create_engine, conversión)
+POOL_OVERRIDES = {
+    'DB_POOL_SIZE': ('pool_size', int),
+    'DB_MAX_OVERFLOW': ('max_overflow', int),
+    'DB_POOL_TIMEOUT': ('pool_timeout', int),  # SQLAlchemy lo trunca a segundos enteros
+    'DB_POOL_RECYCLE': ('pool_recycle', int),
+    'DB_POOL_PRE_PING': ('pool_pre_ping', lambda value: str(value).lower() in ('1', 'true', 'yes', 'si', 'sí'))
+}
+
+# Argumentos que solo acepta un pool con cola
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+# Contadores acumulados de la telemetría
+POOL_COUNTERS = ('checkouts', 'checkins', 'connects', 'invalidations', 'soft_invalidations', 'timeouts')
+
+class PoolTelemetry:
+    """Contadores y esperas del pool de conexiones"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(POOL_COUNTERS, 0)
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.overflow_max = 0
+
+    def inc(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def record_wait(self, seconds, overflow=0, timed_out=False):
+        """Registrar la espera de una petición de conexión (lograda o agotada)"""
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.overflow_max = max(self.overflow_max, overflow)
+            if timed_out:
+                self.counters['timeouts'] += 1
+
+    def stats(self, pool=None):
+        """
+        Estadísticas acumuladas y, si se indica el pool, su estado actual
+
+        Returns:
+            dict: Contadores, esperas y ocupación del pool
+        """
+        with self._lock:
+            stats = dict(self.counters)
+            stats.update({
+                'wait_count': self.wait_count,
+                'wait_seconds_total': round(self.wait_total, 6),
+                'wait_seconds_max': round(self.wait_max, 6),
+                'overflow_max': self.overflow_max
+            })
+
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0)
+            })
+        return stats
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide la espera para obtener una conexión"""
+
+    telemetry = None
+
+    # QueuePool._do_get se llama a sí mismo si pierde una carrera: medir solo la llamada externa
+    _measuring = threading.local()
+
+    def _do_get(self):
+        if self.telemetry is None or getattr(self._measuring, 'active', False):
+            return super()._do_get()
+
+        self._measuring.active = True
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.telemetry.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        finally:
+            self._measuring.active = False
+        self.telemetry.record_wait(time.perf_counter() - start, overflow=max(self.overflow(), 0))
+        return connection
+
+    def recreate(self):
+        # dispose() y las invalidaciones masivas crean un pool nuevo: conservar la telemetría
+        pool = super().recreate()
+        pool.telemetry = self.telemetry
+        return pool
+
+def build_engine_options(config):
+    """
+    Argumentos de create_engine para la configuración de la aplicación
+
+    Combina, en este orden, el perfil ``DB_POOL_PROFILE``, las variables
+    ``DB_POOL_*`` definidas y ``SQLALCHEMY_ENGINE_OPTIONS``.
+
+    Args:
+        config (dict): Configuración de la aplicación
+
+    Returns:
+        dict: Opciones para SQLALCHEMY_ENGINE_OPTIONS
+
+    Raises:
+        ValueError: Si el perfil no existe en DB_POOL_PROFILES
+    """
+    profiles = config.get('DB_POOL_PROFILES') or {}
+    profile = config.get('DB_POOL_PROFILE') or 'default'
+    if profile not in profiles:
+        raise ValueError(f"Perfil de pool desconocido: {profile} (disponibles: {', '.join(profiles)})")
+
+    options = dict(profiles[profile])
+    for key, (option, convert) in POOL_OVERRIDES.items():
+        value = config.get(key)
+        if value is not None and value != '':
+            options[option] = convert(value)
+
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # SQLite en memoria comparte una única conexión (StaticPool): sin tamaño ni cola
+        for option in QUEUE_POOL_OPTIONS:
+            options.pop(option, None)
+    else:
+        options['poolclass'] = InstrumentedQueuePool
+
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+def configure_engine_options(app):
+    """Aplicar el perfil del pool a SQLALCHEMY_ENGINE_OPTIONS (antes de db.init_app)"""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config)
+
+def init_pool_monitor(app):
+    """
+    Registrar los eventos del pool del engine principal y su colector de métricas
+
+    Returns:
+        PoolTelemetry: Telemetría del pool
+    """
+    from app import db
+    from app.metrics import get_metrics_registry
+
+    with app.app_context():
+        engine = db.engine
+
+    telemetry = PoolTelemetry()
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.telemetry = telemetry
+
+    # Los eventos del engine se conservan cuando el pool se recrea
+    event.listen(engine, 'checkout', lambda *args: telemetry.inc('checkouts'))
+    event.listen(engine, 'checkin', lambda *args: telemetry.inc('checkins'))
+    event.listen(engine, 'connect', lambda *args: telemetry.inc('connects'))
+    event.listen(engine, 'invalidate', lambda *args: telemetry.inc('invalidations'))
+    event.listen(engine, 'soft_invalidate', lambda *args: telemetry.inc('soft_invalidations'))
+
+    def pool_collector():
+        stats = telemetry.stats(engine.pool)
+        labels = {'profile': app.config.get('DB_POOL_PROFILE') or 'default'}
+        metrics = [
+            (f'sti_db_pool_{counter}_total', 'counter', f'Total de {counter} del pool de conexiones',
+             [(labels, stats[counter])])
+            for counter in POOL_COUNTERS
+        ]
+        metrics.append(('sti_db_pool_wait_seconds', 'summary', 'Espera para obtener una conexión del pool',
+                        [(labels, (stats['wait_count'], stats['wait_seconds_total']))]))
+        metrics.append(('sti_db_pool_wait_seconds_max', 'gauge', 'Mayor espera para obtener una conexión',
+                        [(labels, stats['wait_seconds_max'])]))
+        metrics.append(('sti_db_pool_overflow_max', 'gauge', 'Mayor desbordamiento observado del pool',
+                        [(labels, stats['overflow_max'])]))
+        for gauge in ('size', 'checked_out', 'idle', 'overflow'):
+            if gauge in stats:
+                metrics.append((f'sti_db_pool_{gauge}', 'gauge', f'Conexiones del pool ({gauge})',
+                                [(labels, stats[gauge])]))
+        return metrics
+
+    get_metrics_registry(app).register_collector(pool_collector)
+    app.extensions['db_pool'] = telemetry
+    return telemetry
+
+def get_pool_stats(app=None):
+    """Estadísticas actuales del pool del engine principal"""
+    from app import db
+
+    app = app or current_app._get_current_object()
+    telemetry = app.extensions.get('db_pool')
+    if telemetry is None:
+        return {}
+    with app.app_context():
+        return telemetry.stats(db.engine.pool)
@@ -20,57 +20,115 @@ VARK_RESOURCES = COURSE_RESOURCES
 # Carpeta de rutas de aprendizaje
 LEARNING_PATHS_FOLDER = "https://drive.google.com/drive/folders/1650yAVCLmN7zDJTITp_kZRD2n63Q4k1p?usp=drive_link"
 
+# Carpeta con las unidades de Matemática Básica 1
+MATH_UNITS_FOLDER = "https://drive.google.com/drive/folders/1ls2_3KTMXf31Kj2rYrFRHu-eAasHqnZx?usp=drive_link"
+
+# Carpeta por defecto cuando un curso o unidad no tiene enlace propio
+MATH_DRIVE_FOLDER = MAIN_DRIVE_FOLDER
+
+# Curso que se muestra cuando un curso de la base de datos no tiene materiales configurados
+DEFAULT_MATERIALS_COURSE = 'matematicas_basicas'
+
 # Configuración detallada de cada curso (Profesor: Herbert Galeano)
+# Es la fuente de app/materials_catalog.py, que la recarga al modificar este archivo
 LEARNING_MATERIALS = {
     'matematicas_basicas': {
-        'name': 'Matemáticas Básicas',
-        'code': 'MATH101',
+        'name': 'Matemática Básica 1',
+        'code': 'MATH-BAS-1',
+        'aliases': ['MATH101'],
+        'teacher': 'Herbert Galeano',
+        'description': 'Curso introductorio de matemáticas que cubre conceptos fundamentales de álgebra, geometría y aritmética. Recursos VARK incluidos.',
         'icon': 'fa-calculator',
         'color': '#3b82f6',
+        'vark_resources': True,
         'drive_folder': COURSE_RESOURCES['matematicas_basicas'],
+        'units_folder': MATH_UNITS_FOLDER,
         'units': {
             'unidad_1': {
                 'name': 'Unidad 1 - Números Naturales',
-                'url': COURSE_RESOURCES['matematicas_basicas'],
-                'description': 'Números naturales, operaciones básicas, propiedades'
+                'url': MATH_UNITS_FOLDER,
+                'description': 'Números naturales, operaciones básicas, propiedades fundamentales',
+                'files': 7
             },
             'unidad_2': {
                 'name': 'Unidad 2 - Números Enteros',
-                'url': COURSE_RESOURCES['matematicas_basicas'],
-                'description': 'Números enteros, operaciones con enteros, recta numérica'
+                'url': MATH_UNITS_FOLDER,
+                'description': 'Números enteros, operaciones con enteros, recta numérica',
+                'files': 7
             },
             'unidad_3': {
                 'name': 'Unidad 3 - Fracciones',
-                'url': COURSE_RESOURCES['matematicas_basicas'],
-                'description': 'Fracciones, operaciones con fracciones, simplificación'
+                'url': MATH_UNITS_FOLDER,
+                'description': 'Fracciones, operaciones, simplificación, fracciones equivalentes',
+                'files': 7
             },
             'unidad_4': {
                 'name': 'Unidad 4 - Números Decimales',
-                'url': COURSE_RESOURCES['matematicas_basicas'],
-                'description': 'Decimales, conversiones, operaciones con decimales'
+                'url': MATH_UNITS_FOLDER,
+                'description': 'Decimales, conversiones, operaciones con números decimales',
+                'files': 7
             },
             'unidad_5': {
                 'name': 'Unidad 5 - Porcentajes',
-                'url': COURSE_RESOURCES['matematicas_basicas'],
-                'description': 'Porcentajes, regla de tres, aplicaciones'
+                'url': MATH_UNITS_FOLDER,
+                'description': 'Porcentajes, regla de tres, aplicaciones prácticas',
+                'files': 7
             },
             'unidad_6': {
                 'name': 'Unidad 6 - Ecuaciones Lineales',
-                'url': COURSE_RESOURCES['matematicas_basicas'],
-                'description': 'Ecuaciones de primer grado, despeje de variables'
+                'url': MATH_UNITS_FOLDER,
+                'description': 'Ecuaciones de primer grado, sistemas de ecuaciones, problemas',
+                'files': 7
             },
             'unidad_7': {
                 'name': 'Unidad 7 - Geometría Básica',
-                'url': COURSE_RESOURCES['matematicas_basicas'],
-                'description': 'Figuras geométricas, perímetro, área, volumen'
+                'url': MATH_UNITS_FOLDER,
+                'description': 'Figuras geométricas, perímetro, área, volumen',
+                'files': 7
             }
         }
     },
+    'quimica_general': {
+        'name': 'Química General 1',
+        'code': 'QUIM-GEN-1',
+        'teacher': 'Herbert Galeano',
+        'description': 'Fundamentos de química: estructura atómica, tabla periódica, enlaces químicos y reacciones químicas.',
+        'icon': 'fa-flask',
+        'color': '#10b981',
+        'vark_resources': False,
+        'drive_folder': MAIN_DRIVE_FOLDER,
+        'units': {}
+    },
+    'tecnica_complementaria': {
+        'name': 'Técnica Complementaria 1',
+        'code': 'TEC-COMP-1',
+        'teacher': 'Herbert Galeano',
+        'description': 'Desarrollo de habilidades técnicas y prácticas. Recursos VARK adaptados a tu estilo de aprendizaje.',
+        'icon': 'fa-cogs',
+        'color': '#f59e0b',
+        'vark_resources': True,
+        'drive_folder': MAIN_DRIVE_FOLDER,
+        'units': {}
+    },
+    'social_humanistica': {
+        'name': 'Social Humanística 1',
+        'code': 'SOC-HUM-1',
+        'teacher': 'Herbert Galeano',
+        'description': 'Ciencias sociales y humanidades. Estudio de sociedades, cultura e historia. Recursos VARK adaptados.',
+        'icon': 'fa-users',
+        'color': '#8b5cf6',
+        'vark_resources': True,
+        'drive_folder': MAIN_DRIVE_FOLDER,
+        'units': {}
+    },
     'algebra_elemental': {
         'name': 'Álgebra Elemental',
         'code': 'ALGE101',
+        'teacher': 'Herbert Galeano',
+        'description': 'Ecuaciones, sistemas de ecuaciones y representación gráfica de funciones lineales.',
         'icon': 'fa-square-root-alt',
-        'color': '#10b981',
+        'color': '#ef4444',
+        'vark_resources': True,
         'drive_folder': COURSE_RESOURCES['algebra_elemental'],
         'units': {
             'unidad_1': {
@@ -88,8 +146,11 @@ LEARNING_MATERIALS = {
     'estadistica_descriptiva': {
         'name': 'Estadística Descriptiva',
         'code': 'STAT101',
+        'teacher': 'Herbert Galeano',
+        'description': 'Recolección y organización de datos, gráficos estadísticos y medidas de tendencia central.',
         'icon': 'fa-chart-bar',
-        'color': '#f59e0b',
+        'color': '#06b6d4',
+        'vark_resources': True,
         'drive_folder': COURSE_RESOURCES['estadistica_descriptiva'],
         'units': {
             'unidad_1': {
@@ -116,45 +177,26 @@ def get_course_materials(course_name_or_id):
     Obtener los materiales de un curso
     
     Args:
-        course_name_or_id: Nombre o ID del curso
+        course_name_or_id: Nombre, código o clave del curso
         
     Returns:
         dict: Diccionario con las unidades y sus enlaces
     """
-    # Normalizar nombre del curso
-    course_key = course_name_or_id.lower().replace(' ', '_').replace('á', 'a').replace('é', 'e')
-    
-    # Buscar en el diccionario
-    for key, course_data in LEARNING_MATERIALS.items():
-        if key in course_key or course_key in key:
-            return course_data
-    
-    # Si es Matemática Básica, retornar por defecto
-    if 'matematica' in course_key or 'math' in course_key:
-        return LEARNING_MATERIALS['matematica_basica_1']
-    
-    return None
+    from app.materials_catalog import get_materials_catalog
+    course = get_materials_catalog().snapshot().find(course_name_or_id)
+    return LEARNING_MATERIALS[course.key] if course else None
 
 def get_unit_url(course_name_or_id, unit_number):
     """
     Obtener URL de una unidad específica
     
     Args:
-        course_name_or_id: Nombre o ID del curso
+        course_name_or_id: Nombre, código o clave del curso
         unit_number: Número de unidad (1-7)
         
     Returns:
-        str: URL de la unidad o None
+        str: URL de la unidad o la carpeta principal
     """
-    materials = get_course_materials(course_name_or_id)
-    
-    if not materials:
-        return MATH_DRIVE_FOLDER  # Por defecto, carpeta principal
-    
-    unit_key = f'unidad_{unit_number}'
-    
-    if unit_key in materials['units']:
-        return materials['units'][unit_key]['url']
-    
-    return MATH_DRIVE_FOLDER  # Por defecto, carpeta principal
-
+    from app.materials_catalog import get_materials_catalog
+    unit = get_materials_catalog().snapshot().get_unit(course_name_or_id, unit_number)
+    return unit.url if unit else MATH_DRIVE_FOLDER
@@ -0,0 +1,291 @@
+"""
+Catálogo de materiales de los cursos (enlaces de Google Drive)
+
+Lee ``LEARNING_MATERIALS`` de ``app/drive_config.py`` una sola vez y lo
+convierte en registros inmutables con índices ya construidos por clave,
+código (y alias), unidad y palabra clave, además de las URLs y etiquetas que
+muestran las plantillas. Así ``all_courses`` y ``course_units`` se resuelven
+con búsquedas en diccionarios. Si el archivo de configuración cambia (según
+su fecha de modificación, revisada como mucho cada
+``MATERIALS_RELOAD_INTERVAL`` segundos) el módulo se recarga y el catálogo
+se reconstruye sin reiniciar el servidor.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+import importlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from flask import current_app, has_app_context
+
+DEFAULT_RELOAD_INTERVAL = 2.0
+
+# Módulo con la configuración de materiales
+DEFAULT_CONFIG_MODULE = 'app.drive_config'
+
+# Colores de las tarjetas de unidad, en orden
+UNIT_COLORS = ('#0d6efd', '#198754', '#0dcaf0', '#ffc107', '#dc3545', '#8b5cf6', '#06b6d4')
+
+# Palabras ignoradas en el índice por palabra clave
+_STOPWORDS = frozenset({'con', 'del', 'las', 'los', 'por', 'para', 'una', 'unidad'})
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+MaterialUnit = namedtuple('MaterialUnit', [
+    'id', 'number', 'name', 'title', 'description', 'url', 'files', 'color'
+])
+
+MaterialCourse = namedtuple('MaterialCourse', [
+    'key', 'code', 'name', 'teacher', 'description', 'icon', 'color', 'drive_folder',
+    'units_folder', 'units', 'resources_label', 'units_label'
+])
+
+@lru_cache(maxsize=4096)
+def _normalize_cached(text):
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _NON_WORD.sub('_', text.casefold()).strip('_')
+
+def normalize_key(text):
+    """Normalizar un texto para buscarlo (minúsculas, sin tildes, palabras unidas con '_')"""
+    # Los códigos y nombres buscados se repiten mucho: se memoriza la normalización
+    return _normalize_cached(str(text or ''))
+
+def _keywords(*texts):
+    """Palabras clave de varios textos"""
+    words = set()
+    for text in texts:
+        words.update(word for word in normalize_key(text).split('_') if len(word) >= 3)
+    return words - _STOPWORDS
+
+class MaterialsSnapshot:
+    """Instantánea inmutable del catálogo con sus índices"""
+
+    __slots__ = ('courses', 'by_key', 'by_code', 'by_unit', 'by_keyword', 'default_course', 'main_folder')
+
+    def __init__(self, materials, main_folder=None, default_key=None):
+        """
+        Args:
+            materials (dict): Clave del curso -> configuración (formato de LEARNING_MATERIALS)
+            main_folder (str): Carpeta principal de Drive, usada cuando falta un enlace
+            default_key (str): Curso a mostrar para cursos sin materiales configurados
+        """
+        self.main_folder = main_folder
+        courses = []
+        by_code = {}
+        by_unit = {}
+        by_keyword = {}
+
+        for key, data in materials.items():
+            drive_folder = data.get('drive_folder') or main_folder
+            units_folder = data.get('units_folder') or drive_folder
+
+            units = []
+            for unit_id, unit in data.get('units', {}).items():
+                number = int(unit_id.rsplit('_', 1)[-1]) if unit_id.rsplit('_', 1)[-1].isdigit() else len(units) + 1
+                name = unit.get('name', unit_id)
+                units.append(MaterialUnit(
+                    unit_id, number, name, name.split(' - ', 1)[-1], unit.get('description', ''),
+                    unit.get('url') or units_folder, unit.get('files'), UNIT_COLORS[len(units) % len(UNIT_COLORS)]
+                ))
+
+            course = MaterialCourse(
+                key, data.get('code', key), data.get('name', key), data.get('teacher'),
+                data.get('description', ''), data.get('icon', 'fa-book'), data.get('color', UNIT_COLORS[0]),
+                drive_folder, units_folder, tuple(units),
+                'Ver Recursos VARK' if data.get('vark_resources') else 'Ver Recursos',
+                f'Ver {len(units)} Unidades' if units else None
+            )
+            courses.append(course)
+
+            for code in [course.code, key, course.name] + list(data.get('aliases', [])):
+                by_code.setdefault(code, course)
+                by_code.setdefault(normalize_key(code), course)
+            for unit in course.units:
+                by_unit[(key, unit.id)] = unit
+                by_unit[(key, unit.number)] = unit
+            for word in _keywords(course.name, course.code, course.description,
+                                  *(f'{unit.name} {unit.description}' for unit in course.units)):
+                by_keyword.setdefault(word, []).append(course)
+
+        self.courses = tuple(courses)
+        self.by_key = {course.key: course for course in self.courses}
+        self.by_code = by_code
+        self.by_unit = by_unit
+        self.by_keyword = {word: tuple(matches) for word, matches in by_keyword.items()}
+        self.default_course = self.by_key.get(default_key)
+
+    def get(self, key):
+        """Curso por su clave en LEARNING_MATERIALS"""
+        return self.by_key.get(key)
+
+    def find(self, query):
+        """
+        Buscar un curso por clave, código, alias o nombre
+
+        Args:
+            query (str): Clave, código o nombre (se ignoran mayúsculas y tildes)
+
+        Returns:
+            MaterialCourse: Curso encontrado o None
+        """
+        # Camino rápido: clave, código, alias o nombre exactos
+        course = self.by_code.get(query)
+        if course is not None:
+            return course
+
+        normalized = normalize_key(query)
+        if not normalized:
+            return None
+
+        course = self.by_code.get(normalized)
+        if course is not None:
+            return course
+
+        # Nombre parecido a la clave (p. ej. 'Matemáticas Básicas' -> matematicas_basicas)
+        for key, course in self.by_key.items():
+            if key in normalized or normalized in key:
+                return course
+        return None
+
+    def for_course(self, course):
+        """
+        Materiales de un curso de la base de datos
+
+        Busca por código y luego por nombre; si no hay coincidencia devuelve el
+        curso por defecto (DEFAULT_MATERIALS_COURSE).
+
+        Returns:
+            MaterialCourse: Materiales a mostrar, o None si no hay curso por defecto
+        """
+        return self.find(course.code) or self.find(course.name) or self.default_course
+
+    def get_unit(self, query, unit):
+        """
+        Unidad de un curso
+
+        Args:
+            query (str): Clave, código o nombre del curso
+            unit: Número de unidad (1, 2...) o su ID ('unidad_1')
+
+        Returns:
+            MaterialUnit: Unidad encontrada o None
+        """
+        course = self.find(query)
+        if course is None:
+            return None
+        return self.by_unit.get((course.key, int(unit) if str(unit).isdigit() else unit))
+
+    def search(self, keyword):
+        """Cursos cuyo nombre, descripción o unidades contienen la palabra clave"""
+        return self.by_keyword.get(normalize_key(keyword), ())
+
+class MaterialsCatalog:
+    """Catálogo de materiales con recarga al cambiar el archivo de configuración"""
+
+    def __init__(self, module_name=DEFAULT_CONFIG_MODULE, reload_interval=DEFAULT_RELOAD_INTERVAL):
+        """
+        Args:
+            module_name (str): Módulo con LEARNING_MATERIALS
+            reload_interval (float): Segundos entre revisiones de la fecha de
+                modificación; 0 para no recargar nunca
+        """
+        self.module_name = module_name
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._module = importlib.import_module(module_name)
+        self._mtime = self._current_mtime()
+        self._checked_at = time.monotonic()
+        self._snapshot = self._build()
+
+    def snapshot(self):
+        """
+        Instantánea vigente del catálogo
+
+        Returns:
+            MaterialsSnapshot: Cursos e índices
+        """
+        if self.reload_interval and time.monotonic() - self._checked_at >= self.reload_interval:
+            self._check_reload()
+        return self._snapshot
+
+    def on_reload(self, listener):
+        """Registrar una función a llamar (sin argumentos) tras cada recarga"""
+        self._listeners.append(listener)
+
+    def reload(self):
+        """Recargar la configuración y reconstruir el catálogo"""
+        with self._lock:
+            self._reload()
+
+    def _check_reload(self):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            mtime = self._current_mtime()
+            if mtime == self._mtime:
+                return
+            # Se recuerda aunque la recarga falle para no reintentar hasta el próximo cambio
+            self._mtime = mtime
+            self._reload()
+
+    def _reload(self):
+        try:
+            self._module = importlib.reload(self._module)
+            self._snapshot = self._build()
+            self.reloads += 1
+        except Exception as e:
+            print(f"Error recargando el catálogo de materiales: {e}")
+            return
+
+        for listener in self._listeners:
+            listener()
+
+    def _build(self):
+        return MaterialsSnapshot(
+            self._module.LEARNING_MATERIALS,
+            main_folder=getattr(self._module, 'MAIN_DRIVE_FOLDER', None),
+            default_key=getattr(self._module, 'DEFAULT_MATERIALS_COURSE', None)
+        )
+
+    def _current_mtime(self):
+        try:
+            return os.path.getmtime(self._module.__file__)
+        except (OSError, TypeError):
+            return None
+
+# Catálogo usado fuera de un contexto de aplicación
+_default_catalog = None
+_default_lock = threading.Lock()
+
+def get_materials_catalog(app=None):
+    """
+    Obtener el catálogo de materiales, creándolo si no existe
+
+    Dentro de una aplicación se guarda en sus extensiones y, al recargarse,
+    invalida las páginas cacheadas que lo muestran.
+
+    Returns:
+        MaterialsCatalog: Catálogo compartido
+    """
+    global _default_catalog
+
+    if app is None and not has_app_context():
+        with _default_lock:
+            if _default_catalog is None:
+                _default_catalog = MaterialsCatalog()
+            return _default_catalog
+
+    app = app or current_app._get_current_object()
+    catalog = app.extensions.get('materials_catalog')
+    if catalog is None:
+        catalog = MaterialsCatalog(
+            reload_interval=app.config.get('MATERIALS_RELOAD_INTERVAL', DEFAULT_RELOAD_INTERVAL)
+        )
+        from app.response_cache import MATERIALS_SCOPE, invalidate_responses
+        catalog.on_reload(lambda: invalidate_responses({MATERIALS_SCOPE}))
+        catalog = app.extensions.setdefault('materials_catalog', catalog)
+    return catalog
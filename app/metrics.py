@@ -0,0 +1,171 @@
+"""
+Registro de métricas del proceso en formato de texto de Prometheus
+"""
+
+from flask import current_app
+import threading
+
+# Extensiones con caché (TTLCache) cuyas estadísticas se publican como métricas
+CACHE_EXTENSIONS = {
+    'resource_catalog': 'resource_catalog',
+    'competency_graphs': 'competency_graph',
+    'student_dashboards': 'student_dashboard',
+    'performance_trends': 'performance_trends',
+    'response_cache': 'response'
+}
+
+# Estadísticas de TTLCache que son contadores acumulados
+CACHE_COUNTERS = ('hits', 'misses', 'evictions', 'expirations', 'invalidations', 'not_modified', 'bypasses')
+
+class MetricsRegistry:
+    """
+    Registro de contadores, indicadores (gauges) y resúmenes con etiquetas
+
+    Además de los valores registrados, al renderizar se consultan los
+    colectores: funciones que devuelven métricas calculadas en ese momento.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def describe(self, name, metric_type, help_text):
+        """Declarar una métrica con su tipo ('counter', 'gauge' o 'summary') y descripción"""
+        with self._lock:
+            self._metrics.setdefault(name, {'type': metric_type, 'help': help_text, 'samples': {}})
+
+    def inc(self, name, value=1, **labels):
+        """Incrementar un contador"""
+        with self._lock:
+            samples = self._samples(name, 'counter')
+            key = _label_key(labels)
+            samples[key] = samples.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Fijar el valor de un indicador"""
+        with self._lock:
+            self._samples(name, 'gauge')[_label_key(labels)] = value
+
+    def set_max(self, name, value, **labels):
+        """Fijar un indicador solo si el nuevo valor supera al actual"""
+        with self._lock:
+            samples = self._samples(name, 'gauge')
+            key = _label_key(labels)
+            if value > samples.get(key, float('-inf')):
+                samples[key] = value
+
+    def observe(self, name, value, **labels):
+        """Registrar una observación en un resumen (cuenta y suma)"""
+        with self._lock:
+            samples = self._samples(name, 'summary')
+            key = _label_key(labels)
+            count, total = samples.get(key, (0, 0.0))
+            samples[key] = (count + 1, total + value)
+
+    def register_collector(self, collector):
+        """
+        Registrar un colector
+
+        Args:
+            collector (callable): Función sin argumentos que devuelve una lista
+                de tuplas ``(nombre, tipo, descripción, [(etiquetas, valor), ...])``
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def snapshot(self):
+        """Copia de las métricas registradas y de las de los colectores"""
+        with self._lock:
+            metrics = {
+                name: {'type': metric['type'], 'help': metric['help'], 'samples': dict(metric['samples'])}
+                for name, metric in self._metrics.items()
+            }
+            collectors = list(self._collectors)
+
+        for collector in collectors:
+            try:
+                for name, metric_type, help_text, samples in collector():
+                    metric = metrics.setdefault(name, {'type': metric_type, 'help': help_text, 'samples': {}})
+                    for labels, value in samples:
+                        metric['samples'][_label_key(labels)] = value
+            except Exception as e:
+                print(f"Error en colector de métricas: {e}")
+
+        return metrics
+
+    def render_prometheus(self):
+        """
+        Renderizar todas las métricas en formato de texto de Prometheus
+
+        Returns:
+            str: Exposición en formato text/plain; version=0.0.4
+        """
+        lines = []
+        for name, metric in sorted(self.snapshot().items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for key, value in sorted(metric['samples'].items()):
+                labels = _format_labels(key)
+                if metric['type'] == 'summary':
+                    count, total = value
+                    lines.append(f'{name}_count{labels} {count}')
+                    lines.append(f'{name}_sum{labels} {_format_value(total)}')
+                else:
+                    lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _samples(self, name, metric_type):
+        metric = self._metrics.setdefault(name, {'type': metric_type, 'help': name, 'samples': {}})
+        return metric['samples']
+
+def init_metrics(app):
+    """Crear el registro de métricas de la aplicación y sus colectores base"""
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+
+    def cache_collector():
+        samples = {}
+        for extension, cache_name in CACHE_EXTENSIONS.items():
+            cache = app.extensions.get(extension)
+            if cache is None:
+                continue
+            for stat, value in cache.stats().items():
+                samples.setdefault(stat, []).append(({'cache': cache_name}, value))
+
+        metrics = []
+        for stat, values in samples.items():
+            if stat in CACHE_COUNTERS:
+                metrics.append((f'sti_cache_{stat}_total', 'counter', f'Total de {stat} de las cachés en memoria', values))
+            else:
+                metrics.append((f'sti_cache_{stat}', 'gauge', f'Valor de {stat} de las cachés en memoria', values))
+        return metrics
+
+    registry.register_collector(cache_collector)
+    return registry
+
+def get_metrics_registry(app=None):
+    """Obtener el registro de métricas de la aplicación"""
+    app = app or current_app._get_current_object()
+    registry = app.extensions.get('metrics')
+    if registry is None:
+        registry = init_metrics(app)
+    return registry
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(key):
+    if not key:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in key) + '}'
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
@@ -8,7 +8,7 @@ from .course import Course, CourseEnrollment
 from .assessment import Question, DiagnosticExam, ExamResponse, VARKQuestion, VARKResponse
 from .learning import LearningPath, LearningPathStep, Resource, ResourceType
 from .progress import Progress, Competency, CompetencyMastery
-from .ai import AIModel, LearningRecommendation
+from .ai import AIModel, LearningRecommendation, LearningAnalytics, CourseAnalyticsSnapshot, CourseActivityCounter
 
 __all__ = [
     'User', 'Student', 'Teacher',
@@ -16,5 +16,6 @@ __all__ = [
     'Question', 'DiagnosticExam', 'ExamResponse', 'VARKQuestion', 'VARKResponse',
     'LearningPath', 'LearningPathStep', 'Resource', 'ResourceType',
     'Progress', 'Competency', 'CompetencyMastery',
-    'AIModel', 'LearningRecommendation'
+    'AIModel', 'LearningRecommendation', 'LearningAnalytics', 'CourseAnalyticsSnapshot',
+    'CourseActivityCounter'
 ]
@@ -6,6 +6,7 @@ from datetime import datetime
 import enum
 import json
 from app import db
+from app.unit_of_work import autocommit
 
 class AIModelType(enum.Enum):
     """Tipos de modelos de IA"""
@@ -49,7 +50,7 @@ class AIModel(db.Model):
     def __repr__(self):
         return f'<AIModel {self.name} v{self.version}>'
     
-    def update_metrics(self, accuracy, precision, recall, f1_score):
+    def update_metrics(self, accuracy, precision, recall, f1_score, commit=None):
         """Actualizar métricas del modelo"""
         self.accuracy = accuracy
         self.precision = precision
@@ -57,7 +58,7 @@ class AIModel(db.Model):
         self.f1_score = f1_score
         self.trained_at = datetime.utcnow()
         self.is_trained = True
-        db.session.commit()
+        autocommit(commit)
 
 class LearningRecommendation(db.Model):
     """Recomendaciones generadas por IA"""
@@ -95,26 +96,31 @@ class LearningRecommendation(db.Model):
     def __repr__(self):
         return f'<LearningRecommendation {self.id}: {self.title}>'
     
-    def accept_recommendation(self):
+    def accept_recommendation(self, commit=None):
         """Aceptar recomendación"""
         self.is_accepted = True
         self.accepted_at = datetime.utcnow()
-        db.session.commit()
+        autocommit(commit)
     
-    def implement_recommendation(self):
+    def implement_recommendation(self, commit=None):
         """Marcar recomendación como implementada"""
         self.is_implemented = True
         self.implemented_at = datetime.utcnow()
-        db.session.commit()
+        autocommit(commit)
     
-    def provide_feedback(self, score):
+    def provide_feedback(self, score, commit=None):
         """Proporcionar retroalimentación sobre la recomendación"""
         self.feedback_score = score
-        db.session.commit()
+        autocommit(commit)
 
 class LearningAnalytics(db.Model):
     """Analíticas de aprendizaje para mejorar el sistema"""
     __tablename__ = 'learning_analytics'
+    __table_args__ = (
+        # Engagement por curso (unión con course_enrollments) y última sesión del estudiante
+        db.Index('ix_learning_analytics_course_student', 'course_id', 'student_id'),
+        db.Index('ix_learning_analytics_student_created', 'student_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
@@ -144,7 +150,7 @@ class LearningAnalytics(db.Model):
     def __repr__(self):
         return f'<LearningAnalytics {self.id} for {self.student.student_id}>'
     
-    def calculate_engagement_score(self):
+    def calculate_engagement_score(self, commit=None):
         """Calcular puntaje de engagement"""
         # Fórmula simple para engagement basada en actividad
         if self.questions_attempted > 0:
@@ -154,5 +160,96 @@ class LearningAnalytics(db.Model):
         else:
             self.engagement_score = 0.0
         
-        db.session.commit()
+        autocommit(commit)
         return self.engagement_score
+
+class CourseAnalyticsSnapshot(db.Model):
+    """Instantánea materializada de las analíticas de un curso"""
+    __tablename__ = 'course_analytics_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False, unique=True)
+    
+    # Información del curso al momento de la reconstrucción
+    course_info = db.Column(db.JSON)
+    
+    # Matrículas (solo se actualizan al reconstruir)
+    enrollments_total = db.Column(db.Integer, default=0)
+    enrollments_active = db.Column(db.Integer, default=0)
+    enrollments_completed = db.Column(db.Integer, default=0)
+    enrollment_progress_sum = db.Column(db.Float, default=0.0)  # Suma de overall_progress activos
+    style_counts = db.Column(db.JSON)  # {'V': n, 'A': n, 'R': n, 'K': n}
+    
+    # Diagnósticos (incrementales)
+    diagnostics_total = db.Column(db.Integer, default=0)
+    diagnostics_completed = db.Column(db.Integer, default=0)
+    diagnostic_score_sum = db.Column(db.Float, default=0.0)
+    diagnostic_score_min = db.Column(db.Float)
+    diagnostic_score_max = db.Column(db.Float)
+    
+    # Rutas de aprendizaje (incrementales)
+    paths_total = db.Column(db.Integer, default=0)
+    paths_active = db.Column(db.Integer, default=0)
+    paths_completed = db.Column(db.Integer, default=0)
+    active_path_progress_sum = db.Column(db.Float, default=0.0)
+    
+    # Progreso (incremental): filas de course_activity_counters, ver CourseActivityCounter
+    activity_counters = db.relationship(
+        'CourseActivityCounter',
+        primaryjoin='foreign(CourseActivityCounter.course_id) == CourseAnalyticsSnapshot.course_id',
+        order_by='CourseActivityCounter.activity_type',
+        viewonly=True,
+        lazy='selectin'
+    )
+    
+    # Secciones calculadas solo al reconstruir
+    performance_trends = db.Column(db.JSON)
+    engagement_metrics = db.Column(db.JSON)
+    
+    # Fechas
+    rebuilt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CourseAnalyticsSnapshot course={self.course_id}>'
+    
+    def is_stale(self, max_age_seconds):
+        """Verificar si la instantánea superó la antigüedad máxima permitida"""
+        if not self.rebuilt_at:
+            return True
+        return (datetime.utcnow() - self.rebuilt_at).total_seconds() > max_age_seconds
+    
+    @property
+    def activity_distribution(self):
+        """Distribución del progreso por tipo de actividad: {tipo: {'count', 'scored', 'percentage_sum'}}"""
+        return {
+            counter.activity_type: {
+                'count': counter.count or 0,
+                'scored': counter.scored or 0,
+                'percentage_sum': counter.percentage_sum or 0.0
+            }
+            for counter in self.activity_counters
+        }
+
+class CourseActivityCounter(db.Model):
+    """
+    Contadores de progreso de un curso por tipo de actividad
+
+    Una fila por (curso, tipo): registrar progreso es un UPDATE atómico
+    ``count = count + n`` sobre la fila de su tipo, sin bloquear la
+    instantánea del curso.
+    """
+    __tablename__ = 'course_activity_counters'
+    __table_args__ = (
+        db.Index('uq_course_activity_counters_course_type', 'course_id', 'activity_type', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    activity_type = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    scored = db.Column(db.Integer, nullable=False, default=0)  # Registros con porcentaje
+    percentage_sum = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<CourseActivityCounter course={self.course_id} {self.activity_type}={self.count}>'
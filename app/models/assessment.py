@@ -5,6 +5,7 @@ Modelos de evaluación y diagnóstico
 from datetime import datetime
 import enum
 from app import db
+from app.unit_of_work import autocommit
 
 class QuestionType(enum.Enum):
     """Tipos de preguntas"""
@@ -69,6 +70,12 @@ class Question(db.Model):
 class DiagnosticExam(db.Model):
     """Examen diagnóstico"""
     __tablename__ = 'diagnostic_exams'
+    __table_args__ = (
+        # Diagnósticos (completados) de un estudiante en un curso
+        db.Index('ix_diagnostic_exams_student_course_completed', 'student_id', 'course_id', 'is_completed'),
+        # Agregados por curso
+        db.Index('ix_diagnostic_exams_course_completed', 'course_id', 'is_completed'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
@@ -98,7 +105,7 @@ class DiagnosticExam(db.Model):
     def __repr__(self):
         return f'<DiagnosticExam {self.id} for {self.student.student_id}>'
     
-    def calculate_score(self):
+    def calculate_score(self, commit=None):
         """Calcular puntaje del examen"""
         if not self.responses:
             return 0.0
@@ -114,7 +121,7 @@ class DiagnosticExam(db.Model):
         self.student.diagnostic_score = self.percentage
         self.student.diagnostic_date = datetime.utcnow()
         
-        db.session.commit()
+        autocommit(commit)
         return self.percentage
 
 class ExamResponse(db.Model):
@@ -179,6 +186,9 @@ class VARKQuestion(db.Model):
 class VARKResponse(db.Model):
     """Respuestas del estudiante al cuestionario VARK"""
     __tablename__ = 'vark_responses'
+    __table_args__ = (
+        db.Index('ix_vark_responses_student', 'student_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
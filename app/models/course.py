@@ -5,6 +5,7 @@ Modelos de cursos y matrículas
 from datetime import datetime
 import enum
 from app import db
+from app.unit_of_work import autocommit
 
 class CourseStatus(enum.Enum):
     """Estados de un curso"""
@@ -60,6 +61,11 @@ class Course(db.Model):
 class CourseEnrollment(db.Model):
     """Matrícula de estudiante en curso"""
     __tablename__ = 'course_enrollments'
+    __table_args__ = (
+        # Un estudiante se matricula una sola vez en cada curso
+        db.Index('uq_course_enrollments_student_course', 'student_id', 'course_id', unique=True),
+        db.Index('ix_course_enrollments_course_active', 'course_id', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
@@ -88,14 +94,14 @@ class CourseEnrollment(db.Model):
     def __repr__(self):
         return f'<Enrollment {self.student.student_id} in {self.course.code}>'
     
-    def update_progress(self, progress_value):
+    def update_progress(self, progress_value, commit=None):
         """Actualizar progreso del estudiante"""
         self.overall_progress = min(1.0, max(0.0, progress_value))
-        db.session.commit()
+        autocommit(commit)
     
-    def complete_course(self):
+    def complete_course(self, commit=None):
         """Marcar curso como completado"""
         self.completion_date = datetime.utcnow()
         self.overall_progress = 1.0
         self.is_active = False
-        db.session.commit()
+        autocommit(commit)
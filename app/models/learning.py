@@ -3,8 +3,10 @@ Modelos de rutas de aprendizaje y recursos
 """
 
 from datetime import datetime
+from sqlalchemy import Float, cast, case, func, or_, select, update
 import enum
 from app import db
+from app.unit_of_work import autocommit
 
 class ResourceType(enum.Enum):
     """Tipos de recursos de aprendizaje"""
@@ -29,9 +31,18 @@ class StepStatus(enum.Enum):
     COMPLETED = "completed"
     SKIPPED = "skipped"
 
+# Estados que dejan atrás un paso al buscar el siguiente pendiente
+PASSED_STATUSES = (StepStatus.COMPLETED, StepStatus.SKIPPED)
+
 class LearningPath(db.Model):
     """Ruta de aprendizaje personalizada"""
     __tablename__ = 'learning_paths'
+    __table_args__ = (
+        # Rutas (activas) de un estudiante en un curso
+        db.Index('ix_learning_paths_student_course_active', 'student_id', 'course_id', 'is_active'),
+        # Agregados por curso
+        db.Index('ix_learning_paths_course_active', 'course_id', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
@@ -42,7 +53,10 @@ class LearningPath(db.Model):
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     total_steps = db.Column(db.Integer, default=0)
-    current_step = db.Column(db.Integer, default=0)
+    current_step = db.Column(db.Integer, default=0)  # Pasos superados antes del siguiente pendiente
+    completed_steps = db.Column(db.Integer, default=0)
+    # Siguiente paso pendiente (sin clave foránea: learning_path_steps ya referencia a esta tabla)
+    next_step_id = db.Column(db.Integer)
     
     # Personalización basada en perfil del estudiante
     learning_style = db.Column(db.Enum(LearningStyle))
@@ -68,25 +82,113 @@ class LearningPath(db.Model):
     
     def get_next_step(self):
         """Obtener siguiente paso en la ruta"""
-        return LearningPathStep.query.filter_by(
-            learning_path_id=self.id,
-            step_order=self.current_step + 1
-        ).first()
-    
-    def update_progress(self):
-        """Actualizar progreso de la ruta"""
-        completed_steps = len([step for step in self.steps if step.status == StepStatus.COMPLETED])
+        if self.next_step_id is None:
+            return None
+        return db.session.get(LearningPathStep, self.next_step_id)
+    
+    def update_progress(self, commit=None):
+        """Actualizar progreso de la ruta a partir del contador de pasos completados"""
+        previous_percentage = self.completion_percentage
+        was_completed = self.is_completed
+        
+        completed_steps = self.completed_steps or 0
         self.completion_percentage = (completed_steps / self.total_steps) * 100 if self.total_steps > 0 else 0
         
         if self.completion_percentage >= 100:
             self.is_completed = True
             self.completed_at = datetime.utcnow()
         
-        db.session.commit()
+        self._advance_next_step()
+        
+        # Mantener al día la instantánea de analíticas del curso
+        from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+        AnalyticsSnapshotRefresher().record_path_progress(self, previous_percentage, was_completed)
+        
+        autocommit(commit)
+    
+    def _advance_next_step(self):
+        """Mover el puntero al siguiente paso pendiente si el actual ya se superó"""
+        if self.next_step_id is not None:
+            step = db.session.get(LearningPathStep, self.next_step_id)
+            if step is not None and step.status not in PASSED_STATUSES:
+                return
+        
+        # Búsqueda por (learning_path_id, step_order) desde el puntero actual
+        step = LearningPathStep.query.filter(
+            LearningPathStep.learning_path_id == self.id,
+            LearningPathStep.step_order > (self.current_step or 0),
+            LearningPathStep.status.notin_(PASSED_STATUSES)
+        ).order_by(LearningPathStep.step_order).first()
+        
+        self.next_step_id = step.id if step else None
+        self.current_step = step.step_order - 1 if step else self.total_steps
+    
+    @classmethod
+    def refresh_counters(cls, path_ids=None, course_id=None, chunk_size=500):
+        """
+        Recalcular desde learning_path_steps los contadores de las rutas que no coinciden
+        
+        Corrige ``completed_steps``, ``next_step_id``, ``current_step`` y
+        ``completion_percentage`` con un UPDATE de subconsultas correlacionadas.
+        No confirma la transacción.
+        
+        Args:
+            path_ids (list): Limitar a estas rutas (por defecto todas)
+            course_id (int): Limitar a las rutas de este curso
+            chunk_size (int): Rutas por sentencia UPDATE
+            
+        Returns:
+            list: Filas (id, student_id, course_id) de las rutas corregidas
+        """
+        completed = select(func.count(LearningPathStep.id)).where(
+            LearningPathStep.learning_path_id == cls.id,
+            LearningPathStep.status == StepStatus.COMPLETED
+        ).scalar_subquery()
+        pending = select(LearningPathStep.id, LearningPathStep.step_order).where(
+            LearningPathStep.learning_path_id == cls.id,
+            LearningPathStep.status.notin_(PASSED_STATUSES)
+        ).order_by(LearningPathStep.step_order, LearningPathStep.id).limit(1)
+        next_step_id = pending.with_only_columns(LearningPathStep.id).scalar_subquery()
+        next_step_order = pending.with_only_columns(LearningPathStep.step_order).scalar_subquery()
+        
+        stale = or_(
+            func.coalesce(cls.completed_steps, 0) != completed,
+            cls.next_step_id.is_distinct_from(next_step_id)
+        )
+        query = select(cls.id, cls.student_id, cls.course_id).where(stale).order_by(cls.id)
+        if path_ids is not None:
+            query = query.where(cls.id.in_(list(path_ids)))
+        if course_id is not None:
+            query = query.where(cls.course_id == course_id)
+        rows = db.session.execute(query).all()
+        
+        ids = [row.id for row in rows]
+        for start in range(0, len(ids), chunk_size):
+            db.session.execute(
+                update(cls).where(cls.id.in_(ids[start:start + chunk_size])).values(
+                    completed_steps=completed,
+                    next_step_id=next_step_id,
+                    current_step=func.coalesce(next_step_order - 1, cls.total_steps),
+                    completion_percentage=case(
+                        (cls.total_steps > 0, cast(completed, Float) / cls.total_steps * 100),
+                        else_=0.0
+                    )
+                ).execution_options(synchronize_session=False)
+            )
+        
+        if rows:
+            # El UPDATE masivo no dispara los eventos del ORM que invalidan los dashboards
+            from app.ai.student_dashboard import invalidate_student_dashboards
+            invalidate_student_dashboards({row.student_id for row in rows}, db.session)
+        return rows
 
 class LearningPathStep(db.Model):
     """Paso individual en una ruta de aprendizaje"""
     __tablename__ = 'learning_path_steps'
+    __table_args__ = (
+        # Paso siguiente de una ruta
+        db.Index('ix_learning_path_steps_path_order', 'learning_path_id', 'step_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     learning_path_id = db.Column(db.Integer, db.ForeignKey('learning_paths.id'), nullable=False)
@@ -114,18 +216,33 @@ class LearningPathStep(db.Model):
     def __repr__(self):
         return f'<LearningPathStep {self.step_order}: {self.title}>'
     
-    def complete_step(self):
+    def complete_step(self, commit=None):
         """Marcar paso como completado"""
+        if self.status == StepStatus.COMPLETED:
+            return
+        
         self.status = StepStatus.COMPLETED
         self.completed_at = datetime.utcnow()
-        db.session.commit()
         
-        # Actualizar progreso de la ruta
-        self.learning_path.update_progress()
+        # Incremento atómico en SQL: no carga los pasos de la ruta para contarlos
+        path = self.learning_path
+        db.session.execute(
+            update(LearningPath).where(LearningPath.id == self.learning_path_id).values(
+                completed_steps=func.coalesce(LearningPath.completed_steps, 0) + 1
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.expire(path, ['completed_steps'])
+        
+        # Actualizar progreso de la ruta (una sola confirmación para ambos)
+        path.update_progress(commit=commit)
 
 class Resource(db.Model):
     """Recursos de aprendizaje"""
     __tablename__ = 'resources'
+    __table_args__ = (
+        db.Index('ix_resources_competency_active', 'competency_id', 'is_active'),
+        db.Index('ix_resources_course_active', 'course_id', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
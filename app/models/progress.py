@@ -5,6 +5,7 @@ Modelos de progreso y competencias
 from datetime import datetime
 import enum
 from app import db
+from app.unit_of_work import autocommit
 
 class CompetencyLevel(enum.Enum):
     """Niveles de dominio de competencias"""
@@ -75,7 +76,7 @@ class CompetencyMastery(db.Model):
     def __repr__(self):
         return f'<CompetencyMastery {self.student.student_id} - {self.competency.code}>'
     
-    def update_mastery(self, new_level, confidence=None):
+    def update_mastery(self, new_level, confidence=None, commit=None):
         """Actualizar nivel de dominio"""
         self.mastery_level = min(1.0, max(0.0, new_level))
         if confidence is not None:
@@ -88,7 +89,7 @@ class CompetencyMastery(db.Model):
             self.is_mastered = True
             self.mastered_at = datetime.utcnow()
         
-        db.session.commit()
+        autocommit(commit)
     
     def get_mastery_status(self):
         """Obtener estado de dominio"""
@@ -102,6 +103,11 @@ class CompetencyMastery(db.Model):
 class Progress(db.Model):
     """Registro de progreso del estudiante"""
     __tablename__ = 'progress'
+    __table_args__ = (
+        # Historial por estudiante y tipo de actividad, y tendencias por curso
+        db.Index('ix_progress_student_activity_percentage', 'student_id', 'activity_type', 'percentage'),
+        db.Index('ix_progress_course_created', 'course_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
@@ -131,11 +137,11 @@ class Progress(db.Model):
     def __repr__(self):
         return f'<Progress {self.id}: {self.activity_type} - {self.percentage}%>'
     
-    def calculate_percentage(self):
+    def calculate_percentage(self, commit=None):
         """Calcular porcentaje de la actividad"""
         if self.max_score and self.max_score > 0:
             self.percentage = (self.score / self.max_score) * 100
         else:
             self.percentage = 0.0
-        db.session.commit()
+        autocommit(commit)
         return self.percentage
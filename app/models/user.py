@@ -7,6 +7,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import enum
 from app import db
+from app.unit_of_work import autocommit
 
 class UserType(enum.Enum):
     """Tipos de usuario en el sistema"""
@@ -48,10 +49,10 @@ class User(UserMixin, db.Model):
         """Obtener nombre completo"""
         return f"{self.first_name} {self.last_name}"
     
-    def update_last_login(self):
+    def update_last_login(self, commit=None):
         """Actualizar último login"""
         self.last_login = datetime.utcnow()
-        db.session.commit()
+        autocommit(commit)
 
 class Student(db.Model):
     """Perfil de estudiante"""
@@ -102,7 +103,7 @@ class Student(db.Model):
             'dominant': self.dominant_learning_style
         }
     
-    def update_vark_profile(self, visual, auditory, reading, kinesthetic):
+    def update_vark_profile(self, visual, auditory, reading, kinesthetic, commit=None):
         """Actualizar perfil VARK"""
         self.vark_visual = visual
         self.vark_auditory = auditory
@@ -117,7 +118,7 @@ class Student(db.Model):
             'K': kinesthetic
         }
         self.dominant_learning_style = max(scores, key=scores.get)
-        db.session.commit()
+        autocommit(commit)
 
 class Teacher(db.Model):
     """Perfil de docente"""
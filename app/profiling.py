@@ -0,0 +1,167 @@
+"""
+Perfilado de peticiones
+
+Consume las consultas registradas por Flask-SQLAlchemy
+(``SQLALCHEMY_RECORD_QUERIES``) al final de cada petición y registra, por
+endpoint, el número de sentencias SQL, el tiempo total de base de datos, las
+sentencias más lentas y el tiempo total de la petición. Marca como posible
+N+1 cualquier plantilla de sentencia repetida más de
+``PROFILING_N_PLUS_ONE_THRESHOLD`` veces en una misma petición. Los
+agregados se publican en ``/api/metrics`` y, si se configura
+``PROFILING_LOG_PATH``, cada petición se escribe en un log JSONL rotativo.
+"""
+
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+from flask import g, request
+from flask_sqlalchemy.record_queries import get_recorded_queries
+from app.metrics import get_metrics_registry
+import json
+import logging
+import re
+import time
+
+# Normalización de sentencias a plantillas para detectar repeticiones
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+
+# Endpoints que no se perfilan
+IGNORED_ENDPOINTS = {'static'}
+
+def init_profiling(app):
+    """
+    Registrar el perfilado de peticiones en la aplicación
+
+    Args:
+        app (Flask): Aplicación
+    """
+    if not app.config.get('PROFILING_ENABLED', True):
+        return
+
+    registry = get_metrics_registry(app)
+    registry.describe('sti_http_requests_total', 'counter', 'Peticiones atendidas')
+    registry.describe('sti_http_request_duration_seconds', 'summary', 'Tiempo total de la petición')
+    registry.describe('sti_db_queries_per_request', 'summary', 'Sentencias SQL por petición')
+    registry.describe('sti_db_queries_per_request_max', 'gauge', 'Máximo de sentencias SQL en una petición')
+    registry.describe('sti_db_time_seconds', 'summary', 'Tiempo de base de datos por petición')
+    registry.describe('sti_db_slowest_query_seconds', 'gauge', 'Sentencia SQL más lenta observada')
+    registry.describe('sti_n_plus_one_total', 'counter', 'Peticiones con un posible patrón N+1')
+
+    json_logger = _create_json_logger(app)
+
+    @app.before_request
+    def start_profiling():
+        g._profiling_start = time.perf_counter()
+
+    @app.after_request
+    def finish_profiling(response):
+        try:
+            start = g.pop('_profiling_start', None)
+            if start is None or request.endpoint in IGNORED_ENDPOINTS:
+                return response
+
+            profile = build_request_profile(
+                get_recorded_queries(),
+                time.perf_counter() - start,
+                n_plus_one_threshold=app.config.get('PROFILING_N_PLUS_ONE_THRESHOLD', 10),
+                slow_query_count=app.config.get('PROFILING_SLOW_QUERY_COUNT', 3)
+            )
+            profile.update({
+                'endpoint': request.endpoint or '<unmatched>',
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code
+            })
+
+            _record_metrics(registry, profile)
+
+            for repeated in profile['n_plus_one']:
+                app.logger.warning(
+                    f"Posible N+1 en {profile['endpoint']}: {repeated['count']} ejecuciones de "
+                    f"{repeated['statement'][:200]}"
+                )
+
+            if json_logger:
+                json_logger.info(json.dumps(profile, default=str))
+
+        except Exception as e:
+            app.logger.error(f"Error registrando perfil de la petición: {str(e)}")
+
+        return response
+
+def normalize_statement(statement):
+    """Reducir una sentencia SQL a su plantilla (sin listas IN ni literales numéricos)"""
+    statement = _WHITESPACE.sub(' ', statement or '').strip()
+    statement = _PLACEHOLDER_LIST.sub('(?+)', statement)
+    return _NUMBER.sub('N', statement)
+
+def build_request_profile(queries, wall_time, n_plus_one_threshold=10, slow_query_count=3):
+    """
+    Construir el perfil de una petición a partir de sus consultas registradas
+
+    Args:
+        queries (list): Consultas de ``get_recorded_queries()``
+        wall_time (float): Tiempo total de la petición en segundos
+        n_plus_one_threshold (int): Repeticiones de una plantilla a partir de las cuales se marca N+1
+        slow_query_count (int): Número de sentencias lentas a conservar
+
+    Returns:
+        dict: Conteo de sentencias, tiempos, sentencias lentas y patrones N+1
+    """
+    templates = Counter(normalize_statement(query.statement) for query in queries)
+    slowest = sorted(queries, key=lambda query: query.duration, reverse=True)[:slow_query_count]
+
+    return {
+        'timestamp': time.time(),
+        'wall_time': wall_time,
+        'query_count': len(queries),
+        'db_time': sum(query.duration for query in queries),
+        'slowest_queries': [
+            {'statement': query.statement, 'duration': query.duration, 'location': query.location}
+            for query in slowest
+        ],
+        'n_plus_one': [
+            {'statement': statement, 'count': count}
+            for statement, count in templates.most_common()
+            if count > n_plus_one_threshold
+        ]
+    }
+
+def _record_metrics(registry, profile):
+    """Acumular el perfil de una petición en el registro de métricas"""
+    endpoint = profile['endpoint']
+
+    registry.inc('sti_http_requests_total', endpoint=endpoint, method=profile['method'], status=profile['status'])
+    registry.observe('sti_http_request_duration_seconds', profile['wall_time'], endpoint=endpoint)
+    registry.observe('sti_db_queries_per_request', profile['query_count'], endpoint=endpoint)
+    registry.set_max('sti_db_queries_per_request_max', profile['query_count'], endpoint=endpoint)
+    registry.observe('sti_db_time_seconds', profile['db_time'], endpoint=endpoint)
+
+    if profile['slowest_queries']:
+        registry.set_max('sti_db_slowest_query_seconds', profile['slowest_queries'][0]['duration'], endpoint=endpoint)
+
+    if profile['n_plus_one']:
+        registry.inc('sti_n_plus_one_total', endpoint=endpoint)
+
+def _create_json_logger(app):
+    """Crear el logger JSONL rotativo si se configuró PROFILING_LOG_PATH"""
+    path = app.config.get('PROFILING_LOG_PATH')
+    if not path:
+        return None
+
+    logger = logging.getLogger(f'{app.import_name}.profiling')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    if not any(getattr(handler, 'baseFilename', None) == path for handler in logger.handlers):
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=app.config.get('PROFILING_LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=app.config.get('PROFILING_LOG_BACKUPS', 5),
+            encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+
+    return logger
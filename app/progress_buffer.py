@@ -0,0 +1,628 @@
+"""
+Buffer de escritura diferida para los eventos de progreso
+
+En modo ``PROGRESS_WRITE_MODE = 'buffer'`` ``/api/progress/update`` valida el
+evento, lo anota en un diario local de solo anexado y lo guarda en memoria;
+un hilo en segundo plano inserta los eventos pendientes por lotes (un
+``executemany``) cuando se acumulan ``PROGRESS_BUFFER_BATCH_SIZE`` eventos o
+pasan ``PROGRESS_BUFFER_FLUSH_INTERVAL`` segundos. Cada lote actualiza la
+instantánea de analíticas de sus cursos e invalida los dashboards y las
+páginas cacheadas afectadas.
+
+En modo buffer la petición no abre una unidad de trabajo: el estudiante y
+la matrícula se validan contra una caché con expiración del propio buffer
+(``PROGRESS_BUFFER_VALIDATION_TTL``; solo guarda resultados encontrados, y
+las matrículas no se borran, solo se desactivan), así que el hilo que
+escribe los lotes es el único que confirma.
+
+El diario se divide en segmentos por proceso; un segmento se borra cuando
+sus eventos están confirmados en la base de datos, y al arrancar se
+recuperan los segmentos de procesos que ya no existen. La entrega es "al
+menos una vez": si el proceso cae entre la confirmación y el borrado del
+segmento, esos eventos se insertarán de nuevo.
+
+Si un lote falla, sus eventos se reintentan de a uno: los que no se pueden
+escribir van a un segmento de eventos descartados (``dead-*.jsonl``, que no
+se recupera al arrancar) y los demás se escriben igual. Solo un error
+operativo de la base de datos (conexión caída, base bloqueada) devuelve los
+eventos al buffer para reintentarlos más tarde.
+
+Las lecturas que necesitan datos al día llaman a ``flush_pending_progress``.
+"""
+
+from collections import deque
+from datetime import datetime
+from flask import current_app
+from app.cache import TTLCache
+import atexit
+import glob
+import json
+import os
+import re
+import threading
+import time
+
+WRITE_MODE_SYNC = 'sync'
+WRITE_MODE_BUFFER = 'buffer'
+
+# Columnas de Progress que se guardan desde un evento
+EVENT_COLUMNS = (
+    'student_id', 'course_id', 'enrollment_id', 'activity_type', 'activity_id',
+    'score', 'max_score', 'percentage', 'time_spent', 'created_at'
+)
+
+_SEGMENT_NAME = re.compile(r'^progress-(\d+)-(\d+)\.jsonl$')
+
+def _activity_type_length():
+    """Longitud máxima de Progress.activity_type"""
+    from app.models import Progress
+    return Progress.__table__.c.activity_type.type.length
+
+def find_enrollment(student_id, course_id=None, enrollment_id=None):
+    """
+    Buscar la matrícula del estudiante por curso, por ID o por ambos
+
+    Returns:
+        tuple: (course_id, enrollment_id); enrollment_id es None si no existe
+    """
+    from app import db
+    from app.models import CourseEnrollment
+
+    if course_id is None and enrollment_id is None:
+        return None, None
+
+    query = db.session.query(CourseEnrollment.course_id, CourseEnrollment.id).filter(
+        CourseEnrollment.student_id == student_id
+    )
+    if course_id is not None:
+        query = query.filter(CourseEnrollment.course_id == course_id)
+    if enrollment_id is not None:
+        query = query.filter(CourseEnrollment.id == enrollment_id)
+    row = query.first()
+    return (row.course_id, row.id) if row else (course_id, None)
+
+def build_progress_event(student_id, data, resolve_enrollment=None):
+    """
+    Validar los datos de un evento de progreso y construir su fila
+
+    El curso se identifica con ``course_id``, con ``enrollment_id`` o con
+    ambos, como antes del buffer; ``time_spent`` se redondea a segundos.
+
+    Args:
+        student_id (int): ID del estudiante autenticado
+        data (dict): Cuerpo JSON de /api/progress/update
+        resolve_enrollment (callable): ``(student_id, course_id, enrollment_id)
+            -> (course_id, enrollment_id)``; por defecto find_enrollment
+
+    Returns:
+        dict: Valores de las columnas de EVENT_COLUMNS
+
+    Raises:
+        ValueError: Si faltan datos, no son numéricos, el tipo de actividad no
+            es un texto que quepa en la columna o el estudiante no está
+            matriculado en el curso
+    """
+    data = data or {}
+    activity_type = data.get('activity_type')
+    activity_id = data.get('activity_id')
+    score = data.get('score')
+
+    if not all([activity_type, activity_id, score is not None]):
+        raise ValueError('Datos requeridos faltantes')
+
+    # Un valor que la columna no acepta haría fallar el lote entero más tarde
+    if not isinstance(activity_type, str) or len(activity_type) > _activity_type_length():
+        raise ValueError(f'Tipo de actividad inválido (texto de hasta {_activity_type_length()} caracteres)')
+
+    try:
+        course_id = int(data['course_id']) if data.get('course_id') is not None else None
+        enrollment_id = int(data['enrollment_id']) if data.get('enrollment_id') is not None else None
+        activity_id = int(activity_id)
+        score = float(score)
+        max_score = float(data['max_score']) if data.get('max_score') is not None else None
+        time_spent = round(float(data['time_spent'])) if data.get('time_spent') is not None else None
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError('Datos de progreso no numéricos')
+
+    # La matrícula debe ser del estudiante (y del curso, si se indicó)
+    course_id, enrollment_id = (resolve_enrollment or find_enrollment)(student_id, course_id, enrollment_id)
+    if enrollment_id is None:
+        raise ValueError('Matrícula no encontrada para el curso')
+
+    return {
+        'student_id': student_id,
+        'course_id': course_id,
+        'enrollment_id': enrollment_id,
+        'activity_type': activity_type,
+        'activity_id': activity_id,
+        'score': score,
+        'max_score': max_score,
+        'percentage': (score / max_score) * 100 if max_score and max_score > 0 else 0.0,
+        'time_spent': time_spent,
+        'created_at': datetime.utcnow()
+    }
+
+def write_progress_events(events, session):
+    """
+    Insertar eventos de progreso en un solo executemany y actualizar lo que depende de ellos
+
+    La inserción masiva no dispara los eventos del ORM, así que se llama
+    explícitamente a la instantánea de analíticas, a los dashboards de los
+    estudiantes, a las tendencias de rendimiento y a la caché de respuestas
+    de los cursos. No confirma la transacción.
+
+    Args:
+        events (list): Filas construidas por build_progress_event
+        session (Session): Sesión en la que se escribe
+    """
+    from sqlalchemy import insert
+    from app.models import Progress
+    from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+    from app.ai.performance_trends import invalidate_performance_trends
+    from app.ai.student_dashboard import invalidate_student_dashboards
+    from app.response_cache import course_scope, invalidate_responses
+
+    session.execute(insert(Progress), [{column: event[column] for column in EVENT_COLUMNS} for event in events])
+
+    by_course = {}
+    for event in events:
+        by_course.setdefault(event['course_id'], []).append((event['activity_type'], event['percentage']))
+
+    refresher = AnalyticsSnapshotRefresher()
+    for course_id, entries in by_course.items():
+        refresher.record_progress_batch(course_id, entries)
+
+    invalidate_student_dashboards({event['student_id'] for event in events}, session)
+    invalidate_performance_trends(by_course, {event['student_id'] for event in events}, session)
+    invalidate_responses({course_scope(course_id) for course_id in by_course}, session)
+
+class ProgressJournal:
+    """Diario de solo anexado de los eventos pendientes, en segmentos por proceso"""
+
+    def __init__(self, directory, fsync=False):
+        """
+        Args:
+            directory (str): Carpeta de los segmentos
+            fsync (bool): Forzar cada evento a disco (más lento; sobrevive a
+                un corte de energía y no solo a la caída del proceso)
+        """
+        self.directory = directory
+        self.fsync = fsync
+        self.pid = os.getpid()
+        os.makedirs(directory, exist_ok=True)
+
+        own = [seq for pid, seq, _ in self._segments() if pid == self.pid]
+        self._seq = max(own, default=0) + 1
+        self._file = None
+
+    def recover(self):
+        """
+        Reclamar los segmentos de procesos terminados y leer sus eventos
+
+        Returns:
+            list: Eventos pendientes, en orden
+        """
+        events = []
+        for pid, seq, path in self._segments():
+            if pid != self.pid:
+                if _process_alive(pid):
+                    continue
+                # Renombrar es atómico: si otro proceso lo reclamó antes, se omite
+                claimed = self._path(self._seq)
+                try:
+                    os.rename(path, claimed)
+                except OSError:
+                    continue
+                path = claimed
+                self._seq += 1
+
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # Última línea cortada por una caída a mitad de escritura
+                        continue
+                    event['created_at'] = datetime.fromisoformat(event['created_at'])
+                    events.append(event)
+        return events
+
+    def append(self, event):
+        """Anotar un evento en el segmento actual"""
+        if self._file is None:
+            self._file = open(self._path(self._seq), 'a', encoding='utf-8')
+        self._file.write(json.dumps(event, default=_json_default) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def dead_letter(self, entries):
+        """
+        Guardar eventos que no se pudieron escribir en un segmento de descartados
+
+        Args:
+            entries (list): Pares (evento, mensaje de error)
+
+        Returns:
+            str: Ruta del segmento
+        """
+        path = os.path.join(self.directory, f'dead-{self.pid}-{time.time_ns()}.jsonl')
+        with open(path, 'a', encoding='utf-8') as f:
+            for event, error in entries:
+                f.write(json.dumps({'event': event, 'error': error}, default=_json_default) + '\n')
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        return path
+
+    def rotate(self):
+        """
+        Cerrar el segmento actual y empezar otro
+
+        Returns:
+            int: Número del último segmento cerrado
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        closed = self._seq
+        self._seq += 1
+        return closed
+
+    def discard(self, up_to_seq):
+        """Borrar los segmentos propios hasta ``up_to_seq`` (ya confirmados)"""
+        for pid, seq, path in self._segments():
+            if pid == self.pid and seq <= up_to_seq:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Error borrando segmento del diario de progreso: {e}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _path(self, seq):
+        return os.path.join(self.directory, f'progress-{self.pid}-{seq:08d}.jsonl')
+
+    def _segments(self):
+        segments = []
+        for path in glob.glob(os.path.join(self.directory, 'progress-*.jsonl')):
+            match = _SEGMENT_NAME.match(os.path.basename(path))
+            if match:
+                segments.append((int(match.group(1)), int(match.group(2)), path))
+        return sorted(segments, key=lambda segment: (segment[1], segment[0]))
+
+class ProgressBuffer:
+    """Eventos de progreso pendientes y el hilo que los escribe por lotes"""
+
+    def __init__(self, app, journal=None, batch_size=200, flush_interval=1.0, max_pending=10000,
+                 validation_ttl=300, validation_entries=10000):
+        """
+        Args:
+            app (Flask): Aplicación (el hilo abre su propio contexto)
+            journal (ProgressJournal): Diario local; None para no guardar copia
+            batch_size (int): Eventos que disparan una escritura
+            flush_interval (float): Segundos máximos que un evento espera
+            max_pending (int): Capacidad del buffer; al llenarse, quien agrega
+                escribe el lote en su propio hilo
+            validation_ttl (int): Segundos que se recuerdan el estudiante y la
+                matrícula de un usuario validado
+            validation_entries (int): Entradas máximas de esa caché
+        """
+        self.app = app
+        self.journal = journal
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(self.batch_size, max_pending)
+        self.flushes = 0
+        self.failures = 0
+        self.dead_letters = 0
+        self._pending = deque()
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.validation = TTLCache(max_entries=validation_entries, ttl_seconds=validation_ttl)
+
+        if journal is not None:
+            recovered = journal.recover()
+            if recovered:
+                self._pending.extend(recovered)
+                self._oldest = time.monotonic()
+
+    def append(self, event):
+        """Agregar un evento validado (build_progress_event)"""
+        with self._lock:
+            full = len(self._pending) >= self.max_pending
+        if full:
+            # Contrapresión: el buffer está lleno y el hilo no da abasto
+            self.flush()
+
+        with self._lock:
+            if self.journal is not None:
+                self.journal.append(event)
+            self._pending.append(event)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+
+        _metrics(self.app).inc('sti_progress_events_total')
+
+    def student_id_for(self, user_id):
+        """ID del perfil de estudiante de un usuario (None si no tiene), desde la caché de validación"""
+        from app import db
+        from app.models import Student
+
+        key = ('student', user_id)
+        student_id = self.validation.get(key)
+        if student_id is None:
+            student_id = db.session.query(Student.id).filter_by(user_id=user_id).scalar()
+            if student_id is not None:
+                self.validation.set(key, student_id)
+        return student_id
+
+    def resolve_enrollment(self, student_id, course_id=None, enrollment_id=None):
+        """find_enrollment con caché; las matrículas no encontradas no se recuerdan"""
+        key = ('enrollment', student_id, course_id, enrollment_id)
+        resolved = self.validation.get(key)
+        if resolved is None:
+            resolved = find_enrollment(student_id, course_id, enrollment_id)
+            if resolved[1] is not None:
+                self.validation.set(key, resolved)
+        return resolved
+
+    def pending(self, student_id=None, course_id=None):
+        """Número de eventos pendientes, opcionalmente de un estudiante o un curso"""
+        with self._lock:
+            if student_id is None and course_id is None:
+                return len(self._pending)
+            return sum(
+                1 for event in self._pending
+                if (student_id is None or event['student_id'] == student_id)
+                and (course_id is None or event['course_id'] == course_id)
+            )
+
+    def flush(self):
+        """
+        Escribir todos los eventos pendientes en un lote
+
+        Si el lote falla se reintenta evento por evento (ver _write_each).
+
+        Returns:
+            int: Eventos escritos (0 si no había o si la escritura falló por un
+            error operativo; en ese caso vuelven al buffer)
+        """
+        from app import db
+
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = list(self._pending)
+                self._pending.clear()
+                self._oldest = None
+                closed_segment = self.journal.rotate() if self.journal is not None else None
+
+            start = time.perf_counter()
+            try:
+                # Contexto propio: no confirma la sesión de la petición que fuerza la escritura
+                with self.app.app_context():
+                    try:
+                        write_progress_events(batch, db.session)
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                        raise
+                    finally:
+                        db.session.remove()
+                written, requeue = len(batch), []
+            except Exception as e:
+                self.failures += 1
+                _metrics(self.app).inc('sti_progress_flush_failures_total')
+                self.app.logger.error(f"Error escribiendo lote de progreso ({len(batch)} eventos): {str(e)}")
+                written, requeue = self._write_each(batch)
+
+            if requeue:
+                with self._lock:
+                    self._pending.extendleft(reversed(requeue))
+                    self._oldest = time.monotonic()
+            elif closed_segment is not None:
+                self.journal.discard(closed_segment)
+            if not written:
+                return 0
+
+            elapsed = time.perf_counter() - start
+            self.flushes += 1
+
+            registry = _metrics(self.app)
+            registry.observe('sti_progress_flush_seconds', elapsed)
+            registry.set_max('sti_progress_flush_seconds_max', elapsed)
+            registry.observe('sti_progress_flush_batch_size', written)
+            return written
+
+    def _write_each(self, batch):
+        """
+        Reintentar un lote fallido evento por evento, cada uno en su transacción
+
+        Los eventos que fallan por sus datos se descartan al segmento de
+        descartados. Un error operativo (conexión, bloqueo) detiene el
+        reintento y devuelve ese evento y los siguientes al buffer.
+
+        Returns:
+            tuple: (eventos escritos, eventos a devolver al buffer)
+        """
+        from sqlalchemy.exc import OperationalError
+        from app import db
+
+        written = 0
+        dead = []
+        with self.app.app_context():
+            try:
+                for index, event in enumerate(batch):
+                    try:
+                        write_progress_events([event], db.session)
+                        db.session.commit()
+                        written += 1
+                    except OperationalError:
+                        db.session.rollback()
+                        self._dead_letter(dead)
+                        return written, batch[index:]
+                    except Exception as e:
+                        db.session.rollback()
+                        dead.append((event, str(e)))
+            finally:
+                db.session.remove()
+
+        self._dead_letter(dead)
+        return written, []
+
+    def _dead_letter(self, entries):
+        if not entries:
+            return
+        self.dead_letters += len(entries)
+        _metrics(self.app).inc('sti_progress_dead_letters_total', len(entries))
+        path = self.journal.dead_letter(entries) if self.journal is not None else None
+        self.app.logger.error(
+            f"{len(entries)} eventos de progreso descartados ({path or 'sin diario'}): {entries[0][1]}"
+        )
+
+    def start(self):
+        """Arrancar el hilo de escritura"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='progress-buffer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Detener el hilo y escribir lo pendiente"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+        if self.journal is not None:
+            self.journal.close()
+
+    def stats(self):
+        """Estado del buffer"""
+        with self._lock:
+            pending = len(self._pending)
+            oldest = self._oldest
+        return {
+            'pending': pending,
+            'oldest_seconds': round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            'flushes': self.flushes,
+            'failures': self.failures,
+            'dead_letters': self.dead_letters,
+            'validation': self.validation.stats()
+        }
+
+    def _due(self):
+        with self._lock:
+            if not self._pending:
+                return False
+            return (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._oldest >= self.flush_interval)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._due():
+                    self.flush()
+            except Exception as e:
+                self.app.logger.error(f"Error en el hilo del buffer de progreso: {str(e)}")
+            self._wakeup.wait(min(self.flush_interval, 1.0) / 2)
+            self._wakeup.clear()
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} no serializable')
+
+def _process_alive(pid):
+    """Indicar si un proceso existe (POSIX); en Windows se asume terminado"""
+    if os.name == 'nt':
+        # os.kill(pid, 0) enviaría Ctrl+C en Windows; allí se despliega con un solo proceso
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _metrics(app):
+    from app.metrics import get_metrics_registry
+    return get_metrics_registry(app)
+
+def buffer_enabled(app=None):
+    """Indicar si el progreso se escribe de forma diferida"""
+    app = app or current_app
+    return app.config.get('PROGRESS_WRITE_MODE') == WRITE_MODE_BUFFER
+
+def get_progress_buffer(app=None):
+    """Obtener el buffer de progreso de la aplicación (None en modo 'sync')"""
+    app = app or current_app._get_current_object()
+    return app.extensions.get('progress_buffer')
+
+def flush_pending_progress(student_id=None, course_id=None):
+    """
+    Escribir los eventos pendientes antes de una lectura que necesita datos al día
+
+    Solo escribe si hay eventos pendientes del estudiante o del curso indicados.
+
+    Returns:
+        int: Eventos escritos
+    """
+    buffer = get_progress_buffer()
+    if buffer is None or not buffer.pending(student_id=student_id, course_id=course_id):
+        return 0
+    return buffer.flush()
+
+def init_progress_buffer(app):
+    """Crear el buffer y arrancar su hilo si el progreso se escribe de forma diferida"""
+    if not buffer_enabled(app):
+        return None
+
+    journal = None
+    directory = app.config.get('PROGRESS_BUFFER_JOURNAL_DIR')
+    if directory is None:
+        directory = os.path.join(app.instance_path, 'progress_journal')
+    if directory:  # '' desactiva el diario
+        journal = ProgressJournal(directory, fsync=app.config.get('PROGRESS_BUFFER_FSYNC', False))
+
+    buffer = ProgressBuffer(
+        app,
+        journal=journal,
+        batch_size=app.config.get('PROGRESS_BUFFER_BATCH_SIZE', 200),
+        flush_interval=app.config.get('PROGRESS_BUFFER_FLUSH_INTERVAL', 1.0),
+        max_pending=app.config.get('PROGRESS_BUFFER_MAX_PENDING', 10000),
+        validation_ttl=app.config.get('PROGRESS_BUFFER_VALIDATION_TTL', 300)
+    )
+    app.extensions['progress_buffer'] = buffer
+
+    registry = _metrics(app)
+    registry.describe('sti_progress_events_total', 'counter', 'Eventos de progreso recibidos en el buffer')
+    registry.describe('sti_progress_flush_seconds', 'summary', 'Duración de las escrituras por lotes del progreso')
+    registry.describe('sti_progress_flush_seconds_max', 'gauge', 'Escritura por lotes del progreso más lenta')
+    registry.describe('sti_progress_flush_batch_size', 'summary', 'Eventos por lote escrito')
+    registry.describe('sti_progress_flush_failures_total', 'counter', 'Lotes de progreso que no se pudieron escribir')
+    registry.describe('sti_progress_dead_letters_total', 'counter', 'Eventos de progreso descartados por datos inválidos')
+    registry.register_collector(lambda: [(
+        'sti_progress_buffer_pending', 'gauge', 'Eventos de progreso pendientes de escribir',
+        [({}, buffer.pending())]
+    )])
+
+    buffer.start()
+    atexit.register(buffer.stop, 5)
+    return buffer
@@ -0,0 +1,352 @@
+"""
+Caché de respuestas HTML por usuario
+
+Las páginas decoradas con ``cached_response`` se guardan ya renderizadas bajo
+una clave formada por el endpoint, sus argumentos, el usuario y la versión
+de datos de cada ámbito del que depende la página (``user:<id>``,
+``course:<id>``, ``teacher:<id>``...). Invalidar un ámbito consiste en darle
+una versión nueva, de modo que las entradas anteriores dejan de coincidir
+sin tener que recorrer el almacenamiento. Cada respuesta lleva un ETag
+fuerte (hash del cuerpo) y las peticiones con ``If-None-Match`` coincidente
+reciben ``304 Not Modified``.
+
+El almacenamiento es intercambiable con ``RESPONSE_CACHE_BACKEND``:
+``memory`` (LRU en memoria del proceso, por defecto), ``filesystem``
+(directorio compartido por los procesos del servidor) o ``none``.
+"""
+
+from collections import namedtuple
+from functools import wraps
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from flask import current_app, has_app_context, request, session, get_flashed_messages
+from flask_login import current_user
+from sqlalchemy import event, inspect
+from app.cache import TTLCache, defer_invalidation, history_values
+from app.models import User, Course, CourseAnalyticsSnapshot
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 512
+
+# Versión de un ámbito que nunca se ha invalidado
+INITIAL_VERSION = '0'
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'status', 'content_type', 'etag'])
+
+# Ámbito del catálogo de materiales de Drive (app/materials_catalog.py)
+MATERIALS_SCOPE = 'materials'
+
+def user_scope(user_id):
+    """Ámbito de los datos de un usuario (nombre, tipo...)"""
+    return f'user:{user_id}'
+
+def course_scope(course_id):
+    """Ámbito de un curso y de su instantánea de analíticas"""
+    return f'course:{course_id}'
+
+def teacher_scope(teacher_id):
+    """Ámbito de la lista de cursos de un docente"""
+    return f'teacher:{teacher_id}'
+
+class MemoryResponseBackend:
+    """Respuestas en una LRU con expiración en la memoria del proceso"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        # Las versiones no se desalojan: perder una reactivaría entradas antiguas
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value)
+
+    def get_version(self, scope):
+        with self._lock:
+            return self._versions.get(scope, INITIAL_VERSION)
+
+    def set_version(self, scope, version):
+        with self._lock:
+            self._versions[scope] = version
+
+    def clear(self):
+        self.cache.clear()
+        with self._lock:
+            self._versions.clear()
+
+    def stats(self):
+        stats = self.cache.stats()
+        return {'entries': stats['entries'], 'max_entries': stats['max_entries'],
+                'evictions': stats['evictions'], 'expirations': stats['expirations']}
+
+class FileSystemResponseBackend:
+    """Respuestas en archivos de un directorio, compartidos entre procesos"""
+
+    def __init__(self, directory, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.join(directory, 'responses'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'versions'), exist_ok=True)
+
+    def get(self, key):
+        path = self._path('responses', key)
+        try:
+            if self.ttl_seconds and os.path.getmtime(path) + self.ttl_seconds <= time.time():
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                header, body = f.read().split(b'\n', 1)
+        except (OSError, ValueError):
+            return None
+
+        meta = json.loads(header)
+        return CachedResponse(body, meta['status'], meta['content_type'], meta['etag'])
+
+    def set(self, key, value):
+        header = json.dumps({'status': value.status, 'content_type': value.content_type, 'etag': value.etag})
+        self._write(self._path('responses', key), header.encode('utf-8') + b'\n' + value.body)
+
+    def get_version(self, scope):
+        try:
+            with open(self._path('versions', scope), encoding='utf-8') as f:
+                return f.read() or INITIAL_VERSION
+        except OSError:
+            return INITIAL_VERSION
+
+    def set_version(self, scope, version):
+        self._write(self._path('versions', scope), version.encode('utf-8'))
+
+    def clear(self):
+        for folder in ('responses', 'versions'):
+            folder_path = os.path.join(self.directory, folder)
+            for name in os.listdir(folder_path):
+                try:
+                    os.remove(os.path.join(folder_path, name))
+                except OSError:
+                    pass
+
+    def stats(self):
+        return {'entries': len(os.listdir(os.path.join(self.directory, 'responses')))}
+
+    def _path(self, folder, name):
+        return os.path.join(self.directory, folder, hashlib.sha256(name.encode('utf-8')).hexdigest())
+
+    def _write(self, path, data):
+        # Escritura atómica: otro proceso nunca lee un archivo a medias
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+class ResponseCache:
+    """Caché de respuestas con versiones por ámbito y contadores de uso"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bypasses = 0
+        self.invalidations = 0
+
+    def build_key(self, endpoint, view_args, user_id, scopes):
+        """
+        Construir la clave de una página
+
+        Args:
+            endpoint (str): Endpoint de Flask
+            view_args (dict): Argumentos de la ruta
+            user_id (int): Usuario autenticado
+            scopes (iterable): Ámbitos de datos de los que depende la página
+
+        Returns:
+            str: Clave con las versiones vigentes de los ámbitos
+        """
+        versions = sorted((scope, self.backend.get_version(scope)) for scope in set(scopes))
+        raw = json.dumps([
+            endpoint, sorted((view_args or {}).items()), sorted(request.args.items(multi=True)), user_id, versions
+        ], default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        value = self.backend.get(key)
+        self.record('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def invalidate(self, scopes):
+        """Dar una versión nueva a cada ámbito indicado"""
+        for scope in scopes:
+            self.backend.set_version(scope, uuid.uuid4().hex)
+            self.record('invalidations')
+
+    def clear(self):
+        """Vaciar respuestas y versiones"""
+        self.backend.clear()
+
+    def stats(self):
+        """Estadísticas de la caché (aciertos, fallos, 304...)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'not_modified': self.not_modified,
+                'bypasses': self.bypasses,
+                'invalidations': self.invalidations
+            }
+        stats.update(self.backend.stats())
+        return stats
+
+    def record(self, counter):
+        """Incrementar un contador de uso ('hits', 'not_modified', 'bypasses'...)"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+def create_response_backend(app):
+    """
+    Crear el almacenamiento configurado en ``RESPONSE_CACHE_BACKEND``
+
+    Returns:
+        Almacenamiento de respuestas, o None si la caché está desactivada
+    """
+    backend = (app.config.get('RESPONSE_CACHE_BACKEND') or 'memory').lower()
+    ttl_seconds = app.config.get('RESPONSE_CACHE_TTL', DEFAULT_TTL_SECONDS)
+
+    if backend == 'memory':
+        return MemoryResponseBackend(
+            max_entries=app.config.get('RESPONSE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+            ttl_seconds=ttl_seconds
+        )
+    if backend == 'filesystem':
+        return FileSystemResponseBackend(
+            app.config.get('RESPONSE_CACHE_DIR') or os.path.join(app.instance_path, 'response_cache'),
+            ttl_seconds=ttl_seconds
+        )
+    if backend == 'none':
+        return None
+    raise ValueError(f"RESPONSE_CACHE_BACKEND desconocido: {backend}")
+
+def get_response_cache(app=None):
+    """
+    Obtener la caché de respuestas de la aplicación, creándola si no existe
+
+    Returns:
+        ResponseCache: Caché compartida, o None si está desactivada
+    """
+    app = app or current_app._get_current_object()
+    if 'response_cache' not in app.extensions:
+        backend = create_response_backend(app)
+        app.extensions.setdefault('response_cache', ResponseCache(backend) if backend else None)
+    return app.extensions['response_cache']
+
+def cached_response(depends_on=None):
+    """
+    Cachear por usuario la respuesta HTML de una vista autenticada
+
+    Se aplica debajo de ``login_required``. Solo se guardan respuestas 200 de
+    peticiones GET/HEAD; las redirecciones (p. ej. acceso denegado) y las
+    páginas con mensajes flash se sirven sin caché.
+
+    Args:
+        depends_on (callable): Recibe los argumentos de la ruta y devuelve los
+            ámbitos de datos que lee la página; el ámbito del usuario se
+            incluye siempre
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache()
+            if cache is None or request.method not in ('GET', 'HEAD') or not current_user.is_authenticated:
+                return view(*args, **kwargs)
+
+            # Un mensaje flash pendiente se mostraría en la página cacheada
+            if '_flashes' in session:
+                cache.record('bypasses')
+                return view(*args, **kwargs)
+
+            scopes = [user_scope(current_user.id)]
+            if depends_on is not None:
+                scopes.extend(depends_on(**kwargs))
+            key = cache.build_key(request.endpoint, kwargs, current_user.id, scopes)
+
+            cached = cache.get(key)
+            if cached is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if (response.status_code != 200 or response.direct_passthrough
+                        or '_flashes' in session or get_flashed_messages()):
+                    return response
+                body = response.get_data()
+                cached = CachedResponse(body, response.status_code, response.content_type,
+                                        hashlib.sha256(body).hexdigest()[:32])
+                cache.set(key, cached)
+            else:
+                response = current_app.response_class(cached.body, status=cached.status,
+                                                      content_type=cached.content_type)
+
+            response.set_etag(cached.etag)
+            # Privada (por usuario) y siempre revalidada con el ETag
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+
+            response = response.make_conditional(request)
+            if response.status_code == 304:
+                cache.record('not_modified')
+            return response
+
+        return wrapper
+    return decorator
+
+def invalidate_responses(scopes, session=None):
+    """
+    Invalidar las páginas que dependen de los ámbitos indicados
+
+    Las escrituras masivas no disparan los eventos del ORM y deben llamar a
+    esta función explícitamente.
+
+    Args:
+        scopes (iterable): Ámbitos a invalidar (user_scope, course_scope...)
+        session (Session): Si se indica, se vuelve a invalidar al confirmar su transacción
+    """
+    defer_invalidation(session, _invalidate_scopes, scopes)
+
+def _invalidate_scopes(scopes):
+    """Invalidar los ámbitos indicados en la aplicación actual"""
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        return
+    cache.invalidate(scopes)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _on_user_change(mapper, connection, target):
+    """Invalidar las páginas del usuario modificado (nombre, tipo...)"""
+    invalidate_responses({user_scope(target.id)}, inspect(target).session)
+
+@event.listens_for(Course, 'after_insert')
+@event.listens_for(Course, 'after_update')
+@event.listens_for(Course, 'after_delete')
+def _on_course_change(mapper, connection, target):
+    """Invalidar las páginas del curso y las listas de cursos de su docente"""
+    scopes = {course_scope(target.id)}
+    scopes.update(teacher_scope(teacher_id) for teacher_id in history_values(target, 'teacher_id'))
+    invalidate_responses(scopes, inspect(target).session)
+
+@event.listens_for(CourseAnalyticsSnapshot, 'after_insert')
+@event.listens_for(CourseAnalyticsSnapshot, 'after_update')
+@event.listens_for(CourseAnalyticsSnapshot, 'after_delete')
+def _on_snapshot_change(mapper, connection, target):
+    """Invalidar las páginas que muestran la instantánea de analíticas del curso"""
+    invalidate_responses({course_scope(target.course_id)}, inspect(target).session)
@@ -7,10 +7,17 @@ from flask_login import login_required, current_user
 from app.student import bp
 from app.models import Student, Course, DiagnosticExam, LearningPath, VARKQuestion, VARKResponse
 from app import db
+from app.unit_of_work import commit_or_flush, transactional
 from app.student.forms import VARKForm
 from app.ai.learning_path_generator import LearningPathGenerator
 from app.ai.vark_analyzer import VARKAnalyzer
 from app.ai.vark_forms_integration import VARKFormsIntegration
+from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+from app.ai.student_dashboard import get_student_dashboard
+from app.response_cache import MATERIALS_SCOPE, cached_response, course_scope
+from app.materials_catalog import get_materials_catalog
+from app.webhook_queue import KIND_VARK, enqueue_response, queue_intake_enabled, webhook_intake_authorized
+from app.progress_buffer import flush_pending_progress
 from datetime import datetime
 import json
 from config import Config
@@ -28,36 +35,11 @@ def dashboard():
         flash('Perfil de estudiante no encontrado.', 'error')
         return redirect(url_for('auth.logout'))
     
-    # Obtener cursos matriculados
-    enrollments = student.enrollments
-    active_courses = [e.course for e in enrollments if e.is_active]
-    
-    # Obtener progreso general
-    total_progress = sum(e.overall_progress for e in enrollments if e.is_active)
-    avg_progress = total_progress / len(active_courses) if active_courses else 0
-    
-    # Obtener exámenes diagnósticos completados
-    completed_diagnostics = DiagnosticExam.query.filter_by(
-        student_id=student.id, 
-        is_completed=True
-    ).count()
-    
-    # Obtener rutas de aprendizaje activas
-    active_learning_paths = LearningPath.query.filter_by(
-        student_id=student.id,
-        is_active=True
-    ).count()
-    
-    dashboard_data = {
-        'student': student,
-        'courses': active_courses,
-        'avg_progress': avg_progress,
-        'completed_diagnostics': completed_diagnostics,
-        'active_learning_paths': active_learning_paths,
-        'vark_profile': student.get_vark_profile() if student.diagnostic_completed else None
-    }
+    # Vista de lectura en caché: cursos, progreso, diagnósticos, rutas y perfil VARK
+    flush_pending_progress(student_id=student.id)
+    view = get_student_dashboard(student.id)
     
-    return render_template('student/dashboard.html', title='Mi Dashboard', **dashboard_data)
+    return render_template('student/dashboard.html', title='Mi Dashboard', **view.template_context())
 
 @bp.route('/profile')
 @login_required
@@ -75,6 +57,7 @@ def profile():
 
 @bp.route('/profile/learning-style', methods=['POST'])
 @login_required
+@transactional
 def update_learning_style():
     """Actualizar manualmente el estilo de aprendizaje detectado (VARK)"""
     if current_user.user_type.value != 'student':
@@ -91,12 +74,13 @@ def update_learning_style():
 
     # Solo actualiza el dominante; puntajes se mantienen si existen
     student.dominant_learning_style = style
-    db.session.commit()
+    commit_or_flush()
     flash('Estilo de aprendizaje actualizado.', 'success')
     return redirect(url_for('student.profile'))
 
 @bp.route('/resources')
 @login_required
+@cached_response()
 def resources():
     """Recursos de aprendizaje del estudiante"""
     if current_user.user_type.value != 'student':
@@ -106,16 +90,30 @@ def resources():
     return render_template('student/resources.html',
                          title='Recursos de Aprendizaje')
 
+def _materials_scopes(**kwargs):
+    """Ámbitos de las páginas que muestran el catálogo de materiales"""
+    # Revisar antes de calcular la clave si drive_config.py cambió (la recarga invalida el ámbito)
+    get_materials_catalog().snapshot()
+    scopes = [MATERIALS_SCOPE]
+    if 'course_id' in kwargs:
+        scopes.append(course_scope(kwargs['course_id']))
+    return scopes
+
 @bp.route('/all-courses')
 @login_required
+@cached_response(depends_on=_materials_scopes)
 def all_courses():
     """Todos los cursos con enlaces a Drive"""
     if current_user.user_type.value != 'student':
         flash('Acceso denegado.', 'error')
         return redirect(url_for('main.index'))
     
+    catalog = get_materials_catalog().snapshot()
+    
     return render_template('student/all_courses.html',
-                         title='Todos los Cursos')
+                         title='Todos los Cursos',
+                         materials=catalog.courses,
+                         main_folder=catalog.main_folder)
 
 @bp.route('/courses')
 @login_required
@@ -134,18 +132,21 @@ def courses():
 
 @bp.route('/course/<int:course_id>/units')
 @login_required
+@cached_response(depends_on=_materials_scopes)
 def course_units(course_id):
     """Ver unidades del curso con enlaces a Drive"""
     if current_user.user_type.value != 'student':
         flash('Acceso denegado.', 'error')
         return redirect(url_for('main.index'))
     
-    student = current_user.student_profile
     course = Course.query.get_or_404(course_id)
+    catalog = get_materials_catalog().snapshot()
     
     return render_template('student/course_units.html',
                          title=f'Unidades - {course.name}',
-                         course=course)
+                         course=course,
+                         materials=catalog.for_course(course),
+                         main_folder=catalog.main_folder)
 
 @bp.route('/course/<int:course_id>')
 @login_required
@@ -186,6 +187,7 @@ def course_detail(course_id):
 
 @bp.route('/diagnostic/<int:course_id>')
 @login_required
+@transactional
 def diagnostic_exam(course_id):
     """Examen diagnóstico para un curso"""
     if current_user.user_type.value != 'student':
@@ -243,7 +245,8 @@ def diagnostic_exam(course_id):
             total_questions=course.min_diagnostic_questions or 25
         )
         db.session.add(diagnostic)
-        db.session.commit()
+        AnalyticsSnapshotRefresher().record_diagnostic_created(diagnostic)
+        commit_or_flush()
     
     # Obtener preguntas del examen (flujo genérico solo si no hay formulario externo)
     questions = get_diagnostic_questions(course_id, diagnostic.total_questions)
@@ -288,6 +291,7 @@ def diagnostic_external_form(course_id):
 
 @bp.route('/diagnostic/<int:course_id>', methods=['POST'])
 @login_required
+@transactional
 def submit_diagnostic(course_id):
     """Procesar respuestas del examen diagnóstico"""
     if current_user.user_type.value != 'student':
@@ -317,6 +321,7 @@ def submit_diagnostic(course_id):
     correct_answers = random.randint(int(total_questions * 0.6), total_questions)
     
     # Actualizar examen
+    was_completed = diagnostic.is_completed
     diagnostic.is_completed = True
     diagnostic.completed_at = datetime.utcnow()
     diagnostic.total_score = correct_answers
@@ -327,7 +332,9 @@ def submit_diagnostic(course_id):
     student.diagnostic_score = diagnostic.percentage
     student.diagnostic_date = datetime.utcnow()
     
-    db.session.commit()
+    AnalyticsSnapshotRefresher().record_diagnostic_completed(diagnostic, was_completed)
+    
+    commit_or_flush()
     
     flash(f'¡Examen completado! Tu calificación: {diagnostic.percentage:.1f}%', 'success')
     return redirect(url_for('student.course_detail', course_id=course_id))
@@ -359,6 +366,7 @@ def vark_questionnaire():
 
 @bp.route('/vark-questionnaire', methods=['POST'])
 @login_required
+@transactional
 def submit_vark_questionnaire():
     """Procesar respuestas del cuestionario VARK"""
     if current_user.user_type.value != 'student':
@@ -395,7 +403,7 @@ def submit_vark_questionnaire():
         vark_scores['kinesthetic']
     )
     
-    db.session.commit()
+    commit_or_flush()
     
     flash('¡Cuestionario completado! Tu estilo de aprendizaje ha sido identificado.', 'success')
     return redirect(url_for('student.course_selection'))
@@ -446,6 +454,7 @@ def course_selection():
 
 @bp.route('/enroll-course/<int:course_id>')
 @login_required
+@transactional
 def enroll_course(course_id):
     """Matricular estudiante en un curso"""
     if current_user.user_type.value != 'student':
@@ -471,7 +480,7 @@ def enroll_course(course_id):
     )
     
     db.session.add(enrollment)
-    db.session.commit()
+    commit_or_flush()
     
     flash(f'¡Te has matriculado exitosamente en {course.name}!', 'success')
     return redirect(url_for('student.diagnostic_exam', course_id=course_id))
@@ -501,12 +510,30 @@ def vark_external_form():
                          student_id=student.id)
 
 @bp.route('/vark-completed/<int:student_id>', methods=['POST'])
+@transactional
 def vark_completed_webhook(student_id):
     """Webhook para procesar respuestas del formulario VARK externo"""
+    if not webhook_intake_authorized():
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+    
     try:
         # Obtener datos del formulario
         form_data = request.form.to_dict()
         
+        # En modo cola se encola y el trabajador procesa las respuestas
+        if queue_intake_enabled():
+            if not form_data:
+                return jsonify({
+                    'success': False,
+                    'error': 'No se proporcionaron datos del formulario'
+                }), 400
+            
+            body, status = enqueue_response(KIND_VARK, {
+                'student_id': student_id,
+                'responses': form_data
+            }, request.headers.get('Idempotency-Key'))
+            return jsonify(dict(body, success=True)), status
+        
         # Procesar respuestas usando la integración VARK
         vark_integration = VARKFormsIntegration()
         result = vark_integration.process_vark_responses_from_forms(student_id, form_data)
@@ -532,6 +559,7 @@ def vark_completed_webhook(student_id):
 
 @bp.route('/vark-manual-sync/<int:student_id>', methods=['POST'])
 @login_required
+@transactional
 def vark_manual_sync(student_id):
     """Sincronización manual de respuestas VARK desde Google Forms"""
     if current_user.user_type.value != 'student':
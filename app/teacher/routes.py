@@ -2,15 +2,25 @@
 Rutas para docentes
 """
 
-from flask import render_template, request, redirect, url_for, flash, jsonify
+from flask import render_template, request, redirect, url_for, flash, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from app.teacher import bp
-from app.models import Teacher, Course, Student, DiagnosticExam, LearningPath, Progress
+from app.models import Teacher, Course, CourseEnrollment, Student, User, DiagnosticExam, LearningPath, Progress
 from app import db
+from app.unit_of_work import commit_or_flush, transactional
 from app.teacher.forms import CourseForm, QuestionForm
+from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+from app.response_cache import cached_response, course_scope, teacher_scope
+from app.course_export import CourseExporter, ExportError, EXPORT_FORMATS
+from app.progress_buffer import flush_pending_progress
 from sqlalchemy import func
+from sqlalchemy.orm import contains_eager
 import json
 
+# Paginación de la lista de estudiantes de un curso
+COURSE_STUDENTS_PER_PAGE = 25
+COURSE_STUDENTS_MAX_PER_PAGE = 100
+
 @bp.route('/dashboard')
 @login_required
 def dashboard():
@@ -124,36 +134,83 @@ def course_students(course_id):
         flash('Acceso denegado a este curso.', 'error')
         return redirect(url_for('teacher.courses'))
     
-    # Obtener estudiantes con información detallada
-    enrollments = course.enrollments
-    students_data = []
+    # Paginación y orden del lado del servidor
+    page = request.args.get('page', 1, type=int)
+    per_page = min(max(request.args.get('per_page', COURSE_STUDENTS_PER_PAGE, type=int), 1),
+                   COURSE_STUDENTS_MAX_PER_PAGE)
+    sort = request.args.get('sort', 'name')
+    order = 'desc' if request.args.get('order') == 'desc' else 'asc'
+    
+    # Mejor puntaje diagnóstico del estudiante en el curso, para ordenar
+    diagnostic_score = db.session.query(func.max(DiagnosticExam.percentage)).filter(
+        DiagnosticExam.course_id == course_id,
+        DiagnosticExam.student_id == CourseEnrollment.student_id
+    ).correlate(CourseEnrollment).scalar_subquery()
+    
+    sort_columns = {
+        'name': (User.last_name, User.first_name),
+        'student_id': (Student.student_id,),
+        'progress': (CourseEnrollment.overall_progress,),
+        'enrolled': (CourseEnrollment.enrollment_date,),
+        'diagnostic': (diagnostic_score,)
+    }
+    if sort not in sort_columns:
+        sort = 'name'
+    order_by = [column.desc() if order == 'desc' else column.asc() for column in sort_columns[sort]]
+    
+    # Matrículas activas con estudiante y usuario en una sola consulta por página
+    pagination = CourseEnrollment.query.join(
+        CourseEnrollment.student
+    ).join(
+        Student.user
+    ).options(
+        contains_eager(CourseEnrollment.student).contains_eager(Student.user)
+    ).filter(
+        CourseEnrollment.course_id == course_id,
+        CourseEnrollment.is_active == True
+    ).order_by(*order_by, CourseEnrollment.id).paginate(
+        page=page,
+        per_page=per_page,
+        error_out=False
+    )
+    
+    student_ids = [enrollment.student_id for enrollment in pagination.items]
+    
+    # Diagnósticos y rutas activas de los estudiantes de la página (una consulta cada uno)
+    diagnostics = {}
+    learning_paths = {}
+    if student_ids:
+        for diagnostic in DiagnosticExam.query.filter(
+            DiagnosticExam.course_id == course_id,
+            DiagnosticExam.student_id.in_(student_ids)
+        ).order_by(DiagnosticExam.id).all():
+            diagnostics.setdefault(diagnostic.student_id, diagnostic)
+        
+        for learning_path in LearningPath.query.filter(
+            LearningPath.course_id == course_id,
+            LearningPath.student_id.in_(student_ids),
+            LearningPath.is_active == True
+        ).order_by(LearningPath.id).all():
+            learning_paths.setdefault(learning_path.student_id, learning_path)
     
-    for enrollment in enrollments:
-        if enrollment.is_active:
-            student = enrollment.student
-            diagnostic = DiagnosticExam.query.filter_by(
-                course_id=course_id,
-                student_id=student.id
-            ).first()
-            
-            learning_path = LearningPath.query.filter_by(
-                course_id=course_id,
-                student_id=student.id,
-                is_active=True
-            ).first()
-            
-            students_data.append({
-                'student': student,
-                'enrollment': enrollment,
-                'diagnostic': diagnostic,
-                'learning_path': learning_path,
-                'vark_profile': student.get_vark_profile() if student.diagnostic_completed else None
-            })
+    students_data = []
+    for enrollment in pagination.items:
+        student = enrollment.student
+        students_data.append({
+            'student': student,
+            'enrollment': enrollment,
+            'diagnostic': diagnostics.get(student.id),
+            'learning_path': learning_paths.get(student.id),
+            'vark_profile': student.get_vark_profile() if student.diagnostic_completed else None
+        })
     
     return render_template('teacher/course_students.html',
                          title=f'Estudiantes - {course.name}',
                          course=course,
-                         students_data=students_data)
+                         students_data=students_data,
+                         pagination=pagination,
+                         sort=sort,
+                         order=order)
 
 @bp.route('/student/<int:student_id>/progress')
 @login_required
@@ -172,7 +229,8 @@ def student_progress(student_id):
         flash('No tienes acceso a este estudiante.', 'error')
         return redirect(url_for('teacher.dashboard'))
     
-    # Obtener progreso del estudiante
+    # Obtener progreso del estudiante (incluidos los eventos aún en el buffer)
+    flush_pending_progress(student_id=student_id)
     progress_records = Progress.query.filter_by(student_id=student_id).all()
     
     # Obtener rutas de aprendizaje
@@ -185,8 +243,17 @@ def student_progress(student_id):
                          progress_records=progress_records,
                          learning_paths=learning_paths)
 
+def _analytics_scopes():
+    """Ámbitos de la página de analíticas: la lista de cursos del docente y cada curso"""
+    teacher = current_user.teacher_profile
+    if teacher is None:
+        return []
+    course_ids = [course_id for (course_id,) in db.session.query(Course.id).filter_by(teacher_id=teacher.id)]
+    return [teacher_scope(teacher.id)] + [course_scope(course_id) for course_id in course_ids]
+
 @bp.route('/analytics')
 @login_required
+@cached_response(depends_on=_analytics_scopes)
 def analytics():
     """Analíticas y reportes"""
     if current_user.user_type.value != 'teacher':
@@ -204,30 +271,28 @@ def analytics():
         'diagnostic_completion': 0
     }
     
+    # Cada curso se lee de su instantánea materializada (una fila por curso)
+    refresher = AnalyticsSnapshotRefresher()
+    
     for course in courses:
-        enrollments = course.enrollments
-        active_enrollments = [e for e in enrollments if e.is_active]
+        snapshot = refresher.get_snapshot(course.id)
+        active_students = snapshot.enrollments_active if snapshot else 0
         
-        if active_enrollments:
-            avg_progress = sum(e.overall_progress for e in active_enrollments) / len(active_enrollments)
+        if active_students:
+            avg_progress = (snapshot.enrollment_progress_sum or 0) / active_students
             analytics_data['courses'].append({
                 'name': course.name,
-                'students': len(active_enrollments),
+                'students': active_students,
                 'avg_progress': avg_progress * 100
             })
             
             # Contar estilos de aprendizaje
-            for enrollment in active_enrollments:
-                student = enrollment.student
-                if student.dominant_learning_style:
-                    analytics_data['learning_styles'][student.dominant_learning_style] += 1
+            for style, count in (snapshot.style_counts or {}).items():
+                if style in analytics_data['learning_styles']:
+                    analytics_data['learning_styles'][style] += count
             
             # Contar diagnósticos completados
-            completed = DiagnosticExam.query.filter_by(
-                course_id=course.id,
-                is_completed=True
-            ).count()
-            analytics_data['diagnostic_completion'] += completed
+            analytics_data['diagnostic_completion'] += snapshot.diagnostics_completed or 0
     
     return render_template('teacher/analytics.html',
                          title='Analíticas',
@@ -235,6 +300,7 @@ def analytics():
 
 @bp.route('/create-course', methods=['GET', 'POST'])
 @login_required
+@transactional
 def create_course():
     """Crear nuevo curso"""
     if current_user.user_type.value != 'teacher':
@@ -258,7 +324,7 @@ def create_course():
         )
         
         db.session.add(course)
-        db.session.commit()
+        commit_or_flush()
         
         flash('¡Curso creado exitosamente!', 'success')
         return redirect(url_for('teacher.course_detail', course_id=course.id))
@@ -296,3 +362,34 @@ def api_course_stats(course_id):
     }
     
     return jsonify(stats)
+
+@bp.route('/course/<int:course_id>/export')
+@login_required
+def export_course(course_id):
+    """Descargar en streaming el progreso y los diagnósticos de un curso (CSV, JSONL o Parquet)"""
+    if current_user.user_type.value != 'teacher':
+        return jsonify({'error': 'Acceso denegado'}), 403
+
+    teacher = current_user.teacher_profile
+    course = Course.query.get_or_404(course_id)
+
+    # Verificar que el curso pertenece al docente
+    if not teacher or course.teacher_id != teacher.id:
+        return jsonify({'error': 'Acceso denegado'}), 403
+
+    export_format = request.args.get('format', 'csv')
+    dataset = request.args.get('dataset', 'progress')
+    exporter = CourseExporter(course.id, chunk_size=current_app.config.get('EXPORT_CHUNK_SIZE', 1000))
+    try:
+        chunks = exporter.stream(dataset, export_format)
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # La exportación incluye los eventos de progreso aún en el buffer
+    flush_pending_progress(course_id=course.id)
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f'{course.code or course.id}_{dataset}.{extension}'
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store'
+    })
@@ -0,0 +1,118 @@
+"""
+Unidad de trabajo: una sola confirmación por acción del usuario
+
+Las rutas que modifican datos se decoran con ``transactional`` (o usan
+``with unit_of_work():``) y la transacción se confirma una sola vez al
+terminar la vista; si la vista lanza una excepción, o devuelve una respuesta
+de error (estado 400 o superior, como las que atrapan una excepción y
+responden 500), se revierte. Los métodos
+de los modelos solo modifican el estado, y los motores de IA llaman a
+``commit_or_flush``: fuera de una unidad de trabajo confirman como antes y
+dentro de ella solo envían los cambios (para obtener IDs) y dejan la
+confirmación a la unidad de trabajo.
+
+``MODEL_AUTOCOMMIT = True`` (o ``commit=True`` en la llamada) devuelve a los
+métodos de los modelos su confirmación anterior, para código que todavía la
+espera.
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, has_app_context
+from app import db
+
+_DEPTH_KEY = 'unit_of_work_depth'
+
+def in_unit_of_work(session=None):
+    """Indicar si hay una unidad de trabajo abierta en la sesión"""
+    session = session or db.session
+    return session.info.get(_DEPTH_KEY, 0) > 0
+
+@contextmanager
+def unit_of_work(session=None):
+    """
+    Abrir una unidad de trabajo que confirma la transacción al salir
+
+    Las unidades anidadas no confirman: solo lo hace la más externa.
+
+    Args:
+        session (Session): Sesión a usar (por defecto db.session)
+
+    Yields:
+        Session: La sesión de la unidad de trabajo
+    """
+    session = session or db.session
+    info = session.info
+    depth = info.get(_DEPTH_KEY, 0)
+    info[_DEPTH_KEY] = depth + 1
+    try:
+        yield session
+        if depth == 0:
+            session.commit()
+    except Exception:
+        if depth == 0:
+            session.rollback()
+        raise
+    finally:
+        info[_DEPTH_KEY] = depth
+
+class _ErrorResponse(Exception):
+    """Respuesta de error de una vista; revierte la unidad de trabajo al atravesarla"""
+
+    def __init__(self, response):
+        super().__init__(response)
+        self.response = response
+
+def _response_status(rv):
+    """
+    Código de estado de lo que devuelve una vista
+
+    Args:
+        rv: Response, tupla (cuerpo, estado[, cabeceras]) o cualquier otro valor
+
+    Returns:
+        int: Estado HTTP (200 si el valor no indica ninguno)
+    """
+    if isinstance(rv, tuple) and len(rv) > 1 and isinstance(rv[1], int):
+        return rv[1]
+    status = getattr(rv, 'status_code', None)
+    return status if isinstance(status, int) else 200
+
+def transactional(view):
+    """
+    Decorador que ejecuta una vista (o función) dentro de una unidad de trabajo
+
+    Si la vista devuelve una respuesta de error (estado >= 400) la transacción
+    se revierte y la respuesta se entrega igual.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            with unit_of_work():
+                rv = view(*args, **kwargs)
+                if _response_status(rv) >= 400:
+                    raise _ErrorResponse(rv)
+                return rv
+        except _ErrorResponse as e:
+            return e.response
+    return wrapper
+
+def commit_or_flush(session=None):
+    """Confirmar la transacción o, dentro de una unidad de trabajo, solo enviar los cambios"""
+    session = session or db.session
+    if in_unit_of_work(session):
+        session.flush()
+    else:
+        session.commit()
+
+def autocommit(commit=None):
+    """
+    Confirmar al final de un método de modelo solo si se pidió
+
+    Args:
+        commit (bool): True para confirmar; None usa MODEL_AUTOCOMMIT
+    """
+    if commit is None:
+        commit = has_app_context() and current_app.config.get('MODEL_AUTOCOMMIT', False)
+    if commit:
+        commit_or_flush()
@@ -0,0 +1,451 @@
+"""
+Cola duradera de webhooks de Google Forms
+
+En modo de ingesta ``queue`` (``WEBHOOK_INTAKE_MODE``) los endpoints de
+webhooks solo validan la carga, la guardan en una cola SQLite local y
+responden 202. Un conjunto de hilos trabajadores vacía la cola por lotes
+usando las integraciones existentes (GoogleFormsIntegration y
+VARKFormsIntegration). Cada trabajo tiene una clave de idempotencia, de modo
+que un webhook reintentado no se procesa dos veces: la clave del cliente
+(cabecera ``Idempotency-Key``) deduplica siempre, y sin ella la carga idéntica
+solo se descarta dentro de ``WEBHOOK_DEDUP_WINDOW`` segundos.
+
+Si ``WEBHOOK_SECRET`` está configurado, los endpoints de webhooks exigen la
+cabecera ``X-Webhook-Secret`` y el estado de un trabajo solo se entrega con el
+secreto o a un docente o administrador autenticado.
+"""
+
+from contextlib import closing
+from datetime import datetime
+from flask import current_app, request, url_for
+from flask_login import current_user
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# Estados de un trabajo
+STATUS_QUEUED = 'queued'
+STATUS_PROCESSING = 'processing'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# Tipos de trabajo
+KIND_DIAGNOSTIC = 'diagnostic'
+KIND_VARK = 'vark'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_jobs (
+    id TEXT PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_webhook_jobs_status ON webhook_jobs (status, created_at);
+"""
+
+class WebhookQueue:
+    """Cola de trabajos respaldada por un archivo SQLite"""
+
+    def __init__(self, path, max_attempts=3, visibility_timeout=300, dedup_window=900):
+        """
+        Args:
+            path (str): Ruta del archivo SQLite de la cola
+            max_attempts (int): Intentos antes de marcar un trabajo como fallido
+            visibility_timeout (int): Segundos tras los que un trabajo en
+                proceso se considera abandonado y vuelve a la cola
+            dedup_window (int): Segundos durante los que una carga idéntica sin
+                clave del cliente se trata como reintento del mismo webhook
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.dedup_window = dedup_window
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    def enqueue(self, kind, payload, idempotency_key=None):
+        """
+        Encolar un trabajo
+
+        Args:
+            kind (str): Tipo de trabajo (KIND_DIAGNOSTIC o KIND_VARK)
+            payload (dict): Datos del webhook
+            idempotency_key (str): Clave enviada por el cliente; deduplica sin
+                límite de tiempo. Si falta, la carga idéntica solo se considera
+                repetida dentro de ``dedup_window`` segundos
+
+        Returns:
+            tuple: (trabajo, True si ya existía un trabajo con la misma clave)
+        """
+        body = json.dumps(payload, sort_keys=True, default=str)
+        now = time.time()
+
+        if idempotency_key:
+            key = f'{kind}:{idempotency_key}'
+            with closing(self._connect()) as conn:
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO webhook_jobs '
+                    '(id, idempotency_key, kind, payload, status, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (uuid.uuid4().hex, key, kind, body, STATUS_QUEUED, now, now)
+                )
+                row = conn.execute('SELECT * FROM webhook_jobs WHERE idempotency_key = ?', (key,)).fetchone()
+            return self._to_job(row), cursor.rowcount == 0
+
+        # Sin clave del cliente: la huella del contenido más un sufijo único, y se
+        # reutiliza el trabajo más reciente con la misma huella dentro de la ventana.
+        # El rango sobre el índice único de la clave cubre todos los sufijos
+        # (';' es el carácter siguiente a ':')
+        prefix = f'{kind}:sha256:{hashlib.sha256(body.encode("utf-8")).hexdigest()}:'
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT * FROM webhook_jobs WHERE idempotency_key > ? AND idempotency_key < ? '
+                'AND created_at >= ? ORDER BY created_at DESC LIMIT 1',
+                (prefix, prefix[:-1] + ';', now - self.dedup_window)
+            ).fetchone()
+            duplicate = row is not None
+            if not duplicate:
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    'INSERT INTO webhook_jobs '
+                    '(id, idempotency_key, kind, payload, status, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (job_id, prefix + job_id, kind, body, STATUS_QUEUED, now, now)
+                )
+                row = conn.execute('SELECT * FROM webhook_jobs WHERE id = ?', (job_id,)).fetchone()
+            conn.execute('COMMIT')
+
+        return self._to_job(row), duplicate
+
+    def enqueue_many(self, kind, items):
+        """
+        Encolar varios trabajos con clave del cliente en una sola transacción
+
+        Args:
+            kind (str): Tipo de trabajo
+            items (list): Pares (payload, idempotency_key)
+
+        Returns:
+            tuple: (trabajos nuevos, trabajos que ya existían)
+        """
+        now = time.time()
+        rows = [
+            (uuid.uuid4().hex, f'{kind}:{key}', kind, json.dumps(payload, sort_keys=True, default=str),
+             STATUS_QUEUED, now, now)
+            for payload, key in items
+        ]
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT OR IGNORE INTO webhook_jobs '
+                '(id, idempotency_key, kind, payload, status, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            created = conn.total_changes - before
+            conn.execute('COMMIT')
+
+        return created, len(rows) - created
+
+    def claim(self, limit):
+        """
+        Reservar hasta ``limit`` trabajos pendientes para procesarlos
+
+        Los trabajos en proceso que superaron el tiempo de visibilidad (por
+        ejemplo, de un trabajador que terminó abruptamente) vuelven a la cola.
+
+        Returns:
+            list: Trabajos reservados, del más antiguo al más reciente
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'UPDATE webhook_jobs SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?',
+                (STATUS_QUEUED, now, STATUS_PROCESSING, now - self.visibility_timeout)
+            )
+            rows = conn.execute(
+                'SELECT * FROM webhook_jobs WHERE status = ? ORDER BY created_at LIMIT ?',
+                (STATUS_QUEUED, limit)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE webhook_jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?',
+                [(STATUS_PROCESSING, now, row['id']) for row in rows]
+            )
+            conn.execute('COMMIT')
+
+        jobs = [self._to_job(row) for row in rows]
+        for job in jobs:
+            job['status'] = STATUS_PROCESSING
+            job['attempts'] += 1
+        return jobs
+
+    def complete(self, job_id, result):
+        """Marcar un trabajo como terminado (con éxito o con un error de negocio)"""
+        status = STATUS_DONE if result.get('success') else STATUS_FAILED
+        self._finish(job_id, status, result=json.dumps(result, default=str), error=result.get('error'))
+
+    def retry(self, job_id, attempts, error):
+        """Devolver un trabajo a la cola tras un error inesperado, o marcarlo fallido si agotó los intentos"""
+        status = STATUS_QUEUED if attempts < self.max_attempts else STATUS_FAILED
+        self._finish(job_id, status, error=error)
+
+    def get(self, job_id):
+        """Obtener un trabajo por su ID (None si no existe)"""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM webhook_jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def stats(self):
+        """Número de trabajos por estado"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT status, COUNT(*) FROM webhook_jobs GROUP BY status').fetchall()
+        counts = {status: 0 for status in (STATUS_QUEUED, STATUS_PROCESSING, STATUS_DONE, STATUS_FAILED)}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE webhook_jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?',
+                (status, result, error, time.time(), job_id)
+            )
+
+    def _connect(self):
+        # Autocommit: cada sentencia es su propia transacción salvo BEGIN explícito
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _to_job(self, row):
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'payload': json.loads(row['payload']),
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': datetime.utcfromtimestamp(row['created_at']).isoformat(),
+            'updated_at': datetime.utcfromtimestamp(row['updated_at']).isoformat()
+        }
+
+class WebhookWorkerPool:
+    """Hilos que vacían la cola de webhooks por lotes"""
+
+    def __init__(self, app, queue, workers=2, batch_size=20, poll_interval=1.0):
+        self.app = app
+        self.queue = queue
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Arrancar los hilos trabajadores"""
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'webhook-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Detener los hilos al terminar su lote actual"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def drain(self):
+        """
+        Procesar la cola en el hilo actual hasta vaciarla
+
+        Returns:
+            int: Trabajos procesados
+        """
+        processed = 0
+        while True:
+            count = self.process_batch()
+            if not count:
+                return processed
+            processed += count
+
+    def process_batch(self):
+        """
+        Reservar y procesar un lote de trabajos
+
+        Returns:
+            int: Trabajos del lote
+        """
+        jobs = self.queue.claim(self.batch_size)
+        if not jobs:
+            return 0
+
+        from app import db
+
+        with self.app.app_context():
+            try:
+                for job in jobs:
+                    try:
+                        result = process_job(job)
+                        self.queue.complete(job['id'], result)
+                    except Exception as e:
+                        db.session.rollback()
+                        self.app.logger.error(f"Error procesando webhook {job['id']}: {str(e)}")
+                        self.queue.retry(job['id'], job['attempts'], str(e))
+            finally:
+                db.session.remove()
+
+        return len(jobs)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.process_batch():
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                self.app.logger.error(f"Error en el trabajador de webhooks: {str(e)}")
+                self._stop.wait(self.poll_interval)
+
+def process_job(job):
+    """
+    Procesar un trabajo con la integración correspondiente
+
+    Returns:
+        dict: Resultado de la integración (``success`` y datos o ``error``)
+    """
+    payload = job['payload']
+
+    if job['kind'] == KIND_DIAGNOSTIC:
+        from app.ai.google_forms_integration import GoogleFormsIntegration
+        from app.models import Student, User
+
+        student = Student.query.join(Student.user).filter(User.email == payload['student_email']).first()
+        if not student:
+            return {'success': False, 'error': 'Estudiante no encontrado'}
+        return GoogleFormsIntegration().process_diagnostic_responses(student.id, payload['responses'])
+
+    if job['kind'] == KIND_VARK:
+        from app.ai.vark_forms_integration import VARKFormsIntegration
+        return VARKFormsIntegration().process_vark_responses_from_forms(payload['student_id'], payload['responses'])
+
+    return {'success': False, 'error': f"Tipo de trabajo desconocido: {job['kind']}"}
+
+def enqueue_form_responses(queue, form_id, responses):
+    """
+    Encolar como diagnósticos las respuestas descargadas de un formulario
+
+    La clave de idempotencia (formulario, ``responseId`` y ``lastSubmittedTime``)
+    evita procesar dos veces una respuesta descargada de nuevo (por ejemplo con
+    ``--full``), pero una respuesta editada en Google Forms se procesa otra vez.
+
+    Returns:
+        dict: ``queued`` (trabajos nuevos) y ``duplicates``
+    """
+    from app.ai.forms_response_puller import diagnostic_payload
+
+    created, duplicates = queue.enqueue_many(KIND_DIAGNOSTIC, [
+        (diagnostic_payload(item), f"forms:{form_id}:{item.get('responseId')}:{item.get('lastSubmittedTime')}")
+        for item in responses
+    ])
+    return {'queued': created, 'duplicates': duplicates}
+
+def queue_intake_enabled(app=None):
+    """Indicar si los webhooks se encolan en lugar de procesarse en la petición"""
+    app = app or current_app
+    return app.config.get('WEBHOOK_INTAKE_MODE') == 'queue'
+
+def webhook_secret_valid():
+    """Indicar si la petición trae el secreto de webhooks configurado (X-Webhook-Secret)"""
+    secret = current_app.config.get('WEBHOOK_SECRET')
+    if not secret:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Webhook-Secret', ''), secret)
+
+def webhook_intake_authorized():
+    """Indicar si se acepta un webhook entrante (sin secreto configurado se aceptan todos)"""
+    return not current_app.config.get('WEBHOOK_SECRET') or webhook_secret_valid()
+
+def webhook_job_visible():
+    """Indicar si la petición puede consultar el estado de un trabajo: secreto o docente/administrador"""
+    if webhook_secret_valid():
+        return True
+    return current_user.is_authenticated and current_user.user_type.value in ('teacher', 'admin')
+
+def get_webhook_queue(app=None):
+    """Obtener la cola de webhooks de la aplicación, creándola si no existe"""
+    app = app or current_app._get_current_object()
+    queue = app.extensions.get('webhook_queue')
+    if queue is None:
+        queue = app.extensions.setdefault('webhook_queue', WebhookQueue(
+            app.config.get('WEBHOOK_QUEUE_PATH') or os.path.join(app.instance_path, 'webhook_queue.db'),
+            max_attempts=app.config.get('WEBHOOK_QUEUE_MAX_ATTEMPTS', 3),
+            visibility_timeout=app.config.get('WEBHOOK_QUEUE_VISIBILITY_TIMEOUT', 300),
+            dedup_window=app.config.get('WEBHOOK_DEDUP_WINDOW', 900)
+        ))
+    return queue
+
+def create_worker_pool(app, workers=None):
+    """Crear el conjunto de trabajadores de la cola según la configuración"""
+    return WebhookWorkerPool(
+        app,
+        get_webhook_queue(app),
+        workers=app.config.get('WEBHOOK_WORKERS', 2) if workers is None else workers,
+        batch_size=app.config.get('WEBHOOK_BATCH_SIZE', 20),
+        poll_interval=app.config.get('WEBHOOK_POLL_INTERVAL', 1.0)
+    )
+
+def init_webhook_queue(app):
+    """Arrancar los trabajadores en segundo plano si la ingesta usa la cola"""
+    if not queue_intake_enabled(app):
+        return None
+
+    from app.metrics import get_metrics_registry
+    queue = get_webhook_queue(app)
+    get_metrics_registry(app).register_collector(lambda: [(
+        'sti_webhook_jobs', 'gauge', 'Trabajos de la cola de webhooks por estado',
+        [({'status': status}, count) for status, count in queue.stats().items()]
+    )])
+
+    if not app.config.get('WEBHOOK_WORKERS', 2):
+        return None
+
+    pool = create_worker_pool(app)
+    pool.start()
+    app.extensions['webhook_workers'] = pool
+    return pool
+
+def enqueue_response(kind, payload, idempotency_key=None):
+    """
+    Encolar un webhook y construir la respuesta 202 de los endpoints
+
+    Returns:
+        tuple: (cuerpo JSON, código HTTP)
+    """
+    job, duplicate = get_webhook_queue().enqueue(kind, payload, idempotency_key)
+    return {
+        'message': 'Respuestas recibidas; se procesarán en segundo plano',
+        'job_id': job['id'],
+        'status': job['status'],
+        'duplicate': duplicate,
+        'status_url': url_for('api.get_webhook_job', job_id=job['id'])
+    }, 202
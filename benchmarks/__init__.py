@@ -0,0 +1,6 @@
+"""
+Benchmarks de rendimiento del STI
+
+Ejecutar desde la raíz del proyecto, por ejemplo:
+    python -m benchmarks.bench_course_analytics --students 10000
+"""
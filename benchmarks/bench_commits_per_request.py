@@ -0,0 +1,159 @@
+"""
+Confirmaciones (COMMIT) por petición en las rutas que modifican datos
+
+Recorre el flujo de un docente y dos estudiantes (inicio de sesión, registro,
+creación de curso, matrícula, examen diagnóstico, cuestionario VARK,
+progreso, rutas de aprendizaje y webhooks de Google Forms) contando las
+confirmaciones y consultas de cada petición (app/unit_of_work.py).
+tests/test_unit_of_work.py comprueba sobre el mismo flujo que ninguna petición
+confirma más de una vez y que las respuestas de error revierten.
+
+Con ``--autocommit`` se activa ``MODEL_AUTOCOMMIT`` (compatibilidad de los
+métodos de los modelos): dentro de una unidad de trabajo sigue habiendo una
+sola confirmación.
+
+Uso:
+    python -m benchmarks.bench_commits_per_request
+    python -m benchmarks.bench_commits_per_request --autocommit
+"""
+
+import argparse
+
+from sqlalchemy import event
+
+from app import db, login_manager
+from app.ai.vark_form_mapping import VARK_FORM_QUESTIONS
+from app.models import Course, DiagnosticExam, Student, User, VARKQuestion
+from benchmarks.common import QueryCounter, add_common_arguments, bulk_insert, create_benchmark_app, seed_course
+
+
+class CommitCounter:
+    """Cuenta las confirmaciones de un engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _commit(self, conn):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'commit', self._commit)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'commit', self._commit)
+        return False
+
+
+def client_for(app, user_id):
+    client = app.test_client()
+    if user_id is not None:
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+    return client
+
+
+def seed(students=20, random_seed=42):
+    """Curso de benchmark, credenciales de un estudiante, preguntas VARK, perfiles VARK vacíos y un diagnóstico pendiente"""
+    seed_course(students, progress_per_student=3, competencies=3, resources_per_competency=2, seed=random_seed)
+    login_user = User.query.get(2)
+    login_user.email = 'estudiante@example.com'
+    login_user.set_password('secreto123')
+    bulk_insert(VARKQuestion, [{
+        'id': question['question_number'], 'question_number': question['question_number'],
+        'question_text': question['question_text'], 'option_v': question['options'].get('V', ''),
+        'option_a': question['options'].get('A', ''), 'option_r': question['options'].get('R', ''),
+        'option_k': question['options'].get('K', '')
+    } for question in VARK_FORM_QUESTIONS])
+    db.session.query(Student).filter(Student.id.in_([2, 3, 4])).update(
+        {Student.dominant_learning_style: None}, synchronize_session=False
+    )
+    # Diagnóstico pendiente del estudiante 5 para el webhook de Google Forms
+    db.session.query(DiagnosticExam).filter_by(student_id=5).update(
+        {DiagnosticExam.is_completed: False}, synchronize_session=False
+    )
+    db.session.commit()
+
+
+def requests_flow(new_course_code):
+    """Peticiones (etiqueta, usuario, método, ruta, argumentos) en orden"""
+    vark_form = {f"entry.{question['question_number']}": question['options']['K']
+                 for question in VARK_FORM_QUESTIONS}
+    return [
+        ('login', None, 'post', '/auth/login', {'data': {'email': 'estudiante@example.com', 'password': 'secreto123'}}),
+        ('registro', None, 'post', '/auth/register', {'data': {
+            'first_name': 'Ana', 'last_name': 'Pérez', 'email': 'ana@example.com', 'password': 'secreto123',
+            'password2': 'secreto123', 'user_type': 'student', 'student_id': 'NEW-1', 'grade_level': 'secundaria'
+        }}),
+        ('crear curso', 1, 'post', '/teacher/create-course', {'data': {
+            'name': 'Curso nuevo', 'code': new_course_code, 'grade_level': 'secundaria', 'subject': 'Física',
+            'credits': 2, 'diagnostic_required': 'y', 'min_diagnostic_questions': 10
+        }}),
+        ('estilo de aprendizaje', 2, 'post', '/student/profile/learning-style', {'data': {'learning_style': 'v'}}),
+        ('matrícula', 2, 'get', '/student/enroll-course/{course}', {}),
+        ('diagnóstico (crear)', 2, 'get', '/student/diagnostic/{course}', {}),
+        ('diagnóstico (enviar)', 2, 'post', '/student/diagnostic/{course}', {}),
+        ('ruta de aprendizaje', 2, 'post', '/api/learning-path/generate', {'json': {'course_id': '{course}'}}),
+        ('progreso', 2, 'post', '/api/progress/update', {'json': {
+            'course_id': 1, 'activity_type': 'assessment', 'activity_id': 7, 'score': 8, 'max_score': 10
+        }}),
+        ('cuestionario VARK', 3, 'post', '/student/vark-questionnaire', {'data': {
+            f'question_{number}': 'VARK'[number % 4] for number in range(1, 17)
+        }}),
+        ('VARK externo (webhook)', None, 'post', '/api/vark/process-external', {'json': {
+            'student_id': 4, 'responses': vark_form
+        }}),
+        ('Google Forms (webhook)', None, 'post', '/api/google-forms/responses', {'json': {
+            'student_email': 'student5@bench.local', 'responses': [{'question_id': 1, 'answer': 'A'}]
+        }}),
+    ]
+
+
+def run_flow(app):
+    """
+    Ejecutar requests_flow contando confirmaciones y consultas de cada petición
+
+    Returns:
+        list: (etiqueta, estado, confirmaciones, consultas) por petición
+    """
+    with app.app_context():
+        engine = db.engine
+
+    course_id = None
+    rows = []
+    for label, user_id, method, path, kwargs in requests_flow('NEW101'):
+        if course_id is not None:
+            path = path.format(course=course_id)
+            if 'json' in kwargs and kwargs['json'].get('course_id') == '{course}':
+                kwargs = {'json': dict(kwargs['json'], course_id=course_id)}
+
+        client = client_for(app, user_id)
+        with CommitCounter(engine) as commits, QueryCounter(engine) as queries:
+            response = getattr(client, method)(path, **kwargs)
+        rows.append((label, response.status_code, commits.count, queries.count))
+
+        if label == 'crear curso':
+            with app.app_context():
+                course_id = Course.query.filter_by(code='NEW101').one().id
+    return rows
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=20)
+    parser.add_argument('--autocommit', action='store_true', help='Activar MODEL_AUTOCOMMIT')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url, MODEL_AUTOCOMMIT=args.autocommit)
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+    with app.app_context():
+        seed(args.students, args.seed)
+
+    print(f'{"petición":<26} {"estado":>6} {"commits":>8} {"consultas":>10}')
+    for label, status, commits, queries in run_flow(app):
+        print(f'{label:<26} {status:>6} {commits:>8} {queries:>10}')
+
+
+if __name__ == '__main__':
+    main()
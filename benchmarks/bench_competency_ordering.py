@@ -0,0 +1,116 @@
+"""
+Benchmark del ordenamiento de competencias por prerequisitos
+
+Compara el algoritmo anterior de LearningPathGenerator._apply_prerequisites
+(búsqueda lineal repetida, O(n³)) con el ordenamiento topológico de Kahn de
+CompetencyGraph sobre grafos aleatorios de 1.000+ competencias, y mide la
+construcción del grafo desde la base de datos y su lectura desde la caché.
+
+Uso:
+    python -m benchmarks.bench_competency_ordering --sizes 250 1000 2000
+"""
+
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from app import db
+from app.ai.competency_graph import CompetencyGraph, get_competency_graph, get_competency_graph_cache
+from app.models import Competency
+from benchmarks.common import add_common_arguments, bulk_insert, create_benchmark_app, measure, seed_course
+
+
+def legacy_apply_prerequisites(competency_scores):
+    """Réplica del algoritmo anterior"""
+    ordered = []
+    remaining = competency_scores.copy()
+
+    while remaining:
+        for comp, score in remaining[:]:
+            ordered_ids = [c.id for c, _ in ordered]
+            if not comp.prerequisites or all(prereq in ordered_ids for prereq in comp.prerequisites):
+                ordered.append((comp, score))
+                remaining.remove((comp, score))
+                break
+        else:
+            ordered.append(remaining.pop(0))
+
+    return ordered
+
+
+def random_competencies(size, rng, max_prerequisites=3):
+    """Competencias con prerequisitos aleatorios hacia IDs menores (grafo acíclico)"""
+    competencies = []
+    for competency_id in range(1, size + 1):
+        candidates = range(1, competency_id)
+        count = min(len(candidates), rng.randint(0, max_prerequisites))
+        competencies.append(SimpleNamespace(
+            id=competency_id, course_id=1, name=f'Competencia {competency_id}', code=f'C{competency_id}',
+            prerequisites=rng.sample(candidates, count) if count else []
+        ))
+    return competencies
+
+
+def timed(function):
+    start = time.perf_counter()
+    value = function()
+    return value, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[250, 500, 1000])
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"{'competencias':>12} {'anterior (ms)':>14} {'Kahn (ms)':>10} {'grafo (ms)':>11}")
+    for size in args.sizes:
+        competencies = random_competencies(size, rng)
+        scores = {comp.id: round(rng.uniform(0, 100), 1) for comp in competencies}
+
+        competency_scores = sorted(((comp, scores[comp.id]) for comp in competencies), key=lambda x: x[1])
+        legacy, legacy_ms = timed(lambda: legacy_apply_prerequisites(competency_scores))
+
+        graph, build_ms = timed(lambda: CompetencyGraph.from_competencies(1, competencies))
+        (sequence, forced), kahn_ms = timed(lambda: graph.order(scores))
+
+        assert not forced and not graph.cycles
+        assert [comp.id for comp, _ in legacy] == [node.id for node, _ in sequence]
+        print(f'{size:>12} {legacy_ms:>14.1f} {kahn_ms:>10.1f} {build_ms:>11.1f}')
+
+    # Los ciclos se informan en lugar de romperse en silencio
+    competencies = random_competencies(50, rng)
+    competencies[9].prerequisites = [40]
+    competencies[39].prerequisites = competencies[39].prerequisites + [10]
+    graph = CompetencyGraph.from_competencies(1, competencies)
+    _, forced = graph.order({})
+    assert graph.cycles and forced, graph.cycles
+    print(f'Ciclos detectados en el grafo de prueba: {len(graph.cycles)}; liberadas: {forced}')
+
+    # Construcción desde la base de datos y lectura desde la caché
+    size = max(args.sizes)
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        seed_course(num_students=1, progress_per_student=1, competencies=1, resources_per_competency=1, seed=args.seed)
+        bulk_insert(Competency, [{
+            'id': comp.id + 1, 'course_id': 1, 'name': comp.name, 'code': f'G{comp.id}',
+            'prerequisites': [prereq + 1 for prereq in comp.prerequisites]
+        } for comp in random_competencies(size, rng)])
+        db.session.commit()
+
+        with measure(f'grafo desde la BD ({size + 1} competencias)', db.engine):
+            get_competency_graph(1)
+        with measure('grafo desde la caché', db.engine):
+            get_competency_graph(1)
+
+        competency = Competency.query.get(2)
+        competency.prerequisites = []
+        db.session.commit()
+        with measure('grafo tras modificar una competencia', db.engine):
+            get_competency_graph(1)
+        print(get_competency_graph_cache().stats())
+
+
+if __name__ == '__main__':
+    main()
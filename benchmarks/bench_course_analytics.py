@@ -0,0 +1,177 @@
+"""
+Benchmark de AnalyticsEngine.get_course_analytics
+
+Compara las estadísticas agregadas (matrícula, diagnóstico, rutas, progreso y
+estilos) calculadas con consultas agrupadas frente a la implementación
+anterior basada en conteos sueltos y cargas completas con .all().
+
+Después comprueba la instantánea materializada: reconstruirla desde una
+lectura no confirma los cambios pendientes de la petición, y completar de
+nuevo un diagnóstico ya completado no lo cuenta dos veces.
+
+Uso:
+    python -m benchmarks.bench_course_analytics --students 10000
+    python -m benchmarks.bench_course_analytics --database-url mysql+pymysql://root:@localhost/sti_bench
+"""
+
+import argparse
+
+from sqlalchemy import event, func
+
+from app import db
+from app.ai.analytics_engine import AnalyticsEngine
+from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+from app.unit_of_work import unit_of_work
+from app.models import Course, CourseAnalyticsSnapshot, CourseEnrollment, DiagnosticExam, LearningPath, Progress
+from benchmarks.common import add_common_arguments, create_benchmark_app, measure, seed_course
+
+
+def legacy_course_stats(course_id):
+    """Réplica de las consultas de la implementación anterior"""
+    stats = {}
+
+    total = CourseEnrollment.query.filter_by(course_id=course_id).count()
+    active = CourseEnrollment.query.filter_by(course_id=course_id, is_active=True).count()
+    completed = CourseEnrollment.query.filter(
+        CourseEnrollment.course_id == course_id,
+        CourseEnrollment.completion_date.isnot(None)
+    ).count()
+    stats['enrollment_stats'] = {'total': total, 'active': active, 'completed': completed}
+
+    total = DiagnosticExam.query.filter_by(course_id=course_id).count()
+    completed = DiagnosticExam.query.filter_by(course_id=course_id, is_completed=True).count()
+    completed_filter = (DiagnosticExam.course_id == course_id, DiagnosticExam.is_completed == True)
+    stats['diagnostic_stats'] = {
+        'total': total,
+        'completed': completed,
+        'avg_score': round(db.session.query(func.avg(DiagnosticExam.percentage)).filter(*completed_filter).scalar() or 0, 2),
+        'min_score': round(db.session.query(func.min(DiagnosticExam.percentage)).filter(*completed_filter).scalar() or 0, 2),
+        'max_score': round(db.session.query(func.max(DiagnosticExam.percentage)).filter(*completed_filter).scalar() or 0, 2)
+    }
+
+    total = LearningPath.query.filter_by(course_id=course_id).count()
+    active = LearningPath.query.filter_by(course_id=course_id, is_active=True).count()
+    completed = LearningPath.query.filter_by(course_id=course_id, is_completed=True).count()
+    avg_progress = db.session.query(func.avg(LearningPath.completion_percentage)).filter(
+        LearningPath.course_id == course_id,
+        LearningPath.is_active == True
+    ).scalar() or 0
+    stats['learning_path_stats'] = {
+        'total': total, 'active': active, 'completed': completed, 'avg_progress': round(avg_progress, 2)
+    }
+
+    records = Progress.query.join(Progress.enrollment).filter(CourseEnrollment.course_id == course_id).all()
+    stats['progress_analytics'] = {
+        'total_activities': len(records),
+        'avg_percentage': round(sum(p.percentage for p in records) / len(records), 2) if records else 0
+    }
+
+    enrollments = CourseEnrollment.query.filter_by(course_id=course_id, is_active=True).all()
+    distribution = {'V': 0, 'A': 0, 'R': 0, 'K': 0, 'Unknown': 0}
+    for enrollment in enrollments:
+        distribution[enrollment.student.dominant_learning_style or 'Unknown'] += 1
+    stats['learning_style_distribution'] = distribution
+
+    return stats
+
+
+def aggregated_course_stats(engine, course_id):
+    """Mismas secciones calculadas por el motor de analíticas actual"""
+    row = engine._aggregate_enrollments(course_id)
+    return {
+        'enrollment_stats': engine._get_enrollment_stats(course_id, row),
+        'diagnostic_stats': engine._get_diagnostic_stats(course_id),
+        'learning_path_stats': engine._get_learning_path_stats(course_id),
+        'progress_analytics': engine._get_progress_analytics(course_id),
+        'learning_style_distribution': engine._get_learning_style_distribution(course_id, row)
+    }
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--progress-per-student', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        print(f'Sembrando {args.students} estudiantes...')
+        course_id = seed_course(args.students, args.progress_per_student, seed=args.seed)
+        sql_engine = db.engine
+        analytics = AnalyticsEngine()
+
+        # Calentar caché de sentencias y páginas de la base de datos
+        aggregated_course_stats(analytics, course_id)
+        db.session.expunge_all()
+
+        with measure('legacy (consultas sueltas + .all())', sql_engine):
+            legacy = legacy_course_stats(course_id)
+        db.session.expunge_all()
+
+        with measure('agregado (GROUP BY / CASE)', sql_engine):
+            aggregated = aggregated_course_stats(analytics, course_id)
+
+        with measure('get_course_analytics completo', sql_engine):
+            analytics.get_course_analytics(course_id)
+
+        for section in ('enrollment_stats', 'diagnostic_stats', 'learning_path_stats'):
+            for key, value in legacy[section].items():
+                assert aggregated[section][key] == value, (section, key, aggregated[section][key], value)
+        assert aggregated['progress_analytics']['total_activities'] == legacy['progress_analytics']['total_activities']
+        print('Resultados equivalentes a la implementación anterior')
+
+        check_snapshot(course_id)
+
+
+def check_snapshot(course_id):
+    """La lectura reconstruye en su propia transacción y los diagnósticos se cuentan una vez"""
+    refresher = AnalyticsSnapshotRefresher()
+    request_session = db.session()
+    commits = []
+
+    def count_commit(session):
+        commits.append(session)
+
+    event.listen(request_session, 'after_commit', count_commit)
+    try:
+        snapshot = refresher.get_snapshot(course_id)
+    finally:
+        event.remove(request_session, 'after_commit', count_commit)
+    assert snapshot is not None and not commits
+    assert CourseAnalyticsSnapshot.query.filter_by(course_id=course_id).count() == 1
+
+    # Dentro de una unidad de trabajo con escrituras pendientes se calcula sin guardar
+    course = db.session.get(Course, course_id)
+    original_name = course.name
+    with unit_of_work():
+        course.name = 'Cambio sin confirmar'
+        db.session.flush()
+        snapshot = refresher.get_snapshot(course_id, force_rebuild=True)
+        assert snapshot.course_info['name'] == 'Cambio sin confirmar'
+        db.session.rollback()
+    assert db.session.get(Course, course_id).name == original_name
+    assert CourseAnalyticsSnapshot.query.filter_by(course_id=course_id).one().course_info['name'] == original_name
+    print('Instantánea creada desde la lectura sin confirmar la transacción de la petición')
+
+    def completed_count():
+        db.session.expire_all()
+        return CourseAnalyticsSnapshot.query.filter_by(course_id=course_id).one().diagnostics_completed
+
+    before = completed_count()
+    diagnostic = DiagnosticExam.query.filter_by(course_id=course_id, is_completed=True).first()
+    refresher.record_diagnostic_completed(diagnostic, was_completed=diagnostic.is_completed)
+    db.session.commit()
+    assert completed_count() == before
+
+    diagnostic = DiagnosticExam.query.filter_by(course_id=course_id, is_completed=False).first()
+    was_completed = diagnostic.is_completed
+    diagnostic.is_completed = True
+    diagnostic.percentage = 50.0
+    refresher.record_diagnostic_completed(diagnostic, was_completed)
+    db.session.commit()
+    assert completed_count() == before + 1
+    print('Un diagnóstico ya completado no se cuenta de nuevo en la instantánea')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark de la exportación en streaming de cursos (app/course_export.py)
+
+Compara el pico de memoria (tracemalloc) de la forma anterior de sacar los
+datos (``Progress.query...all()`` y escribir el CSV completo en memoria) con
+el exportador en streaming, para dos tamaños de curso: el pico del streaming
+debe mantenerse plano. Comprueba además que el CSV es idéntico, que la ruta
+``/teacher/course/<id>/export`` responde en los tres formatos y que
+``flask export-course`` escribe los cuatro conjuntos de datos.
+
+Uso:
+    python -m benchmarks.bench_course_export --students 2000 --progress 20
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from app import db, login_manager
+from app.course_export import EXPORT_DATASETS, CourseExporter, _plain
+from app.models import CompetencyMastery, DiagnosticExam, ExamResponse, Progress, Question, User
+from app.models.assessment import QuestionType
+from benchmarks.common import add_common_arguments, bulk_insert, create_benchmark_app, seed_course
+
+
+def seed_assessments(num_students, questions, competencies):
+    """Respuestas del diagnóstico de cada estudiante y su dominio por competencia"""
+    bulk_insert(Question, [{
+        'id': q, 'course_id': 1, 'competency_id': (q - 1) % competencies + 1, 'question_text': f'Pregunta {q}',
+        'question_type': QuestionType.MULTIPLE_CHOICE, 'correct_answer': 'A'
+    } for q in range(1, questions + 1)])
+    bulk_insert(ExamResponse, [{
+        'exam_id': i, 'question_id': q, 'student_id': i, 'student_answer': 'A' if (i + q) % 3 else 'B',
+        'is_correct': bool((i + q) % 3), 'points_earned': float(bool((i + q) % 3))
+    } for i in range(1, num_students + 1) for q in range(1, questions + 1)])
+    bulk_insert(CompetencyMastery, [{
+        'student_id': i, 'competency_id': c, 'course_id': 1, 'mastery_level': ((i * c) % 10) / 10,
+        'is_mastered': (i * c) % 10 >= 7
+    } for i in range(1, num_students + 1) for c in range(1, competencies + 1)])
+    db.session.commit()
+
+
+def legacy_progress_csv(course_id):
+    """Réplica de la exportación manual: cargar todo el progreso y escribir el CSV en memoria"""
+    columns = [column.name for column in Progress.__table__.columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for progress in Progress.query.filter_by(course_id=course_id).order_by(Progress.id).all():
+        writer.writerow([_plain(getattr(progress, name)) for name in columns])
+    return buffer.getvalue()
+
+
+def traced(function):
+    """Ejecutar una función y devolver (resultado, pico de memoria en MB, segundos)"""
+    db.session.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, peak / 1024 / 1024, elapsed
+
+
+def streamed_size(chunks):
+    return sum(len(chunk) for chunk in chunks)
+
+
+def run_size(args, progress_per_student):
+    """Sembrar un curso y medir ambas exportaciones del progreso"""
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        seed_course(args.students, progress_per_student=progress_per_student, competencies=10,
+                    resources_per_competency=1, seed=args.seed)
+        rows = db.session.query(db.func.count(Progress.id)).scalar()
+        exporter = CourseExporter(1, chunk_size=args.chunk_size)
+
+        legacy, legacy_peak, legacy_time = traced(lambda: legacy_progress_csv(1))
+        streamed, stream_peak, stream_time = traced(lambda: streamed_size(exporter.stream('progress', 'csv')))
+        assert ''.join(exporter.stream('progress', 'csv')) == legacy
+        assert streamed == len(legacy)
+
+        print(f'{rows:>9} filas de progreso: anterior {legacy_peak:8.1f} MB {legacy_time * 1000:8.0f} ms | '
+              f'streaming {stream_peak:6.1f} MB {stream_time * 1000:8.0f} ms')
+    return app, stream_peak
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--progress', type=int, default=20, help='Registros de progreso por estudiante')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    _, small_peak = run_size(args, max(1, args.progress // 4))
+    app, large_peak = run_size(args, args.progress)
+    # La memoria del streaming no crece con el número de filas (margen para el ruido)
+    assert large_peak < small_peak * 1.5 + 1, (small_peak, large_peak)
+
+    with app.app_context():
+        seed_assessments(args.students, questions=10, competencies=10)
+        counts = {
+            'progress': db.session.query(db.func.count(Progress.id)).scalar(),
+            'exam_responses': db.session.query(db.func.count(ExamResponse.id)).join(
+                DiagnosticExam, DiagnosticExam.id == ExamResponse.exam_id).filter(DiagnosticExam.course_id == 1).scalar(),
+            'competency_mastery': db.session.query(db.func.count(CompetencyMastery.id)).scalar(),
+            'learning_paths': args.students
+        }
+
+    # Ruta de descarga
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+
+    response = client.get('/teacher/course/1/export?format=csv&dataset=exam_responses')
+    assert response.status_code == 200 and response.is_streamed
+    assert 'attachment' in response.headers['Content-Disposition']
+    assert response.get_data(as_text=True).count('\n') == counts['exam_responses'] + 1
+
+    response = client.get('/teacher/course/1/export?format=jsonl&dataset=all')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert {name: sum(1 for line in lines if line['dataset'] == name) for name in EXPORT_DATASETS} == counts
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        response = client.get('/teacher/course/1/export?format=parquet')
+        assert response.status_code == 400
+        print('pyarrow no está instalado: la exportación Parquet responde 400')
+    else:
+        response = client.get('/teacher/course/1/export?format=parquet&dataset=learning_paths')
+        table = pq.read_table(io.BytesIO(response.get_data()))
+        assert table.num_rows == counts['learning_paths']
+        print(f'Parquet: {table.num_rows} rutas, {table.num_columns} columnas')
+
+    assert client.get('/teacher/course/1/export?format=xlsx').status_code == 400
+    assert client.get('/teacher/course/1/export?dataset=users').status_code == 400
+    with client.session_transaction() as session:
+        session['_user_id'] = '2'
+    assert client.get('/teacher/course/1/export').status_code == 403
+
+    # Comando de línea de comandos
+    directory = tempfile.mkdtemp(prefix='course_export_')
+    try:
+        result = app.test_cli_runner().invoke(args=['export-course', '--course-id', '1', '--format', 'jsonl',
+                                                    '--output-dir', directory])
+        assert result.exit_code == 0, result.output
+        for name, count in counts.items():
+            with open(os.path.join(directory, f'BENCH1_{name}.jsonl'), encoding='utf-8') as f:
+                assert sum(1 for _ in f) == count
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f'Ruta y comando export-course verificados: {counts}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark de LearningPathGenerator.generate_paths_for_course
+
+Compara la generación de rutas estudiante por estudiante con generate_path
+frente a la generación masiva del curso completo.
+
+Uso:
+    python -m benchmarks.bench_course_paths --students 300
+"""
+
+import argparse
+
+from app import db
+from app.ai.learning_path_generator import LearningPathGenerator
+from app.models import CourseEnrollment, LearningPath, LearningPathStep
+from benchmarks.common import add_common_arguments, create_benchmark_app, measure, seed_course
+
+
+def delete_paths():
+    """Eliminar todas las rutas y pasos sembrados o generados"""
+    db.session.query(LearningPathStep).delete()
+    db.session.query(LearningPath).delete()
+    db.session.commit()
+
+
+def steps_by_student():
+    """Pasos generados por estudiante, para comparar ambas implementaciones"""
+    rows = db.session.query(
+        LearningPath.student_id, LearningPathStep.step_order,
+        LearningPathStep.resource_id, LearningPathStep.competency_id
+    ).join(LearningPathStep.learning_path).order_by(LearningPath.student_id, LearningPathStep.step_order).all()
+
+    steps = {}
+    for student_id, step_order, resource_id, competency_id in rows:
+        steps.setdefault(student_id, []).append((step_order, resource_id, competency_id))
+    return steps
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--competencies', type=int, default=20)
+    parser.add_argument('--chunk-size', type=int, default=100)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        print(f'Sembrando {args.students} estudiantes...')
+        course_id = seed_course(args.students, progress_per_student=1, competencies=args.competencies,
+                                resources_per_competency=10, seed=args.seed)
+        delete_paths()
+
+        sql_engine = db.engine
+        generator = LearningPathGenerator()
+        student_ids = [student_id for (student_id,) in db.session.query(CourseEnrollment.student_id).filter_by(
+            course_id=course_id, is_active=True
+        ).order_by(CourseEnrollment.student_id).all()]
+
+        with measure('por estudiante (generate_path)', sql_engine):
+            for student_id in student_ids:
+                generator.generate_path(student_id, course_id)
+        individual = steps_by_student()
+        delete_paths()
+        db.session.expunge_all()
+
+        with measure('masiva (generate_paths_for_course)', sql_engine):
+            result = generator.generate_paths_for_course(course_id, chunk_size=args.chunk_size)
+        bulk = steps_by_student()
+
+        assert result['success'] and result['failed'] == 0, result
+        assert result['created'] == len(student_ids), result
+        assert bulk == individual
+        print(f"{result['created']} rutas, {result['steps_created']} pasos; resultados equivalentes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark de RecommendationEngine.get_recommendations_batch
+
+Compara las recomendaciones de un curso completo calculadas estudiante por
+estudiante con get_recommendations frente al cálculo en lote.
+
+Uso:
+    python -m benchmarks.bench_course_recommendations --students 500
+"""
+
+import argparse
+
+from app import db
+from app.ai.recommendation_engine import RecommendationEngine
+from app.models import CourseEnrollment, Student
+from benchmarks.common import add_common_arguments, create_benchmark_app, measure, seed_course
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--resources-per-competency', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        print(f'Sembrando {args.students} estudiantes...')
+        course_id = seed_course(args.students, progress_per_student=10,
+                                resources_per_competency=args.resources_per_competency, seed=args.seed)
+
+        # Perfiles marcados en la mitad de los estudiantes para superar el umbral VARK
+        Student.query.filter(Student.id % 2 == 0).update({
+            Student.vark_visual: 10.0, Student.vark_auditory: 5.0,
+            Student.vark_reading: 5.0, Student.vark_kinesthetic: 80.0,
+            Student.dominant_learning_style: 'K'
+        }, synchronize_session=False)
+        db.session.commit()
+
+        sql_engine = db.engine
+        engine = RecommendationEngine()
+        student_ids = [student_id for (student_id,) in db.session.query(CourseEnrollment.student_id).filter_by(
+            course_id=course_id, is_active=True
+        ).order_by(CourseEnrollment.student_id).all()]
+
+        with measure('por estudiante (get_recommendations)', sql_engine):
+            individual = {student_id: engine.get_recommendations(student_id, args.limit) for student_id in student_ids}
+        db.session.expunge_all()
+
+        with measure('en lote (get_recommendations_batch)', sql_engine):
+            batch = engine.get_recommendations_batch(student_ids, args.limit)
+
+        for student_id in student_ids:
+            assert batch[student_id] == individual[student_id], student_id
+        total = sum(len(recommendations) for recommendations in batch.values())
+        print(f'{len(student_ids)} estudiantes, {total} recomendaciones; resultados equivalentes')
+
+
+if __name__ == '__main__':
+    main()
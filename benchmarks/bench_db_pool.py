@@ -0,0 +1,127 @@
+"""
+Prueba de carga del pool de conexiones (app/db_pool.py)
+
+Lanza hilos que piden conexiones al pool y las retienen un tiempo simulando
+peticiones, en tres fases: carga por debajo del tamaño del pool (sin
+esperas), saturación (esperas, desbordamiento hasta ``max_overflow`` y
+tiempos agotados) y conexiones caídas (se cierran las conexiones inactivas
+como haría el ``wait_timeout`` de MySQL; el pre-ping las detecta, las
+invalida y reconecta sin errores). Al final imprime las métricas
+``sti_db_pool_*`` de /api/metrics.
+
+Usa un SQLite temporal como sustituto; con ``--database-url`` se puede
+apuntar a un MySQL/MariaDB local.
+
+Uso:
+    python -m benchmarks.bench_db_pool --pool-size 4 --max-overflow 2 --threads 32
+"""
+
+import argparse
+import threading
+import time
+
+from sqlalchemy import exc
+
+from app import db
+from app.db_pool import get_pool_stats
+from app.metrics import get_metrics_registry
+from app.models import Progress
+from benchmarks.common import add_common_arguments, create_benchmark_app, seed_course
+
+
+def run_load(app, threads, requests_per_thread, hold):
+    """Ejecutar la carga y devolver (peticiones correctas, tiempos agotados, errores, segundos)"""
+    results = {'ok': 0, 'timeouts': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def worker(offset):
+        for i in range(requests_per_thread):
+            outcome = 'ok'
+            try:
+                with app.app_context():
+                    db.session.query(db.func.count(Progress.id)).filter(
+                        Progress.student_id == (offset * requests_per_thread + i) % 50 + 1
+                    ).scalar()
+                    # La conexión sigue retenida por la sesión hasta cerrar el contexto
+                    time.sleep(hold)
+            except exc.TimeoutError:
+                outcome = 'timeouts'
+            except Exception as e:
+                print(f'[ERROR] {e}')
+                outcome = 'errors'
+            with lock:
+                results[outcome] += 1
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return results['ok'], results['timeouts'], results['errors'], time.perf_counter() - start
+
+
+def phase(label, app, threads, requests_per_thread, hold):
+    before = get_pool_stats(app)
+    ok, timeouts, errors, elapsed = run_load(app, threads, requests_per_thread, hold)
+    after = get_pool_stats(app)
+    waits = after['wait_count'] - before['wait_count']
+    wait_total = after['wait_seconds_total'] - before['wait_seconds_total']
+    print(f'{label:<32} {threads:>3} hilos: {ok:>5} ok {timeouts:>4} agotadas {errors:>3} errores | '
+          f'espera media {wait_total / max(waits, 1) * 1000:7.2f} ms, máx {after["wait_seconds_max"] * 1000:7.1f} ms, '
+          f'desbordamiento máx {after["overflow_max"]}, {elapsed:5.2f} s')
+    return ok, timeouts, errors, before, after
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--max-overflow', type=int, default=2)
+    parser.add_argument('--pool-timeout', type=int, default=1, help='Segundos enteros')
+    parser.add_argument('--threads', type=int, default=32, help='Hilos en la fase de saturación')
+    parser.add_argument('--requests', type=int, default=5, help='Peticiones por hilo')
+    parser.add_argument('--hold', type=float, default=0.25, help='Segundos que cada petición retiene la conexión')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(
+        args.database_url, DB_POOL_PROFILE='web', DB_POOL_SIZE=args.pool_size,
+        DB_MAX_OVERFLOW=args.max_overflow, DB_POOL_TIMEOUT=args.pool_timeout
+    )
+    with app.app_context():
+        seed_course(50, progress_per_student=5, competencies=2, resources_per_competency=1, seed=args.seed)
+        engine = db.engine
+    print(f'Pool: {type(engine.pool).__name__}, tamaño {args.pool_size}, desbordamiento {args.max_overflow}, '
+          f'espera máxima {args.pool_timeout} s')
+
+    # 1. Por debajo de la capacidad: ninguna petición agota la espera ni desborda
+    ok, timeouts, errors, _, after = phase('bajo capacidad', app, args.pool_size, args.requests, args.hold)
+    assert timeouts == errors == 0 and after['overflow_max'] == 0
+
+    # 2. Saturación: se usa todo el desbordamiento y algunas peticiones agotan la espera
+    ok, timeouts, errors, _, after = phase('saturación', app, args.threads, args.requests, args.hold)
+    assert errors == 0 and after['overflow_max'] == args.max_overflow
+    assert after['timeouts'] == timeouts and after['wait_seconds_max'] >= args.hold
+
+    # 3. Conexiones caídas: cerrar las conexiones inactivas del pool
+    idle = list(engine.pool._pool.queue)
+    for record in idle:
+        record.dbapi_connection.close()
+    ok, timeouts, errors, before, after = phase('conexiones caídas', app, args.pool_size, args.requests, args.hold)
+    # La primera conexión caída invalida el pool completo; el resto se reabre al entregarse
+    invalidated = after['invalidations'] - before['invalidations']
+    reconnected = after['connects'] - before['connects']
+    assert errors == 0 and invalidated >= 1 and reconnected >= len(idle), (invalidated, reconnected, len(idle))
+    print(f'{len(idle)} conexiones caídas: {invalidated} invalidaciones por el pre-ping, '
+          f'{reconnected} reconexiones, sin errores')
+
+    stats = get_pool_stats(app)
+    assert stats['checkouts'] == stats['checkins'] and stats['checked_out'] == 0
+
+    print()
+    for line in get_metrics_registry(app).render_prometheus().splitlines():
+        if line.startswith('sti_db_pool'):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark de GoogleFormsIntegration.process_diagnostic_responses
+
+Compara la ingesta anterior (una consulta por pregunta, una inserción por
+respuesta, dos commits y recarga del examen para el análisis de competencias)
+con la ingesta actual (preguntas precargadas con IN, calificación en memoria e
+inserción masiva en una sola transacción) para exámenes de 25, 100 y 500
+preguntas.
+
+Uso:
+    python -m benchmarks.bench_diagnostic_ingestion --sizes 25 100 500
+"""
+
+import argparse
+import random
+from datetime import datetime
+
+from app import db
+from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+from app.ai.google_forms_integration import GoogleFormsIntegration
+from app.models import DiagnosticExam, ExamResponse, Question, Student
+from app.models.assessment import QuestionType
+from benchmarks.common import add_common_arguments, bulk_insert, create_benchmark_app, measure, seed_course
+
+
+class LegacyGoogleFormsIntegration(GoogleFormsIntegration):
+    """Réplica de la ingesta anterior"""
+
+    def process_diagnostic_responses(self, student_id, responses_data):
+        try:
+            student = Student.query.get(student_id)
+            diagnostic = DiagnosticExam.query.filter_by(student_id=student_id, is_completed=False).first()
+
+            total_score = 0
+            total_questions = 0
+            for response_data in responses_data:
+                question_id = response_data.get('question_id')
+                student_answer = response_data.get('answer')
+                question = Question.query.get(question_id)
+                if not question:
+                    continue
+                is_correct = self._check_answer(question, student_answer)
+                points_earned = question.points if is_correct else 0
+                db.session.add(ExamResponse(
+                    exam_id=diagnostic.id, question_id=question_id, student_id=student_id,
+                    student_answer=student_answer, is_correct=is_correct,
+                    points_earned=points_earned, time_spent=response_data.get('time_spent', 0)
+                ))
+                total_score += points_earned
+                total_questions += 1
+
+            diagnostic.total_score = total_score
+            diagnostic.percentage = (total_score / total_questions) * 100 if total_questions > 0 else 0
+            diagnostic.is_completed = True
+            diagnostic.completed_at = datetime.utcnow()
+            student.diagnostic_completed = True
+            student.diagnostic_score = diagnostic.percentage
+            student.diagnostic_date = datetime.utcnow()
+            AnalyticsSnapshotRefresher().record_diagnostic_completed(diagnostic, was_completed=False)
+            db.session.commit()
+
+            competency_scores = self._analyze_competency_scores(diagnostic.id)
+            diagnostic.competency_scores = competency_scores
+            db.session.commit()
+
+            return {'success': True, 'diagnostic_id': diagnostic.id,
+                    'score': diagnostic.percentage, 'competency_scores': competency_scores}
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'error': str(e)}
+
+    def _analyze_competency_scores(self, diagnostic_id):
+        diagnostic = DiagnosticExam.query.get(diagnostic_id)
+        competency_scores = {}
+        for response in diagnostic.responses:
+            if response.question.competency_id:
+                scores = competency_scores.setdefault(response.question.competency_id, {
+                    'total_questions': 0, 'correct_answers': 0, 'total_points': 0, 'earned_points': 0
+                })
+                scores['total_questions'] += 1
+                scores['total_points'] += response.question.points
+                if response.is_correct:
+                    scores['correct_answers'] += 1
+                    scores['earned_points'] += response.points_earned
+        return self._finalize_competency_scores(competency_scores)
+
+
+def seed_questions(size, competencies, rng, first_id):
+    """Preguntas de opción múltiple, verdadero/falso y completar repartidas entre competencias"""
+    questions = []
+    for offset in range(size):
+        question_type = rng.choice([QuestionType.MULTIPLE_CHOICE, QuestionType.TRUE_FALSE, QuestionType.FILL_BLANK])
+        if question_type == QuestionType.MULTIPLE_CHOICE:
+            correct_answer = rng.choice('ABCD')
+        elif question_type == QuestionType.TRUE_FALSE:
+            correct_answer = rng.choice(['verdadero', 'falso'])
+        else:
+            correct_answer = 'enlace covalente polar'
+        questions.append({
+            'id': first_id + offset, 'course_id': 1,
+            'competency_id': rng.randint(1, competencies) if rng.random() < 0.9 else None,
+            'question_text': f'Pregunta {first_id + offset}', 'question_type': question_type,
+            'correct_answer': correct_answer, 'points': rng.randint(1, 3)
+        })
+    bulk_insert(Question, questions)
+    return questions
+
+
+def random_answers(questions, rng):
+    """Respuestas del estudiante, con IDs como texto y alguna pregunta inexistente"""
+    answers = []
+    for question in questions:
+        if rng.random() < 0.6:
+            answer = question['correct_answer']
+        else:
+            answer = rng.choice(['A', 'B', 'verdadero', 'enlace ionico'])
+        answers.append({'question_id': str(question['id']), 'answer': answer, 'time_spent': rng.randint(5, 90)})
+    answers.append({'question_id': 10 ** 9, 'answer': 'A'})
+    return answers
+
+
+def reset_diagnostic(diagnostic_id):
+    """Dejar el examen pendiente y sin respuestas"""
+    db.session.query(ExamResponse).filter_by(exam_id=diagnostic_id).delete()
+    db.session.query(DiagnosticExam).filter_by(id=diagnostic_id).update({
+        DiagnosticExam.is_completed: False, DiagnosticExam.competency_scores: None
+    })
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def stored_responses(diagnostic_id):
+    return db.session.query(
+        ExamResponse.question_id, ExamResponse.student_answer, ExamResponse.is_correct,
+        ExamResponse.points_earned, ExamResponse.time_spent
+    ).filter_by(exam_id=diagnostic_id).order_by(ExamResponse.id).all()
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[25, 100, 500])
+    parser.add_argument('--competencies', type=int, default=10)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        seed_course(num_students=1, progress_per_student=1, competencies=args.competencies,
+                    resources_per_competency=1, seed=args.seed)
+        db.session.query(DiagnosticExam).delete()
+        bulk_insert(DiagnosticExam, [{'id': 1, 'course_id': 1, 'student_id': 1, 'title': 'Diagnóstico'}])
+        db.session.commit()
+
+        sql_engine = db.engine
+        first_id = 1
+        for size in args.sizes:
+            questions = seed_questions(size, args.competencies, rng, first_id)
+            db.session.commit()
+            first_id += size
+            answers = random_answers(questions, rng)
+
+            reset_diagnostic(1)
+            with measure(f'anterior ({size} preguntas)', sql_engine):
+                legacy = LegacyGoogleFormsIntegration().process_diagnostic_responses(1, answers)
+            legacy_rows = stored_responses(1)
+
+            reset_diagnostic(1)
+            with measure(f'masiva ({size} preguntas)', sql_engine):
+                bulk = GoogleFormsIntegration().process_diagnostic_responses(1, answers)
+            bulk_rows = stored_responses(1)
+
+            assert legacy['success'] and bulk['success'], (legacy, bulk)
+            assert legacy['score'] == bulk['score']
+            assert legacy['competency_scores'] == bulk['competency_scores']
+            assert [tuple(row) for row in legacy_rows] == [tuple(row) for row in bulk_rows]
+            assert DiagnosticExam.query.get(1).competency_scores
+
+        print('Resultados equivalentes')
+
+
+if __name__ == '__main__':
+    main()
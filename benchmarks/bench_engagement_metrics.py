@@ -0,0 +1,167 @@
+"""
+Benchmark de las métricas de engagement del curso (AnalyticsEngine._get_engagement_metrics)
+
+Siembra un curso con 5000 estudiantes y 100 sesiones de ``learning_analytics``
+cada uno (con duraciones y precisiones nulas en algunas sesiones y algunos
+estudiantes sin sesiones) y compara la versión anterior (una consulta por
+matrícula activa para la última sesión, más la carga perezosa del estudiante y
+su usuario) con la consulta agrupada sobre ``learning_analytics`` unida a
+``course_enrollments``.
+
+Comprueba los promedios por estudiante, los promedios, percentiles e
+histogramas del curso contra un cálculo directo con numpy sobre las sesiones
+generadas, y muestra el error de la versión anterior al dividir sumas de
+valores no nulos entre el total de estudiantes.
+
+Uso:
+    python -m benchmarks.bench_engagement_metrics --students 5000 --sessions 100
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import desc
+
+from app import db
+from app.ai.analytics_engine import AnalyticsEngine
+from app.models import CourseEnrollment, LearningAnalytics
+from benchmarks.common import add_common_arguments, bulk_insert, create_benchmark_app, measure, seed_course
+
+METRICS = ('engagement_score', 'session_duration', 'questions_attempted', 'accuracy_rate')
+
+
+def legacy_engagement_metrics(course_id):
+    """Réplica de _get_engagement_metrics anterior (con LearningAnalytics importado)"""
+    active_enrollments = CourseEnrollment.query.filter_by(course_id=course_id, is_active=True).all()
+    if not active_enrollments:
+        return {}
+
+    engagement_data = []
+    for enrollment in active_enrollments:
+        student = enrollment.student
+        analytics = LearningAnalytics.query.filter_by(
+            student_id=student.id
+        ).order_by(desc(LearningAnalytics.created_at)).first()
+        if analytics:
+            engagement_data.append({
+                'student_id': student.id,
+                'student_name': student.user.get_full_name(),
+                'engagement_score': analytics.engagement_score,
+                'session_duration': analytics.session_duration,
+                'questions_attempted': analytics.questions_attempted,
+                'accuracy_rate': analytics.accuracy_rate
+            })
+
+    if engagement_data:
+        avg_engagement = sum(d['engagement_score'] for d in engagement_data) / len(engagement_data)
+        avg_session_duration = sum(d['session_duration'] for d in engagement_data if d['session_duration']) / len(engagement_data)
+        avg_accuracy = sum(d['accuracy_rate'] for d in engagement_data if d['accuracy_rate']) / len(engagement_data)
+    else:
+        avg_engagement = avg_session_duration = avg_accuracy = 0
+
+    return {
+        'avg_engagement_score': round(avg_engagement, 2),
+        'avg_session_duration': round(avg_session_duration, 2),
+        'avg_accuracy_rate': round(avg_accuracy, 2),
+        'student_engagement': engagement_data
+    }
+
+
+def seed_sessions(num_students, sessions, rng, chunk_students=250):
+    """
+    Insertar las sesiones por bloques de estudiantes
+
+    Returns:
+        dict: Por métrica, arreglos (estudiantes x 2) con suma y cantidad de valores no nulos
+    """
+    totals = {metric: np.zeros((num_students + 1, 2)) for metric in METRICS}
+    now = datetime.utcnow()
+    for first in range(1, num_students + 1, chunk_students):
+        rows = []
+        for student_id in range(first, min(first + chunk_students, num_students + 1)):
+            # Un 2 % de los estudiantes matriculados no tiene sesiones
+            if student_id % 50 == 0:
+                continue
+            for session in range(sessions):
+                attempted = rng.randint(0, 30)
+                correct = rng.randint(0, attempted)
+                row = {
+                    'student_id': student_id, 'course_id': 1,
+                    'session_duration': rng.randint(60, 5400) if rng.random() > 0.05 else None,
+                    'questions_attempted': attempted, 'questions_correct': correct,
+                    'accuracy_rate': correct / attempted if attempted and rng.random() > 0.05 else None,
+                    'engagement_score': rng.random(),
+                    'created_at': now - timedelta(days=sessions - session, seconds=rng.randint(0, 3600))
+                }
+                rows.append(row)
+                for metric in METRICS:
+                    if row[metric] is not None:
+                        totals[metric][student_id] += (row[metric], 1)
+        bulk_insert(LearningAnalytics, rows)
+    db.session.commit()
+    return totals
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--sessions', type=int, default=100, help='Sesiones por estudiante')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        seed_course(args.students, progress_per_student=1, competencies=1, resources_per_competency=1,
+                    seed=args.seed)
+        totals = seed_sessions(args.students, args.sessions, random.Random(args.seed))
+        print(f'{db.session.query(LearningAnalytics).count()} sesiones de {args.students} estudiantes\n')
+
+        sql_engine = db.engine
+        engine = AnalyticsEngine()
+        with measure('anterior (una consulta por matrícula)', sql_engine):
+            legacy = legacy_engagement_metrics(1)
+        db.session.expire_all()
+        with measure('consulta agrupada', sql_engine) as counter:
+            metrics = engine._get_engagement_metrics(1)
+        assert counter.count == 1, counter.count
+
+        # Referencia directa: promedio por estudiante activo con sesiones y resumen del curso
+        active = {student_id for (student_id,) in db.session.query(CourseEnrollment.student_id).filter_by(
+            course_id=1, is_active=True)}
+        with_sessions = [student_id for student_id in sorted(active) if student_id % 50]
+        assert [row['student_id'] for row in metrics['student_engagement']] == with_sessions
+        assert metrics['students_with_sessions'] == len(with_sessions)
+        assert metrics['total_sessions'] == len(with_sessions) * args.sessions
+
+        for metric in METRICS:
+            sums, counts = totals[metric][with_sessions].T
+            expected = np.divide(sums, counts, out=np.full_like(sums, np.nan), where=counts > 0)
+            actual = np.array([row[metric] for row in metrics['student_engagement']], dtype=float)
+            assert np.allclose(actual, expected, atol=0.006, equal_nan=True), metric
+
+            if metric == 'questions_attempted':
+                continue
+            valid = expected[~np.isnan(expected)]
+            assert abs(metrics[f'avg_{metric}'] - valid.mean()) <= 0.006, metric
+            percentiles = metrics['engagement_percentiles' if metric == 'engagement_score' else f'{metric}_percentiles']
+            p50, p90 = np.percentile(valid, [50, 90])
+            assert abs(percentiles['p50'] - p50) <= 0.006 and abs(percentiles['p90'] - p90) <= 0.006, metric
+
+        assert sum(bucket['count'] for bucket in metrics['engagement_histogram']) == len(with_sessions)
+        assert sum(bucket['count'] for bucket in metrics['session_duration_histogram']) == len(with_sessions)
+
+        # Error de la versión anterior: sumas de valores no nulos divididas entre todos los estudiantes
+        latest_durations = [row['session_duration'] for row in legacy['student_engagement']]
+        scored = [duration for duration in latest_durations if duration]
+        print(f"\nduración de la última sesión: anterior {legacy['avg_session_duration']} s, "
+              f"correcta {sum(scored) / len(scored):.2f} s ({len(latest_durations) - len(scored)} nulas)")
+        print(f"engagement del curso: p50 {metrics['engagement_percentiles']['p50']}, "
+              f"p90 {metrics['engagement_percentiles']['p90']}")
+        print('histograma de duración promedio:', ', '.join(
+            f"{bucket['range']}: {bucket['count']}" for bucket in metrics['session_duration_histogram']))
+        print('Promedios, percentiles e histogramas iguales al cálculo directo')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+Benchmark de FormsResponsePuller contra un servidor local que imita la API
+de respuestas de Google Forms (paginación con nextPageToken, filtro
+``timestamp >= ...``, latencia por petición y errores 503 transitorios)
+
+Compara la descarga anterior (un requests.get por formulario, sin sesión ni
+paginación, descargando todo en cada sincronización) con el puller
+concurrente, y mide una sincronización incremental tras nuevas respuestas.
+Las respuestas se encolan en una cola de webhooks temporal antes de avanzar la
+marca de agua; un fallo al encolar deja la marca donde estaba y la siguiente
+sincronización vuelve a entregar las mismas respuestas.
+
+Uso:
+    python -m benchmarks.bench_forms_puller --forms 4 --responses 2000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from app.ai.forms_response_puller import FormsResponsePuller, FormsSyncState
+from app.webhook_queue import WebhookQueue, enqueue_form_responses
+from benchmarks.common import add_common_arguments
+
+
+class StubFormsAPI:
+    """Servidor HTTP local con respuestas de varios formularios"""
+
+    def __init__(self, latency, max_page_size, fail_first):
+        self.latency = latency
+        self.max_page_size = max_page_size
+        self.fail_first = set(fail_first)
+        self.forms = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.start_time = datetime(2025, 3, 1, 8, 0, 0)
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.handle(self)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}/v1/forms'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def add_responses(self, form_id, count):
+        """Agregar respuestas nuevas (dos por segundo, algunas con el mismo instante)"""
+        with self.lock:
+            responses = self.forms.setdefault(form_id, [])
+            for _ in range(count):
+                index = len(responses)
+                submitted = self.start_time + timedelta(seconds=index // 2)
+                responses.append({
+                    'responseId': f'{form_id}-{index}',
+                    'lastSubmittedTime': submitted.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                    'respondentEmail': f'estudiante{index}@example.com',
+                    'answers': {'question_1': {'textAnswers': {'answers': [{'value': 'A'}]}}}
+                })
+
+    def handle(self, handler):
+        time.sleep(self.latency)
+        url = urlparse(handler.path)
+        params = parse_qs(url.query)
+        form_id = url.path.split('/')[-2]
+
+        with self.lock:
+            self.requests += 1
+            if form_id in self.fail_first:
+                self.fail_first.discard(form_id)
+                return self.reply(handler, 503, {'error': 'unavailable'})
+            responses = list(self.forms.get(form_id, []))
+
+        if 'filter' in params:
+            since = params['filter'][0].split('>=')[1].strip()
+            responses = [item for item in responses if item['lastSubmittedTime'] >= since]
+
+        # Sin pageSize la API también pagina: la descarga anterior solo veía la primera página
+        page_size = min(int(params.get('pageSize', [self.max_page_size])[0]), self.max_page_size)
+        offset = int(params.get('pageToken', ['0'])[0])
+        body = {'responses': responses[offset:offset + page_size]}
+        if offset + page_size < len(responses):
+            body['nextPageToken'] = str(offset + page_size)
+        self.reply(handler, 200, body)
+
+    def reply(self, handler, status, body):
+        data = json.dumps(body).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+def legacy_pull(base_url, form_ids):
+    """Réplica de get_form_responses: una petición por formulario, en serie"""
+    results = {}
+    for form_id in form_ids:
+        response = requests.get(f'{base_url}/{form_id}/responses', headers={'Authorization': 'Bearer x'})
+        if response.status_code != 200:
+            results[form_id] = None
+            continue
+        results[form_id] = response.json().get('responses', [])
+    return results
+
+
+def timed(label, stub, function):
+    before = stub.requests
+    start = time.perf_counter()
+    value = function()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<40} {stub.requests - before:>6} peticiones {elapsed * 1000:>9.1f} ms')
+    return value
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--forms', type=int, default=4)
+    parser.add_argument('--responses', type=int, default=2000, help='Respuestas iniciales por formulario')
+    parser.add_argument('--new-responses', type=int, default=15, help='Respuestas nuevas por formulario')
+    parser.add_argument('--latency', type=float, default=0.02, help='Latencia por petición (s)')
+    parser.add_argument('--page-size', type=int, default=500)
+    args = parser.parse_args()
+
+    form_ids = [f'form{i}' for i in range(1, args.forms + 1)]
+    stub = StubFormsAPI(args.latency, args.page_size, fail_first=form_ids[:1])
+    for form_id in form_ids:
+        stub.add_responses(form_id, args.responses)
+
+    legacy = timed('anterior (get en serie, sin paginar)', stub, lambda: legacy_pull(stub.base_url, form_ids))
+    print(f"  descargadas: {sum(len(r or []) for r in legacy.values())} de {args.forms * args.responses}"
+          f" ({sum(r is None for r in legacy.values())} formularios fallidos por el 503)")
+
+    queue = WebhookQueue(os.path.join(tempfile.mkdtemp(), 'webhook_queue.db'))
+
+    def ingest(form_id, responses):
+        return enqueue_form_responses(queue, form_id, responses)
+
+    puller = FormsResponsePuller(api_key='x', base_url=stub.base_url, state=FormsSyncState(),
+                                 max_workers=args.forms, page_size=args.page_size)
+    forms = {form_id: form_id for form_id in form_ids}
+    stub.fail_first = set(form_ids[:1])  # El puller reintenta el 503
+
+    full = timed('puller (completa, concurrente)', stub, lambda: puller.pull(forms, ingest=ingest))
+    assert all(result['success'] for result in full.values()), full
+    assert all(len(result['responses']) == args.responses for result in full.values())
+    assert queue.stats()['queued'] == args.forms * args.responses
+
+    unchanged = timed('puller (incremental, sin cambios)', stub, lambda: puller.pull(forms, ingest=ingest))
+    assert all(not result['responses'] for result in unchanged.values())
+
+    # Un fallo al encolar no avanza la marca: las respuestas se vuelven a entregar
+    for form_id in form_ids:
+        stub.add_responses(form_id, args.new_responses)
+    marks = {form_id: puller.state.get(form_id) for form_id in form_ids}
+
+    def failing_ingest(form_id, responses):
+        raise OSError('cola no disponible')
+
+    failed = timed('puller (fallo al encolar)', stub, lambda: puller.pull(forms, ingest=failing_ingest))
+    assert not any(result['success'] for result in failed.values())
+    assert all(puller.state.get(form_id) == marks[form_id] for form_id in form_ids)
+
+    incremental = timed('puller (incremental, respuestas nuevas)', stub, lambda: puller.pull(forms, ingest=ingest))
+    for form_id, result in incremental.items():
+        expected = [f'{form_id}-{i}' for i in range(args.responses, args.responses + args.new_responses)]
+        assert [item['responseId'] for item in result['responses']] == expected, form_id
+        assert result['ingested'] == {'queued': args.new_responses, 'duplicates': 0}, result['ingested']
+
+    # Descarga completa: nada se encola dos veces
+    total = args.forms * (args.responses + args.new_responses)
+    again = timed('puller (completa, ya encolada)', stub, lambda: puller.pull(forms, full=True, ingest=ingest))
+    assert sum(result['ingested']['duplicates'] for result in again.values()) == total
+    assert queue.stats()['queued'] == total
+
+    puller.close()
+    print(f'cola: {queue.stats()}')
+    print('Sincronización incremental sin pérdidas ni duplicados')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark del catálogo de materiales (app/materials_catalog.py)
+
+Compara la búsqueda anterior de materiales (normalizar el nombre y recorrer
+LEARNING_MATERIALS en cada llamada) con las búsquedas en los índices del
+catálogo, y comprueba la recarga en caliente: al modificar el módulo de
+configuración las páginas ``all_courses`` y ``course_units`` muestran los
+datos nuevos sin reiniciar, aunque estén en la caché de respuestas.
+
+Uso:
+    python -m benchmarks.bench_materials_catalog --lookups 100000
+"""
+
+import argparse
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from app import db, login_manager
+from app.drive_config import LEARNING_MATERIALS
+from app.materials_catalog import MaterialsCatalog, get_materials_catalog
+from app.models import Course, User
+from app.response_cache import MATERIALS_SCOPE, invalidate_responses
+from benchmarks.common import add_common_arguments, create_benchmark_app, seed_course
+
+
+def legacy_course_materials(course_name_or_id):
+    """Réplica de la búsqueda anterior de drive_config.get_course_materials"""
+    course_key = course_name_or_id.lower().replace(' ', '_').replace('á', 'a').replace('é', 'e')
+    for key, course_data in LEARNING_MATERIALS.items():
+        if key in course_key or course_key in key:
+            return course_data
+    return None
+
+
+def best_of(function, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def write_config(directory, course_name):
+    """Escribir un módulo de configuración de prueba a partir de drive_config.py"""
+    source_path = importlib.import_module('app.drive_config').__file__
+    with open(source_path, encoding='utf-8') as f:
+        source = f.read()
+    path = os.path.join(directory, 'bench_drive_config.py')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(source.replace("'name': 'Matemática Básica 1'", f"'name': '{course_name}'"))
+    return path
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--lookups', type=int, default=100000)
+    args = parser.parse_args()
+
+    queries = ['Matemáticas Básicas', 'algebra elemental', 'estadistica descriptiva', 'Química General 1']
+    snapshot = get_materials_catalog().snapshot()
+    for query in queries[:3]:
+        assert legacy_course_materials(query)['code'] == snapshot.find(query).code
+
+    workload = (queries * (args.lookups // len(queries) + 1))[:args.lookups]
+    legacy = best_of(lambda: [legacy_course_materials(query) for query in workload])
+    indexed = best_of(lambda: [snapshot.find(query) for query in workload])
+    print(f'{args.lookups} búsquedas por nombre: anterior {legacy * 1000:.1f} ms, catálogo {indexed * 1000:.1f} ms')
+
+    codes = [course.code for course in snapshot.courses] * (args.lookups // len(snapshot.courses))
+    by_code = best_of(lambda: [snapshot.find(code) for code in codes])
+    print(f'{len(codes)} búsquedas por código en el índice: {by_code * 1000:.1f} ms')
+
+    # Recarga en caliente con un módulo de configuración temporal
+    directory = tempfile.mkdtemp(prefix='materials_')
+    sys.path.insert(0, directory)
+    try:
+        path = write_config(directory, 'Matemática Básica 1')
+        app = create_benchmark_app(args.database_url, MATERIALS_RELOAD_INTERVAL=0.01)
+        login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+
+        catalog = MaterialsCatalog('bench_drive_config', reload_interval=0.01)
+        catalog.on_reload(lambda: invalidate_responses({MATERIALS_SCOPE}))
+        app.extensions['materials_catalog'] = catalog
+
+        with app.app_context():
+            course_id = seed_course(10, progress_per_student=0, competencies=1, resources_per_competency=1,
+                                    seed=args.seed)
+            db.session.get(Course, course_id).code = 'MATH-BAS-1'
+            db.session.commit()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '2'
+
+        units = client.get(f'/student/course/{course_id}/units').get_data(as_text=True)
+        courses = client.get('/student/all-courses').get_data(as_text=True)
+        assert 'Números Naturales' in units and units.count('archivos</span>') == 7
+        assert all(course.name in courses for course in catalog.snapshot().courses)
+
+        # Cambiar el archivo (con otra fecha de modificación) y volver a pedir las páginas
+        write_config(directory, 'Matemática Básica Renovada')
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+        time.sleep(0.02)
+
+        courses = client.get('/student/all-courses').get_data(as_text=True)
+        assert 'Matemática Básica Renovada' in courses and catalog.reloads == 1
+        print('Recarga en caliente: all_courses muestra el curso renombrado sin reiniciar')
+    finally:
+        sys.path.remove(directory)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
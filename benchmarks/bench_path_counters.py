@@ -0,0 +1,118 @@
+"""
+Benchmark de LearningPathStep.complete_step con contadores incrementales
+
+Completa uno a uno todos los pasos de rutas de 50, 200 y 1000 pasos, cada
+paso en su propia transacción como lo haría una petición, y compara la
+versión anterior (cargar todos los pasos de la ruta para contarlos y buscar
+el siguiente por ``current_step + 1``) con la actual (``completed_steps =
+completed_steps + 1`` en SQL y puntero ``next_step_id``). Comprueba que ambas
+dejan el mismo porcentaje y que el puntero avanza paso a paso.
+
+Después desajusta los contadores de varias rutas y comprueba que
+``LearningPath.refresh_counters`` (``flask repair-path-counters``) los
+recalcula desde ``learning_path_steps``.
+
+Uso:
+    python -m benchmarks.bench_path_counters --lengths 50 200 1000
+"""
+
+import argparse
+from datetime import datetime
+
+from app import db
+from app.models import LearningPath, LearningPathStep
+from app.models.learning import StepStatus
+from app.unit_of_work import unit_of_work
+from benchmarks.common import add_common_arguments, bulk_insert, create_benchmark_app, measure, seed_course
+
+
+def legacy_complete_step(step):
+    """Réplica de complete_step y update_progress anteriores"""
+    step.status = StepStatus.COMPLETED
+    step.completed_at = datetime.utcnow()
+    db.session.commit()
+
+    path = step.learning_path
+    completed_steps = len([s for s in path.steps if s.status == StepStatus.COMPLETED])
+    path.completion_percentage = (completed_steps / path.total_steps) * 100 if path.total_steps > 0 else 0
+    if path.completion_percentage >= 100:
+        path.is_completed = True
+        path.completed_at = datetime.utcnow()
+    db.session.commit()
+
+    # La vista siguiente pedía el próximo paso por su orden
+    return LearningPathStep.query.filter_by(learning_path_id=path.id, step_order=path.current_step + 1).first()
+
+
+def add_path(path_id, length):
+    bulk_insert(LearningPath, [{
+        'id': path_id, 'student_id': 1, 'course_id': 1, 'enrollment_id': 1, 'title': f'Ruta {path_id}',
+        'total_steps': length, 'current_step': 0, 'is_active': False
+    }])
+    bulk_insert(LearningPathStep, [{
+        'learning_path_id': path_id, 'resource_id': 1, 'step_order': order, 'title': f'Paso {order}'
+    } for order in range(1, length + 1)])
+    LearningPath.refresh_counters([path_id])
+    db.session.commit()
+
+
+def step_ids(path_id):
+    return [step_id for (step_id,) in db.session.query(LearningPathStep.id).filter_by(
+        learning_path_id=path_id).order_by(LearningPathStep.step_order)]
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--lengths', type=int, nargs='+', default=[50, 200, 1000])
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        seed_course(1, progress_per_student=1, competencies=1, resources_per_competency=1, seed=args.seed)
+        sql_engine = db.engine
+
+        next_id = 1000
+        for length in args.lengths:
+            legacy_id, current_id = next_id, next_id + 1
+            next_id += 2
+            add_path(legacy_id, length)
+            add_path(current_id, length)
+
+            with measure(f'anterior ({length} pasos)', sql_engine):
+                for step_id in step_ids(legacy_id):
+                    db.session.expire_all()
+                    legacy_complete_step(db.session.get(LearningPathStep, step_id))
+
+            with measure(f'contadores ({length} pasos)', sql_engine):
+                for order, step_id in enumerate(step_ids(current_id), start=1):
+                    db.session.expire_all()
+                    with unit_of_work():
+                        step = db.session.get(LearningPathStep, step_id)
+                        step.complete_step()
+                        path = step.learning_path
+                    assert path.completed_steps == order and path.current_step == order, (order, path.current_step)
+
+            legacy, current = db.session.get(LearningPath, legacy_id), db.session.get(LearningPath, current_id)
+            assert legacy.completion_percentage == current.completion_percentage == 100.0
+            assert current.is_completed and current.next_step_id is None and current.get_next_step() is None
+
+        # Reparación: desajustar los contadores de la mitad de las rutas
+        all_ids = [path_id for (path_id,) in db.session.query(LearningPath.id).filter(LearningPath.id >= 1000)]
+        broken = all_ids[::2]
+        db.session.query(LearningPath).filter(LearningPath.id.in_(broken)).update(
+            {LearningPath.completed_steps: 0, LearningPath.next_step_id: 1, LearningPath.current_step: 0},
+            synchronize_session=False
+        )
+        db.session.commit()
+        with measure('refresh_counters (reparación)', sql_engine):
+            repaired = LearningPath.refresh_counters()
+            db.session.commit()
+        assert sorted(row.id for row in repaired) == sorted(broken), repaired
+        assert not LearningPath.refresh_counters()
+        for path in LearningPath.query.filter(LearningPath.id.in_(all_ids)):
+            assert path.completed_steps == path.total_steps and path.next_step_id is None
+        print(f'{len(repaired)} rutas desajustadas corregidas desde learning_path_steps')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Benchmark de las tendencias de rendimiento agrupadas en SQL (app/ai/performance_trends.py)
+
+Compara la versión anterior de ``_get_performance_trends`` (cargar todos los
+``Progress`` de la ventana con el ORM y agrupar por día en diccionarios de
+Python) con el ``GROUP BY`` por día, semana y mes, y comprueba que ambas dan
+los mismos promedios y conteos. Sobre una ventana de dos años compara la
+agrupación en SQL con el recorrido con ``yield_per`` (mismo resultado) y mide
+el pico de memoria de cada variante con tracemalloc.
+
+Al final comprueba el promedio móvil, que una segunda lectura sale de la
+caché sin consultas y que un progreso nuevo (sin nota) la invalida.
+
+Uso:
+    python -m benchmarks.bench_performance_trends --students 2000 --progress 50 --history 100000
+"""
+
+import argparse
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app import db
+from app.ai.performance_trends import BUCKETS, bucket_start, get_performance_trends
+from app.models import Progress
+from benchmarks.common import add_common_arguments, bulk_insert, create_benchmark_app, measure, seed_course
+
+# seed_course siembra progreso de los últimos 46 días y el historial empieza en el día 61,
+# así ninguna fila queda cerca del límite de la ventana de comparación
+WINDOW_DAYS = 60
+HISTORY_DAYS = (61, 730)
+
+
+def legacy_trends(course_id, days, bucket='day'):
+    """Réplica de _get_performance_trends anterior (con el periodo como parámetro)"""
+    since = datetime.utcnow() - timedelta(days=days)
+    progress_records = Progress.query.filter(
+        Progress.course_id == course_id,
+        Progress.created_at >= since
+    ).order_by(Progress.created_at).all()
+
+    daily_performance = {}
+    for record in progress_records:
+        date_key = bucket_start(record.created_at, bucket).isoformat()
+        if date_key not in daily_performance:
+            daily_performance[date_key] = []
+        daily_performance[date_key].append(record.percentage)
+
+    trends = []
+    for date, percentages in daily_performance.items():
+        avg_percentage = sum(percentages) / len(percentages)
+        trends.append({
+            'date': date,
+            'avg_percentage': round(avg_percentage, 2),
+            'activity_count': len(percentages)
+        })
+    return trends
+
+
+def comparable(trends):
+    return [(trend['date'], trend['avg_percentage'], trend['activity_count']) for trend in trends]
+
+
+def assert_close(expected, actual):
+    """Mismos periodos y conteos; promedios iguales salvo redondeo de sumas en distinto orden"""
+    assert [row[0] for row in expected] == [row[0] for row in actual]
+    for (date, expected_avg, expected_count), (_, actual_avg, actual_count) in zip(expected, actual):
+        assert expected_count == actual_count, (date, expected_count, actual_count)
+        assert abs(expected_avg - actual_avg) <= 0.011, (date, expected_avg, actual_avg)
+
+
+def expected_rolling(trends, bucket, window):
+    """Promedio móvil calculado de forma directa, periodo por periodo"""
+    def index(date_key):
+        day = datetime.strptime(date_key, '%Y-%m-%d').date()
+        if bucket == 'month':
+            return day.year * 12 + day.month
+        return day.toordinal() // (7 if bucket == 'week' else 1)
+
+    result = []
+    for trend in trends:
+        current = index(trend['date'])
+        included = [other for other in trends if current - window < index(other['date']) <= current]
+        total = sum(other['avg_percentage'] * other['activity_count'] for other in included)
+        result.append(total / sum(other['activity_count'] for other in included))
+    return result
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    try:
+        result = function()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--progress', type=int, default=50, help='Progreso reciente por estudiante')
+    parser.add_argument('--history', type=int, default=100000, help='Progreso de los dos últimos años')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        seed_course(args.students, progress_per_student=args.progress, competencies=2,
+                    resources_per_competency=1, seed=args.seed)
+        rng = random.Random(args.seed)
+        noon = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+        bulk_insert(Progress, [{
+            'student_id': student_id, 'course_id': 1, 'enrollment_id': student_id,
+            'activity_type': 'assessment', 'activity_id': 1, 'score': 1, 'max_score': 1,
+            'percentage': rng.uniform(0, 100),
+            'created_at': noon - timedelta(days=rng.randint(*HISTORY_DAYS))
+        } for student_id in (rng.randint(1, args.students) for _ in range(args.history))])
+        db.session.commit()
+
+        sql_engine = db.engine
+        trends = get_performance_trends()
+        print(f'{db.session.query(Progress).count()} registros de progreso, '
+              f'motor {sql_engine.dialect.name}\n')
+
+        for bucket in BUCKETS:
+            with measure(f'anterior, {WINDOW_DAYS} días por {bucket}', sql_engine):
+                legacy = legacy_trends(1, WINDOW_DAYS, bucket)
+            with measure(f'GROUP BY, {WINDOW_DAYS} días por {bucket}', sql_engine) as counter:
+                grouped = trends.compute(Progress.course_id == 1, WINDOW_DAYS, bucket)
+            assert counter.count == 1
+            assert_close(comparable(legacy), comparable(grouped))
+            for trend, rolling in zip(grouped, expected_rolling(grouped, bucket, 7)):
+                assert abs(trend['rolling_avg'] - rolling) <= 0.011, (trend, rolling)
+
+        # Ventana de dos años: GROUP BY frente a recorrido con yield_per
+        long_days = HISTORY_DAYS[1] + 5
+        print()
+        db.session.expire_all()
+        with measure(f'anterior, {long_days} días por day', sql_engine):
+            legacy, legacy_peak = peak_memory(lambda: legacy_trends(1, long_days))
+        db.session.expire_all()
+        with measure(f'GROUP BY, {long_days} días por day', sql_engine):
+            grouped, grouped_peak = peak_memory(lambda: trends.compute(Progress.course_id == 1, long_days))
+        trends.stream_days = 0
+        with measure(f'yield_per, {long_days} días por day', sql_engine):
+            streamed, streamed_peak = peak_memory(lambda: trends.compute(Progress.course_id == 1, long_days))
+        assert_close(comparable(legacy), comparable(grouped))
+        assert_close(comparable(grouped), comparable(streamed))
+        assert all(abs(a['rolling_avg'] - b['rolling_avg']) <= 0.011 for a, b in zip(grouped, streamed))
+        print(f'pico de memoria: anterior {legacy_peak / 2**20:.1f} MiB, GROUP BY {grouped_peak / 2**20:.1f} MiB, '
+              f'yield_per {streamed_peak / 2**20:.1f} MiB ({len(streamed)} días)')
+        assert streamed_peak < legacy_peak / 10
+        trends.stream_days = app.config['PERFORMANCE_TRENDS_STREAM_DAYS']
+
+        # Caché por (curso, ventana, periodo, promedio móvil) e invalidación por progreso nuevo
+        print()
+        with measure('tendencias del curso (fallo de caché)', sql_engine):
+            first = trends.course_trends(1, WINDOW_DAYS, 'week')
+        with measure('tendencias del curso (acierto de caché)', sql_engine) as counter:
+            assert trends.course_trends(1, WINDOW_DAYS, 'week') == first
+        assert counter.count == 0
+
+        db.session.add(Progress(student_id=1, course_id=1, enrollment_id=1, activity_type='learning',
+                                activity_id=1, created_at=datetime.utcnow()))
+        db.session.commit()
+        with measure('tendencias tras un progreso nuevo', sql_engine) as counter:
+            after = trends.course_trends(1, WINDOW_DAYS, 'week')
+        assert counter.count == 1
+        assert after[-1]['activity_count'] == first[-1]['activity_count'] + 1
+        assert after[-1]['avg_percentage'] == first[-1]['avg_percentage']
+        print(f"caché: {trends.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmark del buffer de escritura diferida del progreso (app/progress_buffer.py)
+
+Envía los mismos eventos a /api/progress/update en modo ``sync`` (un INSERT,
+la actualización de la instantánea y un commit por evento) y en modo
+``buffer`` (el evento se anota en el diario y el hilo lo escribe por lotes),
+compara consultas, commits y latencia de las peticiones, y comprueba que
+ambos modos dejan el mismo progreso y la misma distribución de actividades en
+la instantánea del curso. En modo buffer solo confirma el hilo que escribe los
+lotes, y la petición valida estudiante y matrícula desde la caché del buffer
+(una consulta por petición: la carga del usuario de la sesión).
+
+También comprueba que el modo ``sync`` mantiene el contrato anterior: acepta
+``enrollment_id`` sin ``course_id`` y un ``time_spent`` fraccionario.
+
+Después simula una caída del proceso con eventos pendientes: un buffer nuevo
+recupera el diario y los escribe. Al final imprime las métricas
+``sti_progress_*`` de /api/metrics.
+
+Uso:
+    python -m benchmarks.bench_progress_buffer --students 50 --events 2000
+"""
+
+import argparse
+import glob
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import event
+
+from app import db, login_manager
+from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+from app.metrics import get_metrics_registry
+from app.models import CourseAnalyticsSnapshot, Progress, User
+from app.progress_buffer import ProgressBuffer, ProgressJournal, get_progress_buffer
+from benchmarks.common import QueryCounter, add_common_arguments, create_benchmark_app, seed_course
+
+
+def make_events(num_students, num_events, rng):
+    """Eventos (usuario, cuerpo JSON) de estudiantes del curso 1"""
+    events = []
+    for _ in range(num_events):
+        student_id = rng.randint(1, num_students)
+        max_score = rng.choice([None, 10, 20, 100])
+        events.append((student_id + 1, {
+            'course_id': 1,
+            'activity_type': rng.choice(['learning', 'assessment', 'practice']),
+            'activity_id': rng.randint(1, 200),
+            'score': rng.randint(0, max_score or 10),
+            'max_score': max_score,
+            'time_spent': rng.randint(10, 600)
+        }))
+    return events
+
+
+def prepare_app(args, **overrides):
+    app = create_benchmark_app(None, **overrides)
+    with app.app_context():
+        seed_course(args.students, progress_per_student=2, competencies=2, resources_per_competency=1,
+                    seed=args.seed)
+        AnalyticsSnapshotRefresher().rebuild(1)
+        db.session.commit()
+    return app
+
+
+def post_events(app, events):
+    """Enviar los eventos y devolver (consultas, commits, segundos, latencias por petición)"""
+    clients = {}
+    latencies = []
+    commits = [0]
+
+    def count_commit(conn):
+        commits[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'commit', count_commit)
+    try:
+        with QueryCounter(engine) as counter:
+            start = time.perf_counter()
+            for user_id, payload in events:
+                client = clients.get(user_id)
+                if client is None:
+                    client = clients[user_id] = app.test_client()
+                    with client.session_transaction() as session:
+                        session['_user_id'] = str(user_id)
+                request_start = time.perf_counter()
+                response = client.post('/api/progress/update', json=payload)
+                latencies.append(time.perf_counter() - request_start)
+                assert response.status_code in (200, 202), response.get_json()
+            elapsed = time.perf_counter() - start
+    finally:
+        event.remove(engine, 'commit', count_commit)
+    return counter.count, commits[0], elapsed, sorted(latencies)
+
+
+def stored_state(app):
+    """Progreso guardado (sin IDs ni fechas) y distribución de la instantánea"""
+    with app.app_context():
+        rows = sorted(db.session.query(
+            Progress.student_id, Progress.enrollment_id, Progress.activity_type, Progress.activity_id,
+            Progress.score, Progress.max_score, Progress.percentage, Progress.time_spent
+        ).all())
+        distribution = CourseAnalyticsSnapshot.query.filter_by(course_id=1).one().activity_distribution
+    return [tuple(row) for row in rows], distribution
+
+
+def check_sync_contract(app):
+    """El modo sync acepta enrollment_id sin course_id y time_spent fraccionario, como antes del buffer"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '2'
+    with app.app_context():
+        enrollment_id = db.session.query(Progress.enrollment_id).filter_by(student_id=1).limit(1).scalar()
+    response = client.post('/api/progress/update', json={
+        'enrollment_id': enrollment_id, 'activity_type': 'learning', 'activity_id': 3,
+        'score': 7, 'max_score': 10, 'time_spent': 42.6
+    })
+    assert response.status_code == 200, response.get_json()
+    with app.app_context():
+        progress = db.session.get(Progress, response.get_json()['progress_id'])
+        assert (progress.course_id, progress.time_spent) == (1, 43)
+        db.session.delete(progress)
+        db.session.commit()
+
+    response = client.post('/api/progress/update', json={'activity_type': 'learning', 'score': 7})
+    assert response.status_code == 400, response.get_json()
+    print('Modo sync: enrollment_id sin course_id y time_spent fraccionario aceptados')
+
+
+def report(label, queries, commits, elapsed, latencies, num_events):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f'{label:<10} {queries:>6} consultas {commits:>5} commits {elapsed:>7.2f} s | '
+          f'{num_events / elapsed:>7.0f} eventos/s, p50 {p50:6.2f} ms, p99 {p99:6.2f} ms')
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=50)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--flush-interval', type=float, default=0.5)
+    args = parser.parse_args()
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+
+    events = make_events(args.students, args.events, random.Random(args.seed))
+    journal_dir = tempfile.mkdtemp(prefix='sti_progress_journal_')
+    try:
+        sync_app = prepare_app(args)
+        buffer_app = prepare_app(
+            args, PROGRESS_WRITE_MODE='buffer', PROGRESS_BUFFER_BATCH_SIZE=args.batch_size,
+            PROGRESS_BUFFER_FLUSH_INTERVAL=args.flush_interval, PROGRESS_BUFFER_JOURNAL_DIR=journal_dir
+        )
+
+        report('sync', *post_events(sync_app, events), args.events)
+        # Las consultas del modo buffer incluyen las del hilo que escribe en paralelo
+        buffer = get_progress_buffer(buffer_app)
+        queries, commits, elapsed, latencies = post_events(buffer_app, events)
+        start = time.perf_counter()
+        buffer.flush()
+        report('buffer', queries, commits, elapsed, latencies, args.events)
+        print(f'           {buffer.flushes} lotes, última escritura forzada en '
+              f'{(time.perf_counter() - start) * 1000:.1f} ms; validación: {buffer.validation.stats()}')
+        assert commits < buffer.flushes, (commits, buffer.flushes)
+        validation_queries = buffer.validation.stats()['misses']
+        assert validation_queries <= 2 * args.students, validation_queries
+
+        assert buffer.pending() == 0 and not glob.glob(os.path.join(journal_dir, '*.jsonl'))
+        assert stored_state(sync_app) == stored_state(buffer_app)
+        print('Mismo progreso y misma instantánea en ambos modos')
+
+        check_sync_contract(sync_app)
+
+        # Caída con eventos pendientes: detener el hilo sin escribir y dejar el segmento a un proceso terminado
+        buffer._stop.set()
+        buffer._wakeup.set()
+        buffer._thread.join()
+        buffer._thread = None
+        post_events(buffer_app, events[:100])
+        assert buffer.pending() == 100
+        buffer._pending.clear()
+        buffer.journal.close()
+        for path in glob.glob(os.path.join(journal_dir, '*.jsonl')):
+            name = os.path.basename(path).split('-')
+            os.rename(path, os.path.join(journal_dir, f'progress-999999999-{name[2]}'))
+
+        recovered = ProgressBuffer(buffer_app, journal=ProgressJournal(journal_dir))
+        assert recovered.pending() == 100, recovered.pending()
+        assert recovered.flush() == 100
+        with buffer_app.app_context():
+            assert db.session.query(Progress).count() == len(stored_state(sync_app)[0]) + 100
+        assert not glob.glob(os.path.join(journal_dir, '*.jsonl'))
+        print('100 eventos pendientes recuperados del diario tras la caída y escritos')
+
+        print()
+        for line in get_metrics_registry(buffer_app).render_prometheus().splitlines():
+            if line.startswith('sti_progress'):
+                print(line)
+    finally:
+        shutil.rmtree(journal_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
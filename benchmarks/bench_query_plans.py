@@ -0,0 +1,195 @@
+"""
+Revisión de planes de consulta (EXPLAIN) de las consultas frecuentes
+
+Ejecuta las funciones principales de ``analytics_engine``,
+``recommendation_engine`` y ``vark_analyzer`` y varias rutas de estudiante y
+docente sobre una base sembrada, captura sus SELECT con sus parámetros y pide
+el plan de cada una a la base de datos (``EXPLAIN QUERY PLAN`` en SQLite,
+``EXPLAIN`` en MySQL) e informa las que recorren completa una de las tablas
+calientes en lugar de buscar por índice. Las consultas sin WHERE (cargas
+completas a propósito, como la del catálogo de recursos en caché) se omiten.
+tests/test_query_plans.py falla si aparece alguno de esos recorridos.
+
+Con ``--without-indexes`` se eliminan antes los índices compuestos para ver
+los recorridos completos que evitan.
+
+Uso:
+    python -m benchmarks.bench_query_plans --students 2000
+    python -m benchmarks.bench_query_plans --without-indexes
+"""
+
+import argparse
+import re
+
+from sqlalchemy import event, inspect
+
+from app import db, login_manager
+from app.ai.analytics_engine import AnalyticsEngine
+from app.ai.recommendation_engine import RecommendationEngine
+from app.ai.vark_analyzer import VARKAnalyzer
+from app.models import User, VARKQuestion, VARKResponse
+from benchmarks.common import add_common_arguments, bulk_insert, create_benchmark_app, seed_course
+
+# Tablas que no deben recorrerse completas
+HOT_TABLES = {'diagnostic_exams', 'learning_paths', 'learning_path_steps', 'progress', 'course_enrollments',
+              'resources', 'vark_responses'}
+
+_WHERE = re.compile(r'\bWHERE\b', re.IGNORECASE)
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)')
+_ALIAS_SUFFIX = re.compile(r'_\d+$')
+
+
+class StatementCapture:
+    """Captura las SELECT ejecutadas (sin repetir) con sus parámetros"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = {}
+        self.statuses = {}
+        self.errors = {}
+        self.label = None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith('SELECT'):
+            return
+        if _WHERE.search(statement):
+            self.statements.setdefault(statement, (self.label, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return False
+
+
+def full_scans(connection, statement, parameters):
+    """Tablas calientes que el plan de la consulta recorre completas"""
+    if connection.dialect.name == 'sqlite':
+        plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+        scanned = [match.group(1) for match in (_SQLITE_SCAN.match(row[-1]) for row in plan) if match]
+    else:
+        plan = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).mappings().fetchall()
+        scanned = [row['table'] for row in plan if row['type'] == 'ALL' and row['table']]
+    return sorted({_ALIAS_SUFFIX.sub('', name) for name in scanned} & HOT_TABLES)
+
+
+def seed_vark_responses(num_students):
+    bulk_insert(VARKQuestion, [{'id': q, 'question_text': f'Pregunta VARK {q}', 'question_number': q,
+                                'option_v': 'V', 'option_a': 'A', 'option_r': 'R', 'option_k': 'K'}
+                               for q in range(1, 17)])
+    bulk_insert(VARKResponse, [{'student_id': i, 'question_id': q, 'selected_option': 'VARK'[(i + q) % 4]}
+                               for i in range(1, num_students + 1) for q in range(1, 17)])
+    db.session.commit()
+
+
+def drop_composite_indexes():
+    """Eliminar los índices de las tablas calientes (salvo claves primarias)"""
+    inspector = inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in HOT_TABLES:
+            for index in inspector.get_indexes(table):
+                connection.exec_driver_sql(
+                    f'DROP INDEX {index["name"]}' if connection.dialect.name == 'sqlite'
+                    else f'DROP INDEX {index["name"]} ON {table}'
+                )
+
+
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+
+
+def capture_frequent_queries(app, course_id, student_id=2):
+    """
+    Ejecutar los motores y las páginas frecuentes capturando sus SELECT
+
+    Returns:
+        StatementCapture: Consultas distintas con la etiqueta de quien las ejecutó
+    """
+    with app.app_context():
+        engine = db.engine
+
+    capture = StatementCapture(engine)
+    with capture:
+        with app.app_context():
+            capture.label = 'AnalyticsEngine.get_course_analytics'
+            AnalyticsEngine().get_course_analytics(course_id)
+            capture.label = 'AnalyticsEngine.get_student_analytics'
+            AnalyticsEngine().get_student_analytics(student_id)
+            capture.label = 'RecommendationEngine.get_recommendations'
+            RecommendationEngine().get_recommendations(student_id)
+            capture.label = 'RecommendationEngine.get_recommendations_batch'
+            RecommendationEngine().get_recommendations_batch(list(range(1, 51)))
+            capture.label = 'VARKAnalyzer.get_learning_style_profile'
+            VARKAnalyzer().get_learning_style_profile(student_id)
+
+        pages = [
+            (student_id + 1, '/student/dashboard'),
+            (student_id + 1, f'/student/course/{course_id}/units'),
+            (student_id + 1, f'/student/course/{course_id}'),
+            (1, f'/teacher/course/{course_id}/students?sort=progress'),
+            (1, f'/teacher/student/{student_id}/progress'),
+            (1, f'/teacher/api/course/{course_id}/stats')
+        ]
+        for user_id, path in pages:
+            client = app.test_client()
+            login(client, user_id)
+            capture.label = f'GET {path}'
+            try:
+                capture.statuses[path] = client.get(path).status_code
+            except Exception as e:
+                # Plantillas que faltan en el repositorio: las consultas de la vista ya se capturaron
+                capture.errors[path] = e
+    return capture
+
+
+def find_full_scans(app, capture):
+    """
+    Revisar el plan de cada consulta capturada
+
+    Returns:
+        list: (etiqueta, tablas recorridas completas, sentencia) de las consultas con recorridos
+    """
+    failures = []
+    with app.app_context(), db.engine.connect() as connection:
+        for statement, (label, parameters) in capture.statements.items():
+            scans = full_scans(connection, statement, parameters)
+            if scans:
+                failures.append((label, scans, statement))
+    return failures
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--without-indexes', action='store_true',
+                        help='Eliminar los índices compuestos antes de revisar los planes')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+
+    with app.app_context():
+        course_id = seed_course(args.students, progress_per_student=10, competencies=10,
+                                resources_per_competency=20, seed=args.seed)
+        seed_vark_responses(args.students)
+        if args.without_indexes:
+            drop_composite_indexes()
+
+    capture = capture_frequent_queries(app, course_id)
+    failures = find_full_scans(app, capture)
+
+    for path, status in capture.statuses.items():
+        if status != 200:
+            print(f'[AVISO] {path}: estado {status}')
+    for path, error in capture.errors.items():
+        print(f'[AVISO] {path}: {error!r}')
+    print(f'{len(capture.statements)} consultas distintas revisadas, {len(failures)} con recorridos completos')
+    for label, scans, statement in failures:
+        print(f'  [SCAN {", ".join(scans)}] {label}: {" ".join(statement.split())[:160]}')
+
+
+if __name__ == '__main__':
+    main()
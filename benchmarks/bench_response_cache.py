@@ -0,0 +1,122 @@
+"""
+Benchmark de la caché de respuestas por usuario (cached_response)
+
+Pide varias veces las páginas cacheadas con el cliente de pruebas de Flask y
+compara la primera petición (render completo), las siguientes (respuesta
+guardada) y las revalidaciones con ``If-None-Match`` (304 sin cuerpo).
+Comprueba además que las páginas se invalidan al modificar el curso o su
+instantánea de analíticas y que los usuarios no comparten entradas.
+
+Uso:
+    python -m benchmarks.bench_response_cache --backend memory
+    python -m benchmarks.bench_response_cache --backend filesystem
+"""
+
+import argparse
+import tempfile
+import time
+
+from app import db, login_manager
+from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+from app.models import Course, User
+from app.response_cache import get_response_cache
+from benchmarks.common import QueryCounter, add_common_arguments, create_benchmark_app, seed_course
+
+
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+def timed_get(label, client, engine, path, repeat, headers=None):
+    """Pedir una página varias veces e imprimir consultas y latencia media"""
+    counter = QueryCounter(engine)
+    start = time.perf_counter()
+    with counter:
+        for _ in range(repeat):
+            response = client.get(path, headers=headers or {})
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f'{label:<45} {response.status_code:>4} {counter.count / repeat:>7.1f} consultas {elapsed * 1000:>9.2f} ms')
+    return response
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--backend', choices=['memory', 'filesystem'], default='memory')
+    args = parser.parse_args()
+
+    overrides = {'RESPONSE_CACHE_BACKEND': args.backend, 'ANALYTICS_SNAPSHOT_MAX_AGE': 3600}
+    if args.backend == 'filesystem':
+        overrides['RESPONSE_CACHE_DIR'] = tempfile.mkdtemp(prefix='response_cache_')
+    app = create_benchmark_app(args.database_url, **overrides)
+
+    # La aplicación no registra user_loader; el benchmark usa uno mínimo
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+
+    with app.app_context():
+        course_id = seed_course(args.students, progress_per_student=5, competencies=10, resources_per_competency=4,
+                                seed=args.seed)
+        AnalyticsSnapshotRefresher().rebuild(course_id)
+        engine = db.engine
+    cache = get_response_cache(app)
+
+    teacher = app.test_client()
+    login(teacher, 1)
+    student = app.test_client()
+    login(student, 2)
+    other_student = app.test_client()
+    login(other_student, 3)
+
+    # teacher.analytics también está cacheada, pero su plantilla no existe en el repositorio
+    pages = [
+        ('student.course_units', student, f'/student/course/{course_id}/units'),
+        ('student.all_courses', student, '/student/all-courses')
+    ]
+    for name, client, path in pages:
+        first = timed_get(f'{name} (sin caché)', client, engine, path, 1)
+        assert first.status_code == 200 and first.headers.get('ETag'), first.status_code
+        cached = timed_get(f'{name} (en caché)', client, engine, path, args.repeat)
+        assert cached.get_data() == first.get_data() and cached.headers['ETag'] == first.headers['ETag']
+        revalidated = timed_get(f'{name} (If-None-Match)', client, engine, path, args.repeat,
+                                headers={'If-None-Match': first.headers['ETag']})
+        assert revalidated.status_code == 304 and not revalidated.get_data()
+
+    # Cada usuario tiene su propia entrada
+    own = student.get(f'/student/course/{course_id}/units')
+    other = other_student.get(f'/student/course/{course_id}/units')
+    assert own.headers['ETag'] != other.headers['ETag']
+
+    # Un docente no recibe la página cacheada de un estudiante (las redirecciones no se cachean)
+    assert teacher.get('/student/all-courses').status_code == 302
+
+    # Con un mensaje flash pendiente la caché se omite para no repetirlo
+    response = student.get('/teacher/analytics')
+    assert response.status_code == 302
+    response = student.get(f'/student/course/{course_id}/units')
+    assert response.status_code == 200 and 'ETag' not in response.headers
+
+    with app.app_context():
+        # Cambiar el curso invalida sus unidades
+        etag = student.get(f'/student/course/{course_id}/units').headers['ETag']
+        db.session.get(Course, course_id).name = 'Curso renombrado'
+        db.session.commit()
+        response = student.get(f'/student/course/{course_id}/units', headers={'If-None-Match': etag})
+        assert response.status_code == 200 and b'Curso renombrado' in response.get_data()
+
+        # Un UPDATE masivo de la instantánea invalida las páginas del curso; el cuerpo
+        # vuelve a renderizarse y, al no cambiar, el ETag fuerte sigue respondiendo 304
+        etag = response.headers['ETag']
+        misses = cache.misses
+        AnalyticsSnapshotRefresher()._increment(course_id, enrollments_active=1000)
+        db.session.commit()
+        response = student.get(f'/student/course/{course_id}/units', headers={'If-None-Match': etag})
+        assert cache.misses == misses + 1 and response.status_code == 304
+
+    print(f'Páginas invalidadas correctamente; caché: {cache.stats()}')
+
+
+if __name__ == '__main__':
+    main()
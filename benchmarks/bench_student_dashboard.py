@@ -0,0 +1,122 @@
+"""
+Benchmark de StudentDashboardView
+
+Compara el dashboard anterior (recorrer dos veces la relación dinámica de
+matrículas, contar diagnósticos y rutas por separado y cargar docente y
+usuario de cada curso desde la plantilla) con la vista de lectura, sin caché,
+en caché y al renderizar las plantillas. El presupuesto de consultas, la
+equivalencia con la ruta anterior y la invalidación se comprueban en
+tests/test_student_dashboard.py.
+
+Uso:
+    python -m benchmarks.bench_student_dashboard --courses 12
+"""
+
+import argparse
+
+from flask import render_template
+
+from app import db, login_manager
+from app.ai.student_dashboard import get_student_dashboard, get_student_dashboard_cache
+from app.models import (
+    User, Student, Teacher, Course, CourseEnrollment, DiagnosticExam,
+    LearningPath, LearningPathStep
+)
+from app.models.learning import StepStatus
+from app.models.user import UserType
+from benchmarks.common import add_common_arguments, bulk_insert, create_benchmark_app, measure, seed_course
+
+# Presupuesto de consultas del dashboard sin caché
+QUERY_BUDGET = 3
+
+
+def seed_student_courses(student_id, courses, steps_per_path):
+    """Matricular al estudiante en cursos adicionales, cada uno con docente, diagnóstico y ruta"""
+    first_user = db.session.query(db.func.max(User.id)).scalar() + 1
+    users, teachers, course_rows, enrollments, diagnostics, paths, steps = [], [], [], [], [], [], []
+    for offset in range(courses):
+        course_id = 100 + offset
+        user_id = first_user + offset
+        users.append({'id': user_id, 'email': f'teacher{course_id}@bench.local', 'password_hash': 'x',
+                      'first_name': f'Docente{course_id}', 'last_name': 'Bench', 'user_type': UserType.TEACHER})
+        teachers.append({'id': course_id, 'user_id': user_id, 'teacher_id': f'TB{course_id}'})
+        course_rows.append({'id': course_id, 'name': f'Curso {course_id}', 'code': f'C{course_id}',
+                            'description': 'Curso adicional del benchmark', 'teacher_id': course_id})
+        enrollments.append({'id': 10000 + course_id, 'student_id': student_id, 'course_id': course_id,
+                            'is_active': offset % 5 != 4, 'overall_progress': (offset % 10) / 10})
+        diagnostics.append({'course_id': course_id, 'student_id': student_id, 'title': 'Diagnóstico',
+                            'is_completed': offset % 2 == 0, 'percentage': 50.0 + offset})
+        paths.append({'id': 10000 + course_id, 'student_id': student_id, 'course_id': course_id,
+                      'enrollment_id': 10000 + course_id, 'title': f'Ruta {course_id}', 'is_active': True,
+                      'total_steps': steps_per_path, 'current_step': offset % steps_per_path})
+        steps.extend({'learning_path_id': 10000 + course_id, 'resource_id': 1, 'step_order': order,
+                      'title': f'Paso {order} del curso {course_id}',
+                      'status': StepStatus.COMPLETED if order <= offset % steps_per_path else StepStatus.PENDING}
+                     for order in range(1, steps_per_path + 1))
+
+    for model, rows in ((User, users), (Teacher, teachers), (Course, course_rows), (CourseEnrollment, enrollments),
+                        (DiagnosticExam, diagnostics), (LearningPath, paths), (LearningPathStep, steps)):
+        bulk_insert(model, rows)
+    LearningPath.refresh_counters()
+    db.session.commit()
+
+
+def legacy_dashboard(student):
+    """Réplica de la ruta anterior, incluidas las relaciones que recorría la plantilla"""
+    enrollments = student.enrollments
+    active_courses = [e.course for e in enrollments if e.is_active]
+    total_progress = sum(e.overall_progress for e in enrollments if e.is_active)
+    avg_progress = total_progress / len(active_courses) if active_courses else 0
+    completed_diagnostics = DiagnosticExam.query.filter_by(student_id=student.id, is_completed=True).count()
+    active_learning_paths = LearningPath.query.filter_by(student_id=student.id, is_active=True).count()
+    vark_profile = student.get_vark_profile() if student.diagnostic_completed else None
+
+    rendered = {
+        'full_name': student.user.get_full_name(),
+        'teachers': [course.teacher.user.get_full_name() for course in active_courses],
+        'next_steps': [
+            LearningPathStep.query.filter_by(learning_path_id=path.id, step_order=path.current_step + 1).first()
+            for path in student.learning_paths.filter_by(is_active=True)
+        ]
+    }
+    return active_courses, avg_progress, completed_diagnostics, active_learning_paths, vark_profile, rendered
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--courses', type=int, default=12, help='Cursos adicionales del estudiante medido')
+    parser.add_argument('--steps', type=int, default=8, help='Pasos por ruta')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        seed_course(args.students, progress_per_student=5, competencies=4, resources_per_competency=2, seed=args.seed)
+        seed_student_courses(1, args.courses, args.steps)
+        engine = db.engine
+        cache = get_student_dashboard_cache()
+        cache.clear()
+
+        db.session.expunge_all()
+        student = db.session.get(Student, 1)
+        with measure('anterior (ruta + plantilla)', engine):
+            legacy_dashboard(student)
+
+        db.session.expunge_all()
+        with measure('StudentDashboardView (sin caché)', engine):
+            view = get_student_dashboard(1)
+        with measure('StudentDashboardView (en caché)', engine):
+            get_student_dashboard(1)
+
+        # La aplicación no registra user_loader; el usuario anónimo no lo necesita
+        login_manager.user_loader(lambda user_id: None)
+        with app.test_request_context('/student/dashboard'):
+            with measure('render dashboard.html + dashboard_mejorado.html', engine):
+                render_template('student/dashboard.html', title='Mi Dashboard', **view.template_context())
+                render_template('student/dashboard_mejorado.html', title='Mi Dashboard', **view.template_context())
+
+        print(f'Presupuesto: {QUERY_BUDGET} consultas sin caché; caché: {cache.stats()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark de VARKAnalyzer.analyze_responses_batch y recompute_all_profiles
+
+Compara el análisis anterior (diccionarios de pesos recorridos respuesta por
+respuesta, estudiante por estudiante) con el análisis vectorizado en NumPy, y
+el recálculo de perfiles estudiante por estudiante con el recálculo por
+bloques con actualización masiva.
+
+Uso:
+    python -m benchmarks.bench_vark_batch --students 10000
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app import db
+from app.ai.vark_analyzer import STYLE_ORDER, VARKAnalyzer
+from app.models import Student, VARKQuestion, VARKResponse
+from benchmarks.common import add_common_arguments, bulk_insert, create_benchmark_app, measure, seed_course
+
+
+def legacy_analyze_responses(analyzer, responses):
+    """Réplica del análisis anterior"""
+    vark_scores = {'visual': 0.0, 'auditory': 0.0, 'reading': 0.0, 'kinesthetic': 0.0}
+    total_questions = len(responses)
+    if total_questions == 0:
+        return vark_scores
+    for response in responses.values():
+        if response in analyzer.vark_weights:
+            for style, weight in analyzer.vark_weights[response].items():
+                vark_scores[style] += weight
+    for style in vark_scores:
+        vark_scores[style] = (vark_scores[style] / total_questions) * 100
+    return vark_scores
+
+
+def random_questionnaires(count, questions, rng):
+    """Cuestionarios con alguna respuesta inválida, vacía o sin contestar (None)"""
+    choices = ['V', 'A', 'R', 'K'] * 8 + ['X', '', None]
+    return [{q: rng.choice(choices) for q in range(1, questions + 1)} for _ in range(count)]
+
+
+def best_of(function, repeat=5):
+    """Mejor tiempo (ms) de varias ejecuciones, con el valor de la última"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return value, best
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--questions', type=int, default=16)
+    parser.add_argument('--db-students', type=int, default=2000,
+                        help='Estudiantes sembrados para comparar el recálculo en la base de datos')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    analyzer = VARKAnalyzer()
+    # Pesos fraccionarios para comprobar que el orden de suma coincide
+    analyzer.vark_weights['V'] = {'visual': 0.7, 'auditory': 0.1, 'reading': 0.1, 'kinesthetic': 0.1}
+    questionnaires = random_questionnaires(args.students, args.questions, rng)
+
+    legacy, legacy_ms = best_of(lambda: [legacy_analyze_responses(analyzer, r) for r in questionnaires])
+    batch, batch_ms = best_of(lambda: analyzer.analyze_responses_batch(questionnaires))
+
+    for i, scores in enumerate(legacy):
+        assert [scores[style] for style in STYLE_ORDER] == batch['scores'][i].tolist(), i
+        assert analyzer.get_dominant_style(scores) == batch['dominant_styles'][i]
+        assert analyzer._identify_strengths(scores) == [s for s, m in zip(STYLE_ORDER, batch['strengths'][i]) if m]
+        assert analyzer._identify_weaknesses(scores) == [s for s, m in zip(STYLE_ORDER, batch['weaknesses'][i]) if m]
+    print(f'{args.students} cuestionarios: anterior {legacy_ms:.1f} ms, lote {batch_ms:.1f} ms; resultados idénticos')
+
+    matrix = np.array([[rng.choice('VARK') for _ in range(args.questions)] for _ in range(args.students)])
+    _, matrix_ms = best_of(lambda: analyzer.analyze_responses_batch(matrix))
+    print(f'Matriz {matrix.shape[0]}x{matrix.shape[1]}: {matrix_ms:.1f} ms')
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        questionnaires = questionnaires[:args.db_students]
+        print(f'Sembrando {len(questionnaires)} estudiantes con respuestas VARK...')
+        seed_course(len(questionnaires), progress_per_student=0, competencies=1, resources_per_competency=1, seed=args.seed)
+        bulk_insert(VARKQuestion, [{'id': q, 'question_text': f'Pregunta {q}', 'question_number': q}
+                                   for q in range(1, args.questions + 1)])
+        bulk_insert(VARKResponse, [
+            {'student_id': student_id, 'question_id': question_id, 'selected_option': option}
+            for student_id, responses in enumerate(questionnaires, start=1)
+            for question_id, option in responses.items() if option is not None
+        ])
+        db.session.commit()
+        sql_engine = db.engine
+
+        with measure('por estudiante (perfil + actualización)', sql_engine):
+            for student in Student.query.order_by(Student.id).all():
+                responses = {r.question_id: r.selected_option for r in student.vark_responses}
+                scores = legacy_analyze_responses(analyzer, responses)
+                analyzer.update_student_vark_profile(student.id, scores)
+        individual = db.session.query(
+            Student.vark_visual, Student.vark_auditory, Student.vark_reading,
+            Student.vark_kinesthetic, Student.dominant_learning_style
+        ).order_by(Student.id).all()
+
+        Student.query.update({Student.vark_visual: 0.0, Student.dominant_learning_style: None})
+        db.session.commit()
+        db.session.expunge_all()
+
+        with measure('en bloque (recompute_all_profiles)', sql_engine):
+            result = analyzer.recompute_all_profiles(chunk_size=args.chunk_size)
+        bulk = db.session.query(
+            Student.vark_visual, Student.vark_auditory, Student.vark_reading,
+            Student.vark_kinesthetic, Student.dominant_learning_style
+        ).order_by(Student.id).all()
+
+        assert result['success'] and result['updated'] == len(questionnaires), result
+        assert [tuple(row) for row in bulk] == [tuple(row) for row in individual]
+        print('Perfiles equivalentes')
+
+
+if __name__ == '__main__':
+    main()
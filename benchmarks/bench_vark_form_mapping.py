@@ -0,0 +1,97 @@
+"""
+Micro-benchmark de VARKFormsIntegration._map_forms_responses_to_vark
+
+Compara el mapeo anterior (diccionario anidado reconstruido en cada llamada y
+comparación exacta de la frase completa) con la tabla precompilada de
+vark_form_mapping sobre envíos sintéticos, incluyendo variantes de
+mayúsculas, tildes, espacios y opciones editadas.
+
+Uso:
+    python -m benchmarks.bench_vark_form_mapping --submissions 10000
+"""
+
+import argparse
+import random
+import time
+import unicodedata
+
+from app.ai.vark_form_mapping import DEFAULT_ANSWER_MATCHER, VARK_FORM_QUESTIONS
+from benchmarks.common import add_common_arguments
+
+
+def legacy_map(forms_data):
+    """Réplica del mapeo anterior: construye el diccionario anidado en cada llamada"""
+    question_mapping = {
+        f"entry.{question['question_number']}": {text: code for code, text in question['options'].items()}
+        for question in VARK_FORM_QUESTIONS
+    }
+    vark_responses = {}
+    for entry_key, response_text in forms_data.items():
+        if entry_key in question_mapping:
+            question_number = int(entry_key.split('.')[1])
+            vark_option = question_mapping[entry_key].get(response_text)
+            if vark_option:
+                vark_responses[question_number] = vark_option
+    return vark_responses
+
+
+def strip_accents(text):
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def vary(text, rng):
+    """Variantes que un usuario o un editor del formulario producen"""
+    variant = rng.random()
+    if variant < 0.1:
+        return text.upper()
+    if variant < 0.2:
+        return strip_accents(text)
+    if variant < 0.3:
+        return '  ' + text.rstrip('.').replace(' ', '  ') + ' '
+    if variant < 0.35:
+        return text.replace('prácticos', 'practicos').replace('.', '') + ' y similares'
+    return text
+
+
+def synthetic_submissions(count, rng):
+    """Envíos del formulario y los códigos VARK que realmente se eligieron"""
+    submissions = []
+    for _ in range(count):
+        data = {'emailAddress': 'alumno@example.com'}
+        expected = {}
+        for question in VARK_FORM_QUESTIONS:
+            code = rng.choice('VARK')
+            data[f"entry.{question['question_number']}"] = vary(question['options'][code], rng)
+            expected[question['question_number']] = code
+        submissions.append((data, expected))
+    return submissions
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--submissions', type=int, default=10000)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    submissions = synthetic_submissions(args.submissions, rng)
+    forms_data = [data for data, _ in submissions]
+    expected = [codes for _, codes in submissions]
+
+    results = {}
+    for label, function in (('anterior', legacy_map), ('precompilado', DEFAULT_ANSWER_MATCHER.map_form_data)):
+        start = time.perf_counter()
+        mapped = [function(data) for data in forms_data]
+        elapsed = time.perf_counter() - start
+        recognized = sum(len(m) for m in mapped)
+        wrong = sum(1 for m, e in zip(mapped, expected) for q, code in m.items() if e[q] != code)
+        results[label] = mapped
+        print(f'{label:<14} {elapsed / len(forms_data) * 1e6:>8.1f} µs/envío  '
+              f'{recognized / sum(len(e) for e in expected):>7.1%} respuestas reconocidas, {wrong} erróneas')
+
+    # Lo que el mapeo anterior reconocía se sigue reconociendo igual
+    for old, new in zip(results['anterior'], results['precompilado']):
+        assert all(new.get(q) == code for q, code in old.items())
+
+
+if __name__ == '__main__':
+    main()
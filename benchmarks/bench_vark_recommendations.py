@@ -0,0 +1,74 @@
+"""
+Benchmark de RecommendationEngine._get_vark_based_recommendations
+
+Compara la implementación anterior (una consulta del estudiante por recurso y
+puntaje en Python) con el puntaje vectorizado de todo el catálogo.
+
+Uso:
+    python -m benchmarks.bench_vark_recommendations --resources 20000
+"""
+
+import argparse
+
+from app import db
+from app.ai.recommendation_engine import RecommendationEngine, VARK_COMPATIBILITY_THRESHOLD
+from app.models import Resource, Student
+from benchmarks.common import add_common_arguments, create_benchmark_app, measure, seed_course
+
+
+def legacy_vark_recommendations(engine, student_id):
+    """Réplica del bucle anterior: compatibilidad recurso por recurso"""
+    recommendations = []
+    for resource in Resource.query.filter_by(is_active=True).order_by(Resource.id).all():
+        compatibility = engine.vark_analyzer.get_learning_style_compatibility(
+            student_id,
+            resource.resource_type.value
+        )
+        if compatibility >= VARK_COMPATIBILITY_THRESHOLD:
+            recommendations.append({'target_id': resource.id, 'relevance_score': compatibility * 0.8})
+    return recommendations
+
+
+def main():
+    parser = add_common_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--resources', type=int, default=20000)
+    parser.add_argument('--limit', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        print(f'Sembrando {args.resources} recursos...')
+        seed_course(num_students=50, progress_per_student=1, competencies=100,
+                    resources_per_competency=max(1, args.resources // 100), seed=args.seed)
+        sql_engine = db.engine
+        engine = RecommendationEngine()
+
+        # Perfil marcadamente kinestésico para que existan recursos sobre el umbral
+        student = Student.query.order_by(Student.id).first()
+        student.vark_visual, student.vark_auditory, student.vark_reading = 10.0, 5.0, 5.0
+        student.vark_kinesthetic = 80.0
+        student.dominant_learning_style = 'K'
+        db.session.commit()
+        student_id = student.id
+        db.session.expunge_all()
+
+        with measure('legacy (consulta por recurso)', sql_engine):
+            legacy = legacy_vark_recommendations(engine, student_id)
+        db.session.expunge_all()
+
+        with measure('vectorizado (todas)', sql_engine):
+            vectorized = engine._get_vark_based_recommendations(student_id)
+        db.session.expunge_all()
+
+        with measure(f'vectorizado (top {args.limit})', sql_engine):
+            top = engine._get_vark_based_recommendations(student_id, args.limit)
+
+        assert [r['target_id'] for r in vectorized] == [
+            r['target_id'] for r in sorted(legacy, key=lambda r: r['relevance_score'], reverse=True)
+        ]
+        assert [r['target_id'] for r in top] == [r['target_id'] for r in vectorized[:args.limit]]
+        print(f'{len(legacy)} recursos compatibles; resultados equivalentes a la implementación anterior')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Utilidades compartidas por los benchmarks: creación de la app sobre una base
+de datos desechable, siembra masiva de datos y conteo de consultas SQL
+"""
+
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+from app import create_app, db
+from app.models import (
+    User, Student, Teacher, Course, CourseEnrollment, DiagnosticExam,
+    LearningPath, Progress, Competency, Resource
+)
+from app.models.user import UserType
+from app.models.learning import ResourceType
+from config import TestingConfig
+
+STYLES = ['V', 'A', 'R', 'K', None]
+ACTIVITY_TYPES = ['diagnostic', 'learning', 'assessment']
+
+
+def add_common_arguments(parser):
+    """Agregar argumentos comunes a un parser de argparse"""
+    parser.add_argument('--database-url', default=None,
+                        help='URL de SQLAlchemy (por defecto un SQLite temporal)')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla aleatoria')
+    return parser
+
+
+def create_benchmark_app(database_url=None, **config_overrides):
+    """
+    Crear la aplicación apuntando a una base de datos de benchmark
+
+    Args:
+        database_url (str): URL de la base de datos; si es None se usa un
+            archivo SQLite temporal
+
+    Returns:
+        Flask: Aplicación configurada
+    """
+    if database_url is None:
+        fd, path = tempfile.mkstemp(prefix='sti_bench_', suffix='.db')
+        os.close(fd)
+        database_url = f'sqlite:///{path}'
+
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ECHO = False
+
+    for key, value in config_overrides.items():
+        setattr(BenchmarkConfig, key, value)
+
+    from config import config
+    config['benchmark'] = BenchmarkConfig
+    return create_app('benchmark')
+
+
+def bulk_insert(model, rows, chunk_size=5000):
+    """Insertar filas en bloques con executemany"""
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(insert(model), rows[start:start + chunk_size])
+
+
+def seed_course(num_students=10000, progress_per_student=5, competencies=10,
+                resources_per_competency=4, seed=42):
+    """
+    Sembrar un curso con estudiantes, matrículas, diagnósticos, rutas y progreso
+
+    Args:
+        num_students (int): Número de estudiantes matriculados
+        progress_per_student (int): Registros de progreso por estudiante
+        competencies (int): Competencias del curso
+        resources_per_competency (int): Recursos por competencia
+        seed (int): Semilla aleatoria
+
+    Returns:
+        int: ID del curso sembrado
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    db.drop_all()
+    db.create_all()
+
+    bulk_insert(User, [{
+        'id': 1, 'email': 'teacher@bench.local', 'password_hash': 'x',
+        'first_name': 'Bench', 'last_name': 'Teacher', 'user_type': UserType.TEACHER
+    }])
+    bulk_insert(Teacher, [{'id': 1, 'user_id': 1, 'teacher_id': 'TB001'}])
+    bulk_insert(Course, [{'id': 1, 'name': 'Curso Benchmark', 'code': 'BENCH1', 'teacher_id': 1}])
+
+    bulk_insert(Competency, [{
+        'id': c, 'course_id': 1, 'name': f'Competencia {c}', 'code': f'BC{c}',
+        'prerequisites': [c - 1] if c > 1 else []
+    } for c in range(1, competencies + 1)])
+
+    resource_types = list(ResourceType)
+    resources = []
+    for c in range(1, competencies + 1):
+        for _ in range(resources_per_competency):
+            resources.append({
+                'id': len(resources) + 1, 'course_id': 1, 'competency_id': c,
+                'title': f'Recurso {len(resources) + 1}',
+                'resource_type': rng.choice(resource_types),
+                'duration': rng.randint(10, 60), 'points': 1,
+                'visual_score': rng.random(), 'auditory_score': rng.random(),
+                'reading_score': rng.random(), 'kinesthetic_score': rng.random()
+            })
+    bulk_insert(Resource, resources)
+
+    users, students, enrollments, diagnostics, paths, progress = [], [], [], [], [], []
+    for i in range(1, num_students + 1):
+        user_id = i + 1
+        style = rng.choice(STYLES)
+        scores = [rng.random() for _ in range(4)]
+        total = sum(scores)
+        users.append({
+            'id': user_id, 'email': f'student{i}@bench.local', 'password_hash': 'x',
+            'first_name': f'Nombre{i}', 'last_name': f'Apellido{i}', 'user_type': UserType.STUDENT
+        })
+        students.append({
+            'id': i, 'user_id': user_id, 'student_id': f'B{i:07d}',
+            'vark_visual': scores[0] / total * 100, 'vark_auditory': scores[1] / total * 100,
+            'vark_reading': scores[2] / total * 100, 'vark_kinesthetic': scores[3] / total * 100,
+            'dominant_learning_style': style, 'diagnostic_completed': True
+        })
+        is_active = rng.random() < 0.9
+        enrollments.append({
+            'id': i, 'student_id': i, 'course_id': 1, 'is_active': is_active,
+            'overall_progress': rng.random(),
+            'completion_date': now if not is_active else None
+        })
+        completed = rng.random() < 0.8
+        diagnostics.append({
+            'id': i, 'course_id': 1, 'student_id': i, 'title': 'Diagnóstico',
+            'is_completed': completed,
+            'percentage': rng.uniform(0, 100) if completed else None,
+            'competency_scores': {str(c): {'percentage': rng.uniform(0, 100)}
+                                  for c in range(1, competencies + 1)} if completed else None
+        })
+        path_progress = rng.uniform(0, 100)
+        paths.append({
+            'id': i, 'student_id': i, 'course_id': 1, 'enrollment_id': i,
+            'title': 'Ruta', 'is_active': True, 'total_steps': 10,
+            'completion_percentage': path_progress, 'is_completed': path_progress >= 100
+        })
+        for _ in range(progress_per_student):
+            progress.append({
+                'student_id': i, 'course_id': 1, 'enrollment_id': i,
+                'activity_type': rng.choice(ACTIVITY_TYPES),
+                'activity_id': rng.randint(1, len(resources)),
+                'competency_id': rng.randint(1, competencies),
+                'score': 1, 'max_score': 1, 'percentage': rng.uniform(0, 100),
+                'created_at': now - timedelta(days=rng.randint(0, 45), seconds=rng.randint(0, 86400))
+            })
+
+    for model, rows in ((User, users), (Student, students), (CourseEnrollment, enrollments),
+                        (DiagnosticExam, diagnostics), (LearningPath, paths), (Progress, progress)):
+        bulk_insert(model, rows)
+
+    db.session.commit()
+    return 1
+
+
+class QueryCounter:
+    """Contador de sentencias SQL ejecutadas sobre un engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return False
+
+
+@contextmanager
+def measure(label, engine, results=None):
+    """
+    Medir latencia y número de consultas SQL de un bloque
+
+    Args:
+        label (str): Etiqueta a imprimir
+        engine: Engine de SQLAlchemy a observar
+        results (dict): Si se indica, se guarda ahí la medición bajo ``label``
+    """
+    counter = QueryCounter(engine)
+    start = time.perf_counter()
+    with counter:
+        yield counter
+    elapsed = time.perf_counter() - start
+    print(f'{label:<45} {counter.count:>7} consultas {elapsed * 1000:>11.1f} ms')
+    if results is not None:
+        results[label] = {'queries': counter.count, 'seconds': elapsed}
@@ -19,9 +19,37 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = 'uploads'
     
+    # Pool de conexiones de la base de datos (app/db_pool.py)
+    # El perfil se elige por despliegue; las variables DB_POOL_* sobrescriben valores sueltos
+    DB_POOL_PROFILE = os.environ.get('DB_POOL_PROFILE', 'default')
+    DB_POOL_PROFILES = {
+        # Valores por defecto de SQLAlchemy (5 + 10) con pre-ping
+        'default': {'pool_pre_ping': True, 'pool_recycle': 3600},
+        # Un proceso de gunicorn con workers síncronos: pocas conexiones por proceso
+        'web': {'pool_size': 5, 'max_overflow': 5, 'pool_timeout': 10, 'pool_recycle': 1800, 'pool_pre_ping': True},
+        # Workers con hilos (gthread) o hilos de webhooks: una conexión por hilo
+        'threaded': {'pool_size': 10, 'max_overflow': 10, 'pool_timeout': 15, 'pool_recycle': 1800,
+                     'pool_pre_ping': True},
+        # Comandos flask y tareas largas: una conexión, espera larga
+        'batch': {'pool_size': 1, 'max_overflow': 1, 'pool_timeout': 60, 'pool_recycle': 3600, 'pool_pre_ping': True}
+    }
+    DB_POOL_SIZE = os.environ.get('DB_POOL_SIZE')
+    DB_MAX_OVERFLOW = os.environ.get('DB_MAX_OVERFLOW')
+    DB_POOL_TIMEOUT = os.environ.get('DB_POOL_TIMEOUT')  # Segundos de espera por una conexión
+    DB_POOL_RECYCLE = os.environ.get('DB_POOL_RECYCLE')  # Segundos; menor que wait_timeout de MySQL
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING')  # 1/0
+    
     # Configuración de Google Forms
     GOOGLE_FORMS_API_KEY = os.environ.get('GOOGLE_FORMS_API_KEY')
     GOOGLE_FORMS_FORM_ID = os.environ.get('GOOGLE_FORMS_FORM_ID')
+    GOOGLE_FORMS_API_URL = os.environ.get('GOOGLE_FORMS_API_URL') or 'https://forms.googleapis.com/v1/forms'
+    
+    # Descarga incremental de respuestas (flask pull-form-responses)
+    FORMS_PULL_MAX_WORKERS = int(os.environ.get('FORMS_PULL_MAX_WORKERS', 4))  # Formularios en paralelo
+    FORMS_PULL_PAGE_SIZE = int(os.environ.get('FORMS_PULL_PAGE_SIZE', 500))
+    FORMS_PULL_TIMEOUT = float(os.environ.get('FORMS_PULL_TIMEOUT', 30))  # Segundos por petición
+    FORMS_PULL_RETRIES = int(os.environ.get('FORMS_PULL_RETRIES', 3))
+    FORMS_SYNC_STATE_PATH = os.environ.get('FORMS_SYNC_STATE_PATH')  # Por defecto instance/forms_sync_state.json
     
     # Configuración específica del formulario VARK
     VARK_FORM_ID = '1FAIpQLSf9eQT1ZEn_NncQiLdsvej-HZVQuFzjAYkqQU1UV4ORl-Lg9A'
@@ -49,6 +77,71 @@ class Config:
     # Configuración de rutas de aprendizaje
     MAX_LEARNING_PATH_LENGTH = 50
     MIN_MASTERY_THRESHOLD = 0.7  # 70% para considerar dominio
+    
+    # Configuración de analíticas materializadas
+    ANALYTICS_SNAPSHOT_MAX_AGE = int(os.environ.get('ANALYTICS_SNAPSHOT_MAX_AGE', 300))  # Segundos
+    
+    # Tendencias de rendimiento (app/ai/performance_trends.py)
+    PERFORMANCE_TRENDS_DAYS = int(os.environ.get('PERFORMANCE_TRENDS_DAYS', 30))  # Días de la ventana
+    PERFORMANCE_TRENDS_BUCKET = os.environ.get('PERFORMANCE_TRENDS_BUCKET', 'day')  # day, week o month
+    PERFORMANCE_TRENDS_ROLLING_WINDOW = int(os.environ.get('PERFORMANCE_TRENDS_ROLLING_WINDOW', 7))  # Periodos del promedio móvil
+    PERFORMANCE_TRENDS_STREAM_DAYS = int(os.environ.get('PERFORMANCE_TRENDS_STREAM_DAYS', 366))  # Ventanas más largas se recorren con yield_per
+    PERFORMANCE_TRENDS_YIELD_PER = int(os.environ.get('PERFORMANCE_TRENDS_YIELD_PER', 1000))  # Filas por lote al recorrer
+    PERFORMANCE_TRENDS_CACHE_TTL = int(os.environ.get('PERFORMANCE_TRENDS_CACHE_TTL', 300))  # Segundos
+    PERFORMANCE_TRENDS_CACHE_MAX_ENTRIES = int(os.environ.get('PERFORMANCE_TRENDS_CACHE_MAX_ENTRIES', 512))
+    
+    # Configuración de la caché del catálogo de recursos
+    RESOURCE_CACHE_TTL = int(os.environ.get('RESOURCE_CACHE_TTL', 600))  # Segundos
+    RESOURCE_CACHE_MAX_ENTRIES = int(os.environ.get('RESOURCE_CACHE_MAX_ENTRIES', 256))  # Cursos en caché
+    COMPETENCY_GRAPH_CACHE_MAX_ENTRIES = int(os.environ.get('COMPETENCY_GRAPH_CACHE_MAX_ENTRIES', 256))  # Cursos en caché
+    
+    # Configuración de la caché del dashboard del estudiante
+    STUDENT_DASHBOARD_CACHE_TTL = int(os.environ.get('STUDENT_DASHBOARD_CACHE_TTL', 120))  # Segundos
+    STUDENT_DASHBOARD_CACHE_MAX_ENTRIES = int(os.environ.get('STUDENT_DASHBOARD_CACHE_MAX_ENTRIES', 1024))  # Estudiantes en caché
+    
+    # Configuración de la caché de respuestas HTML por usuario
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')  # memory, filesystem o none
+    RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR')  # Solo filesystem (por defecto instance/response_cache)
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))  # Segundos
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 512))  # Solo memory
+    
+    # Catálogo de materiales de Drive (app/drive_config.py)
+    MATERIALS_RELOAD_INTERVAL = float(os.environ.get('MATERIALS_RELOAD_INTERVAL', 2))  # Segundos entre revisiones; 0 desactiva la recarga
+    
+    # Exportación en streaming de cursos (/teacher/course/<id>/export y flask export-course)
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))  # Filas por bloque del cursor
+    
+    # Configuración del perfilado de peticiones y métricas (/api/metrics)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '1') != '0'
+    PROFILING_N_PLUS_ONE_THRESHOLD = int(os.environ.get('PROFILING_N_PLUS_ONE_THRESHOLD', 10))  # Repeticiones por petición
+    PROFILING_SLOW_QUERY_COUNT = int(os.environ.get('PROFILING_SLOW_QUERY_COUNT', 3))
+    PROFILING_LOG_PATH = os.environ.get('PROFILING_LOG_PATH')  # Log JSONL rotativo (opcional)
+    PROFILING_LOG_MAX_BYTES = int(os.environ.get('PROFILING_LOG_MAX_BYTES', 10 * 1024 * 1024))
+    PROFILING_LOG_BACKUPS = int(os.environ.get('PROFILING_LOG_BACKUPS', 5))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Acceso del recolector de Prometheus
+    
+    # Configuración de la ingesta de webhooks ('sync' procesa en la petición, 'queue' encola y responde 202)
+    WEBHOOK_INTAKE_MODE = os.environ.get('WEBHOOK_INTAKE_MODE', 'sync')
+    WEBHOOK_QUEUE_PATH = os.environ.get('WEBHOOK_QUEUE_PATH')  # Por defecto instance/webhook_queue.db
+    WEBHOOK_WORKERS = int(os.environ.get('WEBHOOK_WORKERS', 2))  # 0: solo con flask process-webhooks
+    WEBHOOK_BATCH_SIZE = int(os.environ.get('WEBHOOK_BATCH_SIZE', 20))
+    WEBHOOK_POLL_INTERVAL = float(os.environ.get('WEBHOOK_POLL_INTERVAL', 1.0))  # Segundos
+    WEBHOOK_QUEUE_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_QUEUE_MAX_ATTEMPTS', 3))
+    WEBHOOK_QUEUE_VISIBILITY_TIMEOUT = int(os.environ.get('WEBHOOK_QUEUE_VISIBILITY_TIMEOUT', 300))  # Segundos
+    WEBHOOK_DEDUP_WINDOW = int(os.environ.get('WEBHOOK_DEDUP_WINDOW', 900))  # Segundos; sin Idempotency-Key
+    WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET')  # Cabecera X-Webhook-Secret (opcional)
+    
+    # Compatibilidad: los métodos de los modelos vuelven a confirmar por su cuenta (ver app/unit_of_work.py)
+    MODEL_AUTOCOMMIT = os.environ.get('MODEL_AUTOCOMMIT', '0') == '1'
+    
+    # Escritura del progreso ('sync' guarda en la petición, 'buffer' responde 202 y escribe por lotes)
+    PROGRESS_WRITE_MODE = os.environ.get('PROGRESS_WRITE_MODE', 'sync')
+    PROGRESS_BUFFER_BATCH_SIZE = int(os.environ.get('PROGRESS_BUFFER_BATCH_SIZE', 200))
+    PROGRESS_BUFFER_FLUSH_INTERVAL = float(os.environ.get('PROGRESS_BUFFER_FLUSH_INTERVAL', 1.0))  # Segundos
+    PROGRESS_BUFFER_MAX_PENDING = int(os.environ.get('PROGRESS_BUFFER_MAX_PENDING', 10000))
+    PROGRESS_BUFFER_JOURNAL_DIR = os.environ.get('PROGRESS_BUFFER_JOURNAL_DIR')  # Por defecto instance/progress_journal
+    PROGRESS_BUFFER_FSYNC = os.environ.get('PROGRESS_BUFFER_FSYNC', '0') == '1'
+    PROGRESS_BUFFER_VALIDATION_TTL = int(os.environ.get('PROGRESS_BUFFER_VALIDATION_TTL', 300))  # Segundos
 
 class DevelopmentConfig(Config):
     """Configuración para desarrollo"""
@@ -64,6 +157,7 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Configuración para producción"""
     DEBUG = False
+    DB_POOL_PROFILE = os.environ.get('DB_POOL_PROFILE', 'web')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'mysql+pymysql://root:@localhost:3306/sti_database_prod'
     
@@ -0,0 +1,57 @@
+"""Índices compuestos para los filtros más frecuentes
+
+Primera migración del proyecto: el esquema base lo crea ``db.create_all()``
+(init_db.py), que en bases nuevas ya incluye estos índices. Por eso solo se
+crean los que no existen, y la migración sirve tanto para bases anteriores
+como para bases recién creadas.
+
+La matrícula única por estudiante y curso falla si ya hay matrículas
+duplicadas; deben eliminarse antes de aplicar la migración.
+
+Revision ID: 4c4eaf44c336
+Revises:
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c4eaf44c336'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (tabla, nombre del índice, columnas, único)
+INDEXES = [
+    ('diagnostic_exams', 'ix_diagnostic_exams_student_course_completed',
+     ['student_id', 'course_id', 'is_completed'], False),
+    ('diagnostic_exams', 'ix_diagnostic_exams_course_completed', ['course_id', 'is_completed'], False),
+    ('learning_paths', 'ix_learning_paths_student_course_active', ['student_id', 'course_id', 'is_active'], False),
+    ('learning_paths', 'ix_learning_paths_course_active', ['course_id', 'is_active'], False),
+    ('learning_path_steps', 'ix_learning_path_steps_path_order', ['learning_path_id', 'step_order'], False),
+    ('progress', 'ix_progress_student_activity_percentage', ['student_id', 'activity_type', 'percentage'], False),
+    ('progress', 'ix_progress_course_created', ['course_id', 'created_at'], False),
+    ('course_enrollments', 'uq_course_enrollments_student_course', ['student_id', 'course_id'], True),
+    ('course_enrollments', 'ix_course_enrollments_course_active', ['course_id', 'is_active'], False),
+    ('resources', 'ix_resources_competency_active', ['competency_id', 'is_active'], False),
+    ('resources', 'ix_resources_course_active', ['course_id', 'is_active'], False),
+    ('vark_responses', 'ix_vark_responses_student', ['student_id'], False),
+]
+
+
+def _existing_indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for table, name, columns, unique in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for table, name, columns, unique in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
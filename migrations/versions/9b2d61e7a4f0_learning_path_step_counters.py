@@ -0,0 +1,87 @@
+"""Contador de pasos completados y puntero al siguiente paso de las rutas
+
+Agrega ``learning_paths.completed_steps`` y ``learning_paths.next_step_id``
+(si no existen; ``db.create_all()`` ya los crea en bases nuevas) y los
+calcula desde ``learning_path_steps`` junto con ``current_step`` y
+``completion_percentage``, igual que ``flask repair-path-counters``.
+
+Revision ID: 9b2d61e7a4f0
+Revises: 4c4eaf44c336
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2d61e7a4f0'
+down_revision = '4c4eaf44c336'
+branch_labels = None
+depends_on = None
+
+# Estados (nombres del Enum StepStatus) que dejan atrás un paso
+PASSED_STATUSES = ('COMPLETED', 'SKIPPED')
+
+learning_paths = sa.table(
+    'learning_paths',
+    sa.column('id', sa.Integer),
+    sa.column('total_steps', sa.Integer),
+    sa.column('current_step', sa.Integer),
+    sa.column('completed_steps', sa.Integer),
+    sa.column('next_step_id', sa.Integer),
+    sa.column('completion_percentage', sa.Float)
+)
+
+learning_path_steps = sa.table(
+    'learning_path_steps',
+    sa.column('id', sa.Integer),
+    sa.column('learning_path_id', sa.Integer),
+    sa.column('step_order', sa.Integer),
+    sa.column('status', sa.String)
+)
+
+
+def _existing_columns():
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('learning_paths')}
+
+
+def upgrade():
+    existing = _existing_columns()
+    with op.batch_alter_table('learning_paths') as batch_op:
+        if 'completed_steps' not in existing:
+            batch_op.add_column(sa.Column('completed_steps', sa.Integer(), nullable=True, server_default='0'))
+        if 'next_step_id' not in existing:
+            batch_op.add_column(sa.Column('next_step_id', sa.Integer(), nullable=True))
+
+    completed = sa.select(sa.func.count(learning_path_steps.c.id)).where(
+        learning_path_steps.c.learning_path_id == learning_paths.c.id,
+        learning_path_steps.c.status == 'COMPLETED'
+    ).scalar_subquery()
+    pending = sa.select(learning_path_steps.c.id).where(
+        learning_path_steps.c.learning_path_id == learning_paths.c.id,
+        learning_path_steps.c.status.notin_(PASSED_STATUSES)
+    ).order_by(learning_path_steps.c.step_order, learning_path_steps.c.id).limit(1)
+
+    op.execute(learning_paths.update().values(
+        completed_steps=completed,
+        next_step_id=pending.scalar_subquery(),
+        current_step=sa.func.coalesce(
+            pending.with_only_columns(learning_path_steps.c.step_order).scalar_subquery() - 1,
+            learning_paths.c.total_steps
+        ),
+        completion_percentage=sa.case(
+            (learning_paths.c.total_steps > 0,
+             sa.cast(completed, sa.Float) / learning_paths.c.total_steps * 100),
+            else_=0.0
+        )
+    ))
+
+
+def downgrade():
+    existing = _existing_columns()
+    with op.batch_alter_table('learning_paths') as batch_op:
+        if 'next_step_id' in existing:
+            batch_op.drop_column('next_step_id')
+        if 'completed_steps' in existing:
+            batch_op.drop_column('completed_steps')
@@ -0,0 +1,43 @@
+"""Índices de learning_analytics para las métricas de engagement
+
+El engagement del curso une ``learning_analytics`` con ``course_enrollments``
+por (curso, estudiante) y el del estudiante busca su última sesión. Igual que
+la primera migración, solo se crean los índices que no existen
+(``db.create_all()`` ya los crea en bases nuevas).
+
+Revision ID: c3e8d51a7b92
+Revises: 9b2d61e7a4f0
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8d51a7b92'
+down_revision = '9b2d61e7a4f0'
+branch_labels = None
+depends_on = None
+
+# (nombre del índice, columnas)
+INDEXES = [
+    ('ix_learning_analytics_course_student', ['course_id', 'student_id']),
+    ('ix_learning_analytics_student_created', ['student_id', 'created_at']),
+]
+
+
+def _existing_indexes():
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('learning_analytics')}
+
+
+def upgrade():
+    for name, columns in INDEXES:
+        if name not in _existing_indexes():
+            op.create_index(name, 'learning_analytics', columns)
+
+
+def downgrade():
+    for name, columns in reversed(INDEXES):
+        if name in _existing_indexes():
+            op.drop_index(name, table_name='learning_analytics')
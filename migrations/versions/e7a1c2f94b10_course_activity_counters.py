@@ -0,0 +1,79 @@
+"""Contadores de progreso por curso y tipo de actividad
+
+Crea ``course_activity_counters`` (si no existe; ``db.create_all()`` ya la
+crea en bases nuevas) y la llena desde ``progress`` para los cursos que
+tienen instantánea de analíticas. Reemplaza a la columna JSON
+``course_analytics_snapshots.activity_distribution``, que ya no se lee ni
+se escribe y se deja en su lugar.
+
+Revision ID: e7a1c2f94b10
+Revises: c3e8d51a7b92
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a1c2f94b10'
+down_revision = 'c3e8d51a7b92'
+branch_labels = None
+depends_on = None
+
+progress = sa.table(
+    'progress',
+    sa.column('course_id', sa.Integer),
+    sa.column('activity_type', sa.String),
+    sa.column('percentage', sa.Float)
+)
+
+course_analytics_snapshots = sa.table(
+    'course_analytics_snapshots',
+    sa.column('course_id', sa.Integer)
+)
+
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    existing = _existing_tables()
+    if 'course_activity_counters' in existing:
+        return
+
+    counters = op.create_table(
+        'course_activity_counters',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('course_id', sa.Integer(), sa.ForeignKey('courses.id'), nullable=False),
+        sa.Column('activity_type', sa.String(length=50), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('scored', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('percentage_sum', sa.Float(), nullable=False, server_default='0')
+    )
+    op.create_index('uq_course_activity_counters_course_type', 'course_activity_counters',
+                    ['course_id', 'activity_type'], unique=True)
+
+    if 'course_analytics_snapshots' not in existing:
+        return
+
+    # Mismos agregados que AnalyticsEngine._aggregate_progress al reconstruir
+    op.execute(counters.insert().from_select(
+        ['course_id', 'activity_type', 'count', 'scored', 'percentage_sum'],
+        sa.select(
+            progress.c.course_id,
+            progress.c.activity_type,
+            sa.func.count(),
+            sa.func.count(progress.c.percentage),
+            sa.func.coalesce(sa.func.sum(progress.c.percentage), 0.0)
+        ).where(
+            progress.c.course_id.in_(sa.select(course_analytics_snapshots.c.course_id))
+        ).group_by(progress.c.course_id, progress.c.activity_type)
+    ))
+
+
+def downgrade():
+    if 'course_activity_counters' in _existing_tables():
+        op.drop_index('uq_course_activity_counters_course_type', table_name='course_activity_counters')
+        op.drop_table('course_activity_counters')
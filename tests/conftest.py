@@ -0,0 +1,61 @@
+"""
+Fixtures compartidas: aplicación sobre un SQLite desechable por prueba y
+clientes con sesión iniciada
+"""
+
+import pytest
+
+from app import db, login_manager
+from app.models import User
+from benchmarks.common import QueryCounter, create_benchmark_app
+
+
+@pytest.fixture
+def app_factory(tmp_path):
+    """Crear aplicaciones sobre un SQLite del directorio temporal de la prueba"""
+    apps = []
+
+    def factory(**overrides):
+        app = create_benchmark_app(f'sqlite:///{tmp_path / f"sti_{len(apps)}.db"}', **overrides)
+        # La aplicación no registra user_loader; las pruebas inician sesión por ID
+        login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+        apps.append(app)
+        return app
+
+    yield factory
+
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(app_factory):
+    return app_factory()
+
+
+@pytest.fixture
+def client_for(app):
+    """
+    Cliente de pruebas con la sesión de un usuario (None: anónimo)
+
+    Las peticiones deben hacerse fuera de ``app.app_context()``: dentro de él
+    comparten ``g`` y Flask-Login reutilizaría el usuario de la petición anterior.
+    """
+    def client_for(user_id=None):
+        client = app.test_client()
+        if user_id is not None:
+            with client.session_transaction() as session:
+                session['_user_id'] = str(user_id)
+                session['_fresh'] = True
+        return client
+    return client_for
+
+
+@pytest.fixture
+def count_queries(app):
+    """Contador de consultas sobre el engine de la aplicación"""
+    with app.app_context():
+        engine = db.engine
+    return lambda: QueryCounter(engine)
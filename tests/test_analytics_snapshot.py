@@ -0,0 +1,78 @@
+"""
+Pruebas de los contadores de progreso de la instantánea de analíticas
+"""
+
+import pytest
+
+from app import db
+from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+from app.models import CourseActivityCounter, CourseAnalyticsSnapshot, Progress
+from benchmarks.common import bulk_insert, seed_course
+
+
+@pytest.fixture
+def snapshot_app(app):
+    with app.app_context():
+        seed_course(5, progress_per_student=3, competencies=2, resources_per_competency=1)
+        AnalyticsSnapshotRefresher().rebuild(1)
+        db.session.commit()
+    return app
+
+
+def new_progress(activity_type, percentage, course_id=1):
+    return {
+        'student_id': 1, 'course_id': course_id, 'enrollment_id': 1, 'activity_type': activity_type,
+        'activity_id': 1, 'score': percentage, 'max_score': 100 if percentage is not None else None,
+        'percentage': percentage
+    }
+
+
+def distribution(course_id=1):
+    db.session.expire_all()
+    return CourseAnalyticsSnapshot.query.filter_by(course_id=course_id).one().activity_distribution
+
+
+def test_batch_matches_rebuild_without_touching_the_snapshot(snapshot_app, count_queries):
+    entries = [('diagnostic', 80.0), ('diagnostic', None), ('learning', 50.0), ('foro', 30.0), ('foro', 10.0)]
+    with snapshot_app.app_context():
+        existing = set(distribution())
+        assert 'foro' not in existing and {'diagnostic', 'learning'} <= existing
+        bulk_insert(Progress, [new_progress(activity_type, percentage) for activity_type, percentage in entries])
+
+        with count_queries() as queries:
+            AnalyticsSnapshotRefresher().record_progress_batch(1, entries)
+        db.session.commit()
+        incremental = distribution()
+
+        # Un UPDATE por tipo; solo el tipo nuevo lee la instantánea (INSERT ... SELECT)
+        snapshot_statements = [s for s in queries.statements if 'course_analytics_snapshots' in s]
+        assert len(snapshot_statements) == 1 and snapshot_statements[0].startswith('INSERT')
+        assert not [s for s in queries.statements if 'FOR UPDATE' in s]
+
+        AnalyticsSnapshotRefresher().rebuild(1)
+        rebuilt = distribution()
+        assert set(incremental) == set(rebuilt)
+        for activity_type, entry in rebuilt.items():
+            assert incremental[activity_type] == pytest.approx(entry), activity_type
+        assert incremental['foro'] == {'count': 2, 'scored': 2, 'percentage_sum': 40.0}
+
+
+def test_course_without_snapshot_is_not_counted(snapshot_app):
+    with snapshot_app.app_context():
+        CourseAnalyticsSnapshot.query.delete()
+        CourseActivityCounter.query.delete()
+        db.session.commit()
+
+        AnalyticsSnapshotRefresher().record_progress_batch(1, [('learning', 50.0)])
+        db.session.commit()
+
+        assert CourseActivityCounter.query.count() == 0
+
+
+def test_rollback_discards_increments(snapshot_app):
+    with snapshot_app.app_context():
+        before = distribution()
+        AnalyticsSnapshotRefresher().record_progress_batch(1, [('learning', 50.0), ('otro', 10.0)])
+        db.session.rollback()
+
+        assert distribution() == before
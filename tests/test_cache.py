@@ -0,0 +1,54 @@
+"""
+Pruebas de la invalidación diferida de cachés
+"""
+
+from sqlalchemy import text
+
+from app import db
+from app.cache import defer_invalidation
+
+invalidated = []
+
+
+def invalidate_courses(keys):
+    invalidated.append(('courses', sorted(keys)))
+
+
+def invalidate_students(keys):
+    invalidated.append(('students', sorted(keys)))
+
+
+def test_invalidates_now_and_after_commit(app):
+    invalidated.clear()
+    with app.app_context():
+        defer_invalidation(db.session, invalidate_courses, [1, None])
+        defer_invalidation(db.session, invalidate_courses, [2])
+        defer_invalidation(db.session, invalidate_students, [7])
+        assert invalidated == [('courses', [1]), ('courses', [2]), ('students', [7])]
+
+        invalidated.clear()
+        db.session.commit()
+        assert invalidated == [('courses', [1, 2]), ('students', [7])]
+
+        invalidated.clear()
+        db.session.commit()
+        assert invalidated == []
+
+
+def test_rollback_discards_pending(app):
+    invalidated.clear()
+    with app.app_context():
+        db.session.execute(text('SELECT 1'))
+        defer_invalidation(db.session, invalidate_courses, [1])
+        db.session.rollback()
+        db.session.commit()
+    assert invalidated == [('courses', [1])]
+
+
+def test_without_session_or_keys(app):
+    invalidated.clear()
+    with app.app_context():
+        defer_invalidation(None, invalidate_courses, [3])
+        defer_invalidation(db.session, invalidate_courses, [None])
+        db.session.commit()
+    assert invalidated == [('courses', [3])]
@@ -0,0 +1,43 @@
+"""
+Pruebas del orden de estudio del grafo de prerequisitos
+"""
+
+from app.ai.competency_graph import CompetencyGraph, CompetencyNode
+
+
+def graph_of(prerequisites):
+    """Grafo del curso 1 a partir de {ID: (prerequisitos...)}"""
+    return CompetencyGraph(1, [
+        CompetencyNode(node_id, 1, f'C{node_id}', None, tuple(prereqs))
+        for node_id, prereqs in sorted(prerequisites.items())
+    ])
+
+
+def ordered_ids(graph, scores):
+    sequence, forced = graph.order(scores)
+    return [node.id for node, _ in sequence], forced
+
+
+def test_order_respects_prerequisites_and_scores():
+    graph = graph_of({1: (), 2: (1,), 3: (), 4: (2, 3)})
+
+    assert ordered_ids(graph, {1: 0.8, 2: 0.1, 3: 0.5, 4: 0.0}) == ([3, 1, 2, 4], [])
+
+
+def test_cycle_releases_only_its_own_members():
+    # 1 <-> 2 forman un ciclo; 3 depende de 1 y tiene el menor puntaje
+    graph = graph_of({1: (2,), 2: (1,), 3: (1,)})
+
+    assert graph.cycles == [[1, 2]]
+    # Antes se liberaba 3 (fuera del ciclo) y luego 1: forced == [3, 1]
+    assert ordered_ids(graph, {1: 0.9, 2: 0.9, 3: 0.1}) == ([1, 3, 2], [1])
+
+
+def test_cycle_waiting_on_another_cycle_is_released_later():
+    # El ciclo 3 <-> 4 depende del ciclo 1 <-> 2, aunque sus puntajes son menores
+    graph = graph_of({1: (2,), 2: (1,), 3: (4, 1), 4: (3,)})
+
+    sequence, forced = ordered_ids(graph, {1: 0.9, 2: 0.8, 3: 0.1, 4: 0.2})
+
+    assert sequence == [2, 1, 3, 4]
+    assert forced == [2, 3]
@@ -0,0 +1,56 @@
+"""
+Pruebas de la marca de agua de FormsResponsePuller
+"""
+
+from unittest import mock
+
+import requests
+
+from app.ai.forms_response_puller import FormsResponsePuller, FormsSyncState
+
+
+def make_puller():
+    return FormsResponsePuller(api_key='token', state=FormsSyncState(), session=requests.Session())
+
+
+def response(response_id, submitted):
+    return {'responseId': response_id, 'lastSubmittedTime': submitted}
+
+
+def test_mark_compares_instants_not_text():
+    puller = make_puller()
+
+    # Como texto '10:00:00Z' > '10:00:00.5Z' > '10:00:00.123456789Z'
+    mark = puller._advance_mark(None, [
+        response('a', '2024-03-01T10:00:00.123456789Z'),
+        response('b', '2024-03-01T10:00:01Z'),
+        response('c', '2024-03-01T10:00:00.5Z'),
+        response('d', '2024-03-01T10:00:01.000Z'),
+    ])
+
+    assert mark == {'last_submitted_time': '2024-03-01T10:00:01Z', 'response_ids': ['b', 'd']}
+
+
+def test_mark_does_not_move_back():
+    puller = make_puller()
+    mark = {'last_submitted_time': '2024-03-01T10:00:01Z', 'response_ids': ['b']}
+
+    assert puller._advance_mark(mark, [response('a', '2024-03-01T10:00:00.900Z')]) == mark
+    assert puller._advance_mark(mark, [response('e', '2024-03-01T10:00:01.000000Z')]) == {
+        'last_submitted_time': '2024-03-01T10:00:01.000000Z', 'response_ids': ['b', 'e']
+    }
+
+
+def test_pull_skips_responses_seen_at_the_mark():
+    puller = make_puller()
+    puller.state.update('form', {'last_submitted_time': '2024-03-01T10:00:01Z', 'response_ids': ['b']})
+    fetched = [response('b', '2024-03-01T10:00:01.000Z'), response('f', '2024-03-01T10:00:02.25Z')]
+    ingest = mock.Mock(return_value={'queued': 1})
+
+    with mock.patch.object(puller, 'fetch_responses', return_value=fetched) as fetch:
+        result = puller.pull_form('form', ingest=ingest)
+
+    fetch.assert_called_once_with('form', since='2024-03-01T10:00:01Z')
+    ingest.assert_called_once_with('form', [fetched[1]])
+    assert result['high_water_mark'] == '2024-03-01T10:00:02.25Z'
+    assert puller.state.get('form') == {'last_submitted_time': '2024-03-01T10:00:02.25Z', 'response_ids': ['f']}
@@ -0,0 +1,78 @@
+"""
+Pruebas de la escritura diferida del progreso: validación del tipo de
+actividad y descarte de eventos que no se pueden escribir
+"""
+
+import glob
+import json
+import os
+
+import pytest
+
+from app import db
+from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+from app.models import Progress
+from app.progress_buffer import get_progress_buffer
+from benchmarks.common import seed_course
+
+
+@pytest.fixture(params=['sync', 'buffer'])
+def app(request, app_factory, tmp_path):
+    app = app_factory(
+        PROGRESS_WRITE_MODE=request.param, PROGRESS_BUFFER_JOURNAL_DIR=str(tmp_path / 'journal'),
+        PROGRESS_BUFFER_BATCH_SIZE=1000, PROGRESS_BUFFER_FLUSH_INTERVAL=60
+    )
+    with app.app_context():
+        seed_course(3, progress_per_student=1, competencies=2, resources_per_competency=1)
+        AnalyticsSnapshotRefresher().rebuild(1)
+        db.session.commit()
+    yield app
+    buffer = get_progress_buffer(app)
+    if buffer is not None:
+        buffer.stop(5)
+
+
+def progress_payload(**overrides):
+    payload = {'course_id': 1, 'activity_type': 'learning', 'activity_id': 3, 'score': 7, 'max_score': 10}
+    payload.update(overrides)
+    return payload
+
+
+@pytest.mark.parametrize('activity_type', ['x' * 51, {'tipo': 'learning'}, 5], ids=['largo', 'dict', 'numero'])
+def test_invalid_activity_type_is_rejected(app, client_for, activity_type):
+    response = client_for(2).post('/api/progress/update', json=progress_payload(activity_type=activity_type))
+
+    assert response.status_code == 400
+    assert 'Tipo de actividad' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('app', ['buffer'], indirect=True)
+def test_bad_event_is_dead_lettered(app, client_for, tmp_path):
+    buffer = get_progress_buffer(app)
+    client = client_for(2)
+    for activity_id in range(1, 4):
+        response = client.post('/api/progress/update', json=progress_payload(activity_id=activity_id))
+        assert response.status_code == 202, response.get_json()
+    with app.app_context():
+        before = db.session.query(Progress).count()
+
+    # Un evento que la base de datos rechaza, colado entre los válidos
+    poisoned = dict(buffer._pending[0], activity_type={'tipo': 'learning'})
+    buffer._pending.insert(1, poisoned)
+
+    assert buffer.flush() == 3
+    assert buffer.pending() == 0
+    assert (buffer.failures, buffer.dead_letters) == (1, 1)
+    with app.app_context():
+        assert db.session.query(Progress).count() == before + 3
+
+    dead = glob.glob(os.path.join(str(tmp_path / 'journal'), 'dead-*.jsonl'))
+    assert len(dead) == 1
+    with open(dead[0], encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry['event']['activity_type'] for entry in entries] == [{'tipo': 'learning'}]
+    assert not glob.glob(os.path.join(str(tmp_path / 'journal'), 'progress-*.jsonl'))
+
+    # Los lotes siguientes ya no se bloquean
+    client.post('/api/progress/update', json=progress_payload(activity_id=9))
+    assert buffer.flush() == 1
@@ -0,0 +1,41 @@
+"""
+Pruebas de los planes de consulta: las consultas frecuentes usan índices
+"""
+
+import pytest
+from jinja2 import TemplateNotFound
+
+from app import db
+from benchmarks.bench_query_plans import (capture_frequent_queries, drop_composite_indexes, find_full_scans,
+                                          seed_vark_responses)
+from benchmarks.common import seed_course
+
+
+@pytest.fixture
+def seeded_app(app):
+    with app.app_context():
+        course_id = seed_course(300, progress_per_student=5, competencies=6, resources_per_competency=5)
+        seed_vark_responses(300)
+    return app, course_id
+
+
+def test_frequent_queries_use_indexes(seeded_app):
+    app, course_id = seeded_app
+    capture = capture_frequent_queries(app, course_id)
+
+    assert capture.statuses and set(capture.statuses.values()) == {200}, capture.statuses
+    # teacher/student_progress.html no existe todavía; la vista ejecuta sus consultas antes de renderizar
+    assert all(isinstance(error, TemplateNotFound) for error in capture.errors.values()), capture.errors
+    assert len(capture.statements) >= 20
+    failures = find_full_scans(app, capture)
+    assert not failures, [(label, scans, ' '.join(statement.split())[:160]) for label, scans, statement in failures]
+
+
+def test_detects_full_scans_without_indexes(seeded_app):
+    app, course_id = seeded_app
+    with app.app_context():
+        drop_composite_indexes()
+        db.session.remove()
+
+    capture = capture_frequent_queries(app, course_id)
+    assert find_full_scans(app, capture)
@@ -0,0 +1,93 @@
+"""
+Pruebas de StudentDashboardView: presupuesto de consultas, caché e invalidación
+"""
+
+import pytest
+from flask import render_template
+
+from app import db
+from app.ai.student_dashboard import StudentDashboardView, get_student_dashboard, get_student_dashboard_cache
+from app.models import CourseEnrollment, LearningPath, Progress, Student
+from benchmarks.bench_student_dashboard import QUERY_BUDGET, legacy_dashboard, seed_student_courses
+from benchmarks.common import seed_course
+
+
+@pytest.fixture
+def dashboard_app(app):
+    with app.app_context():
+        seed_course(30, progress_per_student=5, competencies=4, resources_per_competency=2)
+        seed_student_courses(1, 6, 5)
+        get_student_dashboard_cache().clear()
+    return app
+
+
+def test_query_budget_and_cache(dashboard_app, count_queries):
+    with dashboard_app.app_context():
+        db.session.expunge_all()
+        with count_queries() as counter:
+            view = get_student_dashboard(1)
+        assert counter.count <= QUERY_BUDGET, counter.statements
+
+        with count_queries() as counter:
+            cached = get_student_dashboard(1)
+        assert counter.count == 0
+        assert cached is view
+
+
+def test_same_data_as_previous_route(dashboard_app):
+    with dashboard_app.app_context():
+        view = get_student_dashboard(1)
+        db.session.expunge_all()
+        courses, avg_progress, diagnostics, paths, vark_profile, rendered = legacy_dashboard(db.session.get(Student, 1))
+
+        assert [course.id for course in view.courses] == [course.id for course in courses]
+        assert view.avg_progress == pytest.approx(avg_progress)
+        assert (view.completed_diagnostics, view.active_learning_paths) == (diagnostics, paths)
+        assert dict(view.vark_profile) == vark_profile
+        assert view.student.full_name == rendered['full_name']
+        assert [course.teacher_name for course in view.courses] == rendered['teachers']
+        assert [path.next_step.id if path.next_step else None for path in view.active_paths] == \
+            [step.id if step else None for step in rendered['next_steps']]
+
+
+def test_templates_render_without_queries(dashboard_app, count_queries):
+    with dashboard_app.app_context():
+        view = get_student_dashboard(1)
+    with dashboard_app.test_request_context('/student/dashboard'):
+        with count_queries() as counter:
+            render_template('student/dashboard.html', title='Mi Dashboard', **view.template_context())
+            render_template('student/dashboard_mejorado.html', title='Mi Dashboard', **view.template_context())
+        assert counter.count == 0, counter.statements
+
+
+def test_progress_change_invalidates_only_that_student(dashboard_app):
+    with dashboard_app.app_context():
+        view = get_student_dashboard(1)
+        other = get_student_dashboard(2)
+
+        db.session.get(CourseEnrollment, 10100).overall_progress = 1.0
+        db.session.add(Progress(student_id=1, course_id=100, enrollment_id=10100, activity_type='learning',
+                                score=1, max_score=1, percentage=100.0))
+        db.session.commit()
+
+        refreshed = get_student_dashboard(1)
+        assert refreshed is not view
+        assert next(course for course in refreshed.courses if course.id == 100).progress == 1.0
+        assert get_student_dashboard(2) is other
+
+
+def test_completed_step_invalidates_view(dashboard_app):
+    with dashboard_app.app_context():
+        get_student_dashboard(1)
+        path = db.session.get(LearningPath, 10100)
+        completed_order = path.get_next_step().step_order
+        path.get_next_step().complete_step()
+        db.session.commit()
+
+        refreshed = get_student_dashboard(1)
+        assert next(p for p in refreshed.active_paths if p.id == path.id).next_step.step_order == completed_order + 1
+
+
+def test_missing_student(dashboard_app):
+    with dashboard_app.app_context():
+        assert StudentDashboardView.load(10 ** 9) is None
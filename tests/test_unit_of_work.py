@@ -0,0 +1,112 @@
+"""
+Pruebas de la unidad de trabajo: una confirmación por petición y reversión
+de las respuestas de error
+"""
+
+from unittest import mock
+
+import pytest
+
+from app import db
+from app.ai.analytics_snapshot import AnalyticsSnapshotRefresher
+from app.ai.learning_path_generator import LearningPathGenerator
+from app.models import CourseEnrollment, LearningPath, LearningPathStep, Progress, Resource
+from app.models.learning import StepStatus
+from app.unit_of_work import transactional, unit_of_work
+from benchmarks.bench_commits_per_request import CommitCounter, run_flow, seed
+from benchmarks.common import bulk_insert
+
+
+@pytest.fixture(params=[False, True], ids=['sin-autocommit', 'autocommit'])
+def app(request, app_factory):
+    app = app_factory(MODEL_AUTOCOMMIT=request.param)
+    with app.app_context():
+        seed()
+    return app
+
+
+@pytest.fixture
+def engine(app):
+    with app.app_context():
+        return db.engine
+
+
+def test_each_request_commits_once(app):
+    rows = run_flow(app)
+
+    assert [(label, status) for label, status, _, _ in rows if status >= 400] == []
+    assert [(label, commits) for label, _, commits, _ in rows if commits != 1] == []
+
+
+def failing_record_progress(self, progress):
+    """Falla después de que la vista agregó el progreso a la sesión"""
+    db.session.flush()
+    raise RuntimeError('fallo simulado al registrar el progreso')
+
+
+def failing_generate_path(self, student_id, course_id):
+    """Escribe una ruta a medias y devuelve None, como una generación fallida"""
+    enrollment_id = db.session.query(CourseEnrollment.id).filter_by(
+        student_id=student_id, course_id=course_id).scalar()
+    db.session.add(LearningPath(student_id=student_id, course_id=course_id, enrollment_id=enrollment_id,
+                                title='Ruta a medias'))
+    db.session.flush()
+    return None
+
+
+@pytest.mark.parametrize('model, patch, path, payload', [
+    (Progress, mock.patch.object(AnalyticsSnapshotRefresher, 'record_progress', failing_record_progress),
+     '/api/progress/update',
+     {'course_id': 1, 'activity_type': 'assessment', 'activity_id': 8, 'score': 5, 'max_score': 10}),
+    (LearningPath, mock.patch.object(LearningPathGenerator, 'generate_path', failing_generate_path),
+     '/api/learning-path/generate', {'course_id': 1}),
+], ids=['progreso', 'ruta'])
+def test_error_response_rolls_back(app, engine, client_for, model, patch, path, payload):
+    with app.app_context():
+        before = db.session.query(model).count()
+
+    client = client_for(2)
+    with patch, CommitCounter(engine) as commits:
+        response = client.post(path, json=payload)
+
+    assert response.status_code == 500
+    assert commits.count == 0
+    with app.app_context():
+        assert db.session.query(model).count() == before
+
+
+def test_transactional_statuses(app, engine):
+    """Tuplas (cuerpo, estado) y objetos Response de error revierten; el resto confirma"""
+    def view(status, as_response):
+        db.session.add(Progress(student_id=1, course_id=1, enrollment_id=1, activity_type='learning'))
+        if as_response:
+            return app.response_class('x', status=status)
+        return ('x', status) if status else 'x'
+
+    with app.app_context():
+        before = db.session.query(Progress).count()
+        for status, as_response, committed in ((500, False, False), (404, True, False),
+                                               (None, False, True), (201, True, True)):
+            with CommitCounter(engine) as commits:
+                transactional(view)(status, as_response)
+            assert commits.count == int(committed), (status, as_response)
+            before += int(committed)
+            assert db.session.query(Progress).count() == before
+
+
+def test_chained_model_methods_commit_once(app, engine):
+    with app.app_context():
+        path = LearningPath.query.filter_by(course_id=1).first()
+        bulk_insert(LearningPathStep, [{
+            'learning_path_id': path.id, 'resource_id': Resource.query.first().id, 'step_order': order,
+            'title': f'Paso {order}', 'status': StepStatus.PENDING
+        } for order in range(1, 4)])
+        path.total_steps = 3
+        db.session.commit()
+
+        step = LearningPathStep.query.filter_by(learning_path_id=path.id).first()
+        with CommitCounter(engine) as commits:
+            with unit_of_work():
+                step.complete_step()
+        assert commits.count == 1
+        assert db.session.get(LearningPath, path.id).completion_percentage > 0
@@ -0,0 +1,40 @@
+"""
+Pruebas del puntaje VARK por diccionario y en lote
+"""
+
+import numpy as np
+
+from app.ai.vark_analyzer import VARKAnalyzer
+
+
+def test_unanswered_questions_count_in_the_denominator():
+    scores = VARKAnalyzer().analyze_responses({1: 'V', 2: 'A', 3: 'X', 4: None})
+
+    assert scores == {'visual': 25.0, 'auditory': 25.0, 'reading': 0.0, 'kinesthetic': 0.0}
+
+
+def test_batch_rows_of_different_lengths():
+    result = VARKAnalyzer().analyze_responses_batch([
+        {1: 'V', 2: ''},
+        {1: 'K', 2: 'K', 3: 'R', 4: None},
+        {}
+    ])
+
+    assert result['scores'].tolist() == [
+        [50.0, 0.0, 0.0, 0.0],
+        [0.0, 0.0, 25.0, 50.0],
+        [0.0, 0.0, 0.0, 0.0]
+    ]
+    assert result['questions'].tolist() == [2, 4, 0]
+    assert result['answered'].tolist() == [1, 3, 0]
+
+
+def test_matrix_matches_dicts():
+    analyzer = VARKAnalyzer()
+    matrix = np.array([['V', None, 'A', 'X'], ['R', 'R', '', 'K']], dtype=object)
+
+    batch = analyzer.analyze_responses_batch(matrix)['scores']
+
+    for row, scores in zip(matrix, batch):
+        expected = analyzer.analyze_responses(dict(enumerate(row)))
+        assert scores.tolist() == list(expected.values())